@@ -95,17 +95,18 @@ def _get_marker_param(request):
     return request.GET['marker']
 
 
-def limited(items, request, max_limit=CONF.osapi_max_limit):
-    """Return a slice of items according to requested offset and limit.
-
-    :param items: A sliceable entity
-    :param request: ``wsgi.Request`` possibly containing 'offset' and 'limit'
-                    GET variables. 'offset' is where to start in the list,
-                    and 'limit' is the maximum number of items to return. If
-                    'limit' is not specified, 0, or > max_limit, we default
-                    to max_limit. Negative values for either offset or limit
-                    will cause exc.HTTPBadRequest() exceptions to be raised.
-    :kwarg max_limit: The maximum number of items to return from 'items'
+def get_limit_offset_marker(request, max_limit=CONF.osapi_max_limit):
+    """Return limit, offset, marker tuple from request.
+
+    :param request: ``wsgi.Request`` possibly containing 'limit', 'offset'
+                    and 'marker' GET variables. 'limit' is the maximum
+                    number of items to return, 'offset' is the number of
+                    items to skip and 'marker' is the id of the last item
+                    the client has seen. If 'limit' is not specified, 0, or
+                    > max_limit, we default to max_limit. Negative values
+                    for either offset or limit will cause
+                    exc.HTTPBadRequest() exceptions to be raised.
+    :kwarg max_limit: The maximum number of items to return
     """
     try:
         offset = int(request.GET.get('offset', 0))
@@ -128,6 +129,23 @@ def limited(items, request, max_limit=CONF.osapi_max_limit):
         raise webob.exc.HTTPBadRequest(explanation=msg)
 
     limit = min(max_limit, limit or max_limit)
+    marker = request.GET.get('marker') or None
+    return limit, offset, marker
+
+
+def limited(items, request, max_limit=CONF.osapi_max_limit):
+    """Return a slice of items according to requested offset and limit.
+
+    :param items: A sliceable entity
+    :param request: ``wsgi.Request`` possibly containing 'offset' and 'limit'
+                    GET variables. 'offset' is where to start in the list,
+                    and 'limit' is the maximum number of items to return. If
+                    'limit' is not specified, 0, or > max_limit, we default
+                    to max_limit. Negative values for either offset or limit
+                    will cause exc.HTTPBadRequest() exceptions to be raised.
+    :kwarg max_limit: The maximum number of items to return from 'items'
+    """
+    limit, offset, _marker = get_limit_offset_marker(request, max_limit)
     range_end = offset + limit
     return items[offset:range_end]
 
@@ -204,6 +222,9 @@ class ViewBuilder(object):
     _collection_name = None
     _detail_version_modifiers = []
 
+    # Modifiers applicable to each request version, by view builder class
+    _version_modifiers_cache = {}
+
     def _get_links(self, request, identifier):
         return [{"rel": "self",
                  "href": self._get_href_link(request, identifier), },
@@ -270,11 +291,27 @@ class ViewBuilder(object):
         This method calls every method, that is applicable to the request
         version, in _detail_version_modifiers.
         """
-        for method_name in self._detail_version_modifiers:
-            method = getattr(self, method_name)
-            if request.api_version_request.matches_versioned_method(method):
-                request_context = request.environ['manila.context']
-                method.func(self, request_context, resource_dict, resource)
+        modifiers = self._get_version_modifiers(request.api_version_request)
+        if modifiers:
+            request_context = request.environ['manila.context']
+            for modifier in modifiers:
+                modifier(self, request_context, resource_dict, resource)
+
+    def _get_version_modifiers(self, version_request):
+        """Returns the modifiers applicable to the request version.
+
+        They are looked up once per view builder class and request version.
+        """
+        key = (type(self), version_request, version_request.experimental)
+        modifiers = self._version_modifiers_cache.get(key)
+        if modifiers is None:
+            modifiers = tuple(
+                method.func for method in (
+                    getattr(self, method_name)
+                    for method_name in self._detail_version_modifiers)
+                if version_request.matches_versioned_method(method))
+            self._version_modifiers_cache[key] = modifiers
+        return modifiers
 
     @classmethod
     def versioned_method(cls, min_ver, max_ver=None, experimental=False):
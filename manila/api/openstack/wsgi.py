@@ -48,6 +48,9 @@ _MEDIA_TYPE_MAP = {
 # name of attribute to keep version method information
 VER_METHOD_ATTR = 'versioned_methods'
 
+# Versions of the controller methods matching each request version
+_versioned_method_cache = {}
+
 # Name of header used by clients to request a specific version
 # of the REST API
 API_VERSION_REQUEST_HEADER = 'X-OpenStack-Manila-API-Version'
@@ -1023,6 +1026,18 @@ class Controller(object):
             self._view_builder = None
 
     def __getattribute__(self, key):
+        try:
+            version_meth_dict = object.__getattribute__(self, VER_METHOD_ATTR)
+        except AttributeError:
+            # No versioning on this class
+            return object.__getattribute__(self, key)
+
+        if version_meth_dict and key in version_meth_dict:
+            return object.__getattribute__(self, '_get_version_select')(key)
+
+        return object.__getattribute__(self, key)
+
+    def _get_version_select(self, key):
 
         def version_select(*args, **kwargs):
             """Select and call the matching version of the specified method.
@@ -1043,30 +1058,40 @@ class Controller(object):
             else:
                 version_request = args[0].api_version_request
 
-            func_list = self.versioned_methods[key]
-            for func in func_list:
-                if version_request.matches_versioned_method(func):
-                    # Update the version_select wrapper function so
-                    # other decorator attributes like wsgi.response
-                    # are still respected.
-                    functools.update_wrapper(version_select, func.func)
-                    return func.func(self, *args, **kwargs)
+            func = self._get_versioned_method(key, version_request)
+            if func is None:
+                # No version match
+                raise exception.VersionNotFoundForAPIMethod(
+                    version=version_request)
 
-            # No version match
-            raise exception.VersionNotFoundForAPIMethod(
-                version=version_request)
+            # Update the version_select wrapper function so
+            # other decorator attributes like wsgi.response
+            # are still respected.
+            functools.update_wrapper(version_select, func.func)
+            return func.func(self, *args, **kwargs)
 
-        try:
-            version_meth_dict = object.__getattribute__(self, VER_METHOD_ATTR)
-        except AttributeError:
-            # No versioning on this class
-            return object.__getattribute__(self, key)
+        return version_select
 
-        if (version_meth_dict and
-                key in object.__getattribute__(self, VER_METHOD_ATTR)):
-            return version_select
+    def _get_versioned_method(self, key, version_request):
+        """Returns the version of a method that matches the request version.
 
-        return object.__getattribute__(self, key)
+        The matching version is looked up once per controller class and
+        request version.
+        """
+        cache_key = (type(self), key, version_request,
+                     version_request.experimental)
+        try:
+            return _versioned_method_cache[cache_key]
+        except KeyError:
+            pass
+
+        func = None
+        for func_version in self.versioned_methods[key]:
+            if version_request.matches_versioned_method(func_version):
+                func = func_version
+                break
+        _versioned_method_cache[cache_key] = func
+        return func
 
     # NOTE(cyeoh): This decorator MUST appear first (the outermost
     # decorator) on an API method for it to work correctly
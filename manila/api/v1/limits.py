@@ -18,11 +18,18 @@ Module dedicated functions/classes dealing with rate limiting requests.
 """
 
 import collections
+import contextlib
 import copy
 import math
+import os
 import re
+import socket
+import sqlite3
+import threading
 import time
 
+from oslo_config import cfg
+from oslo_log import log
 from oslo_serialization import jsonutils
 from oslo_utils import importutils
 from six.moves import http_client
@@ -31,10 +38,12 @@ import webob.exc
 
 from manila.api.openstack import wsgi
 from manila.api.views import limits as limits_views
-from manila.i18n import _
+from manila.i18n import _, _LW
 from manila import quota
 from manila import wsgi as base_wsgi
 
+CONF = cfg.CONF
+LOG = log.getLogger(__name__)
 QUOTAS = quota.QUOTAS
 
 
@@ -123,6 +132,14 @@ class Limit(object):
         if self.verb != verb or not re.match(self.regex, url):
             return
 
+        return self.add_request()
+
+    def add_request(self):
+        """Records a request that this limit applies to.
+
+        @return: Number of seconds to wait before the request can be made,
+                 or None if it can be made now
+        """
         now = self._get_time()
 
         if self.last_request is None:
@@ -150,6 +167,14 @@ class Limit(object):
         self.remaining = math.floor(((cap - water) / cap) * val)
         self.next_request = now
 
+    def is_drained(self, now):
+        """Whether all the requests made have leaked out of the bucket.
+
+        A drained limit behaves like a new one for the next request.
+        """
+        return (self.last_request is None or
+                now - self.last_request >= self.water_level)
+
     def _get_time(self):
         """Retrieve the current time. Broken out for testability."""
         return time.time()
@@ -185,7 +210,8 @@ DEFAULT_LIMITS = [
 class RateLimitingMiddleware(base_wsgi.Middleware):
     """Rate-limits requests passing through this middleware.
 
-    All limit information is stored in memory for this implementation.
+    Limit information is kept by the limiter, in memory by default. Use
+    `SqliteLimiter` for the API workers of a host to share it.
     """
 
     def __init__(self, application, limits=None, limiter=None, **kwargs):
@@ -245,36 +271,133 @@ class RateLimitingMiddleware(base_wsgi.Middleware):
         return self.application
 
 
+class LimitRouter(object):
+    """Finds the limits that apply to requests.
+
+    The regexes of the limits of each verb are compiled once, and combined
+    into a single regex that finds all the limits matching an URL in one
+    pass, unless they use groups or flags that combining them would break.
+    """
+
+    def __init__(self, limits):
+        indexes = collections.defaultdict(list)
+        for index, limit in enumerate(limits):
+            indexes[limit.verb].append(index)
+        self._routes = {
+            verb: self._compile([limits[index].regex for index in indexes],
+                                indexes)
+            for verb, indexes in indexes.items()}
+
+    @staticmethod
+    def _compile(regexes, indexes):
+        patterns = [re.compile(regex) for regex in regexes]
+        default_flags = re.compile('').flags
+        if all(not pattern.groups and pattern.flags == default_flags
+               for pattern in patterns):
+            # Each regex is matched at the start of the URL by a lookahead,
+            # whose group tells whether it matched.
+            combined = re.compile(''.join('(?:(?=(%s)))?' % regex
+                                          for regex in regexes))
+
+            def match(url):
+                groups = combined.match(url).groups()
+                return [index for index, group in zip(indexes, groups)
+                        if group is not None]
+        else:
+            def match(url):
+                return [index for index, pattern in zip(indexes, patterns)
+                        if pattern.match(url)]
+        return match
+
+    def match(self, verb, url):
+        """Returns the indexes of the limits that apply to a request."""
+        route = self._routes.get(verb)
+        return route(url) if route else []
+
+
 class Limiter(object):
     """Rate-limit checking class which handles limits in memory."""
 
+    # Minimum number of seconds between two evictions of the levels of the
+    # users whose limits are all drained
+    EVICTION_INTERVAL = 60
+
     def __init__(self, limits, **kwargs):
         """Initialize the new `Limiter`.
 
         @param limits: List of `Limit` objects
         """
         self.limits = copy.deepcopy(limits)
-        self.levels = collections.defaultdict(lambda: copy.deepcopy(limits))
+        self.user_limits = {}
+        self.levels = {}
 
         # Pick up any per-user limit information
         for key, value in kwargs.items():
             if key.startswith('user:'):
                 username = key[5:]
-                self.levels[username] = self.parse_limits(value)
+                self.user_limits[username] = self.parse_limits(value)
+                self.levels[username] = self._new_levels(username)
+
+        self._router = LimitRouter(self.limits)
+        self._user_routers = {username: LimitRouter(user_limits)
+                              for username, user_limits
+                              in self.user_limits.items()}
+        self._next_eviction = self._get_time() + self.EVICTION_INTERVAL
+
+    def _new_levels(self, username):
+        # NOTE: the limits only hold immutable values, so shallow copies
+        # are enough.
+        return [copy.copy(limit)
+                for limit in self.user_limits.get(username, self.limits)]
+
+    def _get_levels(self, username):
+        levels = self.levels.get(username)
+        if levels is None:
+            levels = self.levels[username] = self._new_levels(username)
+        return levels
+
+    def _get_router(self, username):
+        return self._user_routers.get(username, self._router)
+
+    def _evict_levels(self, now):
+        """Forgets the users whose limits are all drained."""
+        for username, levels in list(self.levels.items()):
+            if all(limit.is_drained(now) for limit in levels):
+                del self.levels[username]
+
+    def _get_time(self):
+        """Retrieve the current time. Broken out for testability."""
+        return time.time()
 
     def get_limits(self, username=None):
         """Return the limits for a given user."""
-        return [limit.display() for limit in self.levels[username]]
+        return [limit.display() for limit in self._get_levels(username)]
 
     def check_for_delay(self, verb, url, username=None):
         """Check the given verb/user/user triplet for limit.
 
+        @return: Tuple of delay (in seconds) and error message (or None, None)
+        """
+        now = self._get_time()
+        if now >= self._next_eviction:
+            self._evict_levels(now)
+            self._next_eviction = now + self.EVICTION_INTERVAL
+
+        levels = self._get_levels(username)
+        return self._add_request(
+            [levels[index]
+             for index in self._get_router(username).match(verb, url)])
+
+    @staticmethod
+    def _add_request(limits):
+        """Records a request in the limits that apply to it.
+
         @return: Tuple of delay (in seconds) and error message (or None, None)
         """
         delays = []
 
-        for limit in self.levels[username]:
-            delay = limit(verb, url)
+        for limit in limits:
+            delay = limit.add_request()
             if delay:
                 delays.append((delay, limit.error_message))
 
@@ -345,6 +468,135 @@ class Limiter(object):
         return result
 
 
+class SqliteLimiter(Limiter):
+    """Rate-limit checking class which keeps the limits in SQLite.
+
+    The API workers using the same database file share the limits, so that
+    they apply to the workers of a host altogether rather than to each of
+    them. The limits of a user are forgotten once they are drained.
+
+    Select it with the ``limiter`` option of the rate limiting middleware,
+    and set the path of the database file with ``db_path``, which defaults
+    to ``rate_limits.sqlite`` in the ``state_path`` directory.
+    """
+
+    # Number of seconds to wait for the database lock
+    LOCK_TIMEOUT = 5
+
+    def __init__(self, limits, db_path=None, **kwargs):
+        super(SqliteLimiter, self).__init__(limits, **kwargs)
+        self.db_path = db_path or os.path.join(CONF.state_path,
+                                               'rate_limits.sqlite')
+        self._connection = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _get_key(limit):
+        return '%s %s %d/%d' % (limit.verb, limit.regex, limit.value,
+                                limit.unit)
+
+    def _get_levels(self, username):
+        # NOTE: the levels in memory only hold the state of the limits
+        # being checked, so users without their own limits share them.
+        if username not in self.user_limits:
+            username = None
+        return super(SqliteLimiter, self)._get_levels(username)
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        with self._lock:
+            if self._connection is None:
+                connection = sqlite3.connect(
+                    self.db_path, timeout=self.LOCK_TIMEOUT,
+                    isolation_level=None, check_same_thread=False)
+                # NOTE: losing the latest levels in a crash is harmless, so
+                # they are not synced to disk.
+                connection.execute('PRAGMA journal_mode = WAL')
+                connection.execute('PRAGMA synchronous = OFF')
+                connection.execute(
+                    'CREATE TABLE IF NOT EXISTS levels ('
+                    'username TEXT NOT NULL, limit_key TEXT NOT NULL, '
+                    'water_level REAL NOT NULL, last_request REAL, '
+                    'next_request REAL, remaining INTEGER NOT NULL, '
+                    'drained_at REAL NOT NULL, '
+                    'PRIMARY KEY (username, limit_key))')
+                connection.execute(
+                    'CREATE INDEX IF NOT EXISTS levels_drained_at '
+                    'ON levels (drained_at)')
+                self._connection = connection
+
+            cursor = self._connection.cursor()
+            # Takes the write lock before reading the levels, so that the
+            # requests of all the workers are recorded one after the other.
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                yield cursor
+                cursor.execute('COMMIT')
+            except Exception:
+                cursor.execute('ROLLBACK')
+                raise
+
+    def _load_levels(self, cursor, username, levels):
+        cursor.execute('SELECT limit_key, water_level, last_request, '
+                       'next_request, remaining FROM levels '
+                       'WHERE username = ?', (username or '',))
+        states = {row[0]: row[1:] for row in cursor.fetchall()}
+        for limit in levels:
+            state = states.get(self._get_key(limit))
+            if state is None:
+                state = (0, None, None, limit.value)
+            (limit.water_level, limit.last_request, limit.next_request,
+             limit.remaining) = state
+
+    def _save_levels(self, cursor, username, levels):
+        cursor.executemany(
+            'INSERT OR REPLACE INTO levels VALUES (?, ?, ?, ?, ?, ?, ?)',
+            [(username or '', self._get_key(limit), limit.water_level,
+              limit.last_request, limit.next_request, limit.remaining,
+              limit.last_request + limit.water_level)
+             for limit in levels if limit.last_request is not None])
+
+    def get_limits(self, username=None):
+        """Return the limits for a given user."""
+        levels = self._get_levels(username)
+        try:
+            with self._transaction() as cursor:
+                self._load_levels(cursor, username, levels)
+                return [limit.display() for limit in levels]
+        except sqlite3.Error:
+            LOG.warning(_LW("Could not read the rate limits of %s."),
+                        username, exc_info=True)
+            return []
+
+    def check_for_delay(self, verb, url, username=None):
+        """Check the given verb/user/user triplet for limit.
+
+        @return: Tuple of delay (in seconds) and error message (or None, None)
+        """
+        levels = self._get_levels(username)
+        levels = [levels[index]
+                  for index in self._get_router(username).match(verb, url)]
+        if not levels:
+            return None, None
+
+        now = self._get_time()
+        try:
+            with self._transaction() as cursor:
+                if now >= self._next_eviction:
+                    cursor.execute('DELETE FROM levels WHERE drained_at <= ?',
+                                   (now,))
+                    self._next_eviction = now + self.EVICTION_INTERVAL
+                self._load_levels(cursor, username, levels)
+                result = self._add_request(levels)
+                self._save_levels(cursor, username, levels)
+        except sqlite3.Error:
+            # NOTE: failing to rate limit must not fail the API requests.
+            LOG.warning(_LW("Could not check the rate limits of %s."),
+                        username, exc_info=True)
+            return None, None
+        return result
+
+
 class WsgiLimiter(object):
     """Rate-limit checking from a WSGI application.
 
@@ -406,24 +658,47 @@ class WsgiLimiterProxy(object):
         @param limiter_address: IP/port combination of where to request limit
         """
         self.limiter_address = limiter_address
+        # Idle connections to the limiter, kept open between requests
+        self._connections = []
+
+    def _post(self, path, body, headers):
+        """Sends a request to the limiter, through an idle connection if any.
+
+        A request failing on an idle connection, which the limiter may have
+        closed in the meantime, is sent again through a new connection.
+        """
+        while True:
+            reused = bool(self._connections)
+            if reused:
+                conn = self._connections.pop()
+            else:
+                conn = http_client.HTTPConnection(self.limiter_address)
+            try:
+                conn.request("POST", path, body, headers)
+                resp = conn.getresponse()
+                # The response must be read before the connection is reused
+                content = resp.read()
+            except (http_client.HTTPException, socket.error):
+                conn.close()
+                if reused:
+                    continue
+                raise
+            self._connections.append(conn)
+            return resp, content
 
     def check_for_delay(self, verb, path, username=None):
         body = jsonutils.dumps({"verb": verb, "path": path})
         headers = {"Content-Type": "application/json"}
 
-        conn = http_client.HTTPConnection(self.limiter_address)
-
         if username:
-            conn.request("POST", "/%s" % (username), body, headers)
+            resp, content = self._post("/%s" % (username), body, headers)
         else:
-            conn.request("POST", "/", body, headers)
-
-        resp = conn.getresponse()
+            resp, content = self._post("/", body, headers)
 
-        if 200 >= resp.status < 300:
+        if 200 <= resp.status < 300:
             return None, None
 
-        return resp.getheader("X-Wait-Seconds"), resp.read() or None
+        return resp.getheader("X-Wait-Seconds"), content or None
 
     # Note: This method gets called before the class is instantiated,
     # so this must be either a static method or a class method.  It is
@@ -86,8 +86,10 @@ class ShareSnapshotMixin(object):
         search_opts.update(req.GET)
 
         # Remove keys that are not related to share attrs
+        limit, offset, marker = common.get_limit_offset_marker(req)
         search_opts.pop('limit', None)
         search_opts.pop('offset', None)
+        search_opts.pop('marker', None)
         sort_key = search_opts.pop('sort_key', 'created_at')
         sort_dir = search_opts.pop('sort_dir', 'desc')
 
@@ -105,17 +107,19 @@ class ShareSnapshotMixin(object):
             search_opts=search_opts,
             sort_key=sort_key,
             sort_dir=sort_dir,
+            limit=limit,
+            offset=offset,
+            marker=marker,
         )
 
         # Snapshots with no instances are filtered out.
         snapshots = list(filter(lambda x: x.get('status') is not None,
                                 snapshots))
 
-        limited_list = common.limited(snapshots, req)
         if is_detail:
-            snapshots = self._view_builder.detail_list(req, limited_list)
+            snapshots = self._view_builder.detail_list(req, snapshots)
         else:
-            snapshots = self._view_builder.summary_list(req, limited_list)
+            snapshots = self._view_builder.summary_list(req, snapshots)
         return snapshots
 
     def _get_snapshots_search_options(self):
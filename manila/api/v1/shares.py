@@ -191,8 +191,10 @@ class ShareMixin(object):
         search_opts.update(req.GET)
 
         # Remove keys that are not related to share attrs
+        limit, offset, marker = common.get_limit_offset_marker(req)
         search_opts.pop('limit', None)
         search_opts.pop('offset', None)
+        search_opts.pop('marker', None)
         sort_key = search_opts.pop('sort_key', 'created_at')
         sort_dir = search_opts.pop('sort_dir', 'desc')
 
@@ -216,14 +218,12 @@ class ShareMixin(object):
 
         shares = self.share_api.get_all(
             context, search_opts=search_opts, sort_key=sort_key,
-            sort_dir=sort_dir)
-
-        limited_list = common.limited(shares, req)
+            sort_dir=sort_dir, limit=limit, offset=offset, marker=marker)
 
         if is_detail:
-            shares = self._view_builder.detail_list(req, limited_list)
+            shares = self._view_builder.detail_list(req, shares)
         else:
-            shares = self._view_builder.summary_list(req, limited_list)
+            shares = self._view_builder.summary_list(req, shares)
         return shares
 
     def _get_share_search_options(self):
@@ -15,6 +15,7 @@
 
 from webob import exc
 
+from manila.api import common
 from manila.api.openstack import wsgi
 from manila.api.views import share_instance as instance_view
 from manila import db
@@ -61,7 +62,7 @@ class ShareInstancesController(wsgi.Controller, wsgi.AdminActionsMixin):
     def instance_force_delete(self, req, id, body):
         return self._force_delete(req, id, body)
 
-    @wsgi.Controller.api_version("2.3")
+    @wsgi.Controller.api_version("2.3", "2.19")
     @wsgi.Controller.authorize
     def index(self, req):
         context = req.environ['manila.context']
@@ -69,6 +70,17 @@ class ShareInstancesController(wsgi.Controller, wsgi.AdminActionsMixin):
         instances = db.share_instances_get_all(context)
         return self._view_builder.detail_list(req, instances)
 
+    @wsgi.Controller.api_version("2.20")  # noqa
+    @wsgi.Controller.authorize
+    def index(self, req):  # noqa pylint: disable=E0102
+        context = req.environ['manila.context']
+
+        params = common.get_pagination_params(req)
+        instances = db.share_instances_get_all(
+            context, limit=params.get('limit') or None,
+            marker=params.get('marker'))
+        return self._view_builder.detail_list(req, instances)
+
     @wsgi.Controller.api_version("2.3")
     @wsgi.Controller.authorize
     def show(self, req, id):
@@ -204,6 +204,11 @@ class API(base.Base):
             novaclient(context).servers.get(instance_id)
         )
 
+    def server_list(self, context, search_opts=None):
+        servers = novaclient(context).servers.list(True,
+                                                   search_opts=search_opts)
+        return [_untranslate_server_summary_view(s) for s in servers]
+
     def server_get_by_name_or_id(self, context, instance_name_or_id):
         try:
             server = utils.find_resource(
@@ -125,6 +125,20 @@ class RequestContext(context.RequestContext):
             'service_catalog': getattr(self, 'service_catalog', None)})
         return values
 
+    def to_policy_values(self):
+        """Returns the credentials that policies are checked against.
+
+        They are built once, and again only if the identity of the context
+        changes, e.g. when it gets elevated.
+        """
+        identity = (self.user_id, self.project_id, self.is_admin,
+                    tuple(self.roles), self.read_deleted)
+        cached = getattr(self, '_policy_values', None)
+        if cached is None or cached[0] != identity:
+            cached = (identity, self.to_dict())
+            self._policy_values = cached
+        return cached[1]
+
     @classmethod
     def from_dict(cls, values):
         return cls(**values)
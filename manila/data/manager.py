@@ -16,7 +16,9 @@
 Data Service
 """
 
+import errno
 import os
+import sys
 
 from oslo_config import cfg
 from oslo_log import log
@@ -30,6 +32,7 @@ from manila.data import utils as data_utils
 from manila import exception
 from manila import manager
 from manila.share import rpcapi as share_rpc
+from manila import utils
 
 LOG = log.getLogger(__name__)
 
@@ -38,11 +41,39 @@ data_opts = [
         'migration_tmp_location',
         default='/tmp/',
         help="Temporary path to create and mount shares during migration."),
+    cfg.IntOpt(
+        'data_copy_workers',
+        default=4,
+        min=1,
+        help="Number of batches of files copied concurrently when "
+             "copying the contents of a share during migration."),
+    cfg.IntOpt(
+        'data_copy_max_attempts',
+        default=3,
+        min=1,
+        help="Number of times the copy of the contents of a share is "
+             "attempted when it fails with a transient error, such as an "
+             "I/O error or a timeout. Each attempt resumes the copy, "
+             "skipping the files that were already copied."),
 ]
 
 CONF = cfg.CONF
 CONF.register_opts(data_opts)
 
+# Errnos of copy failures that resuming the copy may get past, as opposed to
+# permanent ones such as ENOSPC or EACCES.
+_TRANSIENT_COPY_ERRNOS = (errno.EIO, errno.EAGAIN, errno.EINTR,
+                          errno.ETIMEDOUT, errno.ESTALE, errno.ECONNRESET,
+                          errno.ECONNABORTED)
+
+
+class _TransientCopyError(Exception):
+    """Wraps a copy failure that is worth retrying."""
+
+    def __init__(self, exc_info):
+        super(_TransientCopyError, self).__init__(exc_info[1])
+        self.exc_info = exc_info
+
 
 class DataManager(manager.Manager):
     """Receives requests to handle data and sends responses."""
@@ -61,6 +92,29 @@ class DataManager(manager.Manager):
                 self.db.share_update(
                     ctxt, share['id'],
                     {'task_state': constants.TASK_STATE_DATA_COPYING_ERROR})
+                self._notify_interrupted_copy(ctxt, share)
+
+    def _notify_interrupted_copy(self, context, share):
+        # NOTE: Completing the migration of a share whose copy failed
+        # restores its source instance and keeps its destination instance,
+        # so that migrating the share again resumes the copy.
+        share_instance_id = None
+        dest_share_instance_id = None
+        for instance in share.instances:
+            if instance['status'] == constants.STATUS_MIGRATING:
+                share_instance_id = instance['id']
+            elif instance['status'] == constants.STATUS_MIGRATING_TO:
+                dest_share_instance_id = instance['id']
+
+        if None in (share_instance_id, dest_share_instance_id):
+            return
+
+        LOG.warning(_LW("Copy of data from share instance %(src)s to share "
+                        "instance %(dest)s was interrupted."),
+                    {'src': share_instance_id,
+                     'dest': dest_share_instance_id})
+        share_rpc.ShareAPI().migration_complete(
+            context, share, share_instance_id, dest_share_instance_id)
 
     def migration_start(self, context, ignore_list, share_id,
                         share_instance_id, dest_share_instance_id,
@@ -82,7 +136,7 @@ class DataManager(manager.Manager):
             copy = data_utils.Copy(
                 os.path.join(mount_path, share_instance_id),
                 os.path.join(mount_path, dest_share_instance_id),
-                ignore_list)
+                ignore_list, workers=CONF.data_copy_workers)
 
             self._copy_share_data(
                 context, copy, share_ref, share_instance_id,
@@ -152,6 +206,23 @@ class DataManager(manager.Manager):
             LOG.error(msg)
             raise exception.InvalidShare(reason=msg)
 
+    def _run_copy(self, copy):
+
+        @utils.retry(_TransientCopyError,
+                     retries=CONF.data_copy_max_attempts)
+        def _run():
+            try:
+                copy.run()
+            except EnvironmentError as e:
+                if e.errno not in _TRANSIENT_COPY_ERRNOS:
+                    raise
+                raise _TransientCopyError(sys.exc_info())
+
+        try:
+            _run()
+        except _TransientCopyError as e:
+            six.reraise(*e.exc_info)
+
     def _copy_share_data(
             self, context, copy, src_share, share_instance_id,
             dest_share_instance_id, migration_info_src, migration_info_dest):
@@ -216,7 +287,7 @@ class DataManager(manager.Manager):
             {'task_state': constants.TASK_STATE_DATA_COPYING_IN_PROGRESS})
 
         try:
-            copy.run()
+            self._run_copy(copy)
 
             self.db.share_update(
                 context, src_share['id'],
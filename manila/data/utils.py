@@ -13,18 +13,49 @@
 #    under the License.
 
 import os
+import re
+import sys
 
+import eventlet
+from oslo_concurrency import processutils
 from oslo_log import log
+from oslo_utils import units
 import six
 
 from manila import utils
 
 LOG = log.getLogger(__name__)
 
+# Limits of the batches of files copied by a single rsync call.
+BATCH_FILES = 1000
+BATCH_SIZE = units.Gi
+
+# rsync ends the message of a failed system call with its errno, e.g.
+# 'rsync: write failed on "/path": No space left on device (28)'.
+_RSYNC_ERRNO_RE = re.compile(r'^rsync: .*\((\d+)\)$', re.MULTILINE)
 
-class Copy(object):
 
-    def __init__(self, src, dest, ignore_list):
+class Copy(object):
+    """Copies the contents of a mounted share into another one.
+
+    The source tree is listed, with the size of its files, by a single find
+    call. Files are then copied in batches by rsync, which preserves their
+    attributes in the same pass, and the batches are run by a pool of
+    workers. Both commands run as root, since the files belong to tenants.
+    Directories get their attributes last, once all of their contents were
+    copied.
+
+    rsync does not copy again files that already have the size and
+    modification time of their source at the destination, so an
+    interrupted copy can be resumed by running it again on the same
+    destination.
+
+    rsync moves each file into place once it is fully copied, so the
+    progress of the batches being copied is the size of their files that
+    already exist at the destination.
+    """
+
+    def __init__(self, src, dest, ignore_list, workers=1):
         self.src = src
         self.dest = dest
         self.total_size = 0
@@ -32,27 +63,28 @@ class Copy(object):
         self.files = []
         self.dirs = []
         self.current_copy = None
+        self.current_copies = {}
         self.ignore_list = ignore_list
         self.cancelled = False
+        self.workers = max(workers, 1)
+        self._error = None
 
     def get_progress(self):
 
         if self.current_copy is not None:
 
-            try:
-                size, err = utils.execute("stat", "-c", "%s",
-                                          self.current_copy['file_path'],
-                                          run_as_root=True)
-                size = int(size)
-            except utils.processutils.ProcessExecutionError:
-                size = 0
+            copied_size = self.current_size
+            for batch, progress in list(self.current_copies.items()):
+                progress['copied'] = self._get_copied_size(batch)
+                copied_size += progress['copied']
 
-            total_progress = 0
+            total_progress = 100
             if self.total_size > 0:
-                total_progress = self.current_size * 100 / self.total_size
+                total_progress = copied_size * 100 / self.total_size
             current_file_progress = 0
             if self.current_copy['size'] > 0:
-                current_file_progress = size * 100 / self.current_copy['size']
+                current_file_progress = (self.current_copy['copied'] * 100 /
+                                         self.current_copy['size'])
             current_file_path = self.current_copy['file_path']
 
             progress = {
@@ -71,90 +103,125 @@ class Copy(object):
 
     def run(self):
 
+        # NOTE: Running a copy again resumes it, since rsync skips the files
+        # that were already copied to the destination.
+        self.total_size = 0
+        self.current_size = 0
+        self.files = []
+        self.dirs = []
+        self.current_copies = {}
+        self._error = None
+
         self.get_total_size(self.src)
-        self.copy_data(self.src)
-        self.copy_stats(self.src)
+        self.copy_data()
+        self.copy_stats()
 
         LOG.info(six.text_type(self.get_progress()))
 
     def get_total_size(self, path):
+        """Lists the source tree and computes the total size to copy."""
         if self.cancelled:
             return
-        out, err = utils.execute(
-            "ls", "-pA1", "--group-directories-first", path,
-            run_as_root=True)
-        for line in out.split('\n'):
-            if self.cancelled:
-                return
-            if len(line) == 0:
+        cmd = ['find', path, '-mindepth', '1']
+        for name in self.ignore_list:
+            cmd += ['-name', name, '-prune', '-o']
+        cmd += ['-printf', '%y %s %P\\0']
+        out, err = self._execute(*cmd)
+        for line in out.split('\0'):
+            if not line:
                 continue
-            src_item = os.path.join(path, line)
-            if line[-1] == '/':
-                if line[0:-1] in self.ignore_list:
-                    continue
-                self.get_total_size(src_item)
+            item_type, size, item = line.split(' ', 2)
+            if item_type == 'd':
+                self.dirs.append(item)
             else:
-                if line in self.ignore_list:
-                    continue
-                size, err = utils.execute("stat", "-c", "%s", src_item,
-                                          run_as_root=True)
-                self.total_size += int(size)
-
-    def copy_data(self, path):
-        if self.cancelled:
+                size = int(size) if item_type == 'f' else 0
+                self.files.append((item, size))
+                self.total_size += size
+
+    def copy_data(self):
+        pool = eventlet.GreenPool(self.workers)
+        for batch in self._get_batches():
+            if self.cancelled or self._error is not None:
+                break
+            pool.spawn_n(self._copy_batch, batch)
+        pool.waitall()
+
+        if self._error is not None:
+            six.reraise(*self._error)
+
+    def _get_batches(self):
+        batch = []
+        batch_size = 0
+        for item, size in self.files:
+            if batch and (len(batch) >= BATCH_FILES or
+                          batch_size + size > BATCH_SIZE):
+                yield batch
+                batch = []
+                batch_size = 0
+            batch.append((item, size))
+            batch_size += size
+        if batch:
+            yield batch
+
+    def _copy_batch(self, batch):
+        batch = tuple(batch)
+        size = sum(item_size for item, item_size in batch)
+        progress = {'file_path': os.path.join(self.dest, batch[0][0]),
+                    'size': size, 'copied': 0}
+        self.current_copy = progress
+        self.current_copies[batch] = progress
+        try:
+            self._rsync([item for item, item_size in batch])
+        except Exception:
+            if self._error is None:
+                self._error = sys.exc_info()
             return
-        out, err = utils.execute(
-            "ls", "-pA1", "--group-directories-first", path,
-            run_as_root=True)
-        for line in out.split('\n'):
-            if self.cancelled:
-                return
-            if len(line) == 0:
-                continue
-            src_item = os.path.join(path, line)
-            dest_item = src_item.replace(self.src, self.dest)
-            if line[-1] == '/':
-                if line[0:-1] in self.ignore_list:
-                    continue
-                utils.execute("mkdir", "-p", dest_item, run_as_root=True)
-                self.copy_data(src_item)
-            else:
-                if line in self.ignore_list:
-                    continue
-                size, err = utils.execute("stat", "-c", "%s", src_item,
-                                          run_as_root=True)
-
-                self.current_copy = {'file_path': dest_item,
-                                     'size': int(size)}
-
-                utils.execute("cp", "-P", "--preserve=all", src_item,
-                              dest_item, run_as_root=True)
-
-                self.current_size += int(size)
-
-                LOG.info(six.text_type(self.get_progress()))
-
-    def copy_stats(self, path):
-        if self.cancelled:
+        finally:
+            self.current_copies.pop(batch, None)
+
+        progress['copied'] = size
+        self.current_size += size
+
+    def _get_copied_size(self, batch):
+        """Sums the sizes of the files of a batch found at the destination."""
+        paths = [os.path.join(self.dest, item) for item, item_size in batch
+                 if item_size > 0]
+        if not paths:
+            return 0
+        # NOTE: du fails on the files that were not copied yet, but still
+        # prints the total size of the ones that were.
+        out, err = self._execute('du', '-b', '-c', '-l', '--files0-from=-',
+                                 process_input='\0'.join(paths),
+                                 check_exit_code=False)
+        lines = out.strip().splitlines()
+        if not lines:
+            return 0
+        return min(int(lines[-1].split()[0]),
+                   sum(item_size for item, item_size in batch))
+
+    def copy_stats(self):
+        # NOTE(ganso): Should re-apply attributes for folders after their
+        # contents were copied.
+        if self.cancelled or not self.dirs:
             return
-        out, err = utils.execute(
-            "ls", "-pA1", "--group-directories-first", path,
-            run_as_root=True)
-        for line in out.split('\n'):
-            if self.cancelled:
-                return
-            if len(line) == 0:
-                continue
-            src_item = os.path.join(path, line)
-            dest_item = src_item.replace(self.src, self.dest)
-            # NOTE(ganso): Should re-apply attributes for folders.
-            if line[-1] == '/':
-                if line[0:-1] in self.ignore_list:
-                    continue
-                self.copy_stats(src_item)
-                utils.execute("chmod", "--reference=%s" % src_item, dest_item,
-                              run_as_root=True)
-                utils.execute("touch", "--reference=%s" % src_item, dest_item,
-                              run_as_root=True)
-                utils.execute("chown", "--reference=%s" % src_item, dest_item,
-                              run_as_root=True)
+        self._rsync(self.dirs)
+
+    def _rsync(self, items):
+        # NOTE: With --files-from, paths are relative to the source,
+        # directories are not recursed into, and the missing parents of a
+        # path are created with the attributes of their source.
+        self._execute('rsync', '-a', '--from0', '--files-from=-',
+                      self.src + '/', self.dest + '/',
+                      process_input='\0'.join(items))
+
+    @staticmethod
+    def _execute(*cmd, **kwargs):
+        try:
+            return utils.execute(*cmd, run_as_root=True, **kwargs)
+        except processutils.ProcessExecutionError as e:
+            # NOTE: Raise the errno of a failed system call, so that callers
+            # can tell the causes of failures apart.
+            match = _RSYNC_ERRNO_RE.search(e.stderr or '')
+            if match is None:
+                raise
+            raise EnvironmentError(int(match.group(1)), e.stderr.strip())
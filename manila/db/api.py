@@ -57,6 +57,13 @@ db_opts = [
                default='share-snapshot-%s',
                help='Template string to be used to generate share snapshot '
                     'names.'),
+    cfg.IntOpt('share_type_cache_ttl',
+               default=10,
+               min=0,
+               help='Number of seconds share types and their extra specs '
+                    'are cached in memory by each service. Changes made '
+                    'through another service become visible after at most '
+                    'this time. 0 disables the cache.'),
 ]
 
 CONF = cfg.CONF
@@ -294,9 +301,18 @@ def share_instance_update(context, instance_id, values, with_share_data=False):
                                       with_share_data=with_share_data)
 
 
-def share_instances_get_all(context):
+def share_instances_update_many(context, share_instance_updates):
+    """Update many share instances in a single transaction.
+
+    :param share_instance_updates: list of dicts with the 'id' of a share
+        instance and the values to update it with.
+    """
+    return IMPL.share_instances_update_many(context, share_instance_updates)
+
+
+def share_instances_get_all(context, limit=None, marker=None):
     """Returns all share instances."""
-    return IMPL.share_instances_get_all(context)
+    return IMPL.share_instances_get_all(context, limit=limit, marker=marker)
 
 
 def share_instances_get_all_by_share_server(context, share_server_id):
@@ -305,9 +321,10 @@ def share_instances_get_all_by_share_server(context, share_server_id):
                                                         share_server_id)
 
 
-def share_instances_get_all_by_host(context, host):
+def share_instances_get_all_by_host(context, host, with_share_data=False):
     """Returns all share instances with given host."""
-    return IMPL.share_instances_get_all_by_host(context, host)
+    return IMPL.share_instances_get_all_by_host(
+        context, host, with_share_data=with_share_data)
 
 
 def share_instances_get_all_by_share_network(context, share_network_id):
@@ -344,19 +361,23 @@ def share_get(context, share_id):
     return IMPL.share_get(context, share_id)
 
 
-def share_get_all(context, filters=None, sort_key=None, sort_dir=None):
+def share_get_all(context, filters=None, sort_key=None, sort_dir=None,
+                  limit=None, offset=None, marker=None):
     """Get all shares."""
     return IMPL.share_get_all(
         context, filters=filters, sort_key=sort_key, sort_dir=sort_dir,
+        limit=limit, offset=offset, marker=marker,
     )
 
 
 def share_get_all_by_project(context, project_id, filters=None,
-                             is_public=False, sort_key=None, sort_dir=None):
+                             is_public=False, sort_key=None, sort_dir=None,
+                             limit=None, offset=None, marker=None):
     """Returns all shares with given project ID."""
     return IMPL.share_get_all_by_project(
         context, project_id, filters=filters, is_public=is_public,
-        sort_key=sort_key, sort_dir=sort_dir,
+        sort_key=sort_key, sort_dir=sort_dir, limit=limit, offset=offset,
+        marker=marker,
     )
 
 
@@ -370,11 +391,12 @@ def share_get_all_by_consistency_group_id(context, cg_id,
 
 
 def share_get_all_by_share_server(context, share_server_id, filters=None,
-                                  sort_key=None, sort_dir=None):
+                                  sort_key=None, sort_dir=None, limit=None,
+                                  offset=None, marker=None):
     """Returns all shares with given share server ID."""
     return IMPL.share_get_all_by_share_server(
         context, share_server_id, filters=filters, sort_key=sort_key,
-        sort_dir=sort_dir,
+        sort_dir=sort_dir, limit=limit, offset=offset, marker=marker,
     )
 
 
@@ -493,19 +515,22 @@ def share_snapshot_get(context, snapshot_id):
 
 
 def share_snapshot_get_all(context, filters=None, sort_key=None,
-                           sort_dir=None):
+                           sort_dir=None, limit=None, offset=None,
+                           marker=None):
     """Get all snapshots."""
     return IMPL.share_snapshot_get_all(
         context, filters=filters, sort_key=sort_key, sort_dir=sort_dir,
+        limit=limit, offset=offset, marker=marker,
     )
 
 
 def share_snapshot_get_all_by_project(context, project_id, filters=None,
-                                      sort_key=None, sort_dir=None):
+                                      sort_key=None, sort_dir=None,
+                                      limit=None, offset=None, marker=None):
     """Get all snapshots belonging to a project."""
     return IMPL.share_snapshot_get_all_by_project(
         context, project_id, filters=filters, sort_key=sort_key,
-        sort_dir=sort_dir,
+        sort_dir=sort_dir, limit=limit, offset=offset, marker=marker,
     )
 
 
@@ -609,6 +634,17 @@ def share_export_locations_update(context, share_instance_id, export_locations,
         context, share_instance_id, export_locations, delete)
 
 
+def share_export_locations_update_many(context, export_locations,
+                                       delete=True):
+    """Update export locations of many share instances.
+
+    :param export_locations: dict mapping share instance ids to their
+        export locations.
+    """
+    return IMPL.share_export_locations_update_many(
+        context, export_locations, delete)
+
+
 ####################
 
 def export_location_metadata_get(context, export_location_uuid, session=None):
@@ -711,6 +747,11 @@ def network_allocations_get_by_ip_address(context, ip_address):
     return IMPL.network_allocations_get_by_ip_address(context, ip_address)
 
 
+def network_allocations_get_ip_addresses(context):
+    """Get the IP addresses of all network allocations."""
+    return IMPL.network_allocations_get_ip_addresses(context)
+
+
 ##################
 
 
@@ -1009,6 +1050,17 @@ def share_replicas_get_all(context, with_share_server=False,
         with_share_data=with_share_data)
 
 
+def share_replicas_get_all_by_host(context, host, replica_states=None,
+                                   exclude_statuses=None,
+                                   with_share_data=False,
+                                   with_share_server=False):
+    """Returns share replicas hosted by the given backend."""
+    return IMPL.share_replicas_get_all_by_host(
+        context, host, replica_states=replica_states,
+        exclude_statuses=exclude_statuses, with_share_data=with_share_data,
+        with_share_server=with_share_server)
+
+
 def share_replicas_get_all_by_share(context, share_id, with_share_server=False,
                                     with_share_data=False):
     """Returns all share replicas for a given share."""
@@ -38,8 +38,12 @@ from oslo_log import log
 from oslo_utils import timeutils
 from oslo_utils import uuidutils
 import six
+from sqlalchemy import and_
 from sqlalchemy import or_
 from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import noload
+from sqlalchemy.orm import subqueryload
+from sqlalchemy import sql
 from sqlalchemy.sql.expression import true
 from sqlalchemy.sql import func
 
@@ -49,6 +53,7 @@ from manila import exception
 from manila.i18n import _
 from manila.i18n import _LE
 from manila.i18n import _LW
+from manila import utils
 
 CONF = cfg.CONF
 
@@ -262,18 +267,139 @@ def exact_filter(query, model, filters, legal_keys):
     return query
 
 
+def _get_marker_value(context, model, sort_attr, marker, session=None):
+    """Returns the value of the sort column for the marker row."""
+    result = model_query(
+        context, model, sort_attr, session=session,
+    ).filter(model.id == marker).first()
+    if result is None:
+        msg = _("Marker '%s' not found.") % marker
+        raise exception.InvalidInput(reason=msg)
+    return result[0]
+
+
+def _paginate_query(query, sort_attr, sort_dir, id_attr, limit=None,
+                    offset=None, marker=None):
+    """Applies keyset pagination on (sort_attr, id_attr) to a query.
+
+    Rows are ordered by the sort attribute and then by ID, so the order is
+    total even if the sort attribute has duplicate or NULL values. NULLs
+    always sort before any other value in ascending order, regardless of
+    the database backend.
+
+    :param query: query to paginate
+    :param sort_attr: column or scalar expression to sort by
+    :param sort_dir: 'asc' or 'desc'
+    :param id_attr: unique column used to break ties, usually the ID
+    :param limit: maximum number of rows to return
+    :param offset: number of rows to skip after the marker
+    :param marker: tuple of (sort value, ID) of the last row of the
+                   previous page, or None for the first page
+    :returns: the paginated query
+    """
+    is_null = sql.case([(sort_attr.is_(None), 0)], else_=1)
+
+    if marker is not None:
+        marker_value, marker_id = marker
+        if sort_dir == 'asc':
+            if marker_value is None:
+                query = query.filter(or_(
+                    sort_attr.isnot(None),
+                    and_(sort_attr.is_(None), id_attr > marker_id)))
+            else:
+                query = query.filter(or_(
+                    sort_attr > marker_value,
+                    and_(sort_attr == marker_value, id_attr > marker_id)))
+        else:
+            if marker_value is None:
+                query = query.filter(
+                    and_(sort_attr.is_(None), id_attr < marker_id))
+            else:
+                query = query.filter(or_(
+                    sort_attr < marker_value,
+                    sort_attr.is_(None),
+                    and_(sort_attr == marker_value, id_attr < marker_id)))
+
+    if sort_dir == 'asc':
+        query = query.order_by(is_null.asc(), sort_attr.asc(), id_attr.asc())
+    else:
+        query = query.order_by(
+            is_null.desc(), sort_attr.desc(), id_attr.desc())
+
+    if offset:
+        query = query.offset(offset)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def _share_effective_instance_column(column):
+    """Returns a column of the effective instance of a share, for filters.
+
+    The correlated subquery orders the instances of the share the way
+    Share.instance picks the one reported to users, so that shares are
+    filtered on the values users see and can still be paginated in SQL.
+    """
+    instance = models.ShareInstance
+    status_rank = sql.case([
+        (instance.status == constants.STATUS_MIGRATING, 1),
+        (instance.status == constants.STATUS_AVAILABLE, 2),
+        (instance.status == constants.STATUS_ERROR, 3),
+        (instance.status.in_(constants.TRANSITIONAL_STATUSES), 5),
+    ], else_=4)
+    return sql.select([column]).where(and_(
+        instance.share_id == models.Share.id,
+        instance.deleted == 'False',
+    )).order_by(
+        sql.case([(instance.status == constants.STATUS_REPLICATION_CHANGE,
+                   0)], else_=1),
+        sql.case([(instance.replica_state == constants.REPLICA_STATE_ACTIVE,
+                   0)], else_=1),
+        status_rank,
+        instance.created_at.asc(),
+        instance.id.asc(),
+    ).limit(1).correlate(models.Share).as_scalar()
+
+
+def _snapshot_effective_instance_column(column):
+    """Returns a column of the effective instance of a snapshot.
+
+    Like ShareSnapshot.instance, the instance of the snapshot on the active
+    replica of the share is preferred.
+    """
+    snapshot_instance = models.ShareSnapshotInstance
+    share_instance = models.ShareInstance
+    return sql.select([column]).select_from(
+        snapshot_instance.__table__.join(
+            share_instance.__table__,
+            snapshot_instance.share_instance_id == share_instance.id)
+    ).where(and_(
+        snapshot_instance.snapshot_id == models.ShareSnapshot.id,
+        snapshot_instance.deleted == 'False',
+    )).order_by(
+        sql.case([(share_instance.replica_state ==
+                   constants.REPLICA_STATE_ACTIVE, 0)], else_=1),
+        snapshot_instance.created_at.asc(),
+        snapshot_instance.id.asc(),
+    ).limit(1).correlate(models.ShareSnapshot).as_scalar()
+
+
 def ensure_model_dict_has_id(model_dict):
     if not model_dict.get('id'):
         model_dict['id'] = uuidutils.generate_uuid()
     return model_dict
 
 
+# NOTE: The count and the total size of shares and snapshots come from a
+# single aggregate query each, so the sync routines of both resources of a
+# pair refresh the pair together.
+
 def _sync_shares(context, project_id, user_id, session):
     (shares, gigs) = share_data_get_for_project(context,
                                                 project_id,
                                                 user_id,
                                                 session=session)
-    return {'shares': shares}
+    return {'shares': shares, 'gigabytes': gigs}
 
 
 def _sync_snapshots(context, project_id, user_id, session):
@@ -281,19 +407,13 @@ def _sync_snapshots(context, project_id, user_id, session):
                                                       project_id,
                                                       user_id,
                                                       session=session)
-    return {'snapshots': snapshots}
+    return {'snapshots': snapshots, 'snapshot_gigabytes': gigs}
 
 
-def _sync_gigabytes(context, project_id, user_id, session):
-    _junk, share_gigs = share_data_get_for_project(
-        context, project_id, user_id, session=session)
-    return dict(gigabytes=share_gigs)
+_sync_gigabytes = _sync_shares
 
 
-def _sync_snapshot_gigabytes(context, project_id, user_id, session):
-    _junk, snapshot_gigs = snapshot_data_get_for_project(
-        context, project_id, user_id, session=session)
-    return dict(snapshot_gigabytes=snapshot_gigs)
+_sync_snapshot_gigabytes = _sync_snapshots
 
 
 def _sync_share_networks(context, project_id, user_id, session):
@@ -680,7 +800,7 @@ def quota_usage_get_all_by_project_and_user(context, project_id, user_id):
 
 
 def _quota_usage_create(context, project_id, user_id, resource, in_use,
-                        reserved, until_refresh, session=None):
+                        reserved, until_refresh, session=None, save=True):
     quota_usage_ref = models.QuotaUsage()
     quota_usage_ref.project_id = project_id
     quota_usage_ref.user_id = user_id
@@ -691,7 +811,8 @@ def _quota_usage_create(context, project_id, user_id, resource, in_use,
     # updated_at is needed for judgement of max_age
     quota_usage_ref.updated_at = timeutils.utcnow()
 
-    quota_usage_ref.save(session=session)
+    if save:
+        quota_usage_ref.save(session=session)
 
     return quota_usage_ref
 
@@ -727,18 +848,23 @@ def quota_usage_update(context, project_id, user_id, resource, **kwargs):
 ###################
 
 
-def _reservation_create(context, uuid, usage, project_id, user_id, resource,
-                        delta, expire, session=None):
-    reservation_ref = models.Reservation()
-    reservation_ref.uuid = uuid
-    reservation_ref.usage_id = usage['id']
-    reservation_ref.project_id = project_id
-    reservation_ref.user_id = user_id
-    reservation_ref.resource = resource
-    reservation_ref.delta = delta
-    reservation_ref.expire = expire
-    reservation_ref.save(session=session)
-    return reservation_ref
+def _reservations_create(context, session, usages, project_id, user_id,
+                         deltas, expire):
+    """Insert the reservations of deltas with a single statement.
+
+    Returns the uuids of the reservations.
+    """
+    reservations = [dict(uuid=uuidutils.generate_uuid(),
+                         usage_id=usages[resource]['id'],
+                         project_id=project_id,
+                         user_id=user_id,
+                         resource=resource,
+                         delta=delta,
+                         expire=expire)
+                    for resource, delta in deltas.items()]
+    if reservations:
+        session.bulk_insert_mappings(models.Reservation, reservations)
+    return [reservation['uuid'] for reservation in reservations]
 
 
 ###################
@@ -749,26 +875,29 @@ def _reservation_create(context, uuid, usage, project_id, user_id, resource,
 # code always acquires the lock on quota_usages before acquiring the lock
 # on reservations.
 
-def _get_user_quota_usages(context, session, project_id, user_id):
+def _get_user_quota_usages(context, session, project_id, user_id,
+                           resources=None):
     # Broken out for testability
-    rows = model_query(context, models.QuotaUsage,
-                       read_deleted="no",
-                       session=session).\
+    query = model_query(context, models.QuotaUsage,
+                        read_deleted="no",
+                        session=session).\
         filter_by(project_id=project_id).\
         filter(or_(models.QuotaUsage.user_id == user_id,
-                   models.QuotaUsage.user_id is None)).\
-        with_lockmode('update').\
-        all()
+                   models.QuotaUsage.user_id is None))
+    if resources is not None:
+        query = query.filter(models.QuotaUsage.resource.in_(resources))
+    rows = query.with_lockmode('update').all()
     return {row.resource: row for row in rows}
 
 
-def _get_project_quota_usages(context, session, project_id):
-    rows = model_query(context, models.QuotaUsage,
-                       read_deleted="no",
-                       session=session).\
-        filter_by(project_id=project_id).\
-        with_lockmode('update').\
-        all()
+def _get_project_quota_usages(context, session, project_id, resources=None):
+    query = model_query(context, models.QuotaUsage,
+                        read_deleted="no",
+                        session=session).\
+        filter_by(project_id=project_id)
+    if resources is not None:
+        query = query.filter(models.QuotaUsage.resource.in_(resources))
+    rows = query.with_lockmode('update').all()
     result = dict()
     # Get the total count of in_use,reserved
     for row in rows:
@@ -797,11 +926,28 @@ def quota_reserve(context, resources, project_quotas, user_quotas, deltas,
         if user_id is None:
             user_id = context.user_id
 
-        # Get the current usages
+        # Get the current usages, locking only the rows of the
+        # resources being reserved
+        resource_names = sorted(deltas.keys())
         user_usages = _get_user_quota_usages(context, session,
-                                             project_id, user_id)
+                                             project_id, user_id,
+                                             resources=resource_names)
         project_usages = _get_project_quota_usages(context, session,
-                                                   project_id)
+                                                   project_id,
+                                                   resources=resource_names)
+        new_usages = []
+
+        def _create_usage(resource, usage_user_id):
+            usage_ref = _quota_usage_create(elevated,
+                                            project_id,
+                                            usage_user_id,
+                                            resource,
+                                            0, 0,
+                                            until_refresh or None,
+                                            session=session,
+                                            save=False)
+            new_usages.append(usage_ref)
+            return usage_ref
 
         # Handle usage refresh
         work = set(deltas.keys())
@@ -812,25 +958,11 @@ def quota_reserve(context, resources, project_quotas, user_quotas, deltas,
             refresh = False
             if ((resource not in PER_PROJECT_QUOTAS) and
                     (resource not in user_usages)):
-                user_usages[resource] = _quota_usage_create(
-                    elevated,
-                    project_id,
-                    user_id,
-                    resource,
-                    0, 0,
-                    until_refresh or None,
-                    session=session)
+                user_usages[resource] = _create_usage(resource, user_id)
                 refresh = True
             elif ((resource in PER_PROJECT_QUOTAS) and
                     (resource not in user_usages)):
-                user_usages[resource] = _quota_usage_create(
-                    elevated,
-                    project_id,
-                    None,
-                    resource,
-                    0, 0,
-                    until_refresh or None,
-                    session=session)
+                user_usages[resource] = _create_usage(resource, None)
                 refresh = True
             elif user_usages[resource].in_use < 0:
                 # Negative in_use count indicates a desync, so try to
@@ -851,27 +983,18 @@ def quota_reserve(context, resources, project_quotas, user_quotas, deltas,
 
                 updates = sync(elevated, project_id, user_id, session)
                 for res, in_use in updates.items():
+                    # Only the usages of the reserved resources are
+                    # locked, leave the others alone.
+                    if res not in deltas:
+                        continue
+
                     # Make sure we have a destination for the usage!
                     if ((res not in PER_PROJECT_QUOTAS) and
                             (res not in user_usages)):
-                        user_usages[res] = _quota_usage_create(
-                            elevated,
-                            project_id,
-                            user_id,
-                            res,
-                            0, 0,
-                            until_refresh or None,
-                            session=session)
+                        user_usages[res] = _create_usage(res, user_id)
                     if ((res in PER_PROJECT_QUOTAS) and
                             (res not in user_usages)):
-                        user_usages[res] = _quota_usage_create(
-                            elevated,
-                            project_id,
-                            None,
-                            res,
-                            0, 0,
-                            until_refresh or None,
-                            session=session)
+                        user_usages[res] = _create_usage(res, None)
 
                     if user_usages[res].in_use != in_use:
                         LOG.debug('quota_usages out of sync, updating. '
@@ -928,20 +1051,18 @@ def quota_reserve(context, resources, project_quotas, user_quotas, deltas,
         #            outside the transaction.  If we did the raise
         #            here, our usage updates would be discarded, but
         #            they're not invalidated by being over-quota.
+        if new_usages:
+            # The new usages are kept whatever the outcome of the check,
+            # and need their ids before reservations reference them.
+            session.add_all(new_usages)
+            session.flush()
 
         # Create the reservations
         if not overs:
-            reservations = []
+            reservations = _reservations_create(elevated, session,
+                                                user_usages, project_id,
+                                                user_id, deltas, expire)
             for res, delta in deltas.items():
-                reservation = _reservation_create(elevated,
-                                                  uuidutils.generate_uuid(),
-                                                  user_usages[res],
-                                                  project_id,
-                                                  user_id,
-                                                  res, delta, expire,
-                                                  session=session)
-                reservations.append(reservation.uuid)
-
                 # Also update the reserved quantity
                 # NOTE(Vek): Again, we are only concerned here about
                 #            positive increments.  Here, though, we're
@@ -1154,6 +1275,62 @@ def share_instance_update(context, share_instance_id, values,
         return instance_ref
 
 
+# NOTE: Bulk writes split their IN lists into chunks of this many ids, to
+# stay within the limits of the database on the size of a statement.
+_BULK_CHUNK_SIZE = 500
+
+
+def _chunks(items, size=_BULK_CHUNK_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+@require_context
+@oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
+def share_instances_update_many(context, share_instance_updates):
+    """Update many share instances in a single transaction.
+
+    :param share_instance_updates: list of dicts with the 'id' of a share
+        instance and the values to update it with.
+
+    Instances updated with the same values are updated by a single
+    statement. Values that are not share instance columns are ignored and,
+    unlike share_instance_update, missing instances are ignored too.
+    """
+    session = get_session()
+    columns = models.ShareInstance.__table__.columns
+    az_ids = {}
+    groups = {}
+    for update in share_instance_updates:
+        values = dict(update)
+        instance_id = values.pop('id')
+        if 'availability_zone' in values:
+            az_name = values.pop('availability_zone')
+            if az_name not in az_ids:
+                az_values = {'availability_zone': az_name}
+                _ensure_availability_zone_exists(
+                    context, az_values, session, strict=False)
+                az_ids[az_name] = az_values.get('availability_zone_id')
+            if az_ids[az_name]:
+                values['availability_zone_id'] = az_ids[az_name]
+        values = dict((key, value) for key, value in values.items()
+                      if key in columns)
+        key = frozenset(values.items())
+        groups.setdefault(key, (values, []))[1].append(instance_id)
+
+    with session.begin():
+        for values, instance_ids in groups.values():
+            if not values:
+                continue
+            for chunk in _chunks(instance_ids):
+                model_query(
+                    context, models.ShareInstance, session=session,
+                ).filter(
+                    models.ShareInstance.id.in_(chunk),
+                ).update(values, synchronize_session=False)
+
+
 def _share_instance_update(context, share_instance_id, values, session):
     share_instance_ref = share_instance_get(context, share_instance_id,
                                             session=session)
@@ -1185,13 +1362,23 @@ def share_instance_get(context, share_instance_id, session=None,
 
 
 @require_admin_context
-def share_instances_get_all(context):
+def share_instances_get_all(context, limit=None, marker=None):
     session = get_session()
-    return model_query(
+    query = model_query(
         context, models.ShareInstance, session=session, read_deleted="no",
     ).options(
         joinedload('export_locations'),
-    ).all()
+    )
+    if limit is not None or marker:
+        if marker:
+            marker = (_get_marker_value(
+                context, models.ShareInstance,
+                models.ShareInstance.created_at, marker,
+                session=session), marker)
+        query = _paginate_query(
+            query, models.ShareInstance.created_at, 'asc',
+            models.ShareInstance.id, limit=limit, marker=marker)
+    return query.all()
 
 
 @require_context
@@ -1211,16 +1398,37 @@ def share_instance_delete(context, instance_id, session=None):
 
 
 @require_admin_context
-def share_instances_get_all_by_host(context, host):
-    """Retrieves all share instances hosted on a host."""
-    result = (
-        model_query(context, models.ShareInstance).filter(
-            or_(
-                models.ShareInstance.host == host,
-                models.ShareInstance.host.like("{0}#%".format(host))
-            )
-        ).all()
+def share_instances_get_all_by_host(context, host, with_share_data=False):
+    """Retrieves all share instances hosted on a host.
+
+    When with_share_data is set, the parent shares of the instances are
+    loaded with a single query rather than with a query per instance.
+    """
+    session = get_session()
+    query = model_query(
+        context, models.ShareInstance, session=session,
+    ).filter(
+        or_(
+            models.ShareInstance.host == host,
+            models.ShareInstance.host.like("{0}#%".format(host))
+        )
     )
+    if not with_share_data:
+        return query.all()
+
+    result = query.all()
+    share_ids = query.with_entities(models.ShareInstance.share_id).subquery()
+    shares = model_query(
+        context, models.Share, session=session,
+    ).filter(
+        models.Share.id.in_(share_ids)
+    ).options(
+        joinedload('share_metadata'),
+        joinedload('share_type'),
+    ).all()
+    shares = {share['id']: share for share in shares}
+    for instance in result:
+        instance.set_share_data(shares[instance['share_id']])
     return result
 
 
@@ -1278,7 +1486,9 @@ def share_instances_get_all_by_consistency_group_id(context, cg_id):
 
 def _share_replica_get_with_filters(context, share_id=None, replica_id=None,
                                     replica_state=None, status=None,
-                                    with_share_server=True, session=None):
+                                    with_share_server=True, session=None,
+                                    host=None, replica_states=None,
+                                    exclude_statuses=None):
 
     query = model_query(context, models.ShareInstance, session=session,
                         read_deleted="no")
@@ -1286,6 +1496,22 @@ def _share_replica_get_with_filters(context, share_id=None, replica_id=None,
     if share_id is not None:
         query = query.filter(models.ShareInstance.share_id == share_id)
 
+    if host is not None:
+        query = query.filter(or_(
+            models.ShareInstance.host == host,
+            models.ShareInstance.host.like("{0}#%".format(host)),
+        ))
+
+    if replica_states is not None:
+        query = query.filter(
+            models.ShareInstance.replica_state.in_(replica_states))
+
+    if exclude_statuses is not None:
+        query = query.filter(or_(
+            models.ShareInstance.status.is_(None),
+            ~models.ShareInstance.status.in_(exclude_statuses),
+        ))
+
     if replica_id is not None:
         query = query.filter(models.ShareInstance.id == replica_id)
 
@@ -1330,6 +1556,43 @@ def share_replicas_get_all(context, with_share_data=False,
     return result
 
 
+@require_context
+def share_replicas_get_all_by_host(context, host, replica_states=None,
+                                   exclude_statuses=None,
+                                   with_share_data=False,
+                                   with_share_server=False, session=None):
+    """Returns replica instances hosted by the given backend.
+
+    The host is matched with and without a pool, and the filters on the
+    replica state and status are applied in the query, so that periodic
+    tasks only load the replicas they act on. When with_share_data is set,
+    the parent shares are loaded in bulk rather than one by one, without
+    the collections the replicas do not copy from them.
+    """
+    session = session or get_session()
+
+    result = _share_replica_get_with_filters(
+        context, with_share_server=with_share_server, host=host,
+        replica_states=replica_states, exclude_statuses=exclude_statuses,
+        session=session).all()
+
+    if with_share_data:
+        shares = {}
+        for chunk in _chunks(set(r['share_id'] for r in result)):
+            shares.update(
+                (share['id'], share) for share in model_query(
+                    context, models.Share, session=session,
+                ).filter(
+                    models.Share.id.in_(chunk),
+                ).options(
+                    noload('instances'),
+                ).all())
+        for replica in result:
+            replica.set_share_data(shares[replica['share_id']])
+
+    return result
+
+
 @require_context
 def share_replicas_get_all_by_share(context, share_id,
                                     with_share_data=False,
@@ -1502,7 +1765,11 @@ def share_update(context, share_id, update_values):
 
 @require_context
 def share_get(context, share_id, session=None):
-    result = _share_get_query(context, session).filter_by(id=share_id).first()
+    # NOTE: a single share is loaded with one joined query, including its
+    # instances and their export locations.
+    result = _share_get_query(context, session).options(
+        joinedload('instances').joinedload('export_locations'),
+    ).filter_by(id=share_id).first()
 
     if result is None:
         raise exception.NotFound()
@@ -1510,20 +1777,33 @@ def share_get(context, share_id, session=None):
     return result
 
 
+# Share instance attributes that are proxied by the share model and can be
+# used as filters when listing shares.
+_SHARE_INSTANCE_FILTER_KEYS = ('status', 'host', 'share_network_id',
+                               'share_server_id')
+
+
 def _share_get_all_with_filters(context, project_id=None, share_server_id=None,
                                 consistency_group_id=None, filters=None,
                                 is_public=False, sort_key=None,
-                                sort_dir=None):
+                                sort_dir=None, limit=None, offset=None,
+                                marker=None):
     """Returns sorted list of shares that satisfies filters.
 
     :param context: context to query under
     :param project_id: project id that owns shares
     :param share_server_id: share server that hosts shares
-    :param filters: dict of filters to specify share selection
+    :param filters: dict of filters to specify share selection. Besides
+                    'metadata' and 'extra_specs', keys can be share columns
+                    or attributes of the effective share instance, for
+                    exact matching
     :param is_public: public shares from other projects will be added
                       to result if True
     :param sort_key: key of models.Share to be used for sorting
     :param sort_dir: desired direction of sorting, can be 'asc' and 'desc'
+    :param limit: maximum number of shares to return
+    :param offset: number of shares to skip
+    :param marker: ID of the last share of the previous page
     :returns: list -- models.Share
     :raises: exception.InvalidInput
     """
@@ -1531,11 +1811,11 @@ def _share_get_all_with_filters(context, project_id=None, share_server_id=None,
         sort_key = 'created_at'
     if not sort_dir:
         sort_dir = 'desc'
-    query = (
-        _share_get_query(context).join(
-            models.ShareInstance,
-            models.ShareInstance.share_id == models.Share.id
-        )
+    session = get_session()
+    # NOTE: load instances and their export locations for all shares of the
+    # page with one query each, instead of per share.
+    query = _share_get_query(context, session=session).options(
+        subqueryload('instances').subqueryload('export_locations'),
     )
 
     if project_id:
@@ -1545,29 +1825,45 @@ def _share_get_all_with_filters(context, project_id=None, share_server_id=None,
         else:
             query = query.filter(models.Share.project_id == project_id)
     if share_server_id:
-        query = query.filter(
-            models.ShareInstance.share_server_id == share_server_id)
+        # NOTE: all shares with an instance on the share server are returned,
+        # not only those whose effective instance is there.
+        query = query.filter(models.Share.instances.any(
+            share_server_id=share_server_id))
 
     if consistency_group_id:
         query = query.filter(
             models.Share.consistency_group_id == consistency_group_id)
 
     # Apply filters
-    if not filters:
-        filters = {}
+    filters = dict(filters or {})
     if 'metadata' in filters:
-        for k, v in filters['metadata'].items():
+        for k, v in filters.pop('metadata').items():
             query = query.filter(
                 or_(models.Share.share_metadata.any(  # pylint: disable=E1101
                     key=k, value=v)))
     if 'extra_specs' in filters:
-        query = query.join(
-            models.ShareTypeExtraSpecs,
-            models.ShareTypeExtraSpecs.share_type_id ==
-            models.Share.share_type_id)
-        for k, v in filters['extra_specs'].items():
-            query = query.filter(or_(models.ShareTypeExtraSpecs.key == k,
-                                     models.ShareTypeExtraSpecs.value == v))
+        # NOTE: filter through a subquery rather than a join, so that
+        # shares are not duplicated and can be paginated in SQL.
+        extra_specs_query = model_query(
+            context, models.ShareTypeExtraSpecs,
+            models.ShareTypeExtraSpecs.share_type_id, session=session,
+            read_deleted='no')
+        for k, v in filters.pop('extra_specs').items():
+            extra_specs_query = extra_specs_query.filter(
+                or_(models.ShareTypeExtraSpecs.key == k,
+                    models.ShareTypeExtraSpecs.value == v))
+        query = query.filter(models.Share.share_type_id.in_(
+            extra_specs_query.subquery()))
+    for key in _SHARE_INSTANCE_FILTER_KEYS:
+        if key in filters:
+            query = query.filter(_share_effective_instance_column(
+                getattr(models.ShareInstance, key)) == filters.pop(key))
+    query = exact_filter(query, models.Share, filters,
+                         [k for k in filters if k in models.Share.__table__.c])
+    if filters:
+        msg = _("Wrong share filters provided: %s.") % six.text_type(
+            sorted(filters))
+        raise exception.InvalidInput(reason=msg)
 
     # Apply sorting
     if sort_dir.lower() not in ('desc', 'asc'):
@@ -1576,19 +1872,29 @@ def _share_get_all_with_filters(context, project_id=None, share_server_id=None,
                     "sort_key": sort_key, "sort_dir": sort_dir}
         raise exception.InvalidInput(reason=msg)
 
-    def apply_sorting(model, query):
-        sort_attr = getattr(model, sort_key)
-        sort_method = getattr(sort_attr, sort_dir.lower())
-        return query.order_by(sort_method())
+    if sort_key in models.Share.__table__.c:
+        sort_attr = getattr(models.Share, sort_key)
+    elif sort_key in models.ShareInstance.__table__.c:
+        # NOTE: sort by the value of the share's oldest instance, using a
+        # correlated subquery so that each share is returned only once.
+        sort_attr = sql.select(
+            [getattr(models.ShareInstance, sort_key)]
+        ).where(and_(
+            models.ShareInstance.share_id == models.Share.id,
+            models.ShareInstance.deleted == 'False',
+        )).order_by(
+            models.ShareInstance.created_at.asc()
+        ).limit(1).correlate(models.Share).as_scalar()
+    else:
+        msg = _("Wrong sorting key provided - '%s'.") % sort_key
+        raise exception.InvalidInput(reason=msg)
 
-    try:
-        query = apply_sorting(models.Share, query)
-    except AttributeError:
-        try:
-            query = apply_sorting(models.ShareInstance, query)
-        except AttributeError:
-            msg = _("Wrong sorting key provided - '%s'.") % sort_key
-            raise exception.InvalidInput(reason=msg)
+    if marker:
+        marker = (_get_marker_value(context, models.Share, sort_attr, marker,
+                                    session=session), marker)
+    query = _paginate_query(query, sort_attr, sort_dir.lower(),
+                            models.Share.id, limit=limit, offset=offset,
+                            marker=marker)
 
     # Returns list of shares that satisfy filters.
     query = query.all()
@@ -1596,19 +1902,23 @@ def _share_get_all_with_filters(context, project_id=None, share_server_id=None,
 
 
 @require_admin_context
-def share_get_all(context, filters=None, sort_key=None, sort_dir=None):
+def share_get_all(context, filters=None, sort_key=None, sort_dir=None,
+                  limit=None, offset=None, marker=None):
     query = _share_get_all_with_filters(
-        context, filters=filters, sort_key=sort_key, sort_dir=sort_dir)
+        context, filters=filters, sort_key=sort_key, sort_dir=sort_dir,
+        limit=limit, offset=offset, marker=marker)
     return query
 
 
 @require_context
 def share_get_all_by_project(context, project_id, filters=None,
-                             is_public=False, sort_key=None, sort_dir=None):
+                             is_public=False, sort_key=None, sort_dir=None,
+                             limit=None, offset=None, marker=None):
     """Returns list of shares with given project ID."""
     query = _share_get_all_with_filters(
         context, project_id=project_id, filters=filters, is_public=is_public,
-        sort_key=sort_key, sort_dir=sort_dir,
+        sort_key=sort_key, sort_dir=sort_dir, limit=limit, offset=offset,
+        marker=marker,
     )
     return query
 
@@ -1627,11 +1937,13 @@ def share_get_all_by_consistency_group_id(context, cg_id,
 
 @require_context
 def share_get_all_by_share_server(context, share_server_id, filters=None,
-                                  sort_key=None, sort_dir=None):
+                                  sort_key=None, sort_dir=None, limit=None,
+                                  offset=None, marker=None):
     """Returns list of shares with given share server."""
     query = _share_get_all_with_filters(
         context, share_server_id=share_server_id, filters=filters,
-        sort_key=sort_key, sort_dir=sort_dir,
+        sort_key=sort_key, sort_dir=sort_dir, limit=limit, offset=offset,
+        marker=marker,
     )
     return query
 
@@ -1754,8 +2066,9 @@ def share_instance_access_get(context, access_id, instance_id):
 @require_context
 def share_access_get_all_for_share(context, share_id, session=None):
     session = session or get_session()
-    return _share_access_get_query(context, session,
-                                   {'share_id': share_id}).all()
+    return _share_access_get_query(
+        context, session, {'share_id': share_id},
+    ).options(subqueryload('instance_mappings')).all()
 
 
 @require_context
@@ -2053,20 +2366,28 @@ def share_snapshot_get(context, snapshot_id, session=None):
     return result
 
 
+# Share snapshot instance attributes that are proxied by the snapshot model
+# and can be used as filters when listing snapshots.
+_SNAPSHOT_INSTANCE_FILTER_KEYS = ('status', 'progress', 'provider_location')
+
+
 def _share_snapshot_get_all_with_filters(context, project_id=None,
                                          share_id=None, filters=None,
-                                         sort_key=None, sort_dir=None):
+                                         sort_key=None, sort_dir=None,
+                                         limit=None, offset=None,
+                                         marker=None):
     # Init data
     sort_key = sort_key or 'share_id'
     sort_dir = sort_dir or 'desc'
     filters = filters or {}
-    query = model_query(context, models.ShareSnapshot)
+    session = get_session()
+    query = model_query(context, models.ShareSnapshot, session=session)
 
     if project_id:
         query = query.filter_by(project_id=project_id)
     if share_id:
         query = query.filter_by(share_id=share_id)
-    query = query.options(joinedload('share'))
+    query = query.options(joinedload('share'), subqueryload('instances'))
 
     # Apply filters
     if 'usage' in filters:
@@ -2085,22 +2406,31 @@ def _share_snapshot_get_all_with_filters(context, project_id=None,
                         'key': filters['usage'],
                         'ek': six.text_type(usage_filter_keys)}
             raise exception.InvalidInput(reason=msg)
+    for key in _SNAPSHOT_INSTANCE_FILTER_KEYS:
+        if key in filters:
+            query = query.filter(_snapshot_effective_instance_column(
+                getattr(models.ShareSnapshotInstance, key)) == filters[key])
+    query = exact_filter(
+        query, models.ShareSnapshot, dict(filters),
+        [k for k in filters if k in models.ShareSnapshot.__table__.c])
 
     # Apply sorting
-    try:
-        attr = getattr(models.ShareSnapshot, sort_key)
-    except AttributeError:
+    if sort_key not in models.ShareSnapshot.__table__.c:
         msg = _("Wrong sorting key provided - '%s'.") % sort_key
         raise exception.InvalidInput(reason=msg)
-    if sort_dir.lower() == 'desc':
-        query = query.order_by(attr.desc())
-    elif sort_dir.lower() == 'asc':
-        query = query.order_by(attr.asc())
-    else:
+    if sort_dir.lower() not in ('desc', 'asc'):
         msg = _("Wrong sorting data provided: sort key is '%(sort_key)s' "
                 "and sort direction is '%(sort_dir)s'.") % {
                     "sort_key": sort_key, "sort_dir": sort_dir}
         raise exception.InvalidInput(reason=msg)
+    attr = getattr(models.ShareSnapshot, sort_key)
+
+    if marker:
+        marker = (_get_marker_value(context, models.ShareSnapshot, attr,
+                                    marker, session=session), marker)
+    query = _paginate_query(query, attr, sort_dir.lower(),
+                            models.ShareSnapshot.id, limit=limit,
+                            offset=offset, marker=marker)
 
     # Returns list of shares that satisfy filters
     return query.all()
@@ -2108,19 +2438,23 @@ def _share_snapshot_get_all_with_filters(context, project_id=None,
 
 @require_admin_context
 def share_snapshot_get_all(context, filters=None, sort_key=None,
-                           sort_dir=None):
+                           sort_dir=None, limit=None, offset=None,
+                           marker=None):
     return _share_snapshot_get_all_with_filters(
         context, filters=filters, sort_key=sort_key, sort_dir=sort_dir,
+        limit=limit, offset=offset, marker=marker,
     )
 
 
 @require_context
 def share_snapshot_get_all_by_project(context, project_id, filters=None,
-                                      sort_key=None, sort_dir=None):
+                                      sort_key=None, sort_dir=None,
+                                      limit=None, offset=None, marker=None):
     authorize_project_context(context, project_id)
     return _share_snapshot_get_all_with_filters(
         context, project_id=project_id,
         filters=filters, sort_key=sort_key, sort_dir=sort_dir,
+        limit=limit, offset=offset, marker=marker,
     )
 
 
@@ -2331,10 +2665,7 @@ def share_export_location_get_by_uuid(context, export_location_uuid,
     return result
 
 
-@require_context
-@oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
-def share_export_locations_update(context, share_instance_id, export_locations,
-                                  delete):
+def _normalize_export_locations(export_locations):
     # NOTE(u_glide):
     # Backward compatibility code for drivers,
     # which return single export_location as string
@@ -2357,69 +2688,138 @@ def share_export_locations_update(context, share_instance_id, export_locations,
             raise exception.ManilaException(
                 _("Wrong export location type '%s'.") % type(export_location))
         export_locations_as_dicts.append(export_location)
-    export_locations = export_locations_as_dicts
-
-    export_locations_paths = [el['path'] for el in export_locations]
-
-    session = get_session()
-
-    current_el_rows = _share_export_locations_get(
-        context, share_instance_id, session=session)
-
-    def get_path_list_from_rows(rows):
-        return set([l['path'] for l in rows])
+    return export_locations_as_dicts
 
-    current_el_paths = get_path_list_from_rows(current_el_rows)
-
-    def create_indexed_time_dict(key_list):
-        base = timeutils.utcnow()
-        return {
-            # NOTE(u_glide): Incrementing timestamp by microseconds to make
-            # timestamp order match index order.
-            key: base + datetime.timedelta(microseconds=index)
-            for index, key in enumerate(key_list)
-        }
 
-    indexed_update_time = create_indexed_time_dict(export_locations_paths)
-
-    for el in current_el_rows:
-        if delete and el['path'] not in export_locations_paths:
-            export_location_metadata_delete(context, el['uuid'])
-            el.soft_delete(session)
-        else:
-            updated_at = indexed_update_time[el['path']]
-            el.update({
-                'updated_at': updated_at,
-                'deleted': 0,
-            })
-            el.save(session=session)
-            if el['el_metadata']:
-                export_location_metadata_update(
-                    context, el['uuid'], el['el_metadata'], session=session)
+@require_context
+def share_export_locations_update(context, share_instance_id, export_locations,
+                                  delete=True):
+    return share_export_locations_update_many(
+        context, {share_instance_id: export_locations}, delete,
+    )[share_instance_id]
 
-    # Now add new export locations
-    for el in export_locations:
-        if el['path'] in current_el_paths:
-            # Already updated
-            continue
 
-        location_ref = models.ShareInstanceExportLocations()
-        location_ref.update({
-            'uuid': uuidutils.generate_uuid(),
-            'path': el['path'],
-            'share_instance_id': share_instance_id,
-            'updated_at': indexed_update_time[el['path']],
-            'deleted': 0,
-            'is_admin_only': el.get('is_admin_only', False),
-        })
-        location_ref.save(session=session)
-        if not el.get('metadata'):
-            continue
-        export_location_metadata_update(
-            context, location_ref['uuid'], el.get('metadata'), session=session)
+@require_context
+@oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
+def share_export_locations_update_many(context, export_locations,
+                                       delete=True):
+    """Set the export locations of many share instances at once.
+
+    :param export_locations: dict mapping share instance ids to their
+        export locations, in the formats accepted by
+        share_export_locations_update.
+    :param delete: whether current export locations missing from the new
+        ones are deleted.
+    :returns: dict mapping share instance ids to the set of paths of their
+        export locations.
+
+    Current export locations of all the instances are read with one query
+    and the changes are written with a few bulk statements in a single
+    transaction.
+    """
+    export_locations = {
+        instance_id: _normalize_export_locations(els)
+        for instance_id, els in export_locations.items()}
+    instance_ids = list(export_locations)
+    models_el = models.ShareInstanceExportLocations
+    models_el_meta = models.ShareInstanceExportLocationsMetadata
+
+    # NOTE(u_glide): Incrementing timestamp by microseconds to make
+    # timestamp order match index order.
+    base = timeutils.utcnow()
+    indexes = {
+        instance_id: {el['path']: index for index, el in enumerate(els)}
+        for instance_id, els in export_locations.items()}
 
-    return get_path_list_from_rows(_share_export_locations_get(
-        context, share_instance_id, session=session))
+    session = get_session()
+    with session.begin():
+        current_el_rows = []
+        for chunk in _chunks(instance_ids):
+            current_el_rows.extend(_share_export_locations_get(
+                context, chunk, session=session))
+
+        current_el_paths = {}
+        deleted_el_ids = []
+        updated_el_ids = {}
+        for el in current_el_rows:
+            instance_id = el['share_instance_id']
+            current_el_paths.setdefault(instance_id, set()).add(el['path'])
+            index = indexes[instance_id].get(el['path'])
+            if index is None:
+                if delete:
+                    deleted_el_ids.append(el['id'])
+                    continue
+                # NOTE: Kept locations missing from the new ones sort
+                # after them.
+                index = len(indexes[instance_id])
+            updated_el_ids.setdefault(index, []).append(el['id'])
+
+        for chunk in _chunks(deleted_el_ids):
+            model_query(
+                context, models_el_meta, session=session, read_deleted="no",
+            ).filter(
+                models_el_meta.export_location_id.in_(chunk),
+            ).soft_delete(synchronize_session=False)
+            model_query(
+                context, models_el, session=session, read_deleted="no",
+            ).filter(
+                models_el.id.in_(chunk),
+            ).soft_delete(synchronize_session=False)
+
+        for index, el_ids in updated_el_ids.items():
+            updated_at = base + datetime.timedelta(microseconds=index)
+            for chunk in _chunks(el_ids):
+                model_query(
+                    context, models_el, session=session,
+                ).filter(
+                    models_el.id.in_(chunk),
+                ).update({'updated_at': updated_at, 'deleted': 0},
+                         synchronize_session=False)
+
+        # Now add new export locations
+        new_el_rows = []
+        new_el_metadata = {}
+        for instance_id, els in export_locations.items():
+            for el in els:
+                if el['path'] in current_el_paths.get(instance_id, ()):
+                    # Already updated
+                    continue
+                el_uuid = uuidutils.generate_uuid()
+                new_el_rows.append({
+                    'uuid': el_uuid,
+                    'path': el['path'],
+                    'share_instance_id': instance_id,
+                    'updated_at': base + datetime.timedelta(
+                        microseconds=indexes[instance_id][el['path']]),
+                    'deleted': 0,
+                    'is_admin_only': el.get('is_admin_only', False),
+                })
+                if el.get('metadata'):
+                    new_el_metadata[el_uuid] = el['metadata']
+        if new_el_rows:
+            session.bulk_insert_mappings(models_el, new_el_rows)
+
+        new_el_meta_rows = []
+        for chunk in _chunks(new_el_metadata):
+            rows = session.query(models_el.uuid, models_el.id).filter(
+                models_el.uuid.in_(chunk)).all()
+            for el_uuid, el_id in rows:
+                for key, value in new_el_metadata[el_uuid].items():
+                    new_el_meta_rows.append({
+                        'export_location_id': el_id,
+                        'key': key,
+                        'value': value,
+                        'updated_at': base,
+                    })
+        if new_el_meta_rows:
+            session.bulk_insert_mappings(models_el_meta, new_el_meta_rows)
+
+        result = {instance_id: set() for instance_id in instance_ids}
+        for chunk in _chunks(instance_ids):
+            for el in _share_export_locations_get(context, chunk,
+                                                  session=session):
+                result[el['share_instance_id']].add(el['path'])
+    return result
 
 
 #####################################
@@ -2970,6 +3370,14 @@ def network_allocations_get_by_ip_address(context, ip_address):
     return result or []
 
 
+@require_context
+def network_allocations_get_ip_addresses(context):
+    rows = model_query(
+        context, models.NetworkAllocation,
+        models.NetworkAllocation.ip_address).distinct().all()
+    return [row[0] for row in rows]
+
+
 @require_context
 def network_allocations_get_for_share_server(context, share_server_id,
                                              session=None, label=None):
@@ -3008,6 +3416,21 @@ def network_allocation_update(context, id, values):
 ###################
 
 
+_share_type_cache = utils.VersionedTTLCache(
+    lambda: CONF.share_type_cache_ttl)
+
+
+def _invalidates_share_type_cache(f):
+    """Decorator dropping cached share types after f changes them."""
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        try:
+            return f(*args, **kwargs)
+        finally:
+            _share_type_cache.invalidate()
+    return wrapper
+
+
 def _dict_with_extra_specs(inst_type_query):
     """Convert type query result to dict with extra_spec and rate_limit.
 
@@ -3027,6 +3450,7 @@ to a single dict:
 
 
 @require_admin_context
+@_invalidates_share_type_cache
 def share_type_create(context, values, projects=None):
     """Create a new share type.
 
@@ -3151,10 +3575,26 @@ def _share_type_get(context, id, session=None, inactive=False,
 @require_context
 def share_type_get(context, id, inactive=False, expected_fields=None):
     """Return a dict describing specific share_type."""
-    return _share_type_get(context, id,
-                           session=None,
-                           inactive=inactive,
-                           expected_fields=expected_fields)
+    expected_fields = expected_fields or []
+
+    # NOTE: Share types are cached as seen by an admin, along with the
+    # projects they are shared with, and the visibility check of
+    # _share_type_get_query is applied to the cached copy.
+    share_type = _share_type_cache.get(
+        ('id', id, inactive),
+        lambda: _share_type_get(context.elevated(), id,
+                                session=None,
+                                inactive=inactive,
+                                expected_fields=['projects']))
+
+    if not (context.is_admin or share_type['is_public'] or
+            context.project_id in share_type['projects']):
+        raise exception.ShareTypeNotFound(share_type_id=id)
+
+    if 'projects' not in expected_fields:
+        del share_type['projects']
+
+    return share_type
 
 
 def _share_type_get_by_name(context, name, session=None):
@@ -3173,10 +3613,13 @@ def _share_type_get_by_name(context, name, session=None):
 def share_type_get_by_name(context, name):
     """Return a dict describing specific share_type."""
 
-    return _share_type_get_by_name(context, name)
+    return _share_type_cache.get(
+        ('name', name, context.read_deleted),
+        lambda: _share_type_get_by_name(context, name))
 
 
 @require_admin_context
+@_invalidates_share_type_cache
 def share_type_destroy(context, id):
     session = get_session()
     with session.begin():
@@ -3212,6 +3655,7 @@ def share_type_access_get_all(context, type_id):
 
 
 @require_admin_context
+@_invalidates_share_type_cache
 def share_type_access_add(context, type_id, project_id):
     """Add given tenant to the share type access list."""
     share_type_id = _share_type_get_id_from_share_type(context, type_id)
@@ -3231,6 +3675,7 @@ def share_type_access_add(context, type_id, project_id):
 
 
 @require_admin_context
+@_invalidates_share_type_cache
 def share_type_access_remove(context, type_id, project_id):
     """Remove given tenant from the share type access list."""
     share_type_id = _share_type_get_id_from_share_type(context, type_id)
@@ -3270,8 +3715,7 @@ def _share_type_extra_specs_query(context, share_type_id, session=None):
         options(joinedload('share_type'))
 
 
-@require_context
-def share_type_extra_specs_get(context, share_type_id):
+def _share_type_extra_specs_get(context, share_type_id):
     rows = _share_type_extra_specs_query(context, share_type_id).\
         all()
 
@@ -3283,6 +3727,14 @@ def share_type_extra_specs_get(context, share_type_id):
 
 
 @require_context
+def share_type_extra_specs_get(context, share_type_id):
+    return _share_type_cache.get(
+        ('extra_specs', share_type_id),
+        lambda: _share_type_extra_specs_get(context, share_type_id))
+
+
+@require_context
+@_invalidates_share_type_cache
 def share_type_extra_specs_delete(context, share_type_id, key):
     session = get_session()
     with session.begin():
@@ -3306,6 +3758,7 @@ def _share_type_extra_specs_get_item(context, share_type_id, key,
 
 
 @require_context
+@_invalidates_share_type_cache
 @oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
 def share_type_extra_specs_update_or_create(context, share_type_id, specs):
     session = get_session()
@@ -23,6 +23,7 @@ from oslo_config import cfg
 from oslo_db.sqlalchemy import models
 from oslo_log import log
 from sqlalchemy import Column, Integer, String, schema
+from sqlalchemy import event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy import orm
 from sqlalchemy import ForeignKey, DateTime, Boolean, Enum
@@ -57,6 +58,23 @@ class ManilaBase(models.ModelBase,
 
         return super(ManilaBase, self).soft_delete(session)
 
+    def _get_memoized(self, name, compute):
+        """Return a value computed once until share or snapshot instances
+        change.
+
+        Used for properties derived from the instances, which are accessed
+        many times per object, for instance by the API view builders.
+        """
+        # NOTE: Keys that start with an underscore are left out of the
+        # dict view of the model.
+        memoized = self.__dict__.get('_memoized')
+        if memoized is None or memoized[0] != _instances_generation:
+            memoized = (_instances_generation, {})
+            self.__dict__['_memoized'] = memoized
+        if name not in memoized[1]:
+            memoized[1][name] = compute()
+        return memoized[1][name]
+
 
 class Service(BASE, ManilaBase):
     """Represents a running service on a host."""
@@ -214,16 +232,20 @@ class Share(BASE, ManilaBase):
         # NOTE(gouthamr): For a replicated share, export locations of the
         # 'active' instances are chosen, if 'available'.
         all_export_locations = []
+        for instance in self._get_memoized('export_instances',
+                                           self._get_export_instances):
+            for export_location in instance.export_locations:
+                all_export_locations.append(export_location['path'])
+
+        return all_export_locations
+
+    def _get_export_instances(self):
         select_instances = list(filter(
             lambda x: x['replica_state'] == constants.REPLICA_STATE_ACTIVE,
             self.instances)) or self.instances
 
-        for instance in select_instances:
-            if instance['status'] == constants.STATUS_AVAILABLE:
-                for export_location in instance.export_locations:
-                    all_export_locations.append(export_location['path'])
-
-        return all_export_locations
+        return [instance for instance in select_instances
+                if instance['status'] == constants.STATUS_AVAILABLE]
 
     def __getattr__(self, item):
         deprecated_properties = ('host', 'share_server_id', 'share_network_id',
@@ -246,6 +268,9 @@ class Share(BASE, ManilaBase):
 
     @property
     def has_replicas(self):
+        return self._get_memoized('has_replicas', self._get_has_replicas)
+
+    def _get_has_replicas(self):
         if len(self.instances) > 1:
             # NOTE(gouthamr): The 'primary' instance of a replicated share
             # has a 'replica_state' set to 'active'. Only the secondary replica
@@ -257,6 +282,9 @@ class Share(BASE, ManilaBase):
 
     @property
     def instance(self):
+        return self._get_memoized('instance', self._get_instance)
+
+    def _get_instance(self):
         # NOTE(gouthamr): The order of preference: status 'replication_change',
         # followed  by 'available' and 'error'. If replicated share and
         # not undergoing a 'replication_change', only 'active' instances are
@@ -273,8 +301,11 @@ class Share(BASE, ManilaBase):
             )
             order = (order + tuple(other_statuses) +
                      constants.TRANSITIONAL_STATUSES)
+            ranks = {}
+            for rank, status in enumerate(order):
+                ranks.setdefault(status, rank)
             sorted_instances = sorted(
-                self.instances, key=lambda x: order.index(x['status']))
+                self.instances, key=lambda x: ranks[x['status']])
 
             select_instances = sorted_instances
             if (select_instances[0]['status'] !=
@@ -289,7 +320,9 @@ class Share(BASE, ManilaBase):
 
     @property
     def access_rules_status(self):
-        return get_access_rules_status(self.instances)
+        return self._get_memoized(
+            'access_rules_status',
+            lambda: get_access_rules_status(self.instances))
 
     id = Column(String(36), primary_key=True)
     deleted = Column(String(36), default='False')
@@ -312,9 +345,12 @@ class Share(BASE, ManilaBase):
 
     source_cgsnapshot_member_id = Column(String(36), nullable=True)
     task_state = Column(String(255))
+    # NOTE: collections are loaded with one extra query per relationship
+    # for all the rows of the parent query rather than one query per row.
+    # Queries that know better can override this with explicit options.
     instances = orm.relationship(
         "ShareInstance",
-        lazy='immediate',
+        lazy='subquery',
         primaryjoin=(
             'and_('
             'Share.id == ShareInstance.share_id, '
@@ -341,7 +377,7 @@ class ShareInstance(BASE, ManilaBase):
                              'display_name', 'display_description',
                              'snapshot_id', 'share_proto', 'share_type_id',
                              'is_public', 'consistency_group_id',
-                             'source_cgsnapshot_member_id')
+                             'source_cgsnapshot_member_id', 'task_state')
 
     def set_share_data(self, share):
         for share_property in self._proxified_properties:
@@ -392,7 +428,7 @@ class ShareInstance(BASE, ManilaBase):
                                   nullable=True)
     _availability_zone = orm.relationship(
         "AvailabilityZone",
-        lazy='immediate',
+        lazy='joined',
         foreign_keys=availability_zone_id,
         primaryjoin=(
             'and_('
@@ -404,7 +440,7 @@ class ShareInstance(BASE, ManilaBase):
 
     export_locations = orm.relationship(
         "ShareInstanceExportLocations",
-        lazy='immediate',
+        lazy='subquery',
         primaryjoin=(
             'and_('
             'ShareInstance.id == '
@@ -544,7 +580,7 @@ class ShareAccessMapping(BASE, ManilaBase):
 
     instance_mappings = orm.relationship(
         "ShareInstanceAccessMapping",
-        lazy='immediate',
+        lazy='subquery',
         primaryjoin=(
             'and_('
             'ShareAccessMapping.id == '
@@ -578,7 +614,7 @@ class ShareInstanceAccessMapping(BASE, ManilaBase):
 
     instance = orm.relationship(
         "ShareInstance",
-        lazy='immediate',
+        lazy='joined',
         primaryjoin=(
             'and_('
             'ShareInstanceAccessMapping.share_instance_id == '
@@ -612,6 +648,9 @@ class ShareSnapshot(BASE, ManilaBase):
 
     @property
     def instance(self):
+        return self._get_memoized('instance', self._get_instance)
+
+    def _get_instance(self):
         result = None
         if len(self.instances) > 0:
             def qualified_replica(x):
@@ -635,6 +674,10 @@ class ShareSnapshot(BASE, ManilaBase):
         case of replication, we only consider replicas (share instances)
         that are in 'in_sync' replica_state.
         """
+        return self._get_memoized('aggregate_status',
+                                  self._get_aggregate_status)
+
+    def _get_aggregate_status(self):
 
         def qualified_replica(x):
             preferred_statuses = (constants.REPLICA_STATE_ACTIVE,
@@ -652,9 +695,12 @@ class ShareSnapshot(BASE, ManilaBase):
         other_statuses = [x['status'] for x in self.instances if
                           x['status'] not in order]
         order = (order + tuple(other_statuses))
+        ranks = {}
+        for rank, status in enumerate(order):
+            ranks.setdefault(status, rank)
 
         sorted_instances = sorted(
-            replica_snapshots, key=lambda x: order.index(x['status']))
+            replica_snapshots, key=lambda x: ranks[x['status']])
         return sorted_instances[0].status
 
     id = Column(String(36), primary_key=True)
@@ -675,7 +721,7 @@ class ShareSnapshot(BASE, ManilaBase):
 
     instances = orm.relationship(
         "ShareSnapshotInstance",
-        lazy='immediate',
+        lazy='subquery',
         primaryjoin=(
             'and_('
             'ShareSnapshot.id == ShareSnapshotInstance.snapshot_id, '
@@ -716,7 +762,7 @@ class ShareSnapshotInstance(BASE, ManilaBase):
     provider_location = Column(String(255))
     share_instance = orm.relationship(
         ShareInstance, backref="snapshot_instances",
-        lazy='immediate',
+        lazy='joined',
         primaryjoin=(
             'and_('
             'ShareSnapshotInstance.share_instance_id == ShareInstance.id,'
@@ -1018,3 +1064,27 @@ def get_access_rules_status(instances):
             break
 
     return share_access_status
+
+
+# Incremented whenever share or snapshot instances, or the states the
+# properties of the shares and snapshots are derived from, change in memory
+# or are expired or refreshed from the database.
+_instances_generation = 0
+
+
+def _instances_changed(*args, **kwargs):
+    global _instances_generation
+    _instances_generation += 1
+
+
+for _attribute in (ShareInstance.status, ShareInstance.replica_state,
+                   ShareInstance.access_rules_status,
+                   ShareSnapshotInstance.status,
+                   ShareSnapshotInstance.share_instance):
+    event.listen(_attribute, 'set', _instances_changed)
+for _attribute in (Share.instances, ShareSnapshot.instances):
+    event.listen(_attribute, 'append', _instances_changed)
+    event.listen(_attribute, 'remove', _instances_changed)
+for _model in (Share, ShareInstance, ShareSnapshot, ShareSnapshotInstance):
+    event.listen(_model, 'expire', _instances_changed)
+    event.listen(_model, 'refresh', _instances_changed)
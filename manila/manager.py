@@ -51,6 +51,8 @@ This module provides Manager, a base class for managers.
 
 """
 
+import copy
+
 from oslo_config import cfg
 from oslo_log import log
 from oslo_service import periodic_task
@@ -59,7 +61,21 @@ from manila.db import base
 from manila.scheduler import rpcapi as scheduler_rpcapi
 from manila import version
 
+manager_opts = [
+    cfg.IntOpt('capabilities_full_update_interval',
+               default=1,
+               min=1,
+               help='Number of periodic capability updates after which a '
+                    'service sends its full capabilities to the schedulers. '
+                    'The updates in between only carry the capabilities and '
+                    'pools that changed. The default of 1 always sends the '
+                    'full capabilities, which schedulers older than the '
+                    'services require. Only set a greater value once all '
+                    'the schedulers are upgraded.'),
+]
+
 CONF = cfg.CONF
+CONF.register_opts(manager_opts)
 LOG = log.getLogger(__name__)
 
 
@@ -129,6 +145,11 @@ class SchedulerDependentManager(Manager):
         self.last_capabilities = None
         self.service_name = service_name
         self.scheduler_rpcapi = scheduler_rpcapi.SchedulerAPI()
+        # Capabilities last sent to the schedulers, with the sequence number
+        # of the update and the number of delta updates since a full one.
+        self._published_capabilities = None
+        self._capabilities_seqno = 0
+        self._capabilities_deltas = 0
         super(SchedulerDependentManager, self).__init__(host, db_driver)
 
     def update_service_capabilities(self, capabilities):
@@ -136,12 +157,101 @@ class SchedulerDependentManager(Manager):
         self.last_capabilities = capabilities
 
     @periodic_task.periodic_task
-    def _publish_service_capabilities(self, context):
-        """Pass data back to the scheduler at a periodic interval."""
-        if self.last_capabilities:
-            LOG.debug('Notifying Schedulers of capabilities ...')
+    def _publish_service_capabilities(self, context, full=False):
+        """Pass data back to the scheduler at a periodic interval.
+
+        Every capabilities_full_update_interval updates the full
+        capabilities are sent, and only what changed is sent in between.
+        Updates are numbered, so that schedulers that missed one ignore
+        the following deltas until the next full update.
+        """
+        if not self.last_capabilities:
+            return
+
+        full_interval = CONF.capabilities_full_update_interval
+        delta = None
+        if (not full and self._published_capabilities is not None and
+                self._capabilities_deltas + 1 < full_interval):
+            delta = _get_capabilities_delta(self._published_capabilities,
+                                            self.last_capabilities)
+
+        if full_interval > 1:
+            self._capabilities_seqno += 1
+            seqno = self._capabilities_seqno
+        else:
+            seqno = None
+
+        LOG.debug('Notifying Schedulers of capabilities ...')
+        if delta is None:
             self.scheduler_rpcapi.update_service_capabilities(
                 context,
                 self.service_name,
                 self.host,
+                self.last_capabilities,
+                seqno=seqno)
+            self._capabilities_deltas = 0
+        else:
+            self.scheduler_rpcapi.update_service_capabilities_delta(
+                context,
+                self.service_name,
+                self.host,
+                delta,
+                seqno)
+            self._capabilities_deltas += 1
+        if seqno is not None:
+            self._published_capabilities = copy.deepcopy(
                 self.last_capabilities)
+
+
+def _get_dict_delta(old, new, ignored=()):
+    return {
+        'updated': dict((key, value) for key, value in new.items()
+                        if key not in ignored and
+                        (key not in old or old[key] != value)),
+        'removed': [key for key in old
+                    if key not in ignored and key not in new],
+    }
+
+
+def _get_pools_by_name(capabilities):
+    pools = capabilities.get('pools')
+    if not isinstance(pools, list):
+        return None
+    pools_by_name = {}
+    for pool in pools:
+        if not isinstance(pool, dict) or 'pool_name' not in pool:
+            return None
+        pools_by_name[pool['pool_name']] = pool
+    if len(pools_by_name) != len(pools):
+        return None
+    return pools_by_name
+
+
+def _get_capabilities_delta(old, new):
+    """Returns the changes between two capability updates.
+
+    The delta holds the backend level capabilities that were updated or
+    removed, the updated and removed capabilities of each pool that changed
+    and the names of the pools that were removed. None is returned when the
+    pools are not reported as a list of uniquely named pools, in which case
+    the full capabilities have to be sent.
+    """
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        return None
+    if 'pools' in old or 'pools' in new:
+        old_pools = _get_pools_by_name(old)
+        new_pools = _get_pools_by_name(new)
+        if old_pools is None or new_pools is None:
+            return None
+    else:
+        old_pools = new_pools = {}
+
+    delta = _get_dict_delta(old, new, ignored=('pools', ))
+    delta['pools'] = {}
+    for name, pool in new_pools.items():
+        if old_pools.get(name) != pool:
+            delta['pools'][name] = _get_dict_delta(old_pools.get(name, {}),
+                                                   pool)
+    delta['removed_pools'] = [name for name in old_pools
+                              if name not in new_pools]
+    return delta
@@ -13,6 +13,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import bisect
+
 import netaddr
 from oslo_config import cfg
 from oslo_log import log
@@ -131,6 +133,7 @@ class StandaloneNetworkPlugin(network.NetworkBaseAPI):
             self.configuration.standalone_network_plugin_ip_version)
         self.net = self._get_network()
         self.allowed_cidrs = self._get_list_of_allowed_addresses()
+        self.allowed_ranges = self._get_allowed_ranges()
         self.reserved_addresses = (
             six.text_type(self.net.network),
             self.gateway,
@@ -215,26 +218,75 @@ class StandaloneNetworkPlugin(network.NetworkBaseAPI):
 
         return cidrs
 
+    def _get_allowed_ranges(self):
+        """Returns the allowed addresses as sorted (first, last) integers."""
+        return [(cidr.first, cidr.last)
+                for cidr in netaddr.cidr_merge(self.allowed_cidrs)]
+
+    def _get_used_ips(self, context):
+        """Returns the sorted integer values of the used IP addresses.
+
+        Addresses of all network allocations are loaded with a single query
+        and only the ones within the allowed ranges are kept.
+        """
+        used = set()
+        first = self.allowed_ranges[0][0]
+        last = self.allowed_ranges[-1][1]
+        for ip in (list(self.reserved_addresses) +
+                   self.db.network_allocations_get_ip_addresses(context)):
+            try:
+                ip = netaddr.IPAddress(ip)
+            except (netaddr.AddrFormatError, TypeError, ValueError):
+                continue
+            if ip.version == self.ip_version and first <= ip.value <= last:
+                used.add(ip.value)
+        return sorted(used)
+
+    @staticmethod
+    def _get_end_of_run(used, index):
+        """Returns the index following a run of consecutive used addresses.
+
+        Since used addresses are sorted and unique, 'used[i] - i' does not
+        decrease and is constant within a run, which is found by bisection.
+        """
+        offset = used[index] - index
+        low, high = index + 1, len(used)
+        while low < high:
+            middle = (low + high) // 2
+            if used[middle] - middle == offset:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
     def _get_available_ips(self, context, amount):
         """Returns IP addresses from allowed IP range if there are unused IPs.
 
+        Free addresses are searched in the gaps between the used ones, the
+        lowest ones being returned first. Must be called with the
+        inter-process lock of allocate_network held.
+
         :returns: IP addresses as list of text types
         :raises: exception.NetworkBadConfigurationException
         """
         ips = []
         if amount < 1:
             return ips
-        iterator = netaddr.iter_unique_ips(*self.allowed_cidrs)
-        for ip in iterator:
-            ip = six.text_type(ip)
-            if (ip in self.reserved_addresses or
-                    self.db.network_allocations_get_by_ip_address(context,
-                                                                  ip)):
-                continue
-            else:
-                ips.append(ip)
-            if len(ips) == amount:
-                return ips
+        used = self._get_used_ips(context)
+        for first, last in self.allowed_ranges:
+            i = bisect.bisect_left(used, first)
+            candidate = first
+            while candidate <= last:
+                if i < len(used) and used[i] == candidate:
+                    # Skip the whole run of consecutive used addresses
+                    i = self._get_end_of_run(used, i)
+                    candidate = used[i - 1] + 1
+                    continue
+                ips.append(six.text_type(
+                    netaddr.IPAddress(candidate, self.ip_version)))
+                if len(ips) == amount:
+                    return ips
+                candidate += 1
         msg = _("No available IP addresses left in CIDRs %(cidrs)s. "
                 "Requested amount of IPs to be provided '%(amount)s', "
                 "available only '%(available)s'.") % {
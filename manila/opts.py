@@ -32,12 +32,14 @@ import manila.compute.nova
 import manila.db.api
 import manila.db.base
 import manila.exception
+import manila.manager
 import manila.network
 import manila.network.linux.interface
 import manila.network.neutron.api
 import manila.network.neutron.neutron_network_plugin
 import manila.network.nova_network_plugin
 import manila.network.standalone_network_plugin
+import manila.policy
 import manila.quota
 import manila.scheduler.drivers.base
 import manila.scheduler.drivers.simple
@@ -95,6 +97,7 @@ _global_opt_lists = [
     manila.db.api.db_opts,
     [manila.db.base.db_driver_opt],
     manila.exception.exc_log_opts,
+    manila.manager.manager_opts,
     manila.network.linux.interface.OPTS,
     manila.network.network_opts,
     manila.network.neutron.api.neutron_opts,
@@ -102,6 +105,7 @@ _global_opt_lists = [
     neutron_single_network_plugin_opts,
     manila.network.nova_network_plugin.nova_single_network_plugin_opts,
     manila.network.standalone_network_plugin.standalone_network_plugin_opts,
+    manila.policy.policy_opts,
     manila.quota.quota_opts,
     manila.scheduler.drivers.base.scheduler_driver_opts,
     manila.scheduler.host_manager.host_manager_opts,
@@ -16,14 +16,72 @@
 """Policy Engine For Manila"""
 
 import functools
+import re
+import time
 
 from oslo_config import cfg
 from oslo_policy import policy
 
 from manila import exception
 
+policy_opts = [
+    cfg.IntOpt('policy_reload_interval',
+               default=1,
+               min=0,
+               help='Minimum number of seconds between two checks for '
+                    'changes of the policy files. 0 checks the policy '
+                    'files on every policy enforcement.'),
+]
+
 CONF = cfg.CONF
+CONF.register_opts(policy_opts)
+
 _ENFORCER = None
+# Rules the cached policy decisions were taken with, and a counter that is
+# bumped whenever they are replaced
+_RULES = None
+_RULES_GENERATION = 0
+# Target keys that _RULES refer to, None if they can see the whole target
+_TARGET_KEYS = None
+
+# Maximum number of policy decisions cached per context
+_DECISION_CACHE_SIZE = 256
+
+_TARGET_KEY_RE = re.compile(r'%\(([^)]+)\)s')
+_MISSING = object()
+
+# Types of the checks that only look at the target through the
+# substitutions in their match, obtained through the rule parser as they
+# are not exposed by oslo.policy.
+_SUBSTITUTION_CHECKS = tuple(set(
+    type(check) for check in policy.Rules.from_dict({
+        'role': 'role:fake', 'generic': 'fake:fake'}).values()))
+_CONSTANT_CHECKS = tuple(set(
+    type(check) for check in policy.Rules.from_dict({
+        'true': '@', 'false': '!'}).values()))
+
+
+class Enforcer(policy.Enforcer):
+    """Policy enforcer that throttles the checks for policy file changes.
+
+    The policy files are stat'ed every time the rules are loaded, which
+    oslo.policy does on every enforcement. They are only checked once every
+    policy_reload_interval seconds here, unless a reload is forced.
+    """
+
+    _last_load = None
+
+    def load_rules(self, force_reload=False):
+        now = time.time()
+        if (force_reload or self._last_load is None or
+                now < self._last_load or
+                now - self._last_load >= CONF.policy_reload_interval):
+            super(Enforcer, self).load_rules(force_reload)
+            self._last_load = now
+
+    def clear(self):
+        super(Enforcer, self).clear()
+        self._last_load = None
 
 
 def reset():
@@ -36,12 +94,66 @@ def reset():
 def init(policy_path=None):
     global _ENFORCER
     if not _ENFORCER:
-        _ENFORCER = policy.Enforcer(CONF)
+        _ENFORCER = Enforcer(CONF)
         if policy_path:
             _ENFORCER.policy_path = policy_path
     _ENFORCER.load_rules()
 
 
+def _get_target_keys(rules):
+    """Returns the target keys that the rules refer to.
+
+    Returns None if some rule can see the whole target, like http checks
+    and checks registered by third parties do.
+    """
+    keys = set()
+    checks = list(rules.values())
+    while checks:
+        check = checks.pop()
+        if isinstance(check, (policy.AndCheck, policy.OrCheck)):
+            checks.extend(check.rules)
+        elif isinstance(check, policy.NotCheck):
+            checks.append(check.rule)
+        elif isinstance(check, _SUBSTITUTION_CHECKS):
+            keys.update(_TARGET_KEY_RE.findall(check.match))
+        elif not isinstance(check, (policy.RuleCheck,) + _CONSTANT_CHECKS):
+            return None
+    return frozenset(keys)
+
+
+def _get_decisions(context, credentials):
+    """Returns the policy decisions cached in a context.
+
+    Decisions are dropped when the rules are replaced and when the
+    credentials of the context change.
+    """
+    global _RULES, _RULES_GENERATION, _TARGET_KEYS
+    if _ENFORCER.rules is not _RULES:
+        _RULES = _ENFORCER.rules
+        _RULES_GENERATION += 1
+        _TARGET_KEYS = _get_target_keys(_RULES)
+    if _TARGET_KEYS is None:
+        return None
+
+    cached = getattr(context, '_policy_decisions', None)
+    if (cached is None or cached[0] != _RULES_GENERATION or
+            cached[1] is not credentials or
+            len(cached[2]) >= _DECISION_CACHE_SIZE):
+        cached = (_RULES_GENERATION, credentials, {})
+        context._policy_decisions = cached
+    return cached[2]
+
+
+def _get_decision_key(action, target):
+    key = (action,) + tuple(target.get(name, _MISSING)
+                            for name in _TARGET_KEYS)
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
 def enforce(context, action, target, do_raise=True):
     """Verifies that the action is valid on the target in this context.
 
@@ -65,15 +177,35 @@ def enforce(context, action, target, do_raise=True):
 
     """
     init()
-    if not isinstance(context, dict):
-        context = context.to_dict()
+    decisions = key = None
+    if isinstance(context, dict):
+        credentials = context
+    else:
+        credentials = context.to_policy_values()
+        decisions = _get_decisions(context, credentials)
+        if decisions is not None:
+            key = _get_decision_key(action, target)
+
+    if key is not None and key in decisions:
+        result = decisions[key]
+        if do_raise and not result:
+            raise exception.PolicyNotAuthorized(action=action)
+        return result
 
     # Add the exception arguments if asked to do a raise
     extra = {}
     if do_raise:
         extra.update(exc=exception.PolicyNotAuthorized, action=action,
                      do_raise=do_raise)
-    return _ENFORCER.enforce(action, target, context, **extra)
+    try:
+        result = _ENFORCER.enforce(action, target, credentials, **extra)
+    except exception.PolicyNotAuthorized:
+        if key is not None:
+            decisions[key] = False
+        raise
+    if key is not None:
+        decisions[key] = result
+    return result
 
 
 def check_is_admin(roles):
@@ -87,11 +87,21 @@ class Scheduler(object):
         """Get the normalized set of capabilities for the services."""
         return self.host_manager.get_service_capabilities()
 
-    def update_service_capabilities(self, service_name, host, capabilities):
+    def update_service_capabilities(self, service_name, host, capabilities,
+                                    seqno=None):
         """Process a capability update from a service node."""
         self.host_manager.update_service_capabilities(service_name,
                                                       host,
-                                                      capabilities)
+                                                      capabilities,
+                                                      seqno=seqno)
+
+    def update_service_capabilities_delta(self, service_name, host, delta,
+                                          seqno):
+        """Process a delta capability update from a service node."""
+        self.host_manager.update_service_capabilities_delta(service_name,
+                                                            host,
+                                                            delta,
+                                                            seqno)
 
     def hosts_up(self, context, topic):
         """Return the list of hosts that have a running service for topic."""
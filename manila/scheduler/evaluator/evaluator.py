@@ -13,8 +13,10 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
 import operator
 import re
+import threading
 
 import pyparsing
 import six
@@ -22,6 +24,8 @@ import six
 from manila import exception
 from manila.i18n import _
 
+_VARIABLE_RE = re.compile(r"^[a-zA-Z_]+\.[a-zA-Z_]+$")
+
 
 def _operatorOperands(tokenList):
     it = iter(tokenList)
@@ -37,14 +41,41 @@ def _operatorOperands(tokenList):
 class EvalConstant(object):
     def __init__(self, toks):
         self.value = toks[0]
+        self.variable = None
+        self.number = None
+
+        # Literals and variable references are resolved once at compile
+        # time, so that evaluating a cached expression does no parsing.
+        if (isinstance(self.value, six.string_types) and
+                _VARIABLE_RE.match(self.value)):
+            self.variable = tuple(self.value.split('.'))
+        else:
+            try:
+                self.number = self._to_number(self.value)
+            except exception.EvaluatorParseException:
+                # Defer the error to evaluation time, as before.
+                pass
+
+    @staticmethod
+    def _to_number(value):
+        try:
+            return int(value)
+        except ValueError:
+            try:
+                return float(value)
+            except ValueError as e:
+                msg = _("ValueError: %s") % six.text_type(e)
+                raise exception.EvaluatorParseException(reason=msg)
+
+    def eval(self, variables):
+        if self.number is not None:
+            return self.number
 
-    def eval(self):
         result = self.value
-        if (isinstance(result, six.string_types) and
-                re.match("^[a-zA-Z_]+\.[a-zA-Z_]+$", result)):
-            (which_dict, entry) = result.split('.')
+        if self.variable is not None:
+            (which_dict, entry) = self.variable
             try:
-                result = _vars[which_dict][entry]
+                result = variables[which_dict][entry]
             except KeyError as e:
                 msg = _("KeyError: %s") % six.text_type(e)
                 raise exception.EvaluatorParseException(reason=msg)
@@ -52,16 +83,7 @@ class EvalConstant(object):
                 msg = _("TypeError: %s") % six.text_type(e)
                 raise exception.EvaluatorParseException(reason=msg)
 
-        try:
-            result = int(result)
-        except ValueError:
-            try:
-                result = float(result)
-            except ValueError as e:
-                msg = _("ValueError: %s") % six.text_type(e)
-                raise exception.EvaluatorParseException(reason=msg)
-
-        return result
+        return self._to_number(result)
 
 
 class EvalSignOp(object):
@@ -73,21 +95,21 @@ class EvalSignOp(object):
     def __init__(self, toks):
         self.sign, self.value = toks[0]
 
-    def eval(self):
-        return self.operations[self.sign] * self.value.eval()
+    def eval(self, variables):
+        return self.operations[self.sign] * self.value.eval(variables)
 
 
 class EvalAddOp(object):
     def __init__(self, toks):
         self.value = toks[0]
 
-    def eval(self):
-        sum = self.value[0].eval()
+    def eval(self, variables):
+        sum = self.value[0].eval(variables)
         for op, val in _operatorOperands(self.value[1:]):
             if op == '+':
-                sum += val.eval()
+                sum += val.eval(variables)
             elif op == '-':
-                sum -= val.eval()
+                sum -= val.eval(variables)
         return sum
 
 
@@ -95,14 +117,14 @@ class EvalMultOp(object):
     def __init__(self, toks):
         self.value = toks[0]
 
-    def eval(self):
-        prod = self.value[0].eval()
+    def eval(self, variables):
+        prod = self.value[0].eval(variables)
         for op, val in _operatorOperands(self.value[1:]):
             try:
                 if op == '*':
-                    prod *= val.eval()
+                    prod *= val.eval(variables)
                 elif op == '/':
-                    prod /= float(val.eval())
+                    prod /= float(val.eval(variables))
             except ZeroDivisionError as e:
                 msg = _("ZeroDivisionError: %s") % six.text_type(e)
                 raise exception.EvaluatorParseException(reason=msg)
@@ -113,10 +135,10 @@ class EvalPowerOp(object):
     def __init__(self, toks):
         self.value = toks[0]
 
-    def eval(self):
-        prod = self.value[0].eval()
+    def eval(self, variables):
+        prod = self.value[0].eval(variables)
         for op, val in _operatorOperands(self.value[1:]):
-            prod = pow(prod, val.eval())
+            prod = pow(prod, val.eval(variables))
         return prod
 
 
@@ -124,8 +146,8 @@ class EvalNegateOp(object):
     def __init__(self, toks):
         self.negation, self.value = toks[0]
 
-    def eval(self):
-        return not self.value.eval()
+    def eval(self, variables):
+        return not self.value.eval(variables)
 
 
 class EvalComparisonOp(object):
@@ -142,11 +164,11 @@ class EvalComparisonOp(object):
     def __init__(self, toks):
         self.value = toks[0]
 
-    def eval(self):
-        val1 = self.value[0].eval()
+    def eval(self, variables):
+        val1 = self.value[0].eval(variables)
         for op, val in _operatorOperands(self.value[1:]):
             fn = self.operations[op]
-            val2 = val.eval()
+            val2 = val.eval(variables)
             if not fn(val1, val2):
                 break
             val1 = val2
@@ -159,12 +181,12 @@ class EvalTernaryOp(object):
     def __init__(self, toks):
         self.value = toks[0]
 
-    def eval(self):
-        condition = self.value[0].eval()
+    def eval(self, variables):
+        condition = self.value[0].eval(variables)
         if condition:
-            return self.value[2].eval()
+            return self.value[2].eval(variables)
         else:
-            return self.value[4].eval()
+            return self.value[4].eval(variables)
 
 
 class EvalFunction(object):
@@ -177,8 +199,8 @@ class EvalFunction(object):
     def __init__(self, toks):
         self.func, self.value = toks[0]
 
-    def eval(self):
-        args = self.value.eval()
+    def eval(self, variables):
+        args = self.value.eval(variables)
         if type(args) is list:
             return self.functions[self.func](*args)
         else:
@@ -189,9 +211,9 @@ class EvalCommaSeperator(object):
     def __init__(self, toks):
         self.value = toks[0]
 
-    def eval(self):
-        val1 = self.value[0].eval()
-        val2 = self.value[2].eval()
+    def eval(self, variables):
+        val1 = self.value[0].eval(variables)
+        val2 = self.value[2].eval(variables)
         if type(val2) is list:
             val_list = []
             val_list.append(val1)
@@ -206,9 +228,9 @@ class EvalBoolAndOp(object):
     def __init__(self, toks):
         self.value = toks[0]
 
-    def eval(self):
-        left = self.value[0].eval()
-        right = self.value[2].eval()
+    def eval(self, variables):
+        left = self.value[0].eval(variables)
+        right = self.value[2].eval(variables)
         return left and right
 
 
@@ -216,13 +238,19 @@ class EvalBoolOrOp(object):
     def __init__(self, toks):
         self.value = toks[0]
 
-    def eval(self):
-        left = self.value[0].eval()
-        right = self.value[2].eval()
+    def eval(self, variables):
+        left = self.value[0].eval(variables)
+        right = self.value[2].eval(variables)
         return left or right
 
+
 _parser = None
-_vars = {}
+_parser_lock = threading.Lock()
+
+# Maximum number of compiled expressions kept by the LRU cache. Every
+# backend reports at most a goodness and a filter function, so this
+# comfortably holds every distinct expression of a large deployment.
+CACHE_SIZE = 512
 
 
 def _def_parser():
@@ -272,6 +300,92 @@ def _def_parser():
     return expr
 
 
+class CompiledExpression(object):
+    """A parsed expression that can be evaluated many times.
+
+    The parse tree is never modified once built and variables are passed
+    down explicitly on evaluation, so a single instance can be shared by
+    concurrent callers.
+    """
+
+    def __init__(self, expression, tree):
+        self.expression = expression
+        self._tree = tree
+
+    def evaluate(self, **kwargs):
+        return self._tree.eval(kwargs)
+
+    __call__ = evaluate
+
+
+class _ExpressionCache(object):
+    """Thread-safe LRU cache of compiled expressions keyed by their text."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._items = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, expression):
+        with self._lock:
+            compiled = self._items.pop(expression, None)
+            if compiled is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._items[expression] = compiled
+            return compiled
+
+    def put(self, expression, compiled):
+        with self._lock:
+            self._items.pop(expression, None)
+            self._items[expression] = compiled
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._items)
+
+
+_cache = _ExpressionCache(CACHE_SIZE)
+
+
+def _parse(expression):
+    global _parser
+
+    # pyparsing (and its packrat cache) is not safe for concurrent use,
+    # but parsing only happens on a cache miss.
+    with _parser_lock:
+        if _parser is None:
+            _parser = _def_parser()
+        try:
+            return _parser.parseString(expression, parseAll=True)[0]
+        except pyparsing.ParseException as e:
+            msg = _("ParseException: %s") % six.text_type(e)
+            raise exception.EvaluatorParseException(reason=msg)
+
+
+def compile_expression(expression):
+    """Compiles an expression into a reusable CompiledExpression.
+
+    Compiled expressions are cached by their text, so repeatedly compiling
+    the same goodness or filter function only parses it once.
+    """
+    compiled = _cache.get(expression)
+    if compiled is None:
+        compiled = CompiledExpression(expression, _parse(expression))
+        _cache.put(expression, compiled)
+    return compiled
+
+
 def evaluate(expression, **kwargs):
     """Evaluates an expression.
 
@@ -281,17 +395,4 @@ def evaluate(expression, **kwargs):
     Supports both integer and floating point values, and automatic
     promotion where necessary.
     """
-    global _parser
-    if _parser is None:
-        _parser = _def_parser()
-
-    global _vars
-    _vars = kwargs
-
-    try:
-        result = _parser.parseString(expression, parseAll=True)[0]
-    except pyparsing.ParseException as e:
-        msg = _("ParseException: %s") % six.text_type(e)
-        raise exception.EvaluatorParseException(reason=msg)
-
-    return result.eval()
+    return compile_expression(expression).evaluate(**kwargs)
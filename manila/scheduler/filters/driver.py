@@ -97,8 +97,10 @@ class DriverFilter(base_host.BaseHostFilter):
         extra_specs = stats['extra_specs']
         share_stats = stats['share_stats']
 
-        result = evaluator.evaluate(
-            func,
+        # Compiled expressions are cached, so each distinct function is
+        # only parsed once rather than once per host and request.
+        expression = evaluator.compile_expression(func)
+        result = expression.evaluate(
             extra=extra_specs,
             stats=host_stats,
             capabilities=host_caps,
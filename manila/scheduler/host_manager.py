@@ -20,6 +20,7 @@
 Manage hosts in the current zone.
 """
 
+import collections
 import re
 try:
     from UserDict import IterableUserDict  # noqa
@@ -34,7 +35,10 @@ import six
 from manila import db
 from manila import exception
 from manila.i18n import _LI, _LW
+from manila.scheduler.filters import availability_zone
 from manila.scheduler.filters import base_host as base_host_filter
+from manila.scheduler.filters import capabilities as capabilities_filter
+from manila.scheduler.filters import extra_specs_ops
 from manila.scheduler.weighers import base_host as base_host_weigher
 from manila.share import utils as share_utils
 from manila import utils
@@ -261,6 +265,34 @@ class HostState(object):
                       {'pool': pool, 'host': self.host})
             del self.pools[pool]
 
+    def update_changed_pools(self, capability, pool_names, service=None):
+        """Update the given pools from backend reported info.
+
+        Used for updates that only changed some of the pools, the backend
+        level info and the other pools are kept as they are.
+        """
+        self.update_capabilities(capability, service)
+        if self.updated and self.updated > capability['timestamp']:
+            return
+        self.updated = capability['timestamp']
+
+        pools = dict((pool_cap['pool_name'], pool_cap)
+                     for pool_cap in capability['pools'])
+        for pool_name in pool_names:
+            pool_cap = pools.get(pool_name)
+            if pool_cap is None:
+                LOG.debug("Removing non-active pool %(pool)s @ %(host)s "
+                          "from scheduler cache.",
+                          {'pool': pool_name, 'host': self.host})
+                self.pools.pop(pool_name, None)
+                continue
+            self._append_backend_info(pool_cap)
+            cur_pool = self.pools.get(pool_name)
+            if not cur_pool:
+                cur_pool = PoolState(self.host, pool_cap, pool_name)
+                self.pools[pool_name] = cur_pool
+            cur_pool.update_from_share_capability(pool_cap, service)
+
     def _append_backend_info(self, pool_cap):
         # Fill backend level info to pool if needed.
         if not pool_cap.get('share_backend_name'):
@@ -389,14 +421,108 @@ class PoolState(HostState):
         pass
 
 
+class PoolIndex(object):
+    """Secondary indexes on capabilities of the pools known to a scheduler.
+
+    The availability zone of the pools is indexed as 'availability_zone_id'
+    and the other keys are looked up in their capabilities. Each indexed key
+    maps the distinct values reported for it to the set of pools reporting
+    them, so that the pools satisfying a condition on a key are found by
+    evaluating the condition once per distinct value instead of once per
+    pool. Pools reporting a list for a key are indexed under each of its
+    items, and pools reporting an unhashable value are returned for
+    any condition on that key.
+    """
+
+    def __init__(self, keys):
+        self.keys = keys
+        self._index = dict((key, {}) for key in keys)
+        self._unhashable = dict((key, set()) for key in keys)
+        self._pool_values = {}
+
+    def __contains__(self, pool):
+        return pool in self._pool_values
+
+    def __len__(self):
+        return len(self._pool_values)
+
+    @staticmethod
+    def _get_values(pool, key):
+        if key == 'availability_zone_id':
+            value = pool.service.get('availability_zone_id')
+        else:
+            value = pool.capabilities.get(key)
+        if value is None:
+            return []
+        return value if isinstance(value, list) else [value]
+
+    def add(self, pool):
+        if pool in self._pool_values:
+            self.remove(pool)
+        values = []
+        for key in self.keys:
+            for value in self._get_values(pool, key):
+                # NOTE: Values are indexed along with their type, since
+                # conditions may tell apart values that compare equal, such
+                # as True and 1.
+                entry = (type(value), value)
+                try:
+                    self._index[key].setdefault(entry, set()).add(pool)
+                except TypeError:
+                    self._unhashable[key].add(pool)
+                    continue
+                values.append((key, entry))
+        self._pool_values[pool] = values
+
+    def remove(self, pool):
+        for key, entry in self._pool_values.pop(pool, []):
+            pools = self._index[key].get(entry, set())
+            pools.discard(pool)
+            if not pools:
+                self._index[key].pop(entry, None)
+        for key in self.keys:
+            self._unhashable[key].discard(pool)
+
+    def match(self, key, condition):
+        """Returns the pools whose value for a key satisfies a condition."""
+        pools = set(self._unhashable[key])
+        for (__, value), value_pools in self._index[key].items():
+            if condition(value):
+                pools |= value_pools
+        return pools
+
+
 class HostManager(object):
     """Base HostManager class."""
 
     host_state_cls = HostState
 
+    # Capabilities of the pools that are indexed, so that the share type
+    # extra specs and the availability zone requested for a share are
+    # matched against them with set operations before running the filters.
+    indexed_capabilities = (
+        'driver_handles_share_servers',
+        'replication_type',
+        'snapshot_support',
+        'storage_protocol',
+        'thin_provisioning',
+    )
+
     def __init__(self):
         self.service_states = {}  # { <host>: {<service>: {cap k : v}}}
         self.host_state_map = {}
+        # Registry of the pools of all active hosts, only updated for the
+        # hosts whose capabilities changed since the previous request.
+        self.pool_map = {}  # { <host>.<pool_name>: PoolState }
+        self.pool_index = PoolIndex(
+            ('availability_zone_id', ) + self.indexed_capabilities)
+        self._host_pool_keys = {}
+        self._applied_updates = {}
+        # Last capabilities reported by the hosts that send numbered
+        # updates, as received, to apply delta updates to, and the pools
+        # changed by delta updates since the host states were updated.
+        self._capability_reports = {}
+        self._changed_pools = {}
         self.filter_handler = base_host_filter.HostFilterHandler(
             'manila.scheduler.filters')
         self.filter_classes = self.filter_handler.get_all_classes()
@@ -465,10 +591,57 @@ class HostManager(object):
                            filter_class_names=None):
         """Filter hosts and return only ones passing all filters."""
         filter_classes = self._choose_host_filters(filter_class_names)
+        hosts = self._prefilter_hosts(hosts, filter_classes, filter_properties)
         return self.filter_handler.get_filtered_objects(filter_classes,
                                                         hosts,
                                                         filter_properties)
 
+    def _get_indexed_conditions(self, filter_classes, filter_properties):
+        """Yields (key, condition) pairs that pools must satisfy to pass.
+
+        Conditions are only derived from the filters in use, and exactly
+        reproduce the checks they do on the indexed capabilities.
+        """
+        for filter_cls in filter_classes:
+            if issubclass(filter_cls,
+                          availability_zone.AvailabilityZoneFilter):
+                spec = filter_properties.get('request_spec') or {}
+                props = spec.get('resource_properties') or {}
+                az_id = props.get('availability_zone_id')
+                if az_id:
+                    yield ('availability_zone_id',
+                           lambda value, az_id=az_id: value == az_id)
+
+            elif issubclass(filter_cls,
+                            capabilities_filter.CapabilitiesFilter):
+                resource_type = filter_properties.get('resource_type') or {}
+                extra_specs = resource_type.get('extra_specs') or {}
+                for key, req in extra_specs.items():
+                    scope = key.split(':')
+                    if len(scope) == 2 and scope[0] == 'capabilities':
+                        key = scope[1]
+                    elif len(scope) != 1:
+                        continue
+                    if key in self.indexed_capabilities:
+                        yield (key,
+                               lambda value, req=req: extra_specs_ops.match(
+                                   value, req))
+
+    def _prefilter_hosts(self, hosts, filter_classes, filter_properties):
+        """Drops the pools that the indexes show will not pass the filters.
+
+        Hosts that are not in the pool registry are left to the filters.
+        """
+        candidates = None
+        for key, condition in self._get_indexed_conditions(
+                filter_classes, filter_properties):
+            pools = self.pool_index.match(key, condition)
+            candidates = pools if candidates is None else candidates & pools
+        if candidates is None:
+            return hosts
+        return [host for host in hosts
+                if host in candidates or host not in self.pool_index]
+
     def get_weighed_hosts(self, hosts, weight_properties,
                           weigher_class_names=None):
         """Weigh the hosts."""
@@ -481,7 +654,8 @@ class HostManager(object):
                                                        hosts,
                                                        weight_properties)
 
-    def update_service_capabilities(self, service_name, host, capabilities):
+    def update_service_capabilities(self, service_name, host, capabilities,
+                                    seqno=None):
         """Update the per-service capabilities based on this notification."""
         if service_name not in ('share',):
             LOG.debug('Ignoring %(service_name)s service update '
@@ -494,11 +668,93 @@ class HostManager(object):
         capability_copy["timestamp"] = timeutils.utcnow()  # Reported time
         self.service_states[host] = capability_copy
 
+        # NOTE: Pools in the service states get backend level capabilities
+        # added by the host states, so the pools to apply deltas to are
+        # kept apart.
+        pools = capabilities.get('pools')
+        if seqno is None or (pools is not None and (
+                not isinstance(pools, list) or
+                not all(isinstance(pool, dict) and 'pool_name' in pool
+                        for pool in pools))):
+            self._capability_reports.pop(host, None)
+        else:
+            report = dict(capabilities)
+            if pools is not None:
+                report['pools'] = collections.OrderedDict(
+                    (pool['pool_name'], dict(pool)) for pool in pools)
+            self._capability_reports[host] = (seqno, report)
+
         LOG.debug("Received %(service_name)s service update from "
                   "%(host)s: %(cap)s" %
                   {'service_name': service_name, 'host': host,
                    'cap': capabilities})
 
+    def update_service_capabilities_delta(self, service_name, host, delta,
+                                          seqno):
+        """Apply a delta capability update to the per-service capabilities.
+
+        Deltas only apply on top of the update preceding them. Otherwise
+        they are ignored until the service sends its full capabilities.
+        """
+        if service_name not in ('share',):
+            LOG.debug('Ignoring %(service_name)s service update '
+                      'from %(host)s',
+                      {'service_name': service_name, 'host': host})
+            return
+
+        last_seqno, report = self._capability_reports.get(host, (None, None))
+        if last_seqno is None or seqno != last_seqno + 1:
+            LOG.debug("Ignoring %(service_name)s service update %(seqno)s "
+                      "from %(host)s, the previous update was not received.",
+                      {'service_name': service_name, 'host': host,
+                       'seqno': seqno})
+            self._capability_reports.pop(host, None)
+            return
+
+        report.update(delta.get('updated', {}))
+        for key in delta.get('removed', []):
+            report.pop(key, None)
+        pools = report.get('pools')
+        changed_pools = set(delta.get('removed_pools', []))
+        for pool_name, pool_delta in delta.get('pools', {}).items():
+            pool = pools.setdefault(pool_name, {})
+            pool.update(pool_delta.get('updated', {}))
+            for key in pool_delta.get('removed', []):
+                pool.pop(key, None)
+            changed_pools.add(pool_name)
+        for pool_name in delta.get('removed_pools', []):
+            pools.pop(pool_name, None)
+        self._capability_reports[host] = (seqno, report)
+
+        capabilities = self.service_states.get(host)
+        if (capabilities is None or delta.get('updated') or
+                delta.get('removed')):
+            # NOTE: Backend level capabilities are added to the pools, so
+            # the capabilities are replaced when they change, for the host
+            # state and all its pools to be updated.
+            capabilities = dict(report)
+            if pools is not None:
+                capabilities['pools'] = [dict(pool)
+                                         for pool in pools.values()]
+            self.service_states[host] = capabilities
+            self._changed_pools.pop(host, None)
+        elif changed_pools:
+            # Only the changed pools are replaced, and only their pool
+            # states get updated.
+            current_pools = dict((pool['pool_name'], pool)
+                                 for pool in capabilities['pools'])
+            capabilities['pools'] = [
+                dict(pool) if name in changed_pools else current_pools[name]
+                for name, pool in pools.items()]
+            self._changed_pools.setdefault(host, set()).update(
+                changed_pools)
+        capabilities["timestamp"] = timeutils.utcnow()  # Reported time
+
+        LOG.debug("Received %(service_name)s service update %(seqno)s from "
+                  "%(host)s: %(delta)s",
+                  {'service_name': service_name, 'host': host,
+                   'seqno': seqno, 'delta': delta})
+
     def _update_host_state_map(self, context):
 
         # Get resource usage across the available share nodes:
@@ -516,17 +772,35 @@ class HostManager(object):
 
             # Create and register host_state if not in host_state_map
             capabilities = self.service_states.get(host, None)
+            service = dict(service.items())
             host_state = self.host_state_map.get(host)
             if not host_state:
                 host_state = self.host_state_cls(
                     host,
                     capabilities=capabilities,
-                    service=dict(service.items()))
+                    service=service)
                 self.host_state_map[host] = host_state
 
-            # Update capabilities and attributes in host_state
-            host_state.update_from_share_capability(
-                capabilities, service=dict(service.items()))
+            # Update capabilities and attributes in host_state, and the
+            # pools in the registry, only when a new capability update was
+            # received or the availability zone of the service changed.
+            update = (capabilities, service.get('availability_zone_id'))
+            applied = self._applied_updates.get(host)
+            # Delta updates that only changed pools are applied to those
+            # pools alone.
+            changed_pools = self._changed_pools.pop(host, None)
+            if (applied is None or applied[0] is not update[0] or
+                    applied[1] != update[1]):
+                host_state.update_from_share_capability(
+                    capabilities, service=service)
+                self._register_pools(host_state)
+                self._applied_updates[host] = update
+            elif changed_pools:
+                host_state.update_changed_pools(
+                    capabilities, changed_pools, service=service)
+                self._register_pools(host_state, changed_pools)
+            else:
+                host_state.update_capabilities(capabilities, service)
             active_hosts.add(host)
 
         # remove non-active hosts from host_state_map
@@ -535,6 +809,36 @@ class HostManager(object):
             LOG.info(_LI("Removing non-active host: %(host)s from"
                          "scheduler cache."), {'host': host})
             self.host_state_map.pop(host, None)
+            self._unregister_pools(host)
+
+    def _register_pools(self, host_state, pool_names=None):
+        """Replaces the pools of a host in the registry and its indexes.
+
+        When pool names are given, only these pools are replaced.
+        """
+        if pool_names is None:
+            self._unregister_pools(host_state.host)
+            pool_names = list(host_state.pools)
+        pool_keys = self._host_pool_keys.setdefault(host_state.host, set())
+        for pool_name in pool_names:
+            # Use host.pool_name to make sure key is unique
+            pool_key = '.'.join([host_state.host, pool_name])
+            pool = self.pool_map.pop(pool_key, None)
+            if pool is not None:
+                self.pool_index.remove(pool)
+            pool_keys.discard(pool_key)
+            pool = host_state.pools.get(pool_name)
+            if pool is not None:
+                self.pool_map[pool_key] = pool
+                self.pool_index.add(pool)
+                pool_keys.add(pool_key)
+
+    def _unregister_pools(self, host):
+        self._applied_updates.pop(host, None)
+        for pool_key in self._host_pool_keys.pop(host, []):
+            pool = self.pool_map.pop(pool_key, None)
+            if pool is not None:
+                self.pool_index.remove(pool)
 
     def get_all_host_states_share(self, context):
         """Returns a dict of all the hosts the HostManager knows about.
@@ -548,16 +852,8 @@ class HostManager(object):
 
         self._update_host_state_map(context)
 
-        # Build a pool_state map and return that map instead of host_state_map
-        all_pools = {}
-        for host, state in self.host_state_map.items():
-            for key in state.pools:
-                pool = state.pools[key]
-                # Use host.pool_name to make sure key is unique
-                pool_key = '.'.join([host, pool.pool_name])
-                all_pools[pool_key] = pool
-
-        return six.itervalues(all_pools)
+        # Return the pools of the registry instead of host_state_map
+        return list(self.pool_map.values())
 
     def get_pools(self, context, filters=None):
         """Returns a dict of all pools on all hosts HostManager knows about."""
@@ -59,7 +59,7 @@ MAPPING = {
 class SchedulerManager(manager.Manager):
     """Chooses a host to create shares."""
 
-    RPC_API_VERSION = '1.6'
+    RPC_API_VERSION = '1.7'
 
     def __init__(self, scheduler_driver=None, service_name=None,
                  *args, **kwargs):
@@ -92,13 +92,23 @@ class SchedulerManager(manager.Manager):
         return self.driver.get_service_capabilities()
 
     def update_service_capabilities(self, context, service_name=None,
-                                    host=None, capabilities=None, **kwargs):
+                                    host=None, capabilities=None, seqno=None,
+                                    **kwargs):
         """Process a capability update from a service node."""
         if capabilities is None:
             capabilities = {}
         self.driver.update_service_capabilities(service_name,
                                                 host,
-                                                capabilities)
+                                                capabilities,
+                                                seqno=seqno)
+
+    def update_service_capabilities_delta(self, context, service_name=None,
+                                          host=None, delta=None, seqno=None):
+        """Process a delta capability update from a service node."""
+        self.driver.update_service_capabilities_delta(service_name,
+                                                      host,
+                                                      delta or {},
+                                                      seqno)
 
     def create_share_instance(self, context, request_spec=None,
                               filter_properties=None):
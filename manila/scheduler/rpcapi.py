@@ -38,15 +38,17 @@ class SchedulerAPI(object):
         1.4 - Add migrate_share_to_host method
         1.5 - Add create_share_replica
         1.6 - Add manage_share
+        1.7 - Add seqno to update_service_capabilities and add
+        update_service_capabilities_delta
     """
 
-    RPC_API_VERSION = '1.6'
+    RPC_API_VERSION = '1.7'
 
     def __init__(self):
         super(SchedulerAPI, self).__init__()
         target = messaging.Target(topic=CONF.scheduler_topic,
                                   version=self.RPC_API_VERSION)
-        self.client = rpc.get_client(target, version_cap='1.6')
+        self.client = rpc.get_client(target, version_cap='1.7')
 
     def create_share_instance(self, context, request_spec=None,
                               filter_properties=None):
@@ -59,13 +61,33 @@ class SchedulerAPI(object):
 
     def update_service_capabilities(self, context,
                                     service_name, host,
-                                    capabilities):
-        call_context = self.client.prepare(fanout=True, version='1.0')
+                                    capabilities, seqno=None):
+        if seqno is None:
+            call_context = self.client.prepare(fanout=True, version='1.0')
+            call_context.cast(context,
+                              'update_service_capabilities',
+                              service_name=service_name,
+                              host=host,
+                              capabilities=capabilities)
+        else:
+            call_context = self.client.prepare(fanout=True, version='1.7')
+            call_context.cast(context,
+                              'update_service_capabilities',
+                              service_name=service_name,
+                              host=host,
+                              capabilities=capabilities,
+                              seqno=seqno)
+
+    def update_service_capabilities_delta(self, context,
+                                          service_name, host,
+                                          delta, seqno):
+        call_context = self.client.prepare(fanout=True, version='1.7')
         call_context.cast(context,
-                          'update_service_capabilities',
+                          'update_service_capabilities_delta',
                           service_name=service_name,
                           host=host,
-                          capabilities=capabilities)
+                          delta=delta,
+                          seqno=seqno)
 
     def get_pools(self, context, filters=None):
         call_context = self.client.prepare(version='1.1')
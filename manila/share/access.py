@@ -13,25 +13,97 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+import sys
+
+from eventlet import event
 from oslo_log import log
 import six
 
 from manila.common import constants
+from manila.i18n import _LE
 from manila.i18n import _LI
 
 LOG = log.getLogger(__name__)
 
 
+class _PendingAccessUpdates(object):
+    """Access rule changes waiting to be applied to a share instance.
+
+    Every queued change bumps the version, so the helper applying the
+    changes can tell whether more of them arrived meanwhile without
+    querying the database again. The changes merged into a batch share an
+    event, sent once the batch is applied, or with the exception applying
+    it raised.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self.applied_version = 0
+        self.in_progress = False
+        self.done = event.Event()
+        self._reset()
+
+    def _reset(self):
+        self.add_rules = collections.OrderedDict()
+        self.delete_rules = collections.OrderedDict()
+        self.discarded_rules = collections.OrderedDict()
+        self.delete_all = False
+
+    @property
+    def is_pending(self):
+        return self.applied_version < self.version
+
+    def add(self, add_rules, delete_rules):
+        """Queues changes, returning the event of the batch they join."""
+        self.version += 1
+
+        if six.text_type(delete_rules).lower() == "all":
+            self._reset()
+            self.delete_all = True
+            delete_rules = []
+
+        for rule in add_rules or []:
+            self.add_rules[rule['id']] = rule
+        for rule in delete_rules or []:
+            # NOTE: a rule denied before it was applied only has to be
+            # removed from the database.
+            if self.add_rules.pop(rule['id'], None) is not None:
+                self.discarded_rules[rule['id']] = rule
+            else:
+                self.delete_rules[rule['id']] = rule
+        return self.done
+
+    def pop(self):
+        """Returns the merged changes and their event, as applied."""
+        changes = (
+            list(self.add_rules.values()),
+            'all' if self.delete_all else list(self.delete_rules.values()),
+            list(self.discarded_rules.values()),
+            self.done,
+        )
+        self._reset()
+        self.done = event.Event()
+        self.applied_version = self.version
+        return changes
+
+
 class ShareInstanceAccess(object):
 
     def __init__(self, db, driver):
         self.db = db
         self.driver = driver
+        self._pending_updates = {}
 
     def update_access_rules(self, context, share_instance_id, add_rules=None,
                             delete_rules=None, share_server=None):
         """Update access rules in driver and database for given share instance.
 
+        Changes requested while the rules of the share instance are being
+        updated are queued, merged and then applied with a single driver
+        call. Either way, this returns once the requested changes are
+        applied, or raises the exception applying them raised.
+
         :param context: current context
         :param share_instance_id: Id of the share instance model
         :param add_rules: list with ShareAccessMapping models or None - rules
@@ -41,6 +113,61 @@ class ShareInstanceAccess(object):
         be deleted.
         :param share_server: Share server model or None
         """
+        pending = self._pending_updates.setdefault(
+            share_instance_id, _PendingAccessUpdates())
+        requested = pending.add(add_rules, delete_rules)
+        if pending.in_progress:
+            LOG.debug("Access rules of share instance %s are being updated, "
+                      "queued the requested changes.", share_instance_id)
+            # NOTE: callers such as share instance deletion go on only once
+            # the rules are actually removed, and handle driver failures.
+            requested.wait()
+            return
+
+        pending.in_progress = True
+        error = None
+        try:
+            while pending.is_pending:
+                add_rules, delete_rules, discarded_rules, done = pending.pop()
+                try:
+                    self._update_access_rules(
+                        context, share_instance_id, add_rules, delete_rules,
+                        discarded_rules, share_server)
+
+                    if not pending.is_pending:
+                        self.db.share_instance_update_access_status(
+                            context,
+                            share_instance_id,
+                            constants.STATUS_ACTIVE
+                        )
+
+                        LOG.info(_LI("Access rules were successfully applied "
+                                     "for share instance: %s"),
+                                 share_instance_id)
+                except Exception as e:
+                    LOG.error(_LE("Failed to apply access rule changes to "
+                                  "share instance %(id)s: rules to add "
+                                  "%(add)s, rules to delete %(delete)s."),
+                              {'id': share_instance_id,
+                               'add': [r['id'] for r in add_rules],
+                               'delete': delete_rules if delete_rules == 'all'
+                               else [r['id'] for r in delete_rules]})
+                    if done is requested:
+                        error = sys.exc_info()
+                    # NOTE: the callers of the failed changes get the
+                    # exception, the changes queued meanwhile are still
+                    # applied.
+                    done.send_exception(e)
+                else:
+                    done.send()
+        finally:
+            self._pending_updates.pop(share_instance_id, None)
+
+        if error is not None:
+            six.reraise(*error)
+
+    def _update_access_rules(self, context, share_instance_id, add_rules,
+                             delete_rules, discarded_rules, share_server):
         share_instance = self.db.share_instance_get(
             context, share_instance_id, with_share_data=True)
 
@@ -51,22 +178,26 @@ class ShareInstanceAccess(object):
                 share_instance_id,
                 constants.STATUS_UPDATING)
 
-        add_rules = add_rules or []
-        delete_rules = delete_rules or []
         remove_rules = None
 
         if six.text_type(delete_rules).lower() == "all":
             # NOTE(ganso): if we are deleting an instance or clearing all
             # the rules, we want to remove only the ones related
             # to this instance.
-            delete_rules = self.db.share_access_get_all_for_instance(
-                context, share_instance['id'])
-            rules = []
+            # NOTE: rules added after all of them were requested to be
+            # deleted are kept.
+            add_ids = set(rule['id'] for rule in add_rules)
+            delete_rules = [
+                rule for rule in self.db.share_access_get_all_for_instance(
+                    context, share_instance['id'])
+                if rule['id'] not in add_ids]
+            rules = list(add_rules)
         else:
             rules = self.db.share_access_get_all_for_instance(
                 context, share_instance['id'])
-            if delete_rules:
-                delete_ids = [rule['id'] for rule in delete_rules]
+            if delete_rules or discarded_rules:
+                delete_ids = set(rule['id'] for rule in
+                                 delete_rules + discarded_rules)
                 rules = list(filter(lambda r: r['id'] not in delete_ids,
                                     rules))
                 # NOTE(ganso): trigger maintenance mode
@@ -103,35 +234,8 @@ class ShareInstanceAccess(object):
         if remove_rules:
             delete_rules = remove_rules
 
-        self._remove_access_rules(context, delete_rules, share_instance['id'])
-
-        share_instance = self.db.share_instance_get(context, share_instance_id,
-                                                    with_share_data=True)
-
-        if self._check_needs_refresh(context, rules, share_instance):
-            self.update_access_rules(context, share_instance_id,
-                                     share_server=share_server)
-        else:
-            self.db.share_instance_update_access_status(
-                context,
-                share_instance['id'],
-                constants.STATUS_ACTIVE
-            )
-
-            LOG.info(_LI("Access rules were successfully applied for "
-                         "share instance: %s"),
-                     share_instance['id'])
-
-    def _check_needs_refresh(self, context, rules, share_instance):
-        rule_ids = set([rule['id'] for rule in rules])
-        queried_rules = self.db.share_access_get_all_for_instance(
-            context, share_instance['id'])
-        queried_ids = set([rule['id'] for rule in queried_rules])
-
-        access_rules_status = share_instance['access_rules_status']
-
-        return (access_rules_status == constants.STATUS_UPDATING_MULTIPLE or
-                rule_ids != queried_ids)
+        self._remove_access_rules(context, delete_rules + discarded_rules,
+                                  share_instance['id'])
 
     def _update_access_fallback(self, add_rules, context, delete_rules,
                                 remove_rules, share_instance, share_server):
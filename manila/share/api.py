@@ -59,6 +59,30 @@ LOG = log.getLogger(__name__)
 GB = 1048576 * 1024
 QUOTAS = quota.QUOTAS
 
+# Search options that are applied by the database when listing shares and
+# snapshots. Any other search option is matched in memory, in which case
+# pagination is done in memory as well.
+SHARE_DB_SEARCH_OPTS = ('display_name', 'status', 'host', 'share_network_id',
+                        'snapshot_id', 'share_type_id',
+                        'consistency_group_id', 'share_proto')
+SNAPSHOT_DB_SEARCH_OPTS = ('display_name', 'status', 'share_id', 'size',
+                           'usage')
+
+
+def _paginate(items, limit=None, offset=None, marker=None):
+    """Returns a page of items that were filtered in memory."""
+    if marker:
+        ids = [item['id'] for item in items]
+        if marker not in ids:
+            msg = _("Marker '%s' not found.") % marker
+            raise exception.InvalidInput(reason=msg)
+        items = items[ids.index(marker) + 1:]
+    if offset:
+        items = items[offset:]
+    if limit is not None:
+        items = items[:limit]
+    return items
+
 
 class API(base.Base):
     """API for interacting with the share manager."""
@@ -1070,7 +1094,7 @@ class API(base.Base):
         return rv
 
     def get_all(self, context, search_opts=None, sort_key='created_at',
-                sort_dir='desc'):
+                sort_dir='desc', limit=None, offset=None, marker=None):
         policy.check_policy(context, 'share', 'get_all')
 
         if search_opts is None:
@@ -1107,23 +1131,37 @@ class API(base.Base):
         is_public = search_opts.pop('is_public', False)
         is_public = strutils.bool_from_string(is_public, strict=True)
 
+        for key in SHARE_DB_SEARCH_OPTS:
+            if key in search_opts:
+                filters[key] = search_opts.pop(key)
+
+        # NOTE(vponomaryov): we do not need 'all_tenants' opt anymore
+        all_tenants = 'all_tenants' in search_opts
+        search_opts.pop('all_tenants', None)
+        share_server_id = search_opts.pop('share_server_id', None)
+
+        # Pagination can only be done in the database if there is nothing
+        # left to filter in memory.
+        pagination = {'limit': None, 'offset': None, 'marker': None}
+        if not search_opts:
+            pagination = {'limit': limit, 'offset': offset, 'marker': marker}
+
         # Get filtered list of shares
-        if 'share_server_id' in search_opts:
+        if share_server_id:
             # NOTE(vponomaryov): this is project_id independent
             policy.check_policy(context, 'share', 'list_by_share_server_id')
             shares = self.db.share_get_all_by_share_server(
-                context, search_opts.pop('share_server_id'), filters=filters,
-                sort_key=sort_key, sort_dir=sort_dir)
-        elif (context.is_admin and 'all_tenants' in search_opts):
+                context, share_server_id, filters=filters,
+                sort_key=sort_key, sort_dir=sort_dir, **pagination)
+        elif (context.is_admin and all_tenants):
             shares = self.db.share_get_all(
-                context, filters=filters, sort_key=sort_key, sort_dir=sort_dir)
+                context, filters=filters, sort_key=sort_key, sort_dir=sort_dir,
+                **pagination)
         else:
             shares = self.db.share_get_all_by_project(
                 context, project_id=context.project_id, filters=filters,
-                is_public=is_public, sort_key=sort_key, sort_dir=sort_dir)
-
-        # NOTE(vponomaryov): we do not need 'all_tenants' opt anymore
-        search_opts.pop('all_tenants', None)
+                is_public=is_public, sort_key=sort_key, sort_dir=sort_dir,
+                **pagination)
 
         if search_opts:
             results = []
@@ -1131,7 +1169,8 @@ class API(base.Base):
                 # values in search_opts can be only strings
                 if all(s.get(k, None) == v for k, v in search_opts.items()):
                     results.append(s)
-            shares = results
+            shares = _paginate(results, limit=limit, offset=offset,
+                               marker=marker)
         return shares
 
     def get_snapshot(self, context, snapshot_id):
@@ -1139,7 +1178,8 @@ class API(base.Base):
         return self.db.share_snapshot_get(context, snapshot_id)
 
     def get_all_snapshots(self, context, search_opts=None,
-                          sort_key='share_id', sort_dir='desc'):
+                          sort_key='share_id', sort_dir='desc', limit=None,
+                          offset=None, marker=None):
         policy.check_policy(context, 'share_snapshot', 'get_all_snapshots')
 
         search_opts = search_opts or {}
@@ -1156,17 +1196,25 @@ class API(base.Base):
                         "'%(v)s'.") % {'k': k, 'v': string_args[k]}
                 raise exception.InvalidInput(reason=msg)
 
+        filters = {}
+        for key in SNAPSHOT_DB_SEARCH_OPTS:
+            if key in search_opts:
+                filters[key] = search_opts.pop(key)
+
+        # Pagination can only be done in the database if there is nothing
+        # left to filter in memory.
+        pagination = {'limit': None, 'offset': None, 'marker': None}
+        if not search_opts:
+            pagination = {'limit': limit, 'offset': offset, 'marker': marker}
+
         if (context.is_admin and all_tenants):
             snapshots = self.db.share_snapshot_get_all(
-                context, filters=search_opts,
-                sort_key=sort_key, sort_dir=sort_dir)
+                context, filters=filters,
+                sort_key=sort_key, sort_dir=sort_dir, **pagination)
         else:
             snapshots = self.db.share_snapshot_get_all_by_project(
-                context, context.project_id, filters=search_opts,
-                sort_key=sort_key, sort_dir=sort_dir)
-
-        # Remove key 'usage' if provided
-        search_opts.pop('usage', None)
+                context, context.project_id, filters=filters,
+                sort_key=sort_key, sort_dir=sort_dir, **pagination)
 
         if search_opts:
             results = []
@@ -1177,7 +1225,8 @@ class API(base.Base):
                         break
                 else:
                     results.append(snapshot)
-            snapshots = results
+            snapshots = _paginate(results, limit=limit, offset=offset,
+                                  marker=marker)
         return snapshots
 
     def allow_access(self, ctx, share, access_type, access_to,
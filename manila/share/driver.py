@@ -487,6 +487,22 @@ class ShareDriver(object):
         """
         raise NotImplementedError()
 
+    def ensure_shares(self, context, shares, share_servers=None):
+        """Invoked to ensure that many shares are exported at once.
+
+        Optional bulk variant of ensure_share used on service startup.
+        Drivers that can check all their shares with a few backend calls
+        should implement it; otherwise ensure_share is called for each
+        share.
+
+        :param shares: list of share instances hosted by the driver.
+        :param share_servers: dict of share servers used by the given
+            shares, keyed by share server ID.
+        :return dict of lists with export locations, keyed by share instance
+            ID. Shares absent from the dict keep their export locations.
+        """
+        raise NotImplementedError()
+
     def allow_access(self, context, share, access, share_server=None):
         """Allow access to the share."""
         raise NotImplementedError()
@@ -1569,6 +1585,31 @@ class ShareDriver(object):
         """
         raise NotImplementedError()
 
+    def update_replica_states(self, context, replicas, share_servers=None):
+        """Update the replica_state of many replicas at once.
+
+        .. note::
+            This call is made on the host which hosts the replicas being
+            updated.
+
+        Optional bulk variant of update_replica_state used by the periodic
+        replica state update. Drivers that can query the state of all the
+        replication relationships of the backend with a few calls should
+        implement it; otherwise update_replica_state is called for each
+        replica.
+
+        :param context: Current context
+        :param replicas: List of dictionaries of the replicas being updated,
+            as passed to update_replica_state. None of them is 'active'.
+        :param share_servers: dict of share servers used by the given
+            replicas, keyed by share server ID.
+        :return: dict of replica states, keyed by replica ID, with the same
+            values that update_replica_state returns. update_replica_state
+            is called for the replicas absent from the dict, e.g. for those
+            whose replication relationship needs to be fixed.
+        """
+        raise NotImplementedError()
+
     def create_replicated_snapshot(self, context, replica_list,
                                    replica_snapshots,
                                    share_server=None):
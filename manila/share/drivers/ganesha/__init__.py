@@ -121,8 +121,8 @@ class GaneshaNASHelper(NASHelperBase):
         """Subclass this to create FSAL block."""
         return {}
 
-    def _allow_access(self, base_path, share, access):
-        """Allow access to the share."""
+    def _make_export(self, base_path, share, access, export_id):
+        """Return the name and the export block of an access rule."""
         if access['access_type'] != 'ip':
             raise exception.InvalidShareAccess('Only IP access type allowed')
         cf = {}
@@ -131,7 +131,7 @@ class GaneshaNASHelper(NASHelperBase):
         export_name = "%s--%s" % (name, accid)
         ganesha_utils.patch(cf, self.export_template, {
             'EXPORT': {
-                'Export_Id': self.ganesha.get_export_id(),
+                'Export_Id': export_id,
                 'Path': os.path.join(base_path, name),
                 'Pseudo': os.path.join(base_path, export_name),
                 'Tag': accid,
@@ -141,7 +141,14 @@ class GaneshaNASHelper(NASHelperBase):
                 'FSAL': self._fsal_hook(base_path, share, access)
             }
         })
-        self.ganesha.add_export(export_name, cf)
+        return export_name, cf
+
+    def _allow_access(self, base_path, share, access):
+        """Allow access to the share."""
+        if access['access_type'] != 'ip':
+            raise exception.InvalidShareAccess('Only IP access type allowed')
+        self.ganesha.add_export(*self._make_export(
+            base_path, share, access, self.ganesha.get_export_id()))
 
     def _deny_access(self, base_path, share, access):
         """Deny access to the share."""
@@ -149,13 +156,26 @@ class GaneshaNASHelper(NASHelperBase):
 
     def update_access(self, base_path, share, add_rules, delete_rules,
                       recovery=False):
-        """Update access rules of share."""
+        """Update access rules of share.
+
+        The rules are applied in a single batch: export ids are allocated
+        together and the export index is regenerated once.
+        """
 
         if recovery:
             self.ganesha.reset_exports()
             self.ganesha.restart_service()
 
         for rule in add_rules:
-            self._allow_access(base_path, share, rule)
-        for rule in delete_rules:
-            self._deny_access(base_path, share, rule)
+            if rule['access_type'] != 'ip':
+                raise exception.InvalidShareAccess(
+                    'Only IP access type allowed')
+        export_ids = self.ganesha.get_export_ids(len(add_rules))
+        add_exports = [
+            self._make_export(base_path, share, rule, export_id)
+            for rule, export_id in zip(add_rules, export_ids)]
+        remove_exports = ["%s--%s" % (share['name'], rule['id'])
+                          for rule in delete_rules]
+        if add_exports or remove_exports:
+            self.ganesha.update_exports(add_exports=add_exports,
+                                        remove_exports=remove_exports)
@@ -263,9 +263,9 @@ class GaneshaManager(object):
                 raise exception.InvalidParameterValue(err=msg)
         return self._write_conf_file(name, mkconf(confdict))
 
-    def _rm_export_file(self, name):
-        """Remove export file of name."""
-        self.execute("rm", self._getpath(name))
+    def _rm_export_file(self, *names):
+        """Remove export files of names."""
+        self.execute("rm", *[self._getpath(name) for name in names])
 
     def _dbus_send_ganesha(self, method, *args, **kwargs):
         """Send a message to Ganesha via dbus."""
@@ -279,11 +279,13 @@ class GaneshaManager(object):
         """Remove an export from Ganesha runtime with given export id."""
         self._dbus_send_ganesha("RemoveExport", "uint16:%d" % xid)
 
-    def add_export(self, name, confdict):
-        """Add an export to Ganesha specified by confdict."""
+    def _add_export(self, name, confdict):
+        """Add an export to Ganesha without updating the index.
+
+        Returns the list of callables that undo the addition.
+        """
         xid = confdict["EXPORT"]["Export_Id"]
         undos = []
-        _mkindex_called = False
         try:
             path = self._write_export_file(name, confdict)
             undos.append(lambda: self._rm_export_file(name))
@@ -291,24 +293,67 @@ class GaneshaManager(object):
             self._dbus_send_ganesha("AddExport", "string:" + path,
                                     "string:EXPORT(Export_Id=%d)" % xid)
             undos.append(lambda: self._remove_export_dbus(xid))
+        except Exception:
+            for u in undos:
+                u()
+            raise
+        return undos
+
+    def update_exports(self, add_exports=(), remove_exports=()):
+        """Add and remove a batch of exports.
+
+        :param add_exports: list of (name, confdict) pairs of the exports
+                            to add.
+        :param remove_exports: list of names of the exports to remove.
 
+        The export files of the removed exports are deleted by a single
+        command and the index file is regenerated only once, after the
+        whole batch is applied. If the index cannot be regenerated, the
+        exports added by the batch are withdrawn.
+        """
+        undos = []
+        removed = []
+        _mkindex_called = False
+        try:
+            try:
+                for name, confdict in add_exports:
+                    undos.extend(self._add_export(name, confdict))
+                for name in remove_exports:
+                    removed.append(name)
+                    confdict = self._read_export_file(name)
+                    self._remove_export_dbus(confdict["EXPORT"]["Export_Id"])
+            finally:
+                if removed:
+                    self._rm_export_file(*removed)
             _mkindex_called = True
             self._mkindex()
         except Exception:
-            for u in undos:
-                u()
-            if not _mkindex_called:
+            if _mkindex_called:
+                for u in undos:
+                    u()
+            else:
                 self._mkindex()
             raise
 
+    def add_export(self, name, confdict):
+        """Add an export to Ganesha specified by confdict."""
+        self.update_exports(add_exports=[(name, confdict)])
+
     def remove_export(self, name):
         """Remove an export from Ganesha."""
-        try:
-            confdict = self._read_export_file(name)
-            self._remove_export_dbus(confdict["EXPORT"]["Export_Id"])
-        finally:
-            self._rm_export_file(name)
-            self._mkindex()
+        self.update_exports(remove_exports=[name])
+
+    def _query_export_id(self, query):
+        """Run query on the export database and return the export id."""
+        out = self.execute("sqlite3", self.ganesha_db_path, query,
+                           run_as_root=False)[0]
+        match = re.search('\Aexportid\|(\d+)$', out)
+        if not match:
+            LOG.error(_LE("Invalid export database on "
+                      "Ganesha node %(tag)s: %(db)s."),
+                      {'tag': self.tag, 'db': self.ganesha_db_path})
+            raise exception.InvalidSqliteDB()
+        return int(match.groups()[0])
 
     def get_export_id(self, bump=True):
         """Get a new export id."""
@@ -318,17 +363,19 @@ class GaneshaManager(object):
             bumpcode = 'update ganesha set value = value + 1;'
         else:
             bumpcode = ''
-        out = self.execute(
-            "sqlite3", self.ganesha_db_path,
-            bumpcode + 'select * from ganesha where key = "exportid";',
-            run_as_root=False)[0]
-        match = re.search('\Aexportid\|(\d+)$', out)
-        if not match:
-            LOG.error(_LE("Invalid export database on "
-                      "Ganesha node %(tag)s: %(db)s."),
-                      {'tag': self.tag, 'db': self.ganesha_db_path})
-            raise exception.InvalidSqliteDB()
-        return int(match.groups()[0])
+        return self._query_export_id(
+            bumpcode + 'select * from ganesha where key = "exportid";')
+
+    def get_export_ids(self, count):
+        """Get count new export ids, allocated in a single transaction."""
+        if count < 1:
+            return []
+        last = self._query_export_id(
+            'begin exclusive;'
+            'update ganesha set value = value + %d;'
+            'select * from ganesha where key = "exportid";'
+            'commit;' % count)
+        return list(range(last - count + 1, last + 1))
 
     def restart_service(self):
         """Restart the Ganesha service."""
@@ -80,6 +80,17 @@ share_opts = [
     cfg.StrOpt('cinder_volume_type',
                help='Name or id of cinder volume type which will be used '
                     'for all volumes created by driver.'),
+    cfg.IntOpt('ssh_max_concurrent_commands',
+               default=8,
+               min=1,
+               help='Maximum number of commands run at once on a service '
+                    'instance, each on its own channel of the SSH session '
+                    'to the instance.'),
+    cfg.IntOpt('ssh_idle_timeout',
+               default=600,
+               min=0,
+               help='Time in seconds after which an unused SSH session to '
+                    'a service instance is closed. 0 keeps sessions open.'),
 ]
 
 CONF = cfg.CONF
@@ -134,7 +145,14 @@ class GenericShareDriver(driver.ExecuteMixin, driver.ShareDriver):
         self._helpers = {}
         self.backend_name = self.configuration.safe_get(
             'share_backend_name') or "Cinder_Volumes"
-        self.ssh_connections = {}
+        self.ssh_sessions = utils.SSHSessionManager(
+            self.configuration.ssh_conn_timeout,
+            max_channels=self.configuration.ssh_max_concurrent_commands,
+            idle_timeout=self.configuration.ssh_idle_timeout)
+        self.volume_watcher = utils.StatusWatcher(
+            lambda volume_id: self.volume_api.get(self.admin_context,
+                                                  volume_id),
+            lambda: self.volume_api.get_all(self.admin_context))
         self._setup_service_instance_manager()
         self.private_storage = kwargs.get('private_storage')
 
@@ -144,27 +162,8 @@ class GenericShareDriver(driver.ExecuteMixin, driver.ShareDriver):
                 driver_config=self.configuration))
 
     def _ssh_exec(self, server, command, check_exit_code=True):
-        connection = self.ssh_connections.get(server['instance_id'])
-        ssh_conn_timeout = self.configuration.ssh_conn_timeout
-        if not connection:
-            ssh_pool = utils.SSHPool(server['ip'],
-                                     22,
-                                     ssh_conn_timeout,
-                                     server['username'],
-                                     server.get('password'),
-                                     server.get('pk_path'),
-                                     max_size=1)
-            ssh = ssh_pool.create()
-            self.ssh_connections[server['instance_id']] = (ssh_pool, ssh)
-        else:
-            ssh_pool, ssh = connection
-
-        if not ssh.get_transport().is_active():
-            ssh_pool.remove(ssh)
-            ssh = ssh_pool.create()
-            self.ssh_connections[server['instance_id']] = (ssh_pool, ssh)
-        return processutils.ssh_execute(ssh, ' '.join(command),
-                                        check_exit_code=check_exit_code)
+        return self.ssh_sessions.execute(server, command,
+                                         check_exit_code=check_exit_code)
 
     def check_for_setup_error(self):
         """Returns an error if prerequisites aren't met."""
@@ -560,8 +559,8 @@ class GenericShareDriver(driver.ExecuteMixin, driver.ShareDriver):
     def _wait_for_available_volume(self, volume, timeout,
                                    msg_error, msg_timeout,
                                    expected_size=None):
-        t = time.time()
-        while time.time() - t < timeout:
+
+        def _is_available(volume):
             if volume['status'] == const.STATUS_AVAILABLE:
                 if expected_size and volume['size'] != expected_size:
                     LOG.debug("The volume %(vol_id)s is available but the "
@@ -572,15 +571,19 @@ class GenericShareDriver(driver.ExecuteMixin, driver.ShareDriver):
                               dict(vol_id=volume['id'],
                                    expected_size=expected_size,
                                    volume_size=volume['size']))
-                else:
-                    break
+                    return False
+                return True
             elif 'error' in volume['status'].lower():
                 raise exception.ManilaException(msg_error)
-            time.sleep(1)
-            volume = self.volume_api.get(self.admin_context, volume['id'])
-        else:
-            raise exception.ManilaException(msg_timeout)
+            return False
 
+        if _is_available(volume):
+            return volume
+
+        available, volume = self.volume_watcher.wait(
+            volume['id'], _is_available, timeout)
+        if not available:
+            raise exception.ManilaException(msg_timeout)
         return volume
 
     def _deallocate_container(self, context, share):
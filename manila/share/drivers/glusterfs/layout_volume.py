@@ -15,14 +15,17 @@
 
 """GlusterFS volume mapped share layout."""
 
+import bisect
 import os
 import random
 import re
 import shutil
 import string
 import tempfile
+import time
 import xml.etree.cElementTree as etree
 
+import eventlet
 from oslo_config import cfg
 from oslo_log import log
 import six
@@ -62,6 +65,14 @@ glusterfs_volume_mapped_opts = [
                     'In latter example, the number that matches "#{size}", '
                     'that is, 3, is an indication that the size of volume '
                     'is 3G.'),
+    cfg.IntOpt('glusterfs_volume_inventory_refresh_interval',
+               default=60,
+               min=0,
+               help='Interval in seconds after which the inventory of free '
+                    'GlusterFS volumes is refreshed in the background, to '
+                    'pick up volumes added to or removed from the '
+                    'GlusterFS servers. The inventory is also refreshed '
+                    'whenever no free volume is found for a new share.'),
 ]
 
 
@@ -81,6 +92,83 @@ USER_CLONED_FROM = 'user.manila-cloned-from'
 UUID_RE = re.compile('\A[\da-f]{8}-([\da-f]{4}-){3}[\da-f]{12}\Z', re.I)
 
 
+class GlusterVolumeInventory(object):
+    """Index of free GlusterFS volumes by size and host.
+
+    Volumes are kept in sorted lists per size and host, and per host, and
+    the sizes having free volumes in a sorted list, so that volumes are
+    picked with a bisection rather than by sorting all free volumes.
+    """
+
+    def __init__(self):
+        self._volumes = {}
+        self._by_size = {}
+        self._by_host = {}
+        self._sizes = []
+
+    def __contains__(self, vol):
+        return vol in self._volumes
+
+    def __iter__(self):
+        return iter(list(self._volumes))
+
+    def __len__(self):
+        return len(self._volumes)
+
+    def add(self, vol, size, host):
+        """Add a free volume, of the given size (or None) on host."""
+        if vol in self._volumes:
+            self.remove(vol)
+        size = size or None
+        self._volumes[vol] = (size, host)
+        hostmap = self._by_size.setdefault(size, {})
+        if not hostmap and size is not None:
+            bisect.insort(self._sizes, size)
+        bisect.insort(hostmap.setdefault(host, []), vol)
+        bisect.insort(self._by_host.setdefault(host, []), vol)
+
+    def remove(self, vol):
+        """Remove a volume, if present."""
+        if vol not in self._volumes:
+            return
+        size, host = self._volumes.pop(vol)
+        hostmap = self._by_size[size]
+        self._remove_sorted(hostmap, host, vol)
+        if not hostmap:
+            del self._by_size[size]
+            if size is not None:
+                del self._sizes[bisect.bisect_left(self._sizes, size)]
+        self._remove_sorted(self._by_host, host, vol)
+
+    @staticmethod
+    def _remove_sorted(hostmap, host, vol):
+        vols = hostmap[host]
+        del vols[bisect.bisect_left(vols, vol)]
+        if not vols:
+            del hostmap[host]
+
+    def pick(self, size=None):
+        """Pick a free volume, without removing it.
+
+        If size is given, the volumes with the smallest size greater than
+        or equal to it are considered, or the ones without size if there
+        are none. Otherwise, all volumes are considered. A host is chosen
+        randomly among the ones of the volumes considered, to tend towards
+        an even distribution of shares among Gluster clusters, and its
+        alphabetically first volume is returned.
+        """
+        if size:
+            index = bisect.bisect_left(self._sizes, size)
+            chosen_size = (self._sizes[index] if index < len(self._sizes)
+                           else None)
+            hostmap = self._by_size.get(chosen_size)
+        else:
+            hostmap = self._by_host
+        if not hostmap:
+            return None
+        return hostmap[random.choice(list(hostmap.keys()))][0]
+
+
 class GlusterfsVolumeMappedLayout(layout.GlusterfsShareLayoutBase):
 
     _snapshots_are_supported = True
@@ -101,6 +189,14 @@ class GlusterfsVolumeMappedLayout(layout.GlusterfsShareLayoutBase):
             self._glustermanager(srvaddr, False)
         self.glusterfs_versions = {}
         self.private_storage = kwargs.get('private_storage')
+        # Inventory of the volumes that can back new shares, along with
+        # the size and host of the volumes ever found free, so that they
+        # can be put back in it when their share is deleted.
+        self.gluster_free_vols = GlusterVolumeInventory()
+        self.gluster_vols_info = {}
+        self._inventory_refreshed_at = None
+        self._inventory_refreshing = False
+        self._inventory_changes = None
 
     def _compile_volume_pattern(self):
         """Compile a RegexObject from the config specified regex template.
@@ -191,7 +287,7 @@ class GlusterfsVolumeMappedLayout(layout.GlusterfsShareLayoutBase):
             return
         return self._glustermanager(gluster_address)
 
-    def _fetch_gluster_volumes(self, filter_used=True):
+    def _fetch_gluster_volumes(self, filter_used=True, unbound=()):
         """Do a 'gluster volume list | grep <volume pattern>'.
 
         Aggregate the results from all servers.
@@ -200,6 +296,8 @@ class GlusterfsVolumeMappedLayout(layout.GlusterfsShareLayoutBase):
         Return a dict with keys of the form <server>:/<volname>
         and values being dicts that map names of named groups
         to their extracted value.
+        Volumes in unbound are known not to back a share, and
+        are not queried when filtering used volumes.
         """
 
         volumes_dict = {}
@@ -218,7 +316,8 @@ class GlusterfsVolumeMappedLayout(layout.GlusterfsShareLayoutBase):
                 comp_vol = gluster_mgr.components.copy()
                 comp_vol.update({'volume': volname})
                 gluster_mgr_vol = self._glustermanager(comp_vol)
-                if filter_used:
+                if (filter_used and
+                        gluster_mgr_vol.qualified not in unbound):
                     vshr = gluster_mgr_vol.get_vol_option(
                         USER_MANILA_SHARE) or ''
                     if UUID_RE.search(vshr):
@@ -234,98 +333,138 @@ class GlusterfsVolumeMappedLayout(layout.GlusterfsShareLayoutBase):
                 volumes_dict[gluster_mgr_vol.qualified] = pattern_dict
         return volumes_dict
 
+    @utils.synchronized("glusterfs_volume_inventory", external=False)
+    def _refresh_gluster_vols(self):
+        """Refresh the inventory of free volumes.
+
+        Volumes already in the inventory are known to be free, so only the
+        other volumes matching the pattern are queried for the share they
+        back. Changes made to the inventory by creations and deletions of
+        shares during the refresh take precedence over its results.
+        """
+        unbound = self._start_inventory_refresh()
+        try:
+            voldict = self._fetch_gluster_volumes(unbound=unbound)
+        except Exception:
+            self._inventory_changes = None
+            raise
+        self._finish_inventory_refresh(voldict)
+
     @utils.synchronized("glusterfs_native", external=False)
+    def _start_inventory_refresh(self):
+        self._inventory_changes = set()
+        return set(self.gluster_free_vols)
+
+    @utils.synchronized("glusterfs_native", external=False)
+    def _finish_inventory_refresh(self, voldict):
+        changes, self._inventory_changes = self._inventory_changes, None
+        for vol in self.gluster_free_vols:
+            if vol not in voldict and vol not in changes:
+                # The volume was deleted or bound to a share elsewhere.
+                self.gluster_free_vols.remove(vol)
+        for vol, volinfo in voldict.items():
+            if (vol in changes or vol in self.gluster_used_vols or
+                    vol in self.gluster_free_vols):
+                continue
+            info = (volinfo.get('size'), self._glustermanager(vol).host)
+            self.gluster_vols_info[vol] = info
+            self.gluster_free_vols.add(vol, *info)
+        self._inventory_refreshed_at = time.time()
+        LOG.debug("Refreshed inventory of gluster volumes: %(free)d free, "
+                  "%(used)d in use.", {'free': len(self.gluster_free_vols),
+                                       'used': len(self.gluster_used_vols)})
+
+    def _refresh_gluster_vols_in_background(self):
+        if self._inventory_refreshing:
+            return
+        self._inventory_refreshing = True
+
+        def _refresh():
+            try:
+                self._refresh_gluster_vols()
+            except Exception:
+                LOG.exception(_LE("Failed to refresh the inventory of "
+                                  "gluster volumes."))
+            finally:
+                self._inventory_refreshing = False
+
+        eventlet.spawn_n(_refresh)
+
+    def _inventory_is_stale(self):
+        interval = (
+            self.configuration.glusterfs_volume_inventory_refresh_interval)
+        return (self._inventory_refreshed_at is None or
+                time.time() - self._inventory_refreshed_at >= interval)
+
     def _pop_gluster_vol(self, size=None):
         """Pick an unbound volume.
 
-        Do a _fetch_gluster_volumes() first to get the complete
-        list of usable volumes.
-        Keep only the unbound ones (ones that are not yet used to
-        back a share).
+        Volumes are picked from the inventory of free volumes, which is
+        refreshed first if it was never loaded, and in the background if
+        it is stale. If no suitable volume is free, the inventory is
+        refreshed and the pick retried, to account for volumes added to
+        the GlusterFS servers since the last refresh.
         If size is given, try to pick one which has a size specification
         (according to the 'size' named group of the volume pattern),
         and its size is greater-than-or-equal to the given size.
         Return the volume chosen (in <host>:/<volname> format).
         """
 
-        voldict = self._fetch_gluster_volumes()
-        # calculate the set of unused volumes
-        unused_vols = set(voldict) - self.gluster_used_vols
+        refreshed = False
+        if self._inventory_refreshed_at is None:
+            self._refresh_gluster_vols()
+            refreshed = True
+        elif self._inventory_is_stale():
+            self._refresh_gluster_vols_in_background()
+
+        vol = self._take_gluster_vol(size)
+        if vol is None and not refreshed:
+            self._refresh_gluster_vols()
+            vol = self._take_gluster_vol(size)
+
+        if vol is None:
+            msg = (_("Couldn't find a free gluster volume to use."))
+            LOG.error(msg)
+            raise exception.GlusterfsException(msg)
+        return vol
+
+    @utils.synchronized("glusterfs_native", external=False)
+    def _take_gluster_vol(self, size=None):
+        """Take a volume out of the inventory of free volumes."""
 
-        if not unused_vols:
+        if not self.gluster_free_vols:
             # No volumes available for use as share. Warn user.
             LOG.warning(_LW("No unused gluster volumes available for use as "
                             "share! Create share won't be supported unless "
                             "existing shares are deleted or some gluster "
                             "volumes are created with names matching "
                             "'glusterfs_volume_pattern'."))
-        else:
-            LOG.info(_LI("Number of gluster volumes in use:  "
-                         "%(inuse-numvols)s. Number of gluster volumes "
-                         "available for use as share: %(unused-numvols)s"),
-                     {'inuse-numvols': len(self.gluster_used_vols),
-                     'unused-numvols': len(unused_vols)})
-
-        # volmap is the data structure used to categorize and sort
-        # the unused volumes. It's a nested dictionary of structure
-        # {<size>: <hostmap>}
-        # where <size> is either an integer or None,
-        # <hostmap> is a dictionary of structure {<host>: <vols>}
-        # where <host> is a host name (IP address), <vols> is a list
-        # of volumes (gluster addresses).
-        volmap = {None: {}}
-        # if both caller has specified size and 'size' occurs as
-        # a parameter in the volume pattern...
-        if size and 'size' in self.volume_pattern_keys:
-            # then this function is used to extract the
-            # size value for a given volume from the voldict...
-            get_volsize = lambda vol: voldict[vol]['size']
-        else:
-            # else just use a stub.
-            get_volsize = lambda vol: None
-        for vol in unused_vols:
-            # For each unused volume, we extract the <size>
-            # and <host> values with which it can be inserted
-            # into the volmap, and conditionally perform
-            # the insertion (with the condition being: once
-            # caller specified size and a size indication was
-            # found in the volume name, we require that the
-            # indicated size adheres to caller's spec).
-            volsize = get_volsize(vol)
-            if not volsize or volsize >= size:
-                hostmap = volmap.get(volsize)
-                if not hostmap:
-                    hostmap = {}
-                    volmap[volsize] = hostmap
-                host = self._glustermanager(vol).host
-                hostvols = hostmap.get(host)
-                if not hostvols:
-                    hostvols = []
-                    hostmap[host] = hostvols
-                hostvols.append(vol)
-        if len(volmap) > 1:
-            # volmap has keys apart from the default None,
-            # ie. volumes with sensible and adherent size
-            # indication have been found. Then pick the smallest
-            # of the size values.
-            chosen_size = sorted(n for n in volmap.keys() if n)[0]
-        else:
-            chosen_size = None
-        chosen_hostmap = volmap[chosen_size]
-        if not chosen_hostmap:
-            msg = (_("Couldn't find a free gluster volume to use."))
-            LOG.error(msg)
-            raise exception.GlusterfsException(msg)
+            return None
+
+        LOG.info(_LI("Number of gluster volumes in use:  "
+                     "%(inuse-numvols)s. Number of gluster volumes "
+                     "available for use as share: %(unused-numvols)s"),
+                 {'inuse-numvols': len(self.gluster_used_vols),
+                  'unused-numvols': len(self.gluster_free_vols)})
+
+        # Sizes are only taken into account if the volume pattern
+        # has a 'size' parameter.
+        if 'size' not in self.volume_pattern_keys:
+            size = None
+        vol = self.gluster_free_vols.pick(size)
+        if vol is not None:
+            self._add_gluster_used_vol(vol)
+        return vol
 
-        # From the hosts we choose randomly to tend towards
-        # even distribution of share backing volumes among
-        # Gluster clusters.
-        chosen_host = random.choice(list(chosen_hostmap.keys()))
-        # Within a host's volumes, choose alphabetically first,
-        # to make it predictable.
-        vol = sorted(chosen_hostmap[chosen_host])[0]
+    def _add_gluster_used_vol(self, vol):
         self.gluster_used_vols.add(vol)
-        return vol
+        self.gluster_free_vols.remove(vol)
+        if self._inventory_changes is not None:
+            self._inventory_changes.add(vol)
+
+    @utils.synchronized("glusterfs_native", external=False)
+    def _mark_gluster_vol_used(self, vol):
+        self._add_gluster_used_vol(vol)
 
     @utils.synchronized("glusterfs_native", external=False)
     def _push_gluster_vol(self, exp_locn):
@@ -335,6 +474,13 @@ class GlusterfsVolumeMappedLayout(layout.GlusterfsShareLayoutBase):
             msg = (_("Couldn't find the share in used list."))
             LOG.error(msg)
             raise exception.GlusterfsException(msg)
+        # Volumes of the pool go back to the inventory, while the ones
+        # created as snapshot clones were deleted.
+        info = self.gluster_vols_info.get(exp_locn)
+        if info:
+            self.gluster_free_vols.add(exp_locn, *info)
+        if self._inventory_changes is not None:
+            self._inventory_changes.add(exp_locn)
 
     def _wipe_gluster_vol(self, gluster_mgr):
 
@@ -514,7 +660,7 @@ class GlusterfsVolumeMappedLayout(layout.GlusterfsShareLayoutBase):
             args = ['volume', op, gmgr.volume] + opargs
             gmgr.gluster_call(*args, log=_LE("Creating share from snapshot"))
 
-        self.gluster_used_vols.add(gmgr.qualified)
+        self._mark_gluster_vol_used(gmgr.qualified)
         self.private_storage.update(share['id'], {'volume': gmgr.qualified})
 
         return export
@@ -587,7 +733,7 @@ class GlusterfsVolumeMappedLayout(layout.GlusterfsShareLayoutBase):
     def ensure_share(self, context, share, share_server=None):
         """Invoked to ensure that share is exported."""
         gmgr = self._share_manager(share)
-        self.gluster_used_vols.add(gmgr.qualified)
+        self._mark_gluster_vol_used(gmgr.qualified)
 
         gmgr.set_vol_option(USER_MANILA_SHARE, share['id'])
 
@@ -20,9 +20,8 @@ from xml.etree import ElementTree as ET
 
 from oslo_log import log
 from oslo_serialization import jsonutils
+import requests
 import six
-from six.moves import http_cookiejar
-from six.moves.urllib import request as urlreq  # pylint: disable=E0611
 
 from manila import exception
 from manila.i18n import _
@@ -39,15 +38,27 @@ class RestHelper(object):
 
     def __init__(self, configuration):
         self.configuration = configuration
+        # Shares and access rules found on the array, so that looking them
+        # up does not list all of them 100 at a time. The indexes are
+        # updated on the changes made through this helper and listed again
+        # from the array after SHARE_INDEX_TIMEOUT seconds.
+        self._share_index = {}
+        self._access_index = {}
+        self.session = None
         self.init_http_head()
 
     def init_http_head(self):
-        self.cookie = http_cookiejar.CookieJar()
         self.url = None
-        self.headers = {
+        # The session keeps the connection to the array alive and holds
+        # its cookies between the calls. The one of a previous login is
+        # closed, not to leak its pooled connections.
+        if self.session is not None:
+            self.session.close()
+        self.session = requests.Session()
+        self.session.headers.update({
             "Connection": "keep-alive",
             "Content-Type": "application/json",
-        }
+        })
 
     def do_call(self, url, data=None, method=None,
                 calltimeout=constants.SOCKET_TIMEOUT):
@@ -65,16 +76,15 @@ class RestHelper(object):
                       {'url': url,
                        'method': method,
                        'data': data})
-        opener = urlreq.build_opener(urlreq.HTTPCookieProcessor(self.cookie))
-        urlreq.install_opener(opener)
+        if method is None:
+            method = "GET" if data is None else "POST"
         result = None
 
         try:
-            req = urlreq.Request(url, data, self.headers)
-            if method:
-                req.get_method = lambda: method
-            res_temp = urlreq.urlopen(req, timeout=calltimeout)
-            res = res_temp.read().decode("utf-8")
+            res_temp = self.session.request(method, url, data=data,
+                                            timeout=calltimeout)
+            res_temp.raise_for_status()
+            res = res_temp.content.decode("utf-8")
 
             LOG.debug('Response Data: %(res)s.', {'res': res})
 
@@ -119,7 +129,8 @@ class RestHelper(object):
                       {'url': item_url})
             deviceid = result['data']['deviceid']
             self.url = item_url + deviceid
-            self.headers['iBaseToken'] = result['data']['iBaseToken']
+            self.session.headers['iBaseToken'] = (
+                result['data']['iBaseToken'])
             break
 
         if deviceid is None:
@@ -255,6 +266,8 @@ class RestHelper(object):
         self._assert_rest_result(result, msg)
         self._assert_data_in_result(result, msg)
 
+        # Forget any share previously found with the same path.
+        self._get_share_index(share_url_type).pop(share_path, None)
         return result['data']['ID']
 
     def _delete_share_by_id(self, share_id, share_url_type):
@@ -263,6 +276,10 @@ class RestHelper(object):
 
         result = self.call(url, None, "DELETE")
         self._assert_rest_result(result, 'Delete share error.')
+        self._remove_from_share_index('ID', share_id, share_url_type)
+        for key in list(self._access_index):
+            if key[1] == share_id:
+                del self._access_index[key]
 
     def _delete_fs(self, fs_id):
         """Delete file system."""
@@ -271,6 +288,7 @@ class RestHelper(object):
 
         result = self.call(url, None, "DELETE")
         self._assert_rest_result(result, 'Delete file system error.')
+        self._remove_from_share_index('FSID', fs_id)
 
     def _get_cifs_service_status(self):
         url = "/CIFSSERVICE"
@@ -382,6 +400,12 @@ class RestHelper(object):
         url = "/" + access_type + "/" + access_id
         result = self.call(url, None, "DELETE")
         self._assert_rest_result(result, 'delete access from share error!')
+        for key, index in self._access_index.items():
+            if key[0] != access_type:
+                continue
+            for name, item_id in list(index['access'].items()):
+                if item_id == access_id:
+                    del index['access'][name]
 
     def _get_access_count(self, share_id, share_client_type):
         url_subfix = ("/" + share_client_type + "/count?"
@@ -398,42 +422,53 @@ class RestHelper(object):
     def _get_all_access_from_share(self, share_id, share_proto):
         """Return a list of all the access IDs of the share"""
         share_client_type = self._get_share_client_type(share_proto)
-        count = self._get_access_count(share_id, share_client_type)
-
-        access_ids = []
-        range_begin = 0
-        while count > 0:
-            access_range = self._get_access_from_share_range(share_id,
-                                                             range_begin,
-                                                             share_client_type)
-            for item in access_range:
-                access_ids.append(item['ID'])
-            range_begin += 100
-            count -= 100
-
-        return access_ids
+        access = self._get_access_index(share_id, share_client_type,
+                                        refresh=True)
+        return list(access.values())
 
     def _get_access_from_share(self, share_id, access_to, share_proto):
-        """Segments to find access for a period of 100."""
+        """Find access to the share by name."""
         share_client_type = self._get_share_client_type(share_proto)
-        count = self._get_access_count(share_id, share_client_type)
+        access = self._get_access_index(share_id, share_client_type)
+        return access.get(access_to) or access.get('@' + access_to)
 
-        access_id = None
-        range_begin = 0
-        while count > 0:
-            if access_id:
-                break
-            access_range = self._get_access_from_share_range(share_id,
-                                                             range_begin,
-                                                             share_client_type)
-            for item in access_range:
-                if item['NAME'] in (access_to, '@' + access_to):
-                    access_id = item['ID']
+    def _get_access_index(self, share_id, share_client_type, refresh=False):
+        """Return the access IDs of the share by name.
 
-            range_begin += 100
-            count -= 100
-
-        return access_id
+        The access rules of the share are listed for a period of 100 when
+        they are not known yet or too old.
+        """
+        key = (share_client_type, share_id)
+        index = self._access_index.get(key)
+        if (refresh or index is None or
+                time.time() - index['updated'] >
+                constants.SHARE_INDEX_TIMEOUT):
+            count = self._get_access_count(share_id, share_client_type)
+            access = {}
+            range_begin = 0
+            while count > 0:
+                access_range = self._get_access_from_share_range(
+                    share_id, range_begin, share_client_type)
+                for item in access_range:
+                    access[item['NAME']] = item['ID']
+                range_begin += 100
+                count -= 100
+            index = {'updated': time.time(), 'access': access}
+            self._access_index[key] = index
+
+        return index['access']
+
+    def _add_to_access_index(self, share_id, share_client_type, name,
+                             result):
+        key = (share_client_type, share_id)
+        if key not in self._access_index:
+            return
+        access_id = (result.get('data') or {}).get('ID')
+        if access_id:
+            self._access_index[key]['access'][name] = access_id
+        else:
+            # The new access is listed again from the array.
+            del self._access_index[key]
 
     def _get_access_from_share_range(self, share_id,
                                      range_begin,
@@ -522,6 +557,8 @@ class RestHelper(object):
 
         msg = 'Allow access error.'
         self._assert_rest_result(result, msg)
+        self._add_to_access_index(share_id, "NFS_SHARE_AUTH_CLIENT",
+                                  access_to, result)
 
     def _allow_cifs_access_rest(self, share_id, access_to, access_level):
         url = "/CIFS_SHARE_AUTH_CLIENT"
@@ -547,6 +584,8 @@ class RestHelper(object):
             result = self.call(url, data, "POST")
             error_code = result['error']['code']
             if error_code == 0:
+                self._add_to_access_index(share_id, "CIFS_SHARE_AUTH_CLIENT",
+                                          access_to, result)
                 return True
             elif error_code != constants.ERROR_USER_OR_GROUP_NOT_EXIST:
                 self._assert_rest_result(result, error_msg)
@@ -641,6 +680,11 @@ class RestHelper(object):
 
     def _get_share_by_name(self, share_name, share_url_type):
         """Segments to find share for a period of 100."""
+        share = self._get_share_index(share_url_type).get(
+            self._get_share_path(share_name))
+        if share:
+            return dict(share)
+
         count = self._get_share_count(share_url_type)
 
         share = {}
@@ -675,16 +719,39 @@ class RestHelper(object):
         self._assert_rest_result(result, 'Get share by name error!')
 
         share_path = self._get_share_path(share_name)
+        shares = self._get_share_index(share_url_type)
 
         share = {}
         for item in result.get('data', []):
+            shares[item['SHAREPATH']] = {'ID': item['ID'],
+                                         'FSID': item['FSID']}
             if share_path == item['SHAREPATH']:
                 share['ID'] = item['ID']
                 share['FSID'] = item['FSID']
-                break
 
         return share
 
+    def _get_share_index(self, share_url_type):
+        """Return the known shares by share path.
+
+        The shares are forgotten after SHARE_INDEX_TIMEOUT seconds, to be
+        found again on the array.
+        """
+        index = self._share_index.get(share_url_type)
+        if (index is None or time.time() - index['updated'] >
+                constants.SHARE_INDEX_TIMEOUT):
+            index = {'updated': time.time(), 'shares': {}}
+            self._share_index[share_url_type] = index
+        return index['shares']
+
+    def _remove_from_share_index(self, key, value, share_url_type=None):
+        for url_type, index in self._share_index.items():
+            if share_url_type and url_type != share_url_type:
+                continue
+            for share_path, share in list(index['shares'].items()):
+                if share[key] == value:
+                    del index['shares'][share_path]
+
     def _get_share_url_type(self, share_proto):
         share_url_type = None
         if share_proto == 'NFS':
@@ -802,6 +869,8 @@ class RestHelper(object):
 
         msg = _("Change filesystem name error.")
         self._assert_rest_result(result, msg)
+        # The paths of the shares of the file system change with its name.
+        self._remove_from_share_index('FSID', fsid)
 
     def _change_extra_specs(self, fsid, extra_specs):
         url = "/filesystem/%s" % fsid
@@ -19,11 +19,14 @@ Contains classes required to issue API calls to Data ONTAP and OnCommand DFM.
 """
 
 import copy
+import time
 
 from lxml import etree
 from oslo_log import log
+import requests
+from requests import adapters
+from requests.packages.urllib3 import exceptions as urllib3_exceptions
 import six
-from six.moves import urllib
 
 from manila import exception
 from manila.i18n import _
@@ -50,6 +53,39 @@ ERELATION_NOT_QUIESCED = '17127'
 ESOURCE_IS_DIFFERENT = '17105'
 EVOL_CLONE_BEING_SPLIT = '17151'
 
+DEFAULT_CONNECTION_POOL_SIZE = 10
+# Seconds a call waits for a pooled connection when all are in use.
+DEFAULT_CONNECTION_POOL_TIMEOUT = 60
+
+
+class _PoolTimeoutAdapter(adapters.HTTPAdapter):
+    """HTTP adapter waiting a limited time for a free pooled connection.
+
+    requests does not pass any pool timeout to urllib3, so with a blocking
+    pool a call would wait forever for a connection that is never returned.
+    The pools of this adapter raise EmptyPoolError once pool_timeout
+    expires instead.
+    """
+
+    def __init__(self, pool_timeout, **kwargs):
+        self._pool_timeout = pool_timeout
+        super(_PoolTimeoutAdapter, self).__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super(_PoolTimeoutAdapter, self).init_poolmanager(*args, **kwargs)
+        pool_timeout = self._pool_timeout
+
+        def _with_pool_timeout(pool_class):
+            def _get_conn(pool, timeout=None):
+                return pool_class._get_conn(
+                    pool, timeout=timeout or pool_timeout)
+            return type(pool_class.__name__, (pool_class, ),
+                        {'_get_conn': _get_conn})
+
+        self.poolmanager.pool_classes_by_scheme = dict(
+            (scheme, _with_pool_timeout(pool_class)) for scheme, pool_class
+            in self.poolmanager.pool_classes_by_scheme.items())
+
 
 class NaServer(object):
     """Encapsulates server connection logic."""
@@ -63,12 +99,17 @@ class NaServer(object):
     NETAPP_NS = 'http://www.netapp.com/filer/admin'
     STYLE_LOGIN_PASSWORD = 'basic_auth'
     STYLE_CERTIFICATE = 'certificate_auth'
+    REQUEST_HEADERS = {'Content-Type': 'text/xml', 'charset': 'utf-8'}
 
     def __init__(self, host, server_type=SERVER_TYPE_FILER,
                  transport_type=TRANSPORT_TYPE_HTTP,
                  style=STYLE_LOGIN_PASSWORD, username=None,
-                 password=None, port=None, trace=False):
+                 password=None, port=None, trace=False,
+                 pool_size=DEFAULT_CONNECTION_POOL_SIZE, timeout=None):
         self._host = host
+        self._pool_size = pool_size
+        self._session = None
+        self._stats = {}
         self.set_server_type(server_type)
         self.set_transport_type(transport_type)
         self.set_style(style)
@@ -78,10 +119,21 @@ class NaServer(object):
         self._password = password
         self._trace = trace
         self._refresh_conn = True
-        self._trace = trace
+        if timeout:
+            self.set_timeout(timeout)
 
         LOG.debug('Using NetApp controller: %s', self._host)
 
+    def __deepcopy__(self, memo):
+        # NOTE: Copies of a server, such as the ones made for other
+        # vservers, share its HTTP session and its pool of connections.
+        server = copy.copy(self)
+        memo[id(self)] = server
+        for name, value in self.__dict__.items():
+            if name not in ('_session', '_stats'):
+                setattr(server, name, copy.deepcopy(value, memo))
+        return server
+
     def get_transport_type(self):
         """Get the transport type protocol."""
         return self._protocol
@@ -217,37 +269,75 @@ class NaServer(object):
 
     def invoke_elem(self, na_element, enable_tunneling=False):
         """Invoke the API on the server."""
+        response = self._post(na_element, enable_tunneling)
+        response_element = self._get_result(response.content)
+
+        if self._trace:
+            LOG.debug("Response: %s", response_element.to_string(pretty=True))
+
+        return response_element
+
+    def invoke_iter_elem(self, na_element, enable_tunneling=False):
+        """Invoke an iterator API, streaming the records of its response.
+
+        :returns: NaRecordStream over the records of the response
+        """
+        response = self._post(na_element, enable_tunneling, stream=True)
+        response.raw.decode_content = True
+        return NaRecordStream(response.raw, response=response)
+
+    def _post(self, na_element, enable_tunneling, stream=False):
+        """Sends the API request to the server and returns the response."""
         if na_element and not isinstance(na_element, NaElement):
             ValueError('NaElement must be supplied to invoke API')
 
-        request, request_element = self._create_request(na_element,
-                                                        enable_tunneling)
+        request_d, request_element = self._create_request(na_element,
+                                                          enable_tunneling)
 
         if self._trace:
             LOG.debug("Request: %s", request_element.to_string(pretty=True))
 
-        if not hasattr(self, '_opener') or not self._opener \
-                or self._refresh_conn:
-            self._build_opener()
+        if not self._session or self._refresh_conn:
+            self._build_session()
+        start = time.time()
         try:
-            if hasattr(self, '_timeout'):
-                response = self._opener.open(request, timeout=self._timeout)
-            else:
-                response = self._opener.open(request)
-        except urllib.error.HTTPError as e:
-            raise NaApiError(e.code, e.msg)
-        except urllib.error.URLError as e:
+            response = self._session.post(
+                self._get_url(), data=request_d,
+                headers=NaServer.REQUEST_HEADERS,
+                timeout=self.get_timeout(), stream=stream)
+        except (requests.ConnectionError, requests.Timeout,
+                urllib3_exceptions.EmptyPoolError) as e:
             raise exception.StorageCommunicationException(six.text_type(e))
         except Exception as e:
             raise NaApiError(message=e)
+        finally:
+            elapsed = time.time() - start
+            self._record_latency(na_element.get_name(), elapsed)
 
-        response_xml = response.read()
-        response_element = self._get_result(response_xml)
+        if not response.ok:
+            response.close()
+            raise NaApiError(six.text_type(response.status_code),
+                             response.reason)
 
         if self._trace:
-            LOG.debug("Response: %s", response_element.to_string(pretty=True))
+            LOG.debug("API %(api)s took %(time).3fs.",
+                      {'api': na_element.get_name(), 'time': elapsed})
 
-        return response_element
+        return response
+
+    def _record_latency(self, api_name, elapsed):
+        stats = self._stats.setdefault(
+            api_name, {'calls': 0, 'total_time': 0.0, 'max_time': 0.0})
+        stats['calls'] += 1
+        stats['total_time'] += elapsed
+        stats['max_time'] = max(stats['max_time'], elapsed)
+
+    def get_api_stats(self):
+        """Gets the number of calls and the latencies of each API.
+
+        Statistics are shared by all the copies of a server.
+        """
+        return copy.deepcopy(self._stats)
 
     def invoke_successfully(self, na_element, enable_tunneling=False):
         """Invokes API and checks execution status as success.
@@ -260,16 +350,7 @@ class NaServer(object):
         result = self.invoke_elem(na_element, enable_tunneling)
         if result.has_attr('status') and result.get_attr('status') == 'passed':
             return result
-        code = result.get_attr('errno')\
-            or result.get_child_content('errorno')\
-            or 'ESTATUSFAILED'
-        if code == ESIS_CLONE_NOT_LICENSED:
-            msg = 'Clone operation failed: FlexClone not licensed.'
-        else:
-            msg = result.get_attr('reason')\
-                or result.get_child_content('reason')\
-                or 'Execution status is failed due to unknown reason'
-        raise NaApiError(code, msg)
+        raise get_result_error(result)
 
     def _create_request(self, na_element, enable_tunneling=False):
         """Creates request in the desired format."""
@@ -281,10 +362,7 @@ class NaServer(object):
             self._enable_tunnel_request(netapp_elem)
         netapp_elem.add_child_elem(na_element)
         request_d = netapp_elem.to_string()
-        request = urllib.request.Request(
-            self._get_url(), data=request_d,
-            headers={'Content-Type': 'text/xml', 'charset': 'utf-8'})
-        return request, netapp_elem
+        return request_d, netapp_elem
 
     def _enable_tunnel_request(self, netapp_elem):
         """Enables vserver or vfiler tunneling."""
@@ -323,20 +401,32 @@ class NaServer(object):
         return '%s://%s:%s/%s' % (self._protocol, self._host, self._port,
                                   self._url)
 
-    def _build_opener(self):
+    def _build_session(self):
+        """Builds an HTTP session keeping connections to the server alive.
+
+        Up to pool_size connections are kept open and reused by the calls
+        made through the server and its copies, saving a TCP and TLS
+        handshake per call. The session built before is closed, not to leak
+        its pooled connections.
+        """
+        if self._session is not None:
+            self._session.close()
         if self._auth_style == NaServer.STYLE_LOGIN_PASSWORD:
-            auth_handler = self._create_basic_auth_handler()
+            auth = self._create_basic_auth_handler()
         else:
-            auth_handler = self._create_certificate_auth_handler()
-        opener = urllib.request.build_opener(auth_handler)
-        self._opener = opener
+            auth = self._create_certificate_auth_handler()
+        session = requests.Session()
+        adapter = _PoolTimeoutAdapter(
+            self.get_timeout() or DEFAULT_CONNECTION_POOL_TIMEOUT,
+            pool_connections=1, pool_maxsize=self._pool_size,
+            pool_block=True)
+        session.mount('%s://' % self._protocol, adapter)
+        session.auth = auth
+        self._session = session
+        self._refresh_conn = False
 
     def _create_basic_auth_handler(self):
-        password_man = urllib.request.HTTPPasswordMgrWithDefaultRealm()
-        password_man.add_password(None, self._get_url(), self._username,
-                                  self._password)
-        auth_handler = urllib.request.HTTPBasicAuthHandler(password_man)
-        return auth_handler
+        return requests.auth.HTTPBasicAuth(self._username, self._password)
 
     def _create_certificate_auth_handler(self):
         raise NotImplementedError()
@@ -345,6 +435,104 @@ class NaServer(object):
         return "server: %s" % (self._host)
 
 
+def _get_localname(tag):
+    """Returns the tag of an element without its namespace."""
+    return tag.rpartition('}')[2]
+
+
+def get_result_error(result):
+    """Returns the NaApiError matching a failed API result."""
+    code = result.get_attr('errno')\
+        or result.get_child_content('errorno')\
+        or 'ESTATUSFAILED'
+    if code == ESIS_CLONE_NOT_LICENSED:
+        msg = 'Clone operation failed: FlexClone not licensed.'
+    else:
+        msg = result.get_attr('reason')\
+            or result.get_child_content('reason')\
+            or 'Execution status is failed due to unknown reason'
+    return NaApiError(code, msg)
+
+
+class NaRecordStream(object):
+    """Iterates over the records of an iterator API response as dicts.
+
+    The response is parsed incrementally with etree.iterparse and each
+    record of its attributes list is dropped from the tree once converted,
+    so that memory does not grow with the number of records. Children of a
+    record are keyed by their local names, children with other children
+    being converted to dicts too, and the values of children appearing
+    more than once are gathered in lists.
+
+    The next-tag and num-records values of the response are available once
+    all its records have been iterated over. The HTTP response, if given,
+    is released once the iteration ends, returning its connection to the
+    pool; it is closed if the iteration failed or was stopped early.
+    """
+
+    def __init__(self, source, response=None):
+        self._source = source
+        self._response = response
+        self.next_tag = None
+        self.num_records = 0
+
+    def __iter__(self):
+        completed = False
+        path = []
+        try:
+            for event, element in etree.iterparse(
+                    self._source, events=('start', 'end')):
+                if not isinstance(element.tag, six.string_types):
+                    continue
+                if event == 'start':
+                    path.append(_get_localname(element.tag))
+                    continue
+                if path[-3:-1] == ['results', 'attributes-list']:
+                    yield self._to_dict(element)
+                    element.clear()
+                    while element.getprevious() is not None:
+                        del element.getparent()[0]
+                elif path[-2:] == ['results', 'next-tag']:
+                    self.next_tag = element.text
+                elif path[-2:] == ['results', 'num-records']:
+                    self.num_records = int(element.text or 0)
+                elif (path[-1] == 'results' and len(path) <= 2 and
+                        element.get('status') != 'passed'):
+                    raise get_result_error(NaElement(element))
+                path.pop()
+            completed = True
+        finally:
+            if not completed:
+                self.close()
+            elif hasattr(self._source, 'release_conn'):
+                self._source.release_conn()
+
+    def close(self):
+        """Closes the response, returning its connection to the pool."""
+        if self._response is not None:
+            self._response.close()
+        elif hasattr(self._source, 'close'):
+            self._source.close()
+
+    @staticmethod
+    def _to_dict(element):
+        if not len(element):
+            return element.text
+        record = {}
+        for child in element.iterchildren():
+            if not isinstance(child.tag, six.string_types):
+                continue
+            name = _get_localname(child.tag)
+            value = NaRecordStream._to_dict(child)
+            if name not in record:
+                record[name] = value
+            elif isinstance(record[name], list):
+                record[name].append(value)
+            else:
+                record[name] = [record[name], value]
+        return record
+
+
 class NaElement(object):
     """Class wraps basic building block for NetApp API request."""
 
@@ -354,6 +542,10 @@ class NaElement(object):
             self._element = name
         else:
             self._element = etree.Element(name)
+        self._children_index = None
+
+    def __deepcopy__(self, memo):
+        return NaElement(copy.deepcopy(self._element, memo))
 
     def get_name(self):
         """Returns the tag name of the element."""
@@ -383,18 +575,37 @@ class NaElement(object):
             return
         raise ValueError(_("Can only add elements of type NaElement."))
 
+    def _get_child(self, name):
+        """Get the first child element with the given tag or local name.
+
+        Children are indexed by tag and local name on the first lookup.
+        The index is rebuilt when the number of children changes, since
+        they may also be added through other NaElement instances wrapping
+        the same element.
+        """
+        element = self._element
+        if (self._children_index is None or
+                self._children_index[0] != len(element)):
+            index = {}
+            for child in element.iterchildren():
+                if isinstance(child.tag, six.string_types):
+                    index.setdefault(child.tag, child)
+                    index.setdefault(_get_localname(child.tag), child)
+            self._children_index = (len(element), index)
+        return self._children_index[1].get(name)
+
     def get_child_by_name(self, name):
         """Get the child element by the tag name."""
-        for child in self._element.iterchildren():
-            if child.tag == name or etree.QName(child.tag).localname == name:
-                return NaElement(child)
+        child = self._get_child(name)
+        if child is not None:
+            return NaElement(child)
         return None
 
     def get_child_content(self, name):
         """Get the content of the child."""
-        for child in self._element.iterchildren():
-            if child.tag == name or etree.QName(child.tag).localname == name:
-                return child.text
+        child = self._get_child(name)
+        if child is not None:
+            return child.text
         return None
 
     def get_children(self):
@@ -33,7 +33,10 @@ class NetAppBaseClient(object):
             port=kwargs['port'],
             username=kwargs['username'],
             password=kwargs['password'],
-            trace=kwargs.get('trace', False))
+            trace=kwargs.get('trace', False),
+            pool_size=kwargs.get('connection_pool_size',
+                                 netapp_api.DEFAULT_CONNECTION_POOL_SIZE),
+            timeout=kwargs.get('api_timeout'))
 
     def get_ontapi_version(self, cached=True):
         """Gets the supported ontapi version."""
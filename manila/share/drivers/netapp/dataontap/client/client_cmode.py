@@ -137,6 +137,27 @@ class NetAppCmodeClient(client_base.NetAppBaseClient):
         result.get_child_by_name('next-tag').set_content('')
         return result
 
+    def iter_records(self, api_name, api_args=None,
+                     max_page_length=DEFAULT_MAX_PAGE_LENGTH):
+        """Invoke an iterator-style getter API, yielding records as dicts.
+
+        Pages are requested one after the other and their responses are
+        parsed as they are received, so that large lists are processed
+        without building the tree of all of their records.
+        """
+        api_args = copy.deepcopy(api_args) if api_args else {}
+        api_args['max-records'] = max_page_length
+
+        while True:
+            request = netapp_api.NaElement(api_name)
+            request.translate_struct(api_args)
+            records = self.connection.invoke_iter_elem(request, True)
+            for record in records:
+                yield record
+            if not records.next_tag:
+                return
+            api_args['tag'] = records.next_tag
+
     @na_utils.trace
     def create_vserver(self, vserver_name, root_volume_aggregate_name,
                        root_volume_name, aggregate_names, ipspace_name):
@@ -306,8 +327,8 @@ class NetAppCmodeClient(client_base.NetAppBaseClient):
                 },
             },
         }
-        volumes_data = self.send_iter_request('volume-get-iter', api_args)
-        return self._get_record_count(volumes_data)
+        records = self.iter_records('volume-get-iter', api_args)
+        return sum(1 for record in records)
 
     @na_utils.trace
     def delete_vserver(self, vserver_name, vserver_client,
@@ -1747,21 +1768,15 @@ class NetAppCmodeClient(client_base.NetAppBaseClient):
                 },
             },
         }
-        result = self.send_iter_request('volume-get-iter', api_args)
-        if not self._has_records(result):
-            return []
-
         volume_list = []
-        attributes_list = result.get_child_by_name(
-            'attributes-list') or netapp_api.NaElement('none')
+        for volume_attributes in self.iter_records('volume-get-iter',
+                                                   api_args):
 
-        for volume_attributes in attributes_list.get_children():
-
-            volume_id_attributes = volume_attributes.get_child_by_name(
-                'volume-id-attributes') or netapp_api.NaElement('none')
+            volume_id_attributes = volume_attributes.get(
+                'volume-id-attributes') or {}
 
             volume_list.append({
-                'name': volume_id_attributes.get_child_content('name'),
+                'name': volume_id_attributes.get('name'),
             })
 
         return volume_list
@@ -2050,19 +2065,15 @@ class NetAppCmodeClient(client_base.NetAppBaseClient):
                 },
             },
         }
-        result = self.send_iter_request('snapshot-get-iter', api_args)
-
-        attributes_list = result.get_child_by_name(
-            'attributes-list') or netapp_api.NaElement('none')
-
         # Build a map of snapshots, one list of snapshots per vserver
         snapshot_map = {}
-        for snapshot_info in attributes_list.get_children():
-            vserver = snapshot_info.get_child_content('vserver')
+        for snapshot_info in self.iter_records('snapshot-get-iter',
+                                               api_args):
+            vserver = snapshot_info.get('vserver')
             snapshot_list = snapshot_map.get(vserver, [])
             snapshot_list.append({
-                'name': snapshot_info.get_child_content('name'),
-                'volume': snapshot_info.get_child_content('volume'),
+                'name': snapshot_info.get('name'),
+                'volume': snapshot_info.get('volume'),
                 'vserver': vserver,
             })
             snapshot_map[vserver] = snapshot_list
@@ -2224,15 +2235,10 @@ class NetAppCmodeClient(client_base.NetAppBaseClient):
                 },
             },
         }
-        result = self.send_iter_request('export-rule-get-iter', api_args)
+        records = self.iter_records('export-rule-get-iter', api_args)
 
-        attributes_list = result.get_child_by_name(
-            'attributes-list') or netapp_api.NaElement('none')
-        export_rule_info_list = attributes_list.get_children()
-
-        rule_indices = [int(export_rule_info.get_child_content('rule-index'))
-                        for export_rule_info in export_rule_info_list]
-        rule_indices.sort()
+        rule_indices = sorted(int(record['rule-index'])
+                              for record in records)
         return [six.text_type(rule_index) for rule_index in rule_indices]
 
     @na_utils.trace
@@ -2522,23 +2528,15 @@ class NetAppCmodeClient(client_base.NetAppBaseClient):
         }
 
         try:
-            result = self.send_iter_request('storage-disk-get-iter', api_args)
+            for storage_disk_info in self.iter_records(
+                    'storage-disk-get-iter', api_args):
+                disk_raid_info = storage_disk_info.get('disk-raid-info') or {}
+                disk_type = disk_raid_info.get('effective-disk-type')
+                if disk_type:
+                    disk_types.add(disk_type)
         except netapp_api.NaApiError:
             msg = _('Failed to get disk info for aggregate %s.')
             LOG.exception(msg % aggregate_name)
-            return disk_types
-
-        attributes_list = result.get_child_by_name(
-            'attributes-list') or netapp_api.NaElement('none')
-
-        for storage_disk_info in attributes_list.get_children():
-
-                disk_raid_info = storage_disk_info.get_child_by_name(
-                    'disk-raid-info') or netapp_api.NaElement('none')
-                disk_type = disk_raid_info.get_child_content(
-                    'effective-disk-type')
-                if disk_type:
-                    disk_types.add(disk_type)
 
         return disk_types
 
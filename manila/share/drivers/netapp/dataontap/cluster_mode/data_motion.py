@@ -74,7 +74,9 @@ def get_client_for_backend(backend_name, vserver_name=None):
         hostname=config.netapp_server_hostname,
         port=config.netapp_server_port,
         vserver=vserver_name or config.netapp_vserver,
-        trace=na_utils.TRACE_API)
+        trace=na_utils.TRACE_API,
+        connection_pool_size=config.netapp_connection_pool_size,
+        api_timeout=config.netapp_api_timeout)
 
     return client
 
@@ -130,7 +130,10 @@ class NetAppCmodeFileStorageLibrary(object):
                 hostname=self.configuration.netapp_server_hostname,
                 port=self.configuration.netapp_server_port,
                 vserver=vserver,
-                trace=na_utils.TRACE_API)
+                trace=na_utils.TRACE_API,
+                connection_pool_size=(
+                    self.configuration.netapp_connection_pool_size),
+                api_timeout=self.configuration.netapp_api_timeout)
             self._clients[vserver] = client
 
         return client
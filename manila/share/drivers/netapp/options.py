@@ -36,7 +36,19 @@ netapp_connection_opts = [
     cfg.PortOpt('netapp_server_port',
                 help=('The TCP port to use for communication with the storage '
                       'system or proxy server. If not specified, Data ONTAP '
-                      'drivers will use 80 for HTTP and 443 for HTTPS.')), ]
+                      'drivers will use 80 for HTTP and 443 for HTTPS.')),
+    cfg.IntOpt('netapp_connection_pool_size',
+               min=1,
+               default=10,
+               help=('The maximum number of HTTP connections kept open to '
+                     'the storage system. Connections are reused across '
+                     'API calls, and calls wait for a free connection when '
+                     'all of them are in use.')),
+    cfg.IntOpt('netapp_api_timeout',
+               min=1,
+               help=('The time in seconds to wait for the storage system to '
+                     'answer an API call. If not specified, API calls do '
+                     'not time out.')), ]
 
 netapp_transport_opts = [
     cfg.StrOpt('netapp_transport_type',
@@ -225,6 +225,11 @@ class ServiceInstanceManager(object):
         self._execute = utils.execute
 
         self.compute_api = compute.API()
+        self.instance_watcher = utils.StatusWatcher(
+            lambda instance_id: self.compute_api.server_get(
+                self.admin_context, instance_id),
+            lambda: self.compute_api.server_list(self.admin_context),
+            ignored_exceptions=(exception.InstanceNotFound,))
 
         self.path_to_private_key = self.get_config_option(
             "path_to_private_key")
@@ -648,38 +653,37 @@ class ServiceInstanceManager(object):
         self.network_helper.teardown_network(server_details)
 
     def wait_for_instance_to_be_active(self, instance_id, timeout):
-        t = time.time()
-        while time.time() - t < timeout:
-            try:
-                service_instance = self.compute_api.server_get(
-                    self.admin_context,
-                    instance_id)
-            except exception.InstanceNotFound as e:
-                LOG.debug(e)
-                time.sleep(1)
-                continue
 
+        def _is_active(service_instance):
             instance_status = service_instance['status']
             # NOTE(vponomaryov): emptiness of 'networks' field checked as
             #                    workaround for nova/neutron bug #1210483.
             if (instance_status == 'ACTIVE' and
                     service_instance.get('networks', {})):
-                return service_instance
-            elif service_instance['status'] == 'ERROR':
-                break
+                return True
+            elif instance_status == 'ERROR':
+                raise _failed(instance_status)
 
             LOG.debug("Waiting for instance %(instance_id)s to be active. "
                       "Current status: %(instance_status)s." %
                       dict(instance_id=instance_id,
                            instance_status=instance_status))
-            time.sleep(1)
-        raise exception.ServiceInstanceException(
-            _("Instance %(instance_id)s failed to reach active state "
-              "in %(timeout)s seconds. "
-              "Current status: %(instance_status)s.") %
-            dict(instance_id=instance_id,
-                 timeout=timeout,
-                 instance_status=instance_status))
+            return False
+
+        def _failed(instance_status):
+            return exception.ServiceInstanceException(
+                _("Instance %(instance_id)s failed to reach active state "
+                  "in %(timeout)s seconds. "
+                  "Current status: %(instance_status)s.") %
+                dict(instance_id=instance_id,
+                     timeout=timeout,
+                     instance_status=instance_status))
+
+        active, service_instance = self.instance_watcher.wait(
+            instance_id, _is_active, timeout)
+        if not active:
+            raise _failed(service_instance and service_instance['status'])
+        return service_instance
 
     def reboot_server(self, server, soft_reboot=False):
         self.compute_api.server_reboot(self.admin_context,
@@ -23,6 +23,7 @@ import copy
 import datetime
 import functools
 
+import eventlet
 from oslo_config import cfg
 from oslo_log import log
 from oslo_serialization import jsonutils
@@ -98,6 +99,18 @@ share_manager_opts = [
                help='This value, specified in seconds, determines how often '
                     'the share manager will poll for the health '
                     '(replica_state) of each replica instance.'),
+    cfg.IntOpt('ensure_share_concurrency',
+               default=10,
+               min=1,
+               help='Maximum number of shares the share manager ensures '
+                    'concurrently on service startup, when the share driver '
+                    'does not support ensuring shares in bulk.'),
+    cfg.IntOpt('replica_state_update_concurrency',
+               default=10,
+               min=1,
+               help='Maximum number of share replicas and replica snapshots '
+                    'whose state the share manager updates concurrently '
+                    'during its periodic replica state updates.'),
 ]
 
 CONF = cfg.CONF
@@ -275,17 +288,17 @@ class ShareManager(manager.SchedulerDependentManager):
         else:
             self.driver.initialized = True
 
-        share_instances = self.db.share_instances_get_all_by_host(ctxt,
-                                                                  self.host)
+        share_instances = self.db.share_instances_get_all_by_host(
+            ctxt, self.host, with_share_data=True)
         LOG.debug("Re-exporting %s shares", len(share_instances))
+        instances_to_ensure = []
         for share_instance in share_instances:
-            share_ref = self.db.share_get(ctxt, share_instance['share_id'])
-            if share_ref.is_busy:
+            if share_instance['task_state'] in constants.BUSY_TASK_STATES:
                 LOG.info(
                     _LI("Share instance %(id)s: skipping export, "
                         "because it is busy with an active task: %(task)s."),
                     {'id': share_instance['id'],
-                     'task': share_ref['task_state']},
+                     'task': share_instance['task_state']},
                 )
                 continue
 
@@ -299,43 +312,107 @@ class ShareManager(manager.SchedulerDependentManager):
                 continue
 
             self._ensure_share_instance_has_pool(ctxt, share_instance)
-            share_server = self._get_share_server(ctxt, share_instance)
-            share_instance = self.db.share_instance_get(
-                ctxt, share_instance['id'], with_share_data=True)
+            instances_to_ensure.append(share_instance)
+
+        if instances_to_ensure:
+            self._ensure_shares(ctxt, instances_to_ensure)
+
+        self.publish_service_capabilities(ctxt)
+        LOG.info(_LI("Finished initialization of driver: '%(driver)s"
+                     "@%(host)s'"),
+                 {"driver": self.driver.__class__.__name__,
+                  "host": self.host})
+
+    def _ensure_shares(self, ctxt, share_instances):
+        """Ensures that share instances are exported on service startup.
+
+        Share servers are loaded once for the whole host. The driver is
+        asked to ensure all the shares at once and, if it does not support
+        that, the shares are ensured one by one in a bounded pool of green
+        threads. The export locations returned are written in a single
+        database transaction.
+        """
+        share_servers = {
+            server['id']: server for server in
+            self.db.share_server_get_all_by_host(ctxt, self.host)
+        }
+        for share_instance in share_instances:
+            server_id = share_instance['share_server_id']
+            if server_id and server_id not in share_servers:
+                share_servers[server_id] = self._get_share_server(
+                    ctxt, share_instance)
+
+        pool = eventlet.GreenPool(
+            self.configuration.safe_get('ensure_share_concurrency') or 1)
+        try:
+            exports = self.driver.ensure_shares(
+                ctxt, share_instances, share_servers=share_servers) or {}
+            ensured = share_instances
+        except NotImplementedError:
+            exports = {}
+            for share_instance in share_instances:
+                pool.spawn_n(self._ensure_share, ctxt, share_instance,
+                             share_servers, exports)
+            pool.waitall()
+            ensured = [share_instance for share_instance in share_instances
+                       if share_instance['id'] in exports]
+        except Exception as e:
+            LOG.error(
+                _LE("Caught exception trying ensure shares on host "
+                    "'%(host)s'. Exception: \n%(e)s."),
+                {'host': self.host, 'e': six.text_type(e)},
+            )
+            return
+
+        export_locations = {
+            share_instance['id']: exports[share_instance['id']]
+            for share_instance in ensured if exports.get(share_instance['id'])
+        }
+        if export_locations:
             try:
-                export_locations = self.driver.ensure_share(
-                    ctxt, share_instance, share_server=share_server)
+                self.db.share_export_locations_update_many(
+                    ctxt, export_locations)
             except Exception as e:
                 LOG.error(
-                    _LE("Caught exception trying ensure share '%(s_id)s'. "
+                    _LE("Caught exception trying to update export "
+                        "locations of shares on host '%(host)s'. "
                         "Exception: \n%(e)s."),
-                    {'s_id': share_instance['id'], 'e': six.text_type(e)},
+                    {'host': self.host, 'e': six.text_type(e)},
                 )
-                continue
-
-            if export_locations:
-                self.db.share_export_locations_update(
-                    ctxt, share_instance['id'], export_locations)
 
+        for share_instance in ensured:
             if share_instance['access_rules_status'] == (
                     constants.STATUS_OUT_OF_SYNC):
+                pool.spawn_n(self._update_ensured_share_access_rules, ctxt,
+                             share_instance, share_servers)
+        pool.waitall()
 
-                try:
-                    self.access_helper.update_access_rules(
-                        ctxt, share_instance['id'], share_server=share_server)
-                except Exception as e:
-                    LOG.error(
-                        _LE("Unexpected error occurred while updating access "
-                            "rules for share instance %(s_id)s. "
-                            "Exception: \n%(e)s."),
-                        {'s_id': share_instance['id'], 'e': six.text_type(e)},
-                    )
+    def _ensure_share(self, ctxt, share_instance, share_servers, exports):
+        share_server = share_servers.get(share_instance['share_server_id'])
+        try:
+            exports[share_instance['id']] = self.driver.ensure_share(
+                ctxt, share_instance, share_server=share_server)
+        except Exception as e:
+            LOG.error(
+                _LE("Caught exception trying ensure share '%(s_id)s'. "
+                    "Exception: \n%(e)s."),
+                {'s_id': share_instance['id'], 'e': six.text_type(e)},
+            )
 
-        self.publish_service_capabilities(ctxt)
-        LOG.info(_LI("Finished initialization of driver: '%(driver)s"
-                     "@%(host)s'"),
-                 {"driver": self.driver.__class__.__name__,
-                  "host": self.host})
+    def _update_ensured_share_access_rules(self, ctxt, share_instance,
+                                           share_servers):
+        try:
+            self.access_helper.update_access_rules(
+                ctxt, share_instance['id'],
+                share_server=share_servers.get(
+                    share_instance['share_server_id']))
+        except Exception as e:
+            LOG.error(
+                _LE("Unexpected error occurred while updating access "
+                    "rules for share instance %(s_id)s. "
+                    "Exception: \n%(e)s."),
+                {'s_id': share_instance['id'], 'e': six.text_type(e)},
+            )
 
     def _provide_share_server_for_share(self, context, share_network_id,
                                         share_instance, snapshot=None,
@@ -709,12 +786,16 @@ class ShareManager(manager.SchedulerDependentManager):
                                    readonly_support, self.driver)
 
         try:
-            new_share_instance = helper.create_instance_and_wait(
-                share, share_instance, host)
+            new_share_instance = self._get_resumable_migration_instance(
+                context, share, host, helper)
 
-            self.db.share_instance_update(
-                context, new_share_instance['id'],
-                {'status': constants.STATUS_MIGRATING_TO})
+            if new_share_instance is None:
+                new_share_instance = helper.create_instance_and_wait(
+                    share, share_instance, host)
+
+                self.db.share_instance_update(
+                    context, new_share_instance['id'],
+                    {'status': constants.STATUS_MIGRATING_TO})
 
         except Exception:
             msg = _("Failed to create instance on destination "
@@ -754,6 +835,32 @@ class ShareManager(manager.SchedulerDependentManager):
                                         self.driver)
             raise exception.ShareMigrationFailed(reason=msg)
 
+    def _get_resumable_migration_instance(self, context, share, host, helper):
+        """Returns the instance kept by a failed data copy to a host.
+
+        The destination instance of a generic migration is kept when copying
+        the data onto it fails, so that migrating the share to the same host
+        again resumes the copy instead of starting it over. Instances kept
+        on other hosts are deleted.
+        """
+        resumable = None
+        for instance in share.instances:
+            if instance['status'] != constants.STATUS_MIGRATING_TO:
+                continue
+            if resumable is None and instance['host'] == host['host']:
+                resumable = instance
+            else:
+                helper.cleanup_new_instance(instance)
+
+        if resumable is None:
+            return None
+
+        LOG.info(_LI("Resuming the data copy of share %(share)s onto share "
+                     "instance %(instance)s."),
+                 {'share': share['id'], 'instance': resumable['id']})
+        return self.db.share_instance_get(
+            context, resumable['id'], with_share_data=True)
+
     @utils.require_driver_initialized
     def migration_complete(self, context, share_id, share_instance_id,
                            new_share_instance_id):
@@ -829,7 +936,11 @@ class ShareManager(manager.SchedulerDependentManager):
             msg = _("Data copy of generic migration for share %s has not "
                     "completed successfully.") % share_ref['id']
             LOG.warning(msg)
-            helper.cleanup_new_instance(new_share_instance)
+            # NOTE: The destination instance of a failed copy is kept, so
+            # that the data already copied onto it is not copied again when
+            # the share is migrated to the same host again.
+            if task_state == constants.TASK_STATE_DATA_COPYING_CANCELLED:
+                helper.cleanup_new_instance(new_share_instance)
 
             helper.cleanup_access_rules(share_instance, share_server,
                                         self.driver)
@@ -1443,18 +1554,48 @@ class ShareManager(manager.SchedulerDependentManager):
     @utils.require_driver_initialized
     def periodic_share_replica_update(self, context):
         LOG.debug("Updating status of share replica instances.")
-        replicas = self.db.share_replicas_get_all(context,
-                                                  with_share_data=True)
+        # Only non-active replicas belonging to this backend that are not
+        # busy in some operation are polled.
+        replicas = self.db.share_replicas_get_all_by_host(
+            context, share_utils.extract_host(self.host),
+            replica_states=(constants.REPLICA_STATE_IN_SYNC,
+                            constants.REPLICA_STATE_OUT_OF_SYNC,
+                            constants.STATUS_ERROR),
+            exclude_statuses=constants.TRANSITIONAL_STATUSES,
+            with_share_data=True, with_share_server=True)
+        if not replicas:
+            return
 
-        # Filter only non-active replicas belonging to this backend
-        def qualified_replica(r):
-            return (share_utils.extract_host(r['host']) ==
-                    share_utils.extract_host(self.host))
+        share_servers = {
+            replica['share_server_id']: replica['share_server']
+            for replica in replicas if replica['share_server_id']
+        }
+        try:
+            replica_states = self.driver.update_replica_states(
+                context,
+                [self._get_share_replica_dict(context, replica,
+                                              share_servers=share_servers)
+                 for replica in replicas],
+                share_servers=share_servers) or {}
+        except NotImplementedError:
+            replica_states = {}
+        except Exception:
+            LOG.exception(_LE("Driver error when updating the state of the "
+                              "replicas of host %s."), self.host)
+            replica_states = {}
 
-        replicas = list(filter(lambda x: qualified_replica(x), replicas))
+        pool = eventlet.GreenPool(
+            self.configuration.safe_get('replica_state_update_concurrency')
+            or 1)
         for replica in replicas:
-            self._share_replica_update(
-                context, replica, share_id=replica['share_id'])
+            if replica['id'] not in replica_states:
+                pool.spawn_n(self._share_replica_update, context, replica,
+                             share_id=replica['share_id'])
+            elif replica_states[replica['id']]:
+                pool.spawn_n(self._share_replica_update, context, replica,
+                             share_id=replica['share_id'],
+                             replica_state=replica_states[replica['id']])
+        pool.waitall()
 
     @add_hooks
     @utils.require_driver_initialized
@@ -1466,9 +1607,12 @@ class ShareManager(manager.SchedulerDependentManager):
         self._share_replica_update(context, share_replica, share_id=share_id)
 
     @locked_share_replica_operation
-    def _share_replica_update(self, context, share_replica, share_id=None):
-        share_server = self._get_share_server(context, share_replica)
+    def _share_replica_update(self, context, share_replica, share_id=None,
+                              replica_state=None):
+        """Updates the replica_state of a replica.
 
+        If the replica_state is not given, it is obtained from the driver.
+        """
         # Re-grab the replica:
         try:
             share_replica = self.db.share_replica_get(
@@ -1485,6 +1629,25 @@ class ShareManager(manager.SchedulerDependentManager):
                 constants.REPLICA_STATE_ACTIVE):
             return
 
+        if replica_state is None:
+            replica_state = self._get_share_replica_state(
+                context, share_replica, share_id)
+            if replica_state is None:
+                return
+
+        if replica_state in (constants.REPLICA_STATE_IN_SYNC,
+                             constants.REPLICA_STATE_OUT_OF_SYNC,
+                             constants.STATUS_ERROR):
+            self.db.share_replica_update(context, share_replica['id'],
+                                         {'replica_state': replica_state})
+        else:
+            msg = (_LW("Replica %(id)s cannot be set to %(state)s "
+                       "through update call.") %
+                   {'id': share_replica['id'], 'state': replica_state})
+            LOG.warning(msg)
+
+    def _get_share_replica_state(self, context, share_replica, share_id):
+        share_server = self._get_share_server(context, share_replica)
         access_rules = self.db.share_access_get_all_for_share(
             context, share_replica['share_id'])
 
@@ -1532,16 +1695,7 @@ class ShareManager(manager.SchedulerDependentManager):
                  'status': constants.STATUS_ERROR})
             return
 
-        if replica_state in (constants.REPLICA_STATE_IN_SYNC,
-                             constants.REPLICA_STATE_OUT_OF_SYNC,
-                             constants.STATUS_ERROR):
-            self.db.share_replica_update(context, share_replica['id'],
-                                         {'replica_state': replica_state})
-        elif replica_state:
-            msg = (_LW("Replica %(id)s cannot be set to %(state)s "
-                       "through update call.") %
-                   {'id': share_replica['id'], 'state': replica_state})
-            LOG.warning(msg)
+        return replica_state
 
     @add_hooks
     @utils.require_driver_initialized
@@ -2109,42 +2263,49 @@ class ShareManager(manager.SchedulerDependentManager):
         LOG.debug("Updating status of share replica snapshots.")
         transitional_statuses = (constants.STATUS_CREATING,
                                  constants.STATUS_DELETING)
-        replicas = self.db.share_replicas_get_all(context,
-                                                  with_share_data=True)
-
-        def qualified_replica(r):
-            # Filter non-active replicas belonging to this backend
-            return (share_utils.extract_host(r['host']) ==
-                    share_utils.extract_host(self.host) and
-                    r['replica_state'] != constants.REPLICA_STATE_ACTIVE)
-
-        host_replicas = list(filter(
-            lambda x: qualified_replica(x), replicas))
-        transitional_replica_snapshots = []
+        # Filter non-active replicas belonging to this backend
+        replicas = self.db.share_replicas_get_all_by_host(
+            context, share_utils.extract_host(self.host),
+            replica_states=(constants.REPLICA_STATE_IN_SYNC,
+                            constants.REPLICA_STATE_OUT_OF_SYNC,
+                            constants.STATUS_ERROR),
+            with_share_server=False)
+        if not replicas:
+            return
+        share_ids = {replica['id']: replica['share_id']
+                     for replica in replicas}
 
-        # Get snapshot instances for each replica that are in 'creating' or
+        # Get snapshot instances of the replicas that are in 'creating' or
         # 'deleting' states.
-        for replica in host_replicas:
-            filters = {
-                'share_instance_ids': replica['id'],
-                'statuses': transitional_statuses,
-            }
-            replica_snapshots = (
-                self.db.share_snapshot_instance_get_all_with_filters(
-                    context, filters, with_share_data=True)
-            )
-            transitional_replica_snapshots.extend(replica_snapshots)
+        transitional_replica_snapshots = (
+            self.db.share_snapshot_instance_get_all_with_filters(
+                context, {'share_instance_ids': list(share_ids),
+                          'statuses': transitional_statuses})
+        )
+        if not transitional_replica_snapshots:
+            return
 
-        for replica_snapshot in transitional_replica_snapshots:
-            replica_snapshots = (
+        snapshot_instances = {}
+        for snapshot_instance in (
                 self.db.share_snapshot_instance_get_all_with_filters(
                     context,
-                    {'snapshot_ids': replica_snapshot['snapshot_id']})
-            )
-            share_id = replica_snapshot['share']['share_id']
-            self._update_replica_snapshot(
-                context, replica_snapshot,
-                replica_snapshots=replica_snapshots, share_id=share_id)
+                    {'snapshot_ids': list(set(
+                        rs['snapshot_id']
+                        for rs in transitional_replica_snapshots))})):
+            snapshot_instances.setdefault(
+                snapshot_instance['snapshot_id'], []).append(
+                    snapshot_instance)
+
+        pool = eventlet.GreenPool(
+            self.configuration.safe_get('replica_state_update_concurrency')
+            or 1)
+        for replica_snapshot in transitional_replica_snapshots:
+            pool.spawn_n(
+                self._update_replica_snapshot, context, replica_snapshot,
+                replica_snapshots=snapshot_instances.get(
+                    replica_snapshot['snapshot_id'], []),
+                share_id=share_ids[replica_snapshot['share_instance_id']])
+        pool.waitall()
 
     @locked_share_replica_operation
     def _update_replica_snapshot(self, context, replica_snapshot,
@@ -2233,22 +2394,17 @@ class ShareManager(manager.SchedulerDependentManager):
     def allow_access(self, context, share_instance_id, access_rules):
         """Allow access to some share instance."""
         share_instance = self._get_share_instance(context, share_instance_id)
-        status = share_instance['access_rules_status']
+        add_rules = [self.db.share_access_get(context, rule_id)
+                     for rule_id in access_rules]
 
-        if status not in (constants.STATUS_UPDATING,
-                          constants.STATUS_UPDATING_MULTIPLE,
-                          constants.STATUS_ACTIVE):
-            add_rules = [self.db.share_access_get(context, rule_id)
-                         for rule_id in access_rules]
-
-            share_server = self._get_share_server(context, share_instance)
+        share_server = self._get_share_server(context, share_instance)
 
-            return self.access_helper.update_access_rules(
-                context,
-                share_instance_id,
-                add_rules=add_rules,
-                share_server=share_server
-            )
+        return self.access_helper.update_access_rules(
+            context,
+            share_instance_id,
+            add_rules=add_rules,
+            share_server=share_server
+        )
 
     @add_hooks
     @utils.require_driver_initialized
@@ -2308,7 +2464,7 @@ class ShareManager(manager.SchedulerDependentManager):
     def publish_service_capabilities(self, context):
         """Collect driver status and then publish it."""
         self._report_driver_status(context)
-        self._publish_service_capabilities(context)
+        self._publish_service_capabilities(context, full=True)
 
     def _form_server_setup_info(self, context, share_server, share_network):
         # Network info is used by driver for setting up share server
@@ -2689,14 +2845,17 @@ class ShareManager(manager.SchedulerDependentManager):
                                                              model_update)
 
             if share_update_list:
+                instance_updates = []
+                export_locations = {}
                 for share in share_update_list:
                     values = copy.deepcopy(share)
-                    values.pop('id')
-                    export_locations = values.pop('export_locations')
-                    self.db.share_instance_update(context, share['id'], values)
-                    self.db.share_export_locations_update(context,
-                                                          share['id'],
-                                                          export_locations)
+                    export_locations[share['id']] = values.pop(
+                        'export_locations')
+                    instance_updates.append(values)
+                self.db.share_instances_update_many(context,
+                                                    instance_updates)
+                self.db.share_export_locations_update_many(context,
+                                                           export_locations)
 
         except Exception:
             with excutils.save_and_reraise_exception():
@@ -2704,16 +2863,16 @@ class ShareManager(manager.SchedulerDependentManager):
                     context,
                     group_ref['id'],
                     {'status': constants.STATUS_ERROR})
-                for share in shares:
-                    self.db.share_instance_update(
-                        context, share['id'],
-                        {'status': constants.STATUS_ERROR})
+                self.db.share_instances_update_many(
+                    context, [{'id': share['id'],
+                               'status': constants.STATUS_ERROR}
+                              for share in shares])
                 LOG.error(_LE("Consistency group %s: create failed"), cg_id)
 
         now = timeutils.utcnow()
-        for share in shares:
-            self.db.share_instance_update(
-                context, share['id'], {'status': constants.STATUS_AVAILABLE})
+        self.db.share_instances_update_many(
+            context, [{'id': share['id'], 'status': constants.STATUS_AVAILABLE}
+                      for share in shares])
         self.db.consistency_group_update(context,
                                          group_ref['id'],
                                          {'status': status,
@@ -2871,8 +3030,14 @@ class ShareManager(manager.SchedulerDependentManager):
         LOG.info(_LI("Consistency group snapshot %s: deleted successfully"),
                  cgsnapshot_id)
 
-    def _get_share_replica_dict(self, context, share_replica):
+    def _get_share_replica_dict(self, context, share_replica,
+                                share_servers=None):
         # TODO(gouthamr): remove method when the db layer returns primitives
+        if share_servers is None:
+            share_server = self._get_share_server(context, share_replica)
+        else:
+            share_server = share_servers.get(
+                share_replica.get('share_server_id'))
         share_replica_ref = {
             'id': share_replica.get('id'),
             'share_id': share_replica.get('share_id'),
@@ -2887,7 +3052,7 @@ class ShareManager(manager.SchedulerDependentManager):
             'terminated_at': share_replica.get('terminated_at'),
             'launched_at': share_replica.get('launched_at'),
             'scheduled_at': share_replica.get('scheduled_at'),
-            'share_server': self._get_share_server(context, share_replica),
+            'share_server': share_server,
             'access_rules_status': share_replica.get('access_rules_status'),
             # Share details
             'user_id': share_replica.get('user_id'),
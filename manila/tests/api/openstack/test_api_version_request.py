@@ -116,6 +116,15 @@ class APIVersionRequestTests(test.TestCase):
         self.assertTrue(v_null == v_null)
         self.assertFalse(v1 == '2.0')
 
+    def test_hash(self):
+        v1 = api_version_request.APIVersionRequest('2.5')
+        v2 = api_version_request.APIVersionRequest('2.5')
+        v3 = api_version_request.APIVersionRequest('2.6')
+
+        self.assertEqual(hash(v1), hash(v2))
+        self.assertEqual({v1: 'fake'}, {v2: 'fake'})
+        self.assertNotIn(v3, {v1: 'fake'})
+
     def test_version_matches(self):
         v1 = api_version_request.APIVersionRequest('2.0')
         v2 = api_version_request.APIVersionRequest('2.5')
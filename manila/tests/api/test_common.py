@@ -18,10 +18,12 @@ Test suites for 'common' code used throughout the OpenStack HTTP API.
 """
 
 import ddt
+import mock
 import webob
 import webob.exc
 
 from manila.api import common
+from manila.api.openstack import api_version_request
 from manila import test
 from manila.tests.api import fakes
 from manila.tests.db import fakes as db_fakes
@@ -194,6 +196,30 @@ class PaginationParamsTest(test.TestCase):
                          common.get_pagination_params(req))
 
 
+class LimitOffsetMarkerTest(test.TestCase):
+    """Unit tests for `manila.api.common.get_limit_offset_marker` method."""
+
+    def test_no_params(self):
+        req = webob.Request.blank('/')
+        self.assertEqual((1000, 0, None),
+                         common.get_limit_offset_marker(req))
+
+    def test_all_params(self):
+        req = webob.Request.blank('/?limit=20&offset=5&marker=fake_marker')
+        self.assertEqual((20, 5, 'fake_marker'),
+                         common.get_limit_offset_marker(req))
+
+    def test_limit_over_max_limit(self):
+        req = webob.Request.blank('/?limit=3000')
+        self.assertEqual((1000, 0, None),
+                         common.get_limit_offset_marker(req))
+
+    def test_invalid_offset(self):
+        req = webob.Request.blank('/?offset=-1')
+        self.assertRaises(
+            webob.exc.HTTPBadRequest, common.get_limit_offset_marker, req)
+
+
 class MiscFunctionsTest(test.TestCase):
 
     def test_remove_major_version_from_href(self):
@@ -298,3 +324,18 @@ class ViewBuilderTest(test.TestCase):
         actual_resource = self.view_builder.view(req, self.fake_resource)
 
         self.assertEqual(expected_keys, set(actual_resource.keys()))
+
+    @mock.patch.dict(common.ViewBuilder._version_modifiers_cache, clear=True)
+    def test_versioned_method_modifiers_resolved_once(self):
+        req = fakes.HTTPRequest.blank('/my_resource', version='3.14')
+        self.view_builder.view(req, self.fake_resource)
+        matches = self.mock_object(
+            api_version_request.APIVersionRequest,
+            'matches_versioned_method', mock.Mock(return_value=False))
+
+        req = fakes.HTTPRequest.blank('/my_resource', version='3.14')
+        actual_resource = self.view_builder.view(req, self.fake_resource)
+
+        self.assertEqual(set({'id', 'fred', 'xyzzy', 'alice'}),
+                         set(actual_resource.keys()))
+        self.assertFalse(matches.called)
@@ -139,6 +139,28 @@ class VersionsControllerTestCase(test.TestCase):
 
         self.assertEqual(404, response.status_int)
 
+    def test_versions_version_method_resolved_once(self):
+
+        class Controller(wsgi.Controller):
+            @wsgi.Controller.api_version('2.0', '2.0')
+            def index(self, req):
+                return {'fake_key': 'fake_value'}
+
+        app = fakes.TestRouter(Controller())
+        req = fakes.HTTPRequest.blank('/tests', base_url='http://localhost/v2')
+        req.headers = {version_header_name: '2.0'}
+        self.assertEqual(200, req.get_response(app).status_int)
+        matches = self.mock_object(
+            api_version_request.APIVersionRequest,
+            'matches_versioned_method', mock.Mock(return_value=False))
+
+        req = fakes.HTTPRequest.blank('/tests', base_url='http://localhost/v2')
+        req.headers = {version_header_name: '2.0'}
+        response = req.get_response(app)
+
+        self.assertEqual(200, response.status_int)
+        self.assertFalse(matches.called)
+
     def test_versions_version_not_acceptable(self):
         req = fakes.HTTPRequest.blank('/', base_url='http://localhost/v2')
         req.method = 'GET'
@@ -161,7 +183,7 @@ class ExperimentalAPITestCase(test.TestCase):
             return {'fake_key': 'fake_value'}
 
         @wsgi.Controller.api_version('2.1', '2.1', experimental=True)  # noqa
-        def index(self, req):  # pylint: disable=E0102
+        def index(self, req):  # noqa pylint: disable=E0102
             return {'fake_key': 'fake_value'}
 
     def setUp(self):
@@ -17,6 +17,13 @@
 Tests dealing with HTTP rate-limiting.
 """
 
+import os
+import shutil
+import socket
+import sqlite3
+import tempfile
+
+import mock
 from oslo_serialization import jsonutils
 import six
 from six import moves
@@ -49,6 +56,7 @@ class BaseLimitTestSuite(test.TestCase):
         super(BaseLimitTestSuite, self).setUp()
         self.time = 0.0
         self.mock_object(limits.Limit, "_get_time", self._get_time)
+        self.mock_object(limits.Limiter, "_get_time", self._get_time)
         self.absolute_limits = {}
 
         def stub_get_project_quotas(context, project_id, usages=True):
@@ -332,6 +340,42 @@ class LimitTest(BaseLimitTestSuite):
         self.assertEqual(4, limit.next_request)
         self.assertEqual(4, limit.last_request)
 
+    def test_is_drained(self):
+        limit = limits.Limit("GET", "*", ".*", 2, 1)
+        self.assertTrue(limit.is_drained(self.time))
+
+        limit.add_request()
+        self.time += 0.25
+
+        self.assertFalse(limit.is_drained(self.time))
+        self.assertTrue(limit.is_drained(self.time + 0.25))
+
+
+class LimitRouterTest(test.TestCase):
+    """Tests for the `limits.LimitRouter` class."""
+
+    def test_match(self):
+        router = limits.LimitRouter(TEST_LIMITS)
+
+        self.assertEqual([1, 2], router.match("POST", "/shares/fake"))
+        self.assertEqual([1], router.match("POST", "/snapshots"))
+        self.assertEqual([0], router.match("GET", "/delayed"))
+        self.assertEqual([], router.match("GET", "/anything"))
+        self.assertEqual([3], router.match("PUT", ""))
+        self.assertEqual([], router.match("DELETE", "/shares"))
+
+    def test_match_regexes_not_combined(self):
+        router = limits.LimitRouter([
+            limits.Limit("GET", "*", "^/(shares|snapshots)/(?P<id>.*)", 1,
+                         limits.PER_MINUTE),
+            limits.Limit("GET", "*", "(?i)^/SHARES", 1, limits.PER_MINUTE),
+            limits.Limit("GET", "*", "^/snapshots", 1, limits.PER_MINUTE),
+        ])
+
+        self.assertEqual([0, 1], router.match("GET", "/shares/fake"))
+        self.assertEqual([0, 2], router.match("GET", "/snapshots/fake"))
+        self.assertEqual([], router.match("GET", "/anything"))
+
 
 class ParseLimitsTest(BaseLimitTestSuite):
     """Test default limits parser.
@@ -549,6 +593,74 @@ class LimiterTest(BaseLimitTestSuite):
         results = list(self._check(5, "PUT", "/anything", "user2"))
         self.assertEqual(expected, results)
 
+    def test_evict_levels(self):
+        self._check_sum(10, "PUT", "/anything", "user1")
+        self.time = 55.0
+        self._check_sum(1, "PUT", "/anything", "user2")
+        self.limiter.check_for_delay("GET", "/anything", "user3")
+
+        self.time = 60.0
+        self.limiter.check_for_delay("GET", "/anything", "user4")
+
+        self.assertEqual({'user2', 'user4'}, set(self.limiter.levels))
+        expected = [None] * 10 + [6.0]
+        results = list(self._check(11, "PUT", "/anything", "user1"))
+        self.assertEqual(expected, results)
+        self.assertEqual([None] * 20,
+                         list(self._check(20, "PUT", "/anything", "user3")))
+
+
+class SqliteLimiterTest(LimiterTest):
+    """Tests for the `limits.SqliteLimiter` class."""
+
+    def setUp(self):
+        super(SqliteLimiterTest, self).setUp()
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        self.db_path = os.path.join(tmp_dir, 'rate_limits.sqlite')
+        self.limiter = limits.SqliteLimiter(TEST_LIMITS, self.db_path,
+                                            **{'user:user3': ''})
+
+    def test_evict_levels(self):
+        self._check_sum(10, "PUT", "/anything", "user1")
+        self.time = 55.0
+        self._check_sum(1, "PUT", "/anything", "user2")
+
+        self.time = 60.0
+        self.limiter.check_for_delay("PUT", "/anything", "user4")
+
+        connection = sqlite3.connect(self.db_path)
+        self.addCleanup(connection.close)
+        rows = connection.execute(
+            'SELECT username, limit_key FROM levels').fetchall()
+        self.assertEqual({('user2', 'PUT  10/60'), ('user4', 'PUT  10/60')},
+                         set(rows))
+
+    def test_limiters_share_levels(self):
+        other_limiter = limits.SqliteLimiter(TEST_LIMITS, self.db_path)
+
+        results = [limiter.check_for_delay("PUT", "/anything", "user1")[0]
+                   for limiter in (self.limiter, other_limiter) * 6]
+
+        self.assertEqual([None] * 10 + [6.0] * 2, results)
+
+    def test_get_limits(self):
+        self._check_sum(3, "PUT", "/anything", "user1")
+        other_limiter = limits.SqliteLimiter(TEST_LIMITS, self.db_path)
+
+        result = other_limiter.get_limits("user1")
+
+        self.assertEqual([1, 7, 3, 7, 5],
+                         [limit['remaining'] for limit in result])
+        self.assertEqual(10, other_limiter.get_limits()[3]['remaining'])
+
+    def test_database_error(self):
+        self.limiter.db_path = os.path.join(self.db_path, 'not_a_dir', 'db')
+
+        self.assertEqual((None, None),
+                         self.limiter.check_for_delay("PUT", "/anything"))
+        self.assertEqual([], self.limiter.get_limits())
+
 
 class WsgiLimiterTest(BaseLimitTestSuite):
     """Tests for `limits.WsgiLimiter` class."""
@@ -744,6 +856,27 @@ class WsgiLimiterProxyTest(BaseLimitTestSuite):
 
         self.assertEqual(expected, (delay, error))
 
+    def test_connection_reused(self):
+        self.proxy.check_for_delay("GET", "/delayed")
+        connections = list(self.proxy._connections)
+
+        self.proxy.check_for_delay("GET", "/delayed")
+
+        self.assertEqual(1, len(connections))
+        self.assertEqual(connections, self.proxy._connections)
+
+    def test_connection_closed(self):
+        closed_conn = mock.Mock()
+        closed_conn.request.side_effect = socket.error
+        self.proxy._connections.append(closed_conn)
+
+        delay = self.proxy.check_for_delay("GET", "/anything")
+
+        self.assertEqual((None, None), delay)
+        closed_conn.close.assert_called_once_with()
+        self.assertEqual(1, len(self.proxy._connections))
+        self.assertIsNot(closed_conn, self.proxy._connections[0])
+
     def tearDown(self):
         # restore original HTTPConnection object
         http_client.HTTPConnection = self.oldHTTPConnection
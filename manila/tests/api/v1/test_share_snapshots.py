@@ -194,7 +194,7 @@ class ShareSnapshotAPITest(test.TestCase):
              'status': 'fake_status', 'share_id': 'fake_share_id'},
         ]
         self.mock_object(share_api.API, 'get_all_snapshots',
-                         mock.Mock(return_value=snapshots))
+                         mock.Mock(return_value=[snapshots[1]]))
 
         result = self.controller.index(req)
 
@@ -210,6 +210,9 @@ class ShareSnapshotAPITest(test.TestCase):
             sort_key=search_opts['sort_key'],
             sort_dir=search_opts['sort_dir'],
             search_opts=search_opts_expected,
+            limit=1,
+            offset=1,
+            marker=None,
         )
         self.assertEqual(1, len(result['snapshots']))
         self.assertEqual(snapshots[1]['id'], result['snapshots'][0]['id'])
@@ -255,7 +258,7 @@ class ShareSnapshotAPITest(test.TestCase):
         ]
 
         self.mock_object(share_api.API, 'get_all_snapshots',
-                         mock.Mock(return_value=snapshots))
+                         mock.Mock(return_value=[snapshots[1]]))
 
         result = self.controller.detail(req)
 
@@ -271,6 +274,9 @@ class ShareSnapshotAPITest(test.TestCase):
             sort_key=search_opts['sort_key'],
             sort_dir=search_opts['sort_dir'],
             search_opts=search_opts_expected,
+            limit=1,
+            offset=1,
+            marker=None,
         )
         self.assertEqual(1, len(result['snapshots']))
         self.assertEqual(snapshots[1]['id'], result['snapshots'][0]['id'])
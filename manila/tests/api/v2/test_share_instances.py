@@ -85,6 +85,28 @@ class ShareInstancesAPITest(test.TestCase):
         self.mock_policy_check.assert_called_once_with(
             req_context, self.resource_name, 'index')
 
+    @ddt.data('2.3', '2.20')
+    def test_index_paginated(self, version):
+        test_instances = [db_utils.create_share(size=1).instance
+                          for i in range(3)]
+        req = fakes.HTTPRequest.blank(
+            '/share_instances?limit=1&marker=%s' % test_instances[0]['id'],
+            version=version)
+        req.environ['manila.context'] = self.admin_context
+        self.mock_object(db, 'share_instances_get_all',
+                         mock.Mock(return_value=test_instances[1:2]))
+
+        self.controller.index(req)
+
+        # Pagination parameters are only honoured since 2.20.
+        if version == '2.20':
+            db.share_instances_get_all.assert_called_once_with(
+                req.environ['manila.context'], limit=1,
+                marker=test_instances[0]['id'])
+        else:
+            db.share_instances_get_all.assert_called_once_with(
+                req.environ['manila.context'])
+
     def test_show(self):
         test_instance = db_utils.create_share(size=1).instance
         id = test_instance['id']
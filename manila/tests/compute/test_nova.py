@@ -159,6 +159,16 @@ class NovaApiTestCase(test.TestCase):
         result = self.api.server_get(self.ctx, instance_id)
         self.assertEqual(instance_id, result['id'])
 
+    def test_server_list(self):
+        self.mock_object(self.novaclient.servers, 'list', mock.Mock(
+            return_value=[{'id': 'id1'}, {'id': 'id2'}]))
+
+        result = self.api.server_list(self.ctx, {'status': 'BUILD'})
+
+        self.assertEqual([{'id': 'id1'}, {'id': 'id2'}], result)
+        self.novaclient.servers.list.assert_called_once_with(
+            True, search_opts={'status': 'BUILD'})
+
     def test_server_get_by_name_or_id(self):
         instance_id = 'instance_id1'
         server = {'id': instance_id, 'fake_key': 'fake_value'}
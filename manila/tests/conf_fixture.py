@@ -42,6 +42,7 @@ def set_defaults(conf):
     _safe_set_of_opts(conf, 'share_driver',
                       'manila.tests.fake_driver.FakeShareDriver')
     _safe_set_of_opts(conf, 'auth_strategy', 'noauth')
+    _safe_set_of_opts(conf, 'share_type_cache_ttl', 0)
 
     _safe_set_of_opts(conf, 'zfs_share_export_ip', '1.1.1.1')
     _safe_set_of_opts(conf, 'zfs_service_ip', '2.2.2.2')
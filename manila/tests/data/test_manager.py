@@ -15,6 +15,9 @@
 """
 Tests For Data Manager
 """
+import errno
+import time
+
 import ddt
 import mock
 
@@ -59,6 +62,7 @@ class DataManagerTestCase(test.TestCase):
         self.mock_object(db, 'share_get_all', mock.Mock(
             return_value=[share]))
         self.mock_object(db, 'share_update')
+        self.mock_object(share_rpc.ShareAPI, 'migration_complete')
 
         # run
         self.manager.init_host()
@@ -70,6 +74,35 @@ class DataManagerTestCase(test.TestCase):
         db.share_update.assert_called_with(
             utils.IsAMatcher(context.RequestContext), share['id'],
             {'task_state': constants.TASK_STATE_DATA_COPYING_ERROR})
+        self.assertFalse(share_rpc.ShareAPI.migration_complete.called)
+
+    def test_init_host_interrupted_migration(self):
+
+        share = db_utils.create_share(
+            task_state=constants.TASK_STATE_DATA_COPYING_IN_PROGRESS)
+        db.share_instance_update(self.context, share.instance['id'],
+                                 {'status': constants.STATUS_MIGRATING})
+        dest_instance = db_utils.create_share_instance(
+            share_id=share['id'], status=constants.STATUS_MIGRATING_TO)
+        share = db.share_get(self.context, share['id'])
+        src_instance_id = share.instance['id']
+
+        # mocks
+        self.mock_object(db, 'share_get_all', mock.Mock(
+            return_value=[share]))
+        self.mock_object(db, 'share_update')
+        self.mock_object(share_rpc.ShareAPI, 'migration_complete')
+
+        # run
+        self.manager.init_host()
+
+        # asserts
+        db.share_update.assert_called_once_with(
+            utils.IsAMatcher(context.RequestContext), share['id'],
+            {'task_state': constants.TASK_STATE_DATA_COPYING_ERROR})
+        share_rpc.ShareAPI.migration_complete.assert_called_once_with(
+            utils.IsAMatcher(context.RequestContext), share,
+            src_instance_id, dest_instance['id'])
 
     @ddt.data({'notify': True, 'exc': None},
               {'notify': False, 'exc': None},
@@ -238,6 +271,37 @@ class DataManagerTestCase(test.TestCase):
         helper.DataServiceHelper.deny_access_to_data_service.assert_has_calls([
             mock.call(access, 'ins1_id'), mock.call(access, 'ins2_id')])
 
+    def test__run_copy_resumes_on_io_error(self):
+        fake_copy = mock.Mock()
+        fake_copy.run.side_effect = [OSError(errno.EIO, 'fake'), None]
+        self.mock_object(time, 'sleep')
+
+        self.manager._run_copy(fake_copy)
+
+        self.assertEqual(2, fake_copy.run.call_count)
+
+    def test__run_copy_io_error_max_attempts(self):
+        self.flags(data_copy_max_attempts=2)
+        fake_copy = mock.Mock()
+        fake_copy.run.side_effect = OSError(errno.EIO, 'fake')
+        self.mock_object(time, 'sleep')
+
+        error = self.assertRaises(OSError, self.manager._run_copy, fake_copy)
+
+        self.assertEqual(errno.EIO, error.errno)
+        self.assertEqual(2, fake_copy.run.call_count)
+
+    @ddt.data(OSError(errno.ENOSPC, 'fake'), OSError(errno.EACCES, 'fake'),
+              OSError('fake'), exception.ManilaException('fake'))
+    def test__run_copy_permanent_error(self, error):
+        fake_copy = mock.Mock()
+        fake_copy.run.side_effect = error
+        self.mock_object(time, 'sleep')
+
+        self.assertRaises(type(error), self.manager._run_copy, fake_copy)
+
+        self.assertEqual(1, fake_copy.run.call_count)
+
     def test__copy_share_data_exception_access(self):
 
         migration_info_src = {'mount': 'mount_cmd_src',
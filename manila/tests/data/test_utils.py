@@ -13,7 +13,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import os
+import errno
 
 import mock
 
@@ -31,7 +31,8 @@ class CopyClassTestCase(test.TestCase):
         self._copy = data_utils.Copy(src, dest, ignore_list)
         self._copy.total_size = 10000
         self._copy.current_size = 100
-        self._copy.current_copy = {'file_path': '/fake/path', 'size': 100}
+        self._copy.current_copy = {'file_path': '/fake/path', 'size': 100,
+                                   'copied': 100}
 
         self.mock_log = self.mock_object(data_utils, 'LOG')
 
@@ -41,37 +42,79 @@ class CopyClassTestCase(test.TestCase):
                     'current_file_progress': 100}
 
         # mocks
-        self.mock_object(utils, 'execute',
-                         mock.Mock(return_value=("100", "")))
+        self.mock_object(utils, 'execute')
 
         # run
         out = self._copy.get_progress()
 
         # asserts
         self.assertEqual(expected, out)
+        self.assertFalse(utils.execute.called)
+
+    def test_get_progress_batches_in_progress(self):
+        first = (('file1', 1000), ('file2', 3000))
+        second = (('file3', 2000), ('link', 0))
+        self._copy.current_copies = {
+            first: {'file_path': '/path/fake/dst/file1', 'size': 4000,
+                    'copied': 0},
+            second: {'file_path': '/path/fake/dst/file3', 'size': 2000,
+                     'copied': 0},
+        }
+        self._copy.current_copy = self._copy.current_copies[second]
+        outputs = {
+            'file1\0file2': ('1000\t/path/fake/dst/file1\n1000\ttotal\n',
+                             'du: cannot access file2'),
+            'file3': ('1500\t/path/fake/dst/file3\n1500\ttotal\n', ''),
+        }
+
+        def _du(*cmd, **kwargs):
+            items = kwargs['process_input'].replace(self._copy.dest + '/', '')
+            return outputs[items]
 
-        utils.execute.assert_called_once_with("stat", "-c", "%s", "/fake/path",
-                                              run_as_root=True)
-
-    def test_get_progress_current_copy_none(self):
-        self._copy.current_copy = None
-        expected = {'total_progress': 100}
+        # mocks
+        self.mock_object(utils, 'execute', mock.Mock(side_effect=_du))
 
         # run
         out = self._copy.get_progress()
 
         # asserts
-        self.assertEqual(expected, out)
+        self.assertEqual({'total_progress': 26,
+                          'current_file_path': '/path/fake/dst/file3',
+                          'current_file_progress': 75}, out)
+        utils.execute.assert_has_calls([
+            mock.call('du', '-b', '-c', '-l', '--files0-from=-',
+                      process_input='/path/fake/dst/file3',
+                      check_exit_code=False, run_as_root=True),
+        ])
+        self.assertEqual(2, utils.execute.call_count)
 
-    def test_get_progress_exception(self):
-        expected = {'total_progress': 1,
-                    'current_file_path': '/fake/path',
-                    'current_file_progress': 0}
+    def test_get_copied_size_caps_batch_size(self):
+
+        # mocks
+        self.mock_object(utils, 'execute', mock.Mock(
+            return_value=('4096\ttotal\n', '')))
+
+        # run
+        out = self._copy._get_copied_size((('file1', 10), ('file2', 20)))
+
+        # asserts
+        self.assertEqual(30, out)
+
+    def test_get_copied_size_no_data(self):
 
         # mocks
-        self.mock_object(
-            utils, 'execute',
-            mock.Mock(side_effect=utils.processutils.ProcessExecutionError()))
+        self.mock_object(utils, 'execute')
+
+        # run
+        out = self._copy._get_copied_size((('link', 0),))
+
+        # asserts
+        self.assertEqual(0, out)
+        self.assertFalse(utils.execute.called)
+
+    def test_get_progress_current_copy_none(self):
+        self._copy.current_copy = None
+        expected = {'total_progress': 100}
 
         # run
         out = self._copy.get_progress()
@@ -79,9 +122,6 @@ class CopyClassTestCase(test.TestCase):
         # asserts
         self.assertEqual(expected, out)
 
-        utils.execute.assert_called_once_with("stat", "-c", "%s", "/fake/path",
-                                              run_as_root=True)
-
     def test_cancel(self):
         self._copy.cancelled = False
 
@@ -97,214 +137,144 @@ class CopyClassTestCase(test.TestCase):
     def test_get_total_size(self):
         self._copy.total_size = 0
 
-        values = [("folder1/\nitem/\nfile1\nitem", ""),
-                  ("", ""),
-                  ("10000", "")]
-
-        def get_output(*args, **kwargs):
-            return values.pop(0)
-
         # mocks
-        self.mock_object(utils, 'execute', mock.Mock(
-            side_effect=get_output))
+        self.mock_object(utils, 'execute', mock.Mock(return_value=(
+            'd 4096 folder1\0f 10000 folder1/file 1\0l 7 link\0', '')))
 
         # run
         self._copy.get_total_size(self._copy.src)
 
         # asserts
-        self.assertEqual(self._copy.total_size, 10000)
-
-        utils.execute.assert_has_calls([
-            mock.call("ls", "-pA1", "--group-directories-first",
-                      self._copy.src, run_as_root=True),
-            mock.call("ls", "-pA1", "--group-directories-first",
-                      os.path.join(self._copy.src, "folder1/"),
-                      run_as_root=True),
-            mock.call("stat", "-c", "%s",
-                      os.path.join(self._copy.src, "file1"), run_as_root=True)
-        ])
+        self.assertEqual(10000, self._copy.total_size)
+        self.assertEqual(['folder1'], self._copy.dirs)
+        self.assertEqual([('folder1/file 1', 10000), ('link', 0)],
+                         self._copy.files)
+        utils.execute.assert_called_once_with(
+            'find', self._copy.src, '-mindepth', '1',
+            '-name', 'item', '-prune', '-o', '-printf', '%y %s %P\\0',
+            run_as_root=True)
 
-    def test_get_total_size_cancelled_1(self):
+    def test_get_total_size_cancelled(self):
         self._copy.total_size = 0
         self._copy.cancelled = True
 
-        # run
-        self._copy.get_total_size(self._copy.src)
-
-        # asserts
-        self.assertEqual(self._copy.total_size, 0)
-
-        # reset
-        self._copy.total_size = 10000
-        self._copy.cancelled = False
-
-    def test_get_total_size_cancelled_2(self):
-        self._copy.total_size = 0
-
-        def ls_output(*args, **kwargs):
-            self._copy.cancelled = True
-            return "folder1/", ""
-
         # mocks
-        self.mock_object(utils, 'execute', mock.Mock(
-            side_effect=ls_output))
+        self.mock_object(utils, 'execute')
 
         # run
         self._copy.get_total_size(self._copy.src)
 
         # asserts
-        self.assertEqual(self._copy.total_size, 0)
-        utils.execute.assert_called_once_with(
-            "ls", "-pA1", "--group-directories-first", self._copy.src,
-            run_as_root=True)
-
-        # reset
-        self._copy.total_size = 10000
-        self._copy.cancelled = False
+        self.assertEqual(0, self._copy.total_size)
+        self.assertFalse(utils.execute.called)
 
     def test_copy_data(self):
-
-        values = [("folder1/\nitem/\nfile1\nitem", ""),
-                  "",
-                  ("", ""),
-                  ("10000", ""),
-                  ""]
-
-        def get_output(*args, **kwargs):
-            return values.pop(0)
+        self._copy.current_size = 0
+        self._copy.files = [('file1', 10), ('folder1/file2', 20),
+                            ('link', 0)]
+        self.mock_object(data_utils, 'BATCH_FILES', 2)
 
         # mocks
-        self.mock_object(utils, 'execute', mock.Mock(
-            side_effect=get_output))
-        self.mock_object(self._copy, 'get_progress')
+        self.mock_object(utils, 'execute', mock.Mock(return_value=('', '')))
 
         # run
-        self._copy.copy_data(self._copy.src)
+        self._copy.copy_data()
 
         # asserts
-        self._copy.get_progress.assert_called_once_with()
-
+        self.assertEqual(30, self._copy.current_size)
+        self.assertEqual({}, self._copy.current_copies)
         utils.execute.assert_has_calls([
-            mock.call("ls", "-pA1", "--group-directories-first",
-                      self._copy.src, run_as_root=True),
-            mock.call("mkdir", "-p", os.path.join(self._copy.dest, "folder1/"),
-                      run_as_root=True),
-            mock.call("ls", "-pA1", "--group-directories-first",
-                      os.path.join(self._copy.src, "folder1/"),
+            mock.call('rsync', '-a', '--from0', '--files-from=-',
+                      self._copy.src + '/', self._copy.dest + '/',
+                      process_input='file1\0folder1/file2',
                       run_as_root=True),
-            mock.call("stat", "-c", "%s",
-                      os.path.join(self._copy.src, "file1"), run_as_root=True),
-            mock.call("cp", "-P", "--preserve=all",
-                      os.path.join(self._copy.src, "file1"),
-                      os.path.join(self._copy.dest, "file1"), run_as_root=True)
+            mock.call('rsync', '-a', '--from0', '--files-from=-',
+                      self._copy.src + '/', self._copy.dest + '/',
+                      process_input='link', run_as_root=True),
         ])
 
-    def test_copy_data_cancelled_1(self):
-
-        self._copy.cancelled = True
+    def test_copy_data_batch_size(self):
+        self._copy.files = [('file1', 10), ('file2', 20), ('file3', 5)]
+        self.mock_object(data_utils, 'BATCH_SIZE', 25)
 
         # run
-        self._copy.copy_data(self._copy.src)
+        batches = list(self._copy._get_batches())
 
-        # reset
-        self._copy.cancelled = False
-
-    def test_copy_data_cancelled_2(self):
+        # asserts
+        self.assertEqual([[('file1', 10)], [('file2', 20), ('file3', 5)]],
+                         batches)
 
-        def ls_output(*args, **kwargs):
-            self._copy.cancelled = True
-            return "folder1/", ""
+    def test_copy_data_cancelled(self):
+        self._copy.cancelled = True
+        self._copy.files = [('file1', 10)]
 
         # mocks
-        self.mock_object(utils, 'execute', mock.Mock(
-            side_effect=ls_output))
+        self.mock_object(utils, 'execute')
 
         # run
-        self._copy.copy_data(self._copy.src)
+        self._copy.copy_data()
 
         # asserts
-        utils.execute.assert_called_once_with(
-            "ls", "-pA1", "--group-directories-first", self._copy.src,
-            run_as_root=True)
+        self.assertFalse(utils.execute.called)
 
-        # reset
-        self._copy.cancelled = False
-
-    def test_copy_stats(self):
-
-        values = [("folder1/\nitem/\nfile1\nitem", ""),
-                  ("", ""),
-                  "",
-                  "",
-                  "",
-                  "",
-                  "",
-                  ""]
-
-        def get_output(*args, **kwargs):
-            return values.pop(0)
+    def test_copy_data_error(self):
+        self._copy.files = [('file1', 10)]
+        stderr = ('rsync: write failed on "/path/fake/dst/file1": '
+                  'No space left on device (28)\n'
+                  'rsync error: error in file IO (code 11) at '
+                  'receiver.c(393) [receiver=3.1.2]\n')
 
         # mocks
         self.mock_object(utils, 'execute', mock.Mock(
-            side_effect=get_output))
+            side_effect=utils.processutils.ProcessExecutionError(
+                stderr=stderr)))
 
         # run
-        self._copy.copy_stats(self._copy.src)
+        error = self.assertRaises(EnvironmentError, self._copy.copy_data)
 
         # asserts
-        utils.execute.assert_has_calls([
-            mock.call("ls", "-pA1", "--group-directories-first",
-                      self._copy.src, run_as_root=True),
-            mock.call("ls", "-pA1", "--group-directories-first",
-                      os.path.join(self._copy.src, "folder1/"),
-                      run_as_root=True),
-            mock.call(
-                "chmod",
-                "--reference=%s" % os.path.join(self._copy.src, "folder1/"),
-                os.path.join(self._copy.dest, "folder1/"),
-                run_as_root=True),
-            mock.call(
-                "touch",
-                "--reference=%s" % os.path.join(self._copy.src, "folder1/"),
-                os.path.join(self._copy.dest, "folder1/"),
-                run_as_root=True),
-            mock.call(
-                "chown",
-                "--reference=%s" % os.path.join(self._copy.src, "folder1/"),
-                os.path.join(self._copy.dest, "folder1/"),
-                run_as_root=True),
-        ])
+        self.assertEqual(errno.ENOSPC, error.errno)
+        self.assertEqual(100, self._copy.current_size)
 
-    def test_copy_stats_cancelled_1(self):
+    def test_copy_data_error_without_errno(self):
+        self._copy.files = [('file1', 10)]
 
-        self._copy.cancelled = True
+        # mocks
+        self.mock_object(utils, 'execute', mock.Mock(
+            side_effect=utils.processutils.ProcessExecutionError(
+                stderr='rsync error: syntax or usage error (code 1)')))
 
         # run
-        self._copy.copy_stats(self._copy.src)
+        self.assertRaises(utils.processutils.ProcessExecutionError,
+                          self._copy.copy_data)
 
-        # reset
-        self._copy.cancelled = False
-
-    def test_copy_stats_cancelled_2(self):
-
-        def ls_output(*args, **kwargs):
-            self._copy.cancelled = True
-            return "folder1/", ""
+    def test_copy_stats(self):
+        self._copy.dirs = ['folder1', 'folder1/folder2']
 
         # mocks
-        self.mock_object(utils, 'execute', mock.Mock(
-            side_effect=ls_output))
+        self.mock_object(utils, 'execute', mock.Mock(return_value=('', '')))
 
         # run
-        self._copy.copy_stats(self._copy.src)
+        self._copy.copy_stats()
 
         # asserts
         utils.execute.assert_called_once_with(
-            "ls", "-pA1", "--group-directories-first", self._copy.src,
-            run_as_root=True)
+            'rsync', '-a', '--from0', '--files-from=-',
+            self._copy.src + '/', self._copy.dest + '/',
+            process_input='folder1\0folder1/folder2', run_as_root=True)
 
-        # reset
-        self._copy.cancelled = False
+    def test_copy_stats_cancelled(self):
+        self._copy.cancelled = True
+        self._copy.dirs = ['folder1']
+
+        # mocks
+        self.mock_object(utils, 'execute')
+
+        # run
+        self._copy.copy_stats()
+
+        # asserts
+        self.assertFalse(utils.execute.called)
 
     def test_run(self):
 
@@ -320,6 +290,27 @@ class CopyClassTestCase(test.TestCase):
         # asserts
         self.assertTrue(data_utils.LOG.info.called)
         self._copy.get_total_size.assert_called_once_with(self._copy.src)
-        self._copy.copy_data.assert_called_once_with(self._copy.src)
-        self._copy.copy_stats.assert_called_once_with(self._copy.src)
+        self._copy.copy_data.assert_called_once_with()
+        self._copy.copy_stats.assert_called_once_with()
         self._copy.get_progress.assert_called_once_with()
+
+    def test_run_copies_tree(self):
+        self._copy.workers = 2
+        outputs = {
+            'find': ('d 0 folder1\0f 60 file1\0f 40 folder1/file2\0', ''),
+            'rsync': ('', ''),
+        }
+
+        # mocks
+        self.mock_object(utils, 'execute', mock.Mock(
+            side_effect=lambda *cmd, **kwargs: outputs[cmd[0]]))
+
+        # run
+        self._copy.run()
+
+        # asserts
+        self.assertEqual({'total_progress': 100,
+                          'current_file_path': '/path/fake/dst/file1',
+                          'current_file_progress': 100},
+                         self._copy.get_progress())
+        self.assertEqual(3, utils.execute.call_count)
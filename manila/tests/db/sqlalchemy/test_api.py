@@ -29,6 +29,7 @@ from manila.db.sqlalchemy import models
 from manila import exception
 from manila import test
 from manila.tests import db_utils
+from manila.tests import utils as test_utils
 
 security_service_dict = {
     'id': 'fake id',
@@ -155,6 +156,21 @@ class ShareDatabaseAPITestCase(test.TestCase):
                                                       'share_type_id',
                                                       'export_locations'])
 
+    def test_share_instances_get_all_by_host_with_share_data(self):
+        share = db_utils.create_share(
+            host='foo#pool0', display_name='fake_name',
+            task_state=constants.TASK_STATE_MIGRATION_IN_PROGRESS)
+        db_utils.create_share(host='bar')
+
+        instances = db_api.share_instances_get_all_by_host(
+            self.ctxt, 'foo', with_share_data=True)
+
+        self.assertEqual(1, len(instances))
+        self.assertEqual(share.instance['id'], instances[0]['id'])
+        self.assertEqual('fake_name', instances[0]['display_name'])
+        self.assertEqual(constants.TASK_STATE_MIGRATION_IN_PROGRESS,
+                         instances[0]['task_state'])
+
     def test_share_filter_all_by_share_server(self):
         share_network = db_utils.create_share_network()
         share_server = db_utils.create_share_server(
@@ -193,6 +209,35 @@ class ShareDatabaseAPITestCase(test.TestCase):
 
         self.assertEqual('share-%s' % instance['id'], instance['name'])
 
+    def test_share_instances_update_many(self):
+        shares = [db_utils.create_share() for i in range(3)]
+        updates = [
+            {'id': shares[0].instance['id'],
+             'status': constants.STATUS_ERROR},
+            {'id': shares[1].instance['id'],
+             'status': constants.STATUS_ERROR},
+            {'id': shares[2].instance['id'],
+             'status': constants.STATUS_AVAILABLE,
+             'availability_zone': 'fake_az',
+             'fake_driver_key': {'fake': 'value'}},
+            {'id': 'fake_missing_id', 'status': constants.STATUS_ERROR},
+        ]
+
+        with test_utils.count_db_queries() as queries:
+            db_api.share_instances_update_many(self.ctxt, updates)
+
+        instances = [db_api.share_instance_get(self.ctxt, s.instance['id'])
+                     for s in shares]
+        self.assertEqual(
+            [constants.STATUS_ERROR, constants.STATUS_ERROR,
+             constants.STATUS_AVAILABLE],
+            [i['status'] for i in instances])
+        self.assertEqual('fake_az', instances[2]['availability_zone'])
+        # BEGIN and INSERT creating the availability zone, then BEGIN and
+        # one UPDATE per distinct set of values, whatever the number of
+        # instances.
+        self.assertEqual(5, queries.count)
+
     def test_share_instance_get_all_by_consistency_group(self):
         cg = db_utils.create_consistency_group()
         db_utils.create_share(consistency_group_id=cg['id'])
@@ -217,6 +262,100 @@ class ShareDatabaseAPITestCase(test.TestCase):
         self.assertEqual(2, len(actual_result))
         self.assertEqual(shares[0]['id'], actual_result[1]['id'])
 
+    @ddt.data('asc', 'desc')
+    def test_share_get_all_paginated_with_marker(self, sort_dir):
+        shares = [db_utils.create_share(display_name=name, size=1)
+                  for name in ('b', 'a', 'b', None, 'c')]
+        expected = db_api.share_get_all(
+            self.ctxt, sort_key='display_name', sort_dir=sort_dir)
+
+        pages = []
+        marker = None
+        while True:
+            page = db_api.share_get_all(
+                self.ctxt, sort_key='display_name', sort_dir=sort_dir,
+                limit=2, marker=marker)
+            if not page:
+                break
+            pages.append([share['id'] for share in page])
+            marker = page[-1]['id']
+
+        self.assertEqual(len(shares), len(expected))
+        self.assertEqual(3, len(pages))
+        self.assertEqual([share['id'] for share in expected],
+                         sum(pages, []))
+
+    def test_share_get_all_paginated_with_offset(self):
+        for size in (1, 2, 3):
+            db_utils.create_share(size=size)
+
+        result = db_api.share_get_all(
+            self.ctxt, sort_key='size', sort_dir='asc', limit=1, offset=1)
+
+        self.assertEqual([2], [share['size'] for share in result])
+
+    def test_share_get_all_marker_not_found(self):
+        self.assertRaises(exception.InvalidInput,
+                          db_api.share_get_all,
+                          self.ctxt, marker='fake_marker')
+
+    def test_share_get_all_filter_by_share_and_instance_fields(self):
+        expected = db_utils.create_share(
+            display_name='fake_name', status=constants.STATUS_AVAILABLE)
+        db_utils.create_share(
+            display_name='fake_name', status=constants.STATUS_ERROR)
+        db_utils.create_share(
+            display_name='other_name', status=constants.STATUS_AVAILABLE)
+
+        result = db_api.share_get_all(
+            self.ctxt, filters={'display_name': 'fake_name',
+                                'status': constants.STATUS_AVAILABLE})
+
+        self.assertEqual([expected['id']], [share['id'] for share in result])
+
+    def test_share_get_all_filter_by_effective_instance(self):
+        share = db_utils.create_share(status=constants.STATUS_AVAILABLE)
+        db_utils.create_share_replica(share_id=share['id'],
+                                      status=constants.STATUS_ERROR)
+        db_utils.create_share(status=constants.STATUS_AVAILABLE)
+
+        error_shares = db_api.share_get_all(
+            self.ctxt, filters={'status': constants.STATUS_ERROR})
+        available_shares = db_api.share_get_all(
+            self.ctxt, filters={'status': constants.STATUS_AVAILABLE},
+            sort_key='created_at', sort_dir='asc', limit=1)
+
+        self.assertEqual([], error_shares)
+        self.assertEqual([share['id']], [s['id'] for s in available_shares])
+
+    def test_share_get_all_invalid_filter(self):
+        self.assertRaises(exception.InvalidInput,
+                          db_api.share_get_all,
+                          self.ctxt, filters={'fake_key': 'fake_value'})
+
+    def test_share_get_all_by_share_server_with_replicas(self):
+        share_server = db_utils.create_share_server()
+        share = db_utils.create_share(share_server_id=share_server['id'])
+        db_utils.create_share_replica(share_id=share['id'],
+                                      share_server_id=share_server['id'])
+
+        result = db_api.share_get_all_by_share_server(
+            self.ctxt, share_server['id'], limit=1)
+
+        self.assertEqual([share['id']], [s['id'] for s in result])
+
+    def test_share_instances_get_all_paginated(self):
+        instances = [db_utils.create_share(size=1).instance
+                     for i in range(3)]
+        all_instances = db_api.share_instances_get_all(self.ctxt, limit=3)
+
+        result = db_api.share_instances_get_all(
+            self.ctxt, limit=1, marker=all_instances[0]['id'])
+
+        self.assertEqual(sorted(i['id'] for i in instances),
+                         sorted(i['id'] for i in all_instances))
+        self.assertEqual([all_instances[1]['id']], [i['id'] for i in result])
+
     @ddt.data(None, 'writable')
     def test_share_get_has_replicas_field(self, replication_type):
         share = db_utils.create_share(replication_type=replication_type)
@@ -275,6 +414,44 @@ class ShareDatabaseAPITestCase(test.TestCase):
                         with_share_data,
                         expected_share_keys.issubset(replica.keys()))
 
+    @ddt.data(True, False)
+    def test_share_replicas_get_all_by_host(self, with_share_data):
+        share = db_utils.create_share(host='fake_host@fake_backend#pool0')
+        in_sync = db_utils.create_share_replica(
+            replica_state=constants.REPLICA_STATE_IN_SYNC,
+            status=constants.STATUS_AVAILABLE,
+            share_id=share['id'], host='fake_host@fake_backend#pool1')
+        out_of_sync = db_utils.create_share_replica(
+            replica_state=constants.REPLICA_STATE_OUT_OF_SYNC,
+            status=constants.STATUS_ERROR,
+            share_id=share['id'], host='fake_host@fake_backend')
+        db_utils.create_share_replica(
+            replica_state=constants.REPLICA_STATE_ACTIVE,
+            share_id=share['id'], host='fake_host@fake_backend#pool1')
+        db_utils.create_share_replica(
+            replica_state=constants.REPLICA_STATE_IN_SYNC,
+            status=constants.STATUS_DELETING,
+            share_id=share['id'], host='fake_host@fake_backend#pool1')
+        db_utils.create_share_replica(
+            replica_state=constants.REPLICA_STATE_IN_SYNC,
+            share_id=share['id'], host='fake_host@fake_backend2#pool1')
+
+        with test_utils.count_db_queries() as queries:
+            share_replicas = db_api.share_replicas_get_all_by_host(
+                self.ctxt, 'fake_host@fake_backend',
+                replica_states=(constants.REPLICA_STATE_IN_SYNC,
+                                constants.REPLICA_STATE_OUT_OF_SYNC),
+                exclude_statuses=constants.TRANSITIONAL_STATUSES,
+                with_share_data=with_share_data)
+
+        self.assertEqual(sorted([in_sync['id'], out_of_sync['id']]),
+                         sorted(r['id'] for r in share_replicas))
+        # The replicas and their export locations, plus the parent shares.
+        self.assertEqual(3 if with_share_data else 2, queries.count)
+        if with_share_data:
+            for replica in share_replicas:
+                self.assertEqual(share['project_id'], replica['project_id'])
+
     @ddt.data({'with_share_data': False, 'with_share_server': False},
               {'with_share_data': False, 'with_share_server': True},
               {'with_share_data': True, 'with_share_server': False},
@@ -509,6 +686,185 @@ class ShareDatabaseAPITestCase(test.TestCase):
                     self.ctxt, rule_id, instance['id']))
 
 
+class QueryCountDatabaseAPITestCase(test.TestCase):
+    """Asserts upper bounds on the queries made by list and get calls.
+
+    The number of queries must not depend on the number of rows returned.
+    """
+
+    def setUp(self):
+        super(QueryCountDatabaseAPITestCase, self).setUp()
+        self.ctxt = context.get_admin_context()
+
+    def _create_shares(self, count):
+        shares = []
+        for i in range(count):
+            share = db_utils.create_share(size=1)
+            db_api.share_export_locations_update(
+                self.ctxt, share.instance['id'], ['fake/path/%d' % i], False)
+            db_utils.create_snapshot(share_id=share['id'])
+            db_utils.create_access(share_id=share['id'])
+            shares.append(share)
+        return shares
+
+    def _count_queries(self, func, *args, **kwargs):
+        with test_utils.count_db_queries() as counter:
+            func(*args, **kwargs)
+        return counter.count
+
+    def _list_shares(self):
+        for share in db_api.share_get_all(self.ctxt):
+            share.export_locations
+            share.instance.availability_zone
+
+    def _list_snapshots(self):
+        for snapshot in db_api.share_snapshot_get_all(self.ctxt):
+            snapshot.instance.share_instance
+            snapshot.share
+
+    def test_share_get_all(self):
+        self._create_shares(2)
+        few = self._count_queries(self._list_shares)
+        self._create_shares(8)
+        many = self._count_queries(self._list_shares)
+
+        self.assertEqual(few, many)
+        self.assertLessEqual(many, 3)
+
+    def test_share_get(self):
+        share = self._create_shares(1)[0]
+
+        count = self._count_queries(db_api.share_get, self.ctxt, share['id'])
+
+        self.assertLessEqual(count, 1)
+
+    def test_share_snapshot_get_all(self):
+        self._create_shares(2)
+        few = self._count_queries(self._list_snapshots)
+        self._create_shares(8)
+        many = self._count_queries(self._list_snapshots)
+
+        self.assertEqual(few, many)
+        self.assertLessEqual(many, 5)
+
+    def test_share_access_get_all_for_share(self):
+        share = self._create_shares(1)[0]
+        for i in range(5):
+            db_utils.create_access(share_id=share['id'],
+                                   access_to='10.0.0.%d' % i)
+
+        with test_utils.count_db_queries() as counter:
+            rules = db_api.share_access_get_all_for_share(
+                self.ctxt, share['id'])
+            for rule in rules:
+                rule.state
+
+        self.assertEqual(6, len(rules))
+        self.assertLessEqual(counter.count, 3)
+
+
+class ShareTypeCacheDatabaseAPITestCase(test.TestCase):
+
+    def setUp(self):
+        super(ShareTypeCacheDatabaseAPITestCase, self).setUp()
+        self.flags(share_type_cache_ttl=60)
+        self.ctxt = context.get_admin_context()
+        self.user_ctxt = context.RequestContext('fake_user', 'fake_project')
+        self.share_type = db_api.share_type_create(
+            self.ctxt, {'name': 'fake_type',
+                        'extra_specs': {'key1': 'value1'},
+                        'is_public': False},
+            projects=['fake_project'])
+
+    def _count_queries(self, func, *args, **kwargs):
+        with test_utils.count_db_queries() as counter:
+            result = func(*args, **kwargs)
+        return counter.count, result
+
+    def test_share_type_get_cached(self):
+        first, share_type = self._count_queries(
+            db_api.share_type_get, self.ctxt, self.share_type['id'])
+        second, cached = self._count_queries(
+            db_api.share_type_get, self.ctxt, self.share_type['id'])
+
+        self.assertGreater(first, 0)
+        self.assertEqual(0, second)
+        self.assertEqual(share_type, cached)
+        self.assertEqual({'key1': 'value1'}, cached['extra_specs'])
+        self.assertNotIn('projects', cached)
+
+    def test_share_type_get_cached_copy(self):
+        share_type = db_api.share_type_get(self.ctxt, self.share_type['id'])
+        share_type['extra_specs']['key1'] = 'changed'
+
+        cached = db_api.share_type_get(self.ctxt, self.share_type['id'])
+
+        self.assertEqual('value1', cached['extra_specs']['key1'])
+
+    def test_share_type_get_cached_access(self):
+        other_ctxt = context.RequestContext('fake_user', 'other_project')
+        db_api.share_type_get(self.ctxt, self.share_type['id'])
+
+        share_type = db_api.share_type_get(
+            self.user_ctxt, self.share_type['id'],
+            expected_fields=['projects'])
+
+        self.assertEqual(['fake_project'], share_type['projects'])
+        self.assertRaises(exception.ShareTypeNotFound,
+                          db_api.share_type_get,
+                          other_ctxt, self.share_type['id'])
+
+    def test_share_type_get_by_name_cached(self):
+        db_api.share_type_get_by_name(self.ctxt, 'fake_type')
+
+        count, share_type = self._count_queries(
+            db_api.share_type_get_by_name, self.ctxt, 'fake_type')
+
+        self.assertEqual(0, count)
+        self.assertEqual(self.share_type['id'], share_type['id'])
+
+    def test_extra_specs_update_invalidates_cache(self):
+        db_api.share_type_get(self.ctxt, self.share_type['id'])
+        db_api.share_type_extra_specs_get(self.ctxt, self.share_type['id'])
+
+        db_api.share_type_extra_specs_update_or_create(
+            self.ctxt, self.share_type['id'], {'key2': 'value2'})
+
+        expected = {'key1': 'value1', 'key2': 'value2'}
+        self.assertEqual(expected, db_api.share_type_get(
+            self.ctxt, self.share_type['id'])['extra_specs'])
+        self.assertEqual(expected, db_api.share_type_extra_specs_get(
+            self.ctxt, self.share_type['id']))
+
+    def test_extra_specs_delete_invalidates_cache(self):
+        db_api.share_type_extra_specs_get(self.ctxt, self.share_type['id'])
+
+        db_api.share_type_extra_specs_delete(
+            self.ctxt, self.share_type['id'], 'key1')
+
+        self.assertEqual({}, db_api.share_type_extra_specs_get(
+            self.ctxt, self.share_type['id']))
+
+    def test_access_remove_invalidates_cache(self):
+        db_api.share_type_get(self.user_ctxt, self.share_type['id'])
+
+        db_api.share_type_access_remove(
+            self.ctxt, self.share_type['id'], 'fake_project')
+
+        self.assertRaises(exception.ShareTypeNotFound,
+                          db_api.share_type_get,
+                          self.user_ctxt, self.share_type['id'])
+
+    def test_share_type_destroy_invalidates_cache(self):
+        db_api.share_type_get_by_name(self.ctxt, 'fake_type')
+
+        db_api.share_type_destroy(self.ctxt, self.share_type['id'])
+
+        self.assertRaises(exception.ShareTypeNotFoundByName,
+                          db_api.share_type_get_by_name,
+                          self.ctxt, 'fake_type')
+
+
 @ddt.ddt
 class ConsistencyGroupDatabaseAPITestCase(test.TestCase):
 
@@ -855,6 +1211,29 @@ class ShareSnapshotDatabaseAPITestCase(test.TestCase):
         self.assertEqual(1, len(actual_result.instances))
         self.assertSubDictMatch(values, actual_result.to_dict())
 
+    def test_share_snapshot_get_all_filter_by_instance_status(self):
+        result = db_api.share_snapshot_get_all(
+            self.ctxt, filters={'status': constants.STATUS_AVAILABLE})
+
+        self.assertEqual([self.snapshot_2['id']], [s['id'] for s in result])
+
+    def test_share_snapshot_get_all_filter_by_effective_instance(self):
+        snapshot = db_api.share_snapshot_get(self.ctxt, self.snapshot_1['id'])
+        other_status = [i['status'] for i in snapshot.instances
+                        if i['status'] != snapshot['status']][0]
+
+        result = db_api.share_snapshot_get_all(
+            self.ctxt, filters={'status': other_status})
+
+        self.assertEqual([], result)
+
+    def test_share_snapshot_get_all_paginated_with_marker(self):
+        result = db_api.share_snapshot_get_all(
+            self.ctxt, sort_key='id', sort_dir='asc', limit=1,
+            marker=self.snapshot_1['id'])
+
+        self.assertEqual([self.snapshot_2['id']], [s['id'] for s in result])
+
     def test_get_instance(self):
         snapshot = db_utils.create_snapshot(with_share=True)
 
@@ -1004,6 +1383,73 @@ class ShareExportLocationsDatabaseAPITestCase(test.TestCase):
 
         self.assertTrue(actual_result == [initial_location])
 
+    def test_update_many(self):
+        shares = [db_utils.create_share() for i in range(3)]
+        db_api.share_export_locations_update_many(self.ctxt, {
+            shares[0].instance['id']: ['fake1/1', 'fake2/2'],
+            shares[1].instance['id']: ['fake3/3'],
+        })
+        update_locations = {
+            shares[0].instance['id']: ['fake4/4', 'fake2/2'],
+            shares[1].instance['id']: [],
+            shares[2].instance['id']: [
+                {'path': 'fake5/5', 'is_admin_only': True,
+                 'metadata': {'foo': 'bar'}},
+                'fake6/6',
+            ],
+        }
+
+        result = db_api.share_export_locations_update_many(
+            self.ctxt, update_locations)
+
+        self.assertEqual({shares[0].instance['id']: {'fake4/4', 'fake2/2'},
+                          shares[1].instance['id']: set(),
+                          shares[2].instance['id']: {'fake5/5', 'fake6/6'}},
+                         result)
+        self.assertEqual(['fake4/4', 'fake2/2'],
+                         db_api.share_export_locations_get(
+                             self.ctxt, shares[0]['id']))
+        self.assertEqual([], db_api.share_export_locations_get(
+            self.ctxt, shares[1]['id']))
+        els = db_api.share_export_locations_get_by_share_instance_id(
+            self.ctxt, shares[2].instance['id'])
+        self.assertEqual(['fake5/5', 'fake6/6'], [el['path'] for el in els])
+        self.assertTrue(els[0]['is_admin_only'])
+        self.assertEqual({'foo': 'bar'}, els[0]['el_metadata'])
+        self.assertEqual({}, els[1]['el_metadata'])
+
+    def test_update_many_without_delete(self):
+        share = db_utils.create_share()
+        db_api.share_export_locations_update(
+            self.ctxt, share.instance['id'], ['fake1/1', 'fake2/2'], False)
+
+        result = db_api.share_export_locations_update_many(
+            self.ctxt, {share.instance['id']: ['fake3/3', 'fake2/2']},
+            delete=False)
+
+        self.assertEqual(
+            {share.instance['id']: {'fake1/1', 'fake2/2', 'fake3/3'}}, result)
+        self.assertEqual(['fake3/3', 'fake2/2', 'fake1/1'],
+                         db_api.share_export_locations_get(
+                             self.ctxt, share['id']))
+
+    def test_update_deletes_metadata(self):
+        share = db_utils.create_share()
+        db_api.share_export_locations_update(
+            self.ctxt, share.instance['id'],
+            [{'path': 'fake1/1', 'metadata': {'foo': 'bar'}}], False)
+        el = db_api.share_export_locations_get_by_share_instance_id(
+            self.ctxt, share.instance['id'])[0]
+
+        db_api.share_export_locations_update(
+            self.ctxt, share.instance['id'], ['fake2/2'], True)
+
+        metadata = db_api.model_query(
+            self.ctxt, models.ShareInstanceExportLocationsMetadata,
+            read_deleted="no",
+        ).filter_by(export_location_id=el['id']).all()
+        self.assertEqual([], metadata)
+
     def test_get_admin_export_locations(self):
         ctxt_user = context.RequestContext(
             user_id='fake user', project_id='fake project', is_admin=False)
@@ -2125,3 +2571,16 @@ class NetworkAllocationsDatabaseAPITestCase(test.TestCase):
         )
         for na in result:
             self.assertIn(na.label, ('admin', 'user', None))
+
+    def test_network_allocations_get_ip_addresses(self):
+        self._setup_network_allocations_get_for_share_server()
+        db_api.network_allocation_create(
+            self.ctxt, {'share_server_id': self.share_server_id,
+                        'ip_address': '1.1.1.1',
+                        'status': constants.STATUS_ACTIVE,
+                        'label': 'user'})
+
+        result = db_api.network_allocations_get_ip_addresses(self.ctxt)
+
+        self.assertEqual(['1.1.1.1', '2.2.2.2', '3.3.3.3', '4.4.4.4'],
+                         sorted(result))
@@ -15,8 +15,10 @@
 """Testing of SQLAlchemy model classes."""
 
 import ddt
+import mock
 
 from manila.common import constants
+from manila.db.sqlalchemy import models
 from manila import test
 from manila.tests import db_utils
 
@@ -149,6 +151,40 @@ class ShareTestCase(test.TestCase):
 
         self.assertEqual(access_status, share.access_rules_status)
 
+    def test_instance_memoized(self):
+        share = db_utils.create_share(status=constants.STATUS_AVAILABLE)
+        self.mock_object(models.Share, '_get_instance',
+                         mock.Mock(return_value='fake_instance'))
+
+        for i in range(3):
+            self.assertEqual('fake_instance', share.instance)
+
+        models.Share._get_instance.assert_called_once_with()
+
+    def test_instance_follows_instance_changes(self):
+        instance_list = [
+            db_utils.create_share_instance(status=constants.STATUS_AVAILABLE,
+                                           share_id='fake_id'),
+            db_utils.create_share_instance(status=constants.STATUS_CREATING,
+                                           share_id='fake_id'),
+        ]
+        share = db_utils.create_share(instances=instance_list)
+        available, creating = sorted(share.instances,
+                                     key=lambda x: x['status'])
+        self.assertEqual(available['id'], share.instance['id'])
+        self.assertEqual(constants.STATUS_AVAILABLE, share['status'])
+        self.assertFalse(share.has_replicas)
+
+        available['status'] = constants.STATUS_DELETING
+        creating['status'] = constants.STATUS_ERROR
+        for instance in share.instances:
+            instance['replica_state'] = constants.REPLICA_STATE_IN_SYNC
+
+        self.assertEqual(creating['id'], share.instance['id'])
+        self.assertEqual(constants.STATUS_ERROR, share['status'])
+        self.assertTrue(share.has_replicas)
+        self.assertEqual([], share.export_locations)
+
 
 @ddt.ddt
 class ShareSnapshotTestCase(test.TestCase):
@@ -207,3 +243,22 @@ class ShareSnapshotTestCase(test.TestCase):
         self.assertEqual(expected_share_name, snapshot['share_name'])
         self.assertEqual(active_replica_instance['id'],
                          snapshot['instance']['share_instance_id'])
+
+    def test_aggregate_status_follows_instance_changes(self):
+        share_instance = db_utils.create_share_instance(
+            status=constants.STATUS_AVAILABLE, share_id='fake_id',
+            replica_state=constants.REPLICA_STATE_ACTIVE)
+        share = db_utils.create_share(instances=[share_instance])
+        snapshot_instance = db_utils.create_snapshot_instance(
+            'fake_snapshot_id', status=constants.STATUS_AVAILABLE,
+            share_instance_id=share_instance['id'])
+        snapshot = db_utils.create_snapshot(
+            id='fake_snapshot_id', share_id=share['id'],
+            instances=[snapshot_instance])
+        self.assertEqual(constants.STATUS_AVAILABLE,
+                         snapshot['aggregate_status'])
+
+        snapshot.instances[0]['status'] = constants.STATUS_ERROR
+
+        self.assertEqual(constants.STATUS_ERROR, snapshot['aggregate_status'])
+        self.assertEqual(constants.STATUS_ERROR, snapshot['status'])
@@ -82,6 +82,9 @@ class API(object):
     def server_get(self, *args, **kwargs):
         pass
 
+    def server_list(self, *args, **kwargs):
+        return []
+
     def server_get_by_name_or_id(self, *args, **kwargs):
         pass
 
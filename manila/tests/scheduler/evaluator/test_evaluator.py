@@ -138,3 +138,39 @@ class EvaluatorTestCase(test.TestCase):
         self.assertRaises(exception.EvaluatorParseException,
                           evaluator.evaluate,
                           "7 / 0")
+
+    def test_compile_expression_is_cached(self):
+        evaluator._cache.clear()
+
+        compiled = evaluator.compile_expression("stats.a + 1")
+
+        self.assertIs(compiled, evaluator.compile_expression("stats.a + 1"))
+        self.assertEqual(1, evaluator._cache.hits)
+        self.assertEqual(1, evaluator._cache.misses)
+
+    def test_compiled_expression_reused_with_different_variables(self):
+        compiled = evaluator.compile_expression("stats.a * 2 > 3 ? 100 : 0")
+
+        self.assertEqual(100, compiled.evaluate(stats={'a': 2}))
+        self.assertEqual(0, compiled.evaluate(stats={'a': 1}))
+        self.assertEqual(100, compiled(stats={'a': 5}))
+
+    def test_compile_expression_bad_expression_not_cached(self):
+        evaluator._cache.clear()
+
+        self.assertRaises(exception.EvaluatorParseException,
+                          evaluator.compile_expression,
+                          "1/*1")
+        self.assertEqual(0, len(evaluator._cache))
+
+    def test_expression_cache_evicts_least_recently_used(self):
+        cache = evaluator._ExpressionCache(2)
+        cache.put('a', 'compiled_a')
+        cache.put('b', 'compiled_b')
+        cache.get('a')
+
+        cache.put('c', 'compiled_c')
+
+        self.assertEqual('compiled_a', cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual('compiled_c', cache.get('c'))
@@ -142,6 +142,106 @@ class HostManagerTestCase(test.TestCase):
         }
         self.assertDictMatch(service_states, expected)
 
+    def _get_pools(self, host):
+        return dict((pool['pool_name'], pool) for pool in
+                    self.host_manager.service_states[host]['pools'])
+
+    def test_update_service_capabilities_delta(self):
+        capabilities = {
+            'share_backend_name': 'backend1',
+            'pools': [{'pool_name': 'pool1', 'free_capacity_gb': 10},
+                      {'pool_name': 'pool2', 'free_capacity_gb': 20},
+                      {'pool_name': 'pool3', 'free_capacity_gb': 30}],
+        }
+        self.host_manager.update_service_capabilities(
+            'share', 'host1', capabilities, seqno=1)
+        service_state = self.host_manager.service_states['host1']
+        old_pools = self._get_pools('host1')
+        # Host states add backend level capabilities to the pools.
+        old_pools['pool1']['share_backend_name'] = 'backend1'
+        old_pools['pool2']['share_backend_name'] = 'backend1'
+        delta = {
+            'updated': {},
+            'removed': [],
+            'pools': {
+                'pool1': {'updated': {'free_capacity_gb': 5}, 'removed': []},
+                'pool4': {'updated': {'pool_name': 'pool4',
+                                      'free_capacity_gb': 40},
+                          'removed': []},
+            },
+            'removed_pools': ['pool3'],
+        }
+
+        with mock.patch.object(timeutils, 'utcnow',
+                               mock.Mock(return_value=31337)):
+            self.host_manager.update_service_capabilities_delta(
+                'share', 'host1', delta, 2)
+
+        # Only the changed pools are replaced in the service state.
+        self.assertIs(service_state,
+                      self.host_manager.service_states['host1'])
+        self.assertEqual(31337, service_state['timestamp'])
+        self.assertEqual('backend1', service_state['share_backend_name'])
+        self.assertEqual(
+            ['pool1', 'pool2', 'pool4'],
+            [pool['pool_name'] for pool in service_state['pools']])
+        new_pools = self._get_pools('host1')
+        self.assertEqual({'pool_name': 'pool1', 'free_capacity_gb': 5},
+                         new_pools['pool1'])
+        self.assertIs(old_pools['pool2'], new_pools['pool2'])
+        self.assertEqual({'pool_name': 'pool4', 'free_capacity_gb': 40},
+                         new_pools['pool4'])
+        self.assertEqual(set(['pool1', 'pool3', 'pool4']),
+                         self.host_manager._changed_pools['host1'])
+        # The capabilities sent by the service were not modified.
+        self.assertEqual(10, capabilities['pools'][0]['free_capacity_gb'])
+
+    def test_update_service_capabilities_delta_backend_changed(self):
+        self.host_manager.update_service_capabilities(
+            'share', 'host1',
+            {'share_backend_name': 'backend1', 'old_capability': 'value',
+             'pools': [{'pool_name': 'pool1', 'free_capacity_gb': 10}]},
+            seqno=1)
+        pool = self._get_pools('host1')['pool1']
+        pool['share_backend_name'] = 'backend1'
+        delta = {'updated': {'share_backend_name': 'backend2'},
+                 'removed': ['old_capability'],
+                 'pools': {}, 'removed_pools': []}
+
+        self.host_manager.update_service_capabilities_delta(
+            'share', 'host1', delta, 2)
+
+        service_state = self.host_manager.service_states['host1']
+        self.assertEqual('backend2', service_state['share_backend_name'])
+        self.assertNotIn('old_capability', service_state)
+        self.assertEqual([{'pool_name': 'pool1', 'free_capacity_gb': 10}],
+                         service_state['pools'])
+
+    @ddt.data(None, 2)
+    def test_update_service_capabilities_delta_out_of_sequence(self,
+                                                               seqno):
+        self.host_manager.update_service_capabilities(
+            'share', 'host1', {'free_capacity_gb': 10}, seqno=seqno)
+        service_state = self.host_manager.service_states['host1']
+        delta = {'updated': {'free_capacity_gb': 5}, 'removed': [],
+                 'pools': {}, 'removed_pools': []}
+
+        self.host_manager.update_service_capabilities_delta(
+            'share', 'host1', delta, 4)
+        # Once a delta is missed, the following ones are ignored as well.
+        self.host_manager.update_service_capabilities_delta(
+            'share', 'host1', delta, 5)
+
+        self.assertIs(service_state,
+                      self.host_manager.service_states['host1'])
+        self.assertEqual(10, service_state['free_capacity_gb'])
+
+    def test_update_service_capabilities_delta_not_share(self):
+        self.host_manager.update_service_capabilities_delta(
+            'fake_service', 'host1', {'updated': {'foo': 'bar'}}, 2)
+
+        self.assertEqual({}, self.host_manager.service_states)
+
     def test_get_all_host_states_share(self):
         context = 'fake_context'
         topic = CONF.share_topic
@@ -175,6 +275,168 @@ class HostManagerTestCase(test.TestCase):
                 self.assertEqual(share_node, host_state_map[host].service)
             db.service_get_all_by_topic.assert_called_once_with(context, topic)
 
+    def _get_pools_from_registry(self, services=None):
+        if services is None:
+            services = copy.deepcopy(fakes.SHARE_SERVICES_WITH_POOLS[:4])
+            for service in services:
+                service['availability_zone_id'] = service['availability_zone']
+        self.mock_object(db, 'service_get_all_by_topic',
+                         mock.Mock(return_value=services))
+        self.mock_object(utils, 'service_is_up', mock.Mock(return_value=True))
+        return self.host_manager.get_all_host_states_share('fake_context')
+
+    def test_get_all_host_states_share_only_applies_new_updates(self):
+        self.host_manager.service_states.update(
+            copy.deepcopy(fakes.SHARE_SERVICE_STATES_WITH_POOLS))
+        update = self.mock_object(
+            host_manager.HostState, 'update_from_share_capability',
+            mock.patch.object(
+                host_manager.HostState, 'update_from_share_capability',
+                autospec=True,
+                side_effect=host_manager.HostState.
+                update_from_share_capability).start())
+        pools = self._get_pools_from_registry()
+        self.assertEqual(5, len(pools))
+        self.assertEqual(4, update.call_count)
+        update.reset_mock()
+
+        self._get_pools_from_registry()
+        self.assertFalse(update.called)
+
+        self.host_manager.update_service_capabilities(
+            'share', 'host2@BBB',
+            copy.deepcopy(fakes.SHARE_SERVICE_STATES_WITH_POOLS['host2@BBB']))
+        self._get_pools_from_registry()
+
+        update.assert_called_once_with(
+            self.host_manager.host_state_map['host2@BBB'],
+            self.host_manager.service_states['host2@BBB'],
+            service=mock.ANY)
+
+    def test_get_all_host_states_share_applies_pool_deltas(self):
+        self.host_manager.service_states.update(
+            copy.deepcopy(fakes.SHARE_SERVICE_STATES_WITH_POOLS))
+        self.host_manager.update_service_capabilities(
+            'share', 'host4@DDD',
+            copy.deepcopy(fakes.SHARE_SERVICE_STATES_WITH_POOLS['host4@DDD']),
+            seqno=1)
+        self._get_pools_from_registry()
+        host_state = self.host_manager.host_state_map['host4@DDD']
+        update = self.mock_object(
+            host_manager.HostState, 'update_from_share_capability')
+        delta = {
+            'updated': {},
+            'removed': [],
+            'pools': {'pool4a': {'updated': {'free_capacity_gb': 100},
+                                 'removed': []}},
+            'removed_pools': ['pool4b'],
+        }
+
+        self.host_manager.update_service_capabilities_delta(
+            'share', 'host4@DDD', delta, 2)
+        pools = self._get_pools_from_registry()
+
+        self.assertFalse(update.called)
+        self.assertEqual(
+            set(['host1@AAA#pool1', 'host2@BBB#pool2', 'host3@CCC#pool3',
+                 'host4@DDD#pool4a']),
+            set(pool.host for pool in pools))
+        self.assertEqual(['pool4a'], list(host_state.pools))
+        self.assertEqual(100, host_state.pools['pool4a'].free_capacity_gb)
+        self.assertIn(host_state.pools['pool4a'], self.host_manager.pool_index)
+        self.assertEqual(4, len(self.host_manager.pool_index))
+        self.assertEqual({}, self.host_manager._changed_pools)
+
+    def test_get_all_host_states_share_registry(self):
+        self.host_manager.service_states.update(
+            copy.deepcopy(fakes.SHARE_SERVICE_STATES_WITH_POOLS))
+
+        pools = self._get_pools_from_registry()
+
+        self.assertEqual(
+            set(['host1@AAA#pool1', 'host2@BBB#pool2', 'host3@CCC#pool3',
+                 'host4@DDD#pool4a', 'host4@DDD#pool4b']),
+            set(pool.host for pool in pools))
+        self.assertEqual(5, len(self.host_manager.pool_index))
+
+        # Drop a host and a pool of another one
+        services = copy.deepcopy(fakes.SHARE_SERVICES_WITH_POOLS[1:4])
+        capabilities = copy.deepcopy(
+            fakes.SHARE_SERVICE_STATES_WITH_POOLS['host4@DDD'])
+        capabilities['pools'].pop()
+        self.host_manager.update_service_capabilities(
+            'share', 'host4@DDD', capabilities)
+
+        pools = self._get_pools_from_registry(services)
+
+        self.assertEqual(
+            set(['host2@BBB#pool2', 'host3@CCC#pool3', 'host4@DDD#pool4a']),
+            set(pool.host for pool in pools))
+        self.assertEqual(3, len(self.host_manager.pool_index))
+        self.assertEqual(set(pools), set(self.host_manager.pool_map.values()))
+
+    @ddt.data(
+        ({}, ['host1@AAA#pool1', 'host2@BBB#pool2', 'host3@CCC#pool3',
+              'host4@DDD#pool4a', 'host4@DDD#pool4b']),
+        ({'thin_provisioning': '<is> True'},
+         ['host2@BBB#pool2', 'host3@CCC#pool3', 'host4@DDD#pool4a',
+          'host4@DDD#pool4b']),
+        ({'capabilities:thin_provisioning': 'False',
+          'driver_handles_share_servers': 'False'},
+         ['host1@AAA#pool1']),
+        ({'thin_provisioning': 'True', 'availability_zone': 'zone1'},
+         ['host2@BBB#pool2']),
+        ({'snapshot_support': '<is> False'}, []),
+    )
+    @ddt.unpack
+    def test_get_filtered_hosts_indexed(self, extra_specs, expected):
+        self.host_manager.service_states.update(
+            copy.deepcopy(fakes.SHARE_SERVICE_STATES_WITH_POOLS))
+        pools = self._get_pools_from_registry()
+        az = extra_specs.pop('availability_zone', None)
+        filter_properties = {
+            'resource_type': {'extra_specs': extra_specs},
+            'request_spec': {
+                'resource_properties': {'availability_zone_id': az}},
+        }
+        seen = []
+        self.mock_object(
+            host_manager.capabilities_filter.CapabilitiesFilter,
+            'filter_all', mock.Mock(side_effect=lambda hosts, props: (
+                seen.extend(hosts) or hosts)))
+        self.host_manager.filter_classes = [
+            host_manager.availability_zone.AvailabilityZoneFilter,
+            host_manager.capabilities_filter.CapabilitiesFilter]
+        filters = ['AvailabilityZoneFilter', 'CapabilitiesFilter']
+
+        result = self.host_manager.get_filtered_hosts(
+            pools, filter_properties, filter_class_names=filters)
+
+        self.assertEqual(sorted(expected),
+                         sorted(pool.host for pool in result))
+        self.assertEqual(sorted(expected), sorted(pool.host for pool in seen))
+
+    def test_get_filtered_hosts_not_indexed(self):
+        self.host_manager.service_states.update(
+            copy.deepcopy(fakes.SHARE_SERVICE_STATES_WITH_POOLS))
+        pools = self._get_pools_from_registry()
+        other_host = host_manager.HostState('other_host')
+        filter_properties = {
+            'resource_type': {'extra_specs': {'thin_provisioning': 'True'}},
+        }
+        self.mock_object(
+            host_manager.capabilities_filter.CapabilitiesFilter,
+            'filter_all', mock.Mock(side_effect=lambda hosts, props: hosts))
+        self.host_manager.filter_classes = [
+            host_manager.capabilities_filter.CapabilitiesFilter]
+
+        result = self.host_manager.get_filtered_hosts(
+            pools + [other_host], filter_properties,
+            filter_class_names=['CapabilitiesFilter'])
+
+        self.assertIn(other_host, result)
+        self.assertEqual(5, len(result))
+
     def test_get_pools_no_pools(self):
         context = 'fake_context'
         self.mock_object(utils, 'service_is_up', mock.Mock(return_value=True))
@@ -578,6 +840,56 @@ class HostManagerTestCase(test.TestCase):
         self.assertFalse(self.host_manager._passes_filters(data, filter))
 
 
+class PoolIndexTestCase(test.TestCase):
+    """Test case for PoolIndex class."""
+
+    def _get_pool(self, name, capabilities, az=None):
+        pool = host_manager.PoolState('host', capabilities, name)
+        pool.update_capabilities(capabilities,
+                                 {'availability_zone_id': az})
+        return pool
+
+    def test_match(self):
+        index = host_manager.PoolIndex(
+            ('availability_zone_id', 'thin_provisioning', 'fake_key'))
+        pool1 = self._get_pool('pool1', {'thin_provisioning': True,
+                                         'fake_key': 1}, az='az1')
+        pool2 = self._get_pool('pool2', {'thin_provisioning': [True, False],
+                                         'fake_key': {'unhashable': 1}})
+        pool3 = self._get_pool('pool3', {'thin_provisioning': 1})
+        for pool in (pool1, pool2, pool3):
+            index.add(pool)
+
+        self.assertEqual(3, len(index))
+        self.assertEqual(set([pool1]), index.match(
+            'availability_zone_id', lambda value: value == 'az1'))
+        self.assertEqual(set([pool1, pool2]), index.match(
+            'thin_provisioning', lambda value: value is True))
+        self.assertEqual(set([pool2]), index.match(
+            'thin_provisioning', lambda value: value is False))
+        self.assertEqual(set([pool1, pool2]), index.match(
+            'fake_key', lambda value: value == 1))
+
+    def test_add_again_and_remove(self):
+        index = host_manager.PoolIndex(('thin_provisioning', ))
+        pool = self._get_pool('pool1', {'thin_provisioning': True})
+        index.add(pool)
+        pool.update_capabilities({'thin_provisioning': False})
+
+        index.add(pool)
+
+        self.assertEqual(set(), index.match('thin_provisioning',
+                                            lambda value: value is True))
+        self.assertEqual(set([pool]), index.match(
+            'thin_provisioning', lambda value: value is False))
+
+        index.remove(pool)
+
+        self.assertNotIn(pool, index)
+        self.assertEqual(set(), index.match('thin_provisioning',
+                                            lambda value: True))
+
+
 class HostStateTestCase(test.TestCase):
     """Test case for HostState class."""
 
@@ -105,15 +105,30 @@ class SchedulerManagerTestCase(test.TestCase):
             self.manager.update_service_capabilities(
                 self.context, service_name=service_name, host=host)
             (self.manager.driver.update_service_capabilities.
-                assert_called_once_with(service_name, host, {}))
+                assert_called_once_with(service_name, host, {}, seqno=None))
         with mock.patch.object(self.manager.driver,
                                'update_service_capabilities', mock.Mock()):
             capabilities = {'fake_capability': 'fake_value'}
             self.manager.update_service_capabilities(
                 self.context, service_name=service_name, host=host,
-                capabilities=capabilities)
+                capabilities=capabilities, seqno=3)
             (self.manager.driver.update_service_capabilities.
-                assert_called_once_with(service_name, host, capabilities))
+                assert_called_once_with(service_name, host, capabilities,
+                                        seqno=3))
+
+    def test_update_service_capabilities_delta(self):
+        service_name = 'fake_service'
+        host = 'fake_host'
+        delta = {'updated': {'fake_capability': 'fake_value'}}
+        self.mock_object(self.manager.driver,
+                         'update_service_capabilities_delta')
+
+        self.manager.update_service_capabilities_delta(
+            self.context, service_name=service_name, host=host, delta=delta,
+            seqno=4)
+
+        (self.manager.driver.update_service_capabilities_delta.
+            assert_called_once_with(service_name, host, delta, 4))
 
     @mock.patch.object(db, 'share_update', mock.Mock())
     def test_create_share_exception_puts_share_in_error_state(self):
@@ -80,6 +80,26 @@ class SchedulerRpcAPITestCase(test.TestCase):
                                  capabilities='fake_capabilities',
                                  fanout=True)
 
+    def test_update_service_capabilities_with_seqno(self):
+        self._test_scheduler_api('update_service_capabilities',
+                                 rpc_method='cast',
+                                 service_name='fake_name',
+                                 host='fake_host',
+                                 capabilities='fake_capabilities',
+                                 seqno=1,
+                                 fanout=True,
+                                 version='1.7')
+
+    def test_update_service_capabilities_delta(self):
+        self._test_scheduler_api('update_service_capabilities_delta',
+                                 rpc_method='cast',
+                                 service_name='fake_name',
+                                 host='fake_host',
+                                 delta='fake_delta',
+                                 seqno=2,
+                                 fanout=True,
+                                 version='1.7')
+
     def test_create_share_instance(self):
         self._test_scheduler_api('create_share_instance',
                                  rpc_method='cast',
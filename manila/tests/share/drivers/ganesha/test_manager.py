@@ -322,6 +322,15 @@ class GaneshaManagerTestCase(test.TestCase):
         self._manager.execute.assert_called_once_with('rm', test_path)
         self.assertIsNone(ret)
 
+    def test_rm_export_file_multiple_names(self):
+        self.mock_object(self._manager, 'execute',
+                         mock.Mock(return_value=('', '')))
+        ret = self._manager._rm_export_file('fakefile1', 'fakefile2')
+        self._manager.execute.assert_called_once_with(
+            'rm', '/fakedir0/export.d/fakefile1.conf',
+            '/fakedir0/export.d/fakefile2.conf')
+        self.assertIsNone(ret)
+
     def test_dbus_send_ganesha(self):
         test_args = ('arg1', 'arg2')
         test_kwargs = {'key': 'value'}
@@ -461,6 +470,113 @@ class GaneshaManagerTestCase(test.TestCase):
         self._manager._rm_export_file.assert_called_once_with(test_name)
         self._manager._mkindex.assert_called_once_with()
 
+    def _mock_update_exports_methods(self, **side_effects):
+        methods = ('_write_export_file', '_dbus_send_ganesha',
+                   '_read_export_file', '_remove_export_dbus',
+                   '_rm_export_file', '_mkindex')
+        for method in methods:
+            self.mock_object(self._manager, method,
+                             mock.Mock(side_effect=side_effects.get(method)))
+        self._manager._write_export_file.side_effect = (
+            side_effects.get('_write_export_file',
+                             lambda name, confdict: '/fakedir0/export.d/' +
+                             name + '.conf'))
+        self._manager._read_export_file.return_value = test_dict_unicode
+
+    def test_update_exports(self):
+        self._mock_update_exports_methods()
+        add_exports = [
+            ('fakefile1', {'EXPORT': {'Export_Id': 102}}),
+            ('fakefile2', {'EXPORT': {'Export_Id': 103}})]
+
+        ret = self._manager.update_exports(
+            add_exports=add_exports,
+            remove_exports=['fakefile3', 'fakefile4'])
+
+        self._manager._write_export_file.assert_has_calls(
+            [mock.call(*export) for export in add_exports])
+        self._manager._dbus_send_ganesha.assert_has_calls([
+            mock.call('AddExport',
+                      'string:/fakedir0/export.d/fakefile1.conf',
+                      'string:EXPORT(Export_Id=102)'),
+            mock.call('AddExport',
+                      'string:/fakedir0/export.d/fakefile2.conf',
+                      'string:EXPORT(Export_Id=103)')])
+        self._manager._read_export_file.assert_has_calls([
+            mock.call('fakefile3'), mock.call('fakefile4')])
+        self.assertEqual(2, self._manager._remove_export_dbus.call_count)
+        self._manager._rm_export_file.assert_called_once_with(
+            'fakefile3', 'fakefile4')
+        self._manager._mkindex.assert_called_once_with()
+        self.assertIsNone(ret)
+
+    def test_update_exports_error_during_add(self):
+        self._mock_update_exports_methods(
+            _dbus_send_ganesha=[None, exception.GaneshaCommandFailure])
+        add_exports = [
+            ('fakefile1', {'EXPORT': {'Export_Id': 102}}),
+            ('fakefile2', {'EXPORT': {'Export_Id': 103}})]
+
+        self.assertRaises(exception.GaneshaCommandFailure,
+                          self._manager.update_exports,
+                          add_exports=add_exports,
+                          remove_exports=['fakefile3'])
+
+        self._manager._rm_export_file.assert_called_once_with('fakefile2')
+        self.assertFalse(self._manager._read_export_file.called)
+        self.assertFalse(self._manager._remove_export_dbus.called)
+        self._manager._mkindex.assert_called_once_with()
+
+    def test_update_exports_error_during_remove(self):
+        self._mock_update_exports_methods(
+            _remove_export_dbus=[None, exception.GaneshaCommandFailure])
+
+        self.assertRaises(exception.GaneshaCommandFailure,
+                          self._manager.update_exports,
+                          remove_exports=['fakefile1', 'fakefile2',
+                                          'fakefile3'])
+
+        self.assertEqual(2, self._manager._read_export_file.call_count)
+        self._manager._rm_export_file.assert_called_once_with(
+            'fakefile1', 'fakefile2')
+        self._manager._mkindex.assert_called_once_with()
+
+    def test_update_exports_error_during_mkindex(self):
+        self._mock_update_exports_methods(
+            _mkindex=exception.GaneshaCommandFailure)
+        add_exports = [
+            ('fakefile1', {'EXPORT': {'Export_Id': 102}}),
+            ('fakefile2', {'EXPORT': {'Export_Id': 103}})]
+
+        self.assertRaises(exception.GaneshaCommandFailure,
+                          self._manager.update_exports,
+                          add_exports=add_exports)
+
+        self._manager._rm_export_file.assert_has_calls([
+            mock.call('fakefile1'), mock.call('fakefile2')])
+        self._manager._remove_export_dbus.assert_has_calls([
+            mock.call(102), mock.call(103)])
+        self._manager._mkindex.assert_called_once_with()
+
+    def test_get_export_ids(self):
+        self.mock_object(self._manager, 'execute',
+                         mock.Mock(return_value=('exportid|103', '')))
+        ret = self._manager.get_export_ids(3)
+        self._manager.execute.assert_called_once_with(
+            'sqlite3', self._manager.ganesha_db_path,
+            'begin exclusive;'
+            'update ganesha set value = value + 3;'
+            'select * from ganesha where key = "exportid";'
+            'commit;',
+            run_as_root=False)
+        self.assertEqual([101, 102, 103], ret)
+
+    def test_get_export_ids_none(self):
+        self.mock_object(self._manager, 'execute')
+        ret = self._manager.get_export_ids(0)
+        self.assertFalse(self._manager.execute.called)
+        self.assertEqual([], ret)
+
     def test_get_export_id(self):
         self.mock_object(self._manager, 'execute',
                          mock.Mock(return_value=('exportid|101', '')))
@@ -19,6 +19,7 @@
 import re
 import shutil
 import tempfile
+import time
 
 import ddt
 import mock
@@ -410,8 +411,12 @@ class GlusterfsVolumeMappedLayoutTestCase(test.TestCase):
 
         self.assertEqual(expected, result)
         self.assertIn(result, used_vols)
-        self._layout._fetch_gluster_volumes.assert_called_once_with()
-        self._layout._glustermanager.assert_called_once_with(result)
+        self.assertNotIn(result, self._layout.gluster_free_vols)
+        self._layout._fetch_gluster_volumes.assert_called_once_with(
+            unbound=set())
+        self._layout._glustermanager.assert_has_calls(
+            [mock.call(vol) for vol in set(voldict) - used_vols],
+            any_order=True)
 
     @ddt.data({"voldict": {"share2G": {"size": 2}},
                "used_vols": set(), "size": 3},
@@ -426,10 +431,84 @@ class GlusterfsVolumeMappedLayoutTestCase(test.TestCase):
         self.assertRaises(exception.GlusterfsException,
                           self._layout._pop_gluster_vol, size=size)
 
-        self._layout._fetch_gluster_volumes.assert_called_once_with()
+        self._layout._fetch_gluster_volumes.assert_called_once_with(
+            unbound=set())
         self.assertFalse(
             self.fake_driver._setup_via_manager.called)
 
+    def test_pop_gluster_vol_from_inventory(self):
+        self._layout._fetch_gluster_volumes = mock.Mock(return_value={
+            'host1:/share1G': {'size': 1}, 'host2:/share2G': {'size': 2},
+            'host1:/share3G': {'size': 3}})
+        self._layout.volume_pattern_keys = ['size']
+        self.mock_object(layout_volume.eventlet, 'spawn_n')
+
+        result = [self._layout._pop_gluster_vol(size=2),
+                  self._layout._pop_gluster_vol(size=2)]
+
+        self.assertEqual(['host2:/share2G', 'host1:/share3G'], result)
+        self.assertEqual(1, self._layout._fetch_gluster_volumes.call_count)
+        self.assertFalse(layout_volume.eventlet.spawn_n.called)
+        self.assertEqual(['host1:/share1G'],
+                         list(self._layout.gluster_free_vols))
+
+    def test_pop_gluster_vol_refreshes_stale_inventory(self):
+        self._layout._fetch_gluster_volumes = mock.Mock(return_value={
+            'host1:/share1G': {'size': 1}, 'host1:/share2G': {'size': 2}})
+        self._layout.volume_pattern_keys = ['size']
+        self.mock_object(layout_volume.eventlet, 'spawn_n',
+                         mock.Mock(side_effect=lambda f: f()))
+        clock = self.mock_object(layout_volume.time, 'time',
+                                 mock.Mock(return_value=0))
+
+        self._layout._pop_gluster_vol(size=1)
+        clock.return_value = 3600
+        self._layout._pop_gluster_vol(size=1)
+
+        self.assertEqual(1, layout_volume.eventlet.spawn_n.call_count)
+        self._layout._fetch_gluster_volumes.assert_has_calls([
+            mock.call(unbound=set()),
+            mock.call(unbound=set(['host1:/share2G']))])
+        self.assertFalse(self._layout._inventory_refreshing)
+
+    def test_pop_gluster_vol_refreshes_empty_inventory(self):
+        self._layout._fetch_gluster_volumes = mock.Mock(return_value={
+            'host1:/share1G': {'size': 1}})
+        self._layout.volume_pattern_keys = ['size']
+        self._layout._inventory_refreshed_at = time.time()
+
+        result = self._layout._pop_gluster_vol(size=1)
+
+        self.assertEqual('host1:/share1G', result)
+        self._layout._fetch_gluster_volumes.assert_called_once_with(
+            unbound=set())
+
+    def test_refresh_gluster_vols(self):
+        self._layout.gluster_free_vols.add('host1:/share1G', 1, 'host1')
+        self._layout.gluster_free_vols.add('host1:/share2G', 2, 'host1')
+        self._layout.gluster_used_vols = set(['host2:/share3G'])
+
+        def _fetch_gluster_volumes(unbound):
+            # Concurrent deletion of a share, returning its volume
+            self._layout.gluster_vols_info['host2:/share3G'] = (3, 'host2')
+            self._layout._push_gluster_vol('host2:/share3G')
+            return {'host1:/share1G': {'size': 1},
+                    'host1:/share4G': {'size': 4}}
+
+        self._layout._fetch_gluster_volumes = mock.Mock(
+            side_effect=_fetch_gluster_volumes)
+
+        self._layout._refresh_gluster_vols()
+
+        self._layout._fetch_gluster_volumes.assert_called_once_with(
+            unbound=set(['host1:/share1G', 'host1:/share2G']))
+        self.assertEqual(
+            set(['host1:/share1G', 'host2:/share3G', 'host1:/share4G']),
+            set(self._layout.gluster_free_vols))
+        self.assertEqual((4, 'host1'),
+                         self._layout.gluster_vols_info['host1:/share4G'])
+        self.assertIsNone(self._layout._inventory_changes)
+
     def test_push_gluster_vol(self):
         self._layout.gluster_used_vols = set([
             self.glusterfs_target1, self.glusterfs_target2])
@@ -439,6 +518,18 @@ class GlusterfsVolumeMappedLayoutTestCase(test.TestCase):
         self.assertEqual(1, len(self._layout.gluster_used_vols))
         self.assertFalse(
             self.glusterfs_target2 in self._layout.gluster_used_vols)
+        self.assertNotIn(self.glusterfs_target2,
+                         self._layout.gluster_free_vols)
+
+    def test_push_gluster_vol_back_to_inventory(self):
+        self._layout.gluster_used_vols = set([self.glusterfs_target2])
+        self._layout.gluster_vols_info[self.glusterfs_target2] = (2, 'host2')
+
+        self._layout._push_gluster_vol(self.glusterfs_target2)
+
+        self.assertIn(self.glusterfs_target2, self._layout.gluster_free_vols)
+        self.assertEqual(self.glusterfs_target2,
+                         self._layout.gluster_free_vols.pick(2))
 
     def test_push_gluster_vol_excp(self):
         self._layout.gluster_used_vols = set([self.glusterfs_target1])
@@ -972,3 +1063,47 @@ class GlusterfsVolumeMappedLayoutTestCase(test.TestCase):
         method, args, kwargs = method_invocation
         self.assertRaises(NotImplementedError, getattr(self._layout, method),
                           *args, **kwargs)
+
+
+class GlusterVolumeInventoryTestCase(test.TestCase):
+    """Tests GlusterVolumeInventory."""
+
+    def setUp(self):
+        super(GlusterVolumeInventoryTestCase, self).setUp()
+        self.inventory = layout_volume.GlusterVolumeInventory()
+        for vol, size, host in (('h1:/v2a', 2, 'h1'), ('h1:/v2b', 2, 'h1'),
+                                ('h2:/v2', 2, 'h2'), ('h1:/v5', 5, 'h1'),
+                                ('h2:/v', None, 'h2'), ('h1:/v0', 0, 'h1')):
+            self.inventory.add(vol, size, host)
+
+    def test_pick_smallest_fitting_size(self):
+        self.mock_object(layout_volume.random, 'choice',
+                         mock.Mock(side_effect=lambda hosts: sorted(hosts)[0]))
+
+        self.assertEqual('h1:/v2a', self.inventory.pick(1))
+        self.assertEqual('h1:/v2a', self.inventory.pick(2))
+        self.assertEqual('h1:/v5', self.inventory.pick(3))
+        layout_volume.random.choice.assert_called_with(['h1'])
+
+    def test_pick_unsized(self):
+        self.assertIn(self.inventory.pick(6), ('h2:/v', 'h1:/v0'))
+
+    def test_pick_any(self):
+        self.mock_object(layout_volume.random, 'choice',
+                         mock.Mock(side_effect=lambda hosts: sorted(hosts)[1]))
+
+        self.assertEqual('h2:/v', self.inventory.pick())
+
+    def test_remove(self):
+        for vol in ('h1:/v2a', 'h1:/v2b', 'h2:/v2', 'h1:/v0'):
+            self.inventory.remove(vol)
+        self.inventory.remove('h1:/v2a')
+
+        self.assertEqual('h1:/v5', self.inventory.pick(1))
+        self.assertEqual('h2:/v', self.inventory.pick(6))
+        self.assertEqual(2, len(self.inventory))
+        self.assertEqual([5], self.inventory._sizes)
+
+    def test_pick_empty(self):
+        self.assertIsNone(layout_volume.GlusterVolumeInventory().pick(1))
+        self.assertIsNone(layout_volume.GlusterVolumeInventory().pick())
@@ -2079,7 +2079,7 @@ class HuaweiShareDriverTestCase(test.TestCase):
         self.assertTrue(db.share_type_get.called)
         self.assertTrue(self.driver.plugin.
                         _get_access_id.called)
-        self.assertEqual(7, utils.execute.call_count)
+        self.assertEqual(5, utils.execute.call_count)
         self.assertEqual("\\\\100.115.10.68\\share_fake_uuid", location)
 
     def test_create_share_from_snapshot_nonefs(self):
@@ -2661,6 +2661,126 @@ class HuaweiShareDriverTestCase(test.TestCase):
                           self.driver.deny_access, self._context,
                           self.share_cifs, self.access_user, self.share_server)
 
+    def test_get_share_by_name_from_index(self):
+        helper = self.driver.plugin.helper
+        helper.login()
+        self.mock_object(helper, 'do_call',
+                         mock.Mock(side_effect=helper.do_call))
+
+        share = helper._get_share_by_name('share-fake-uuid', 'NFSHARE')
+        calls = helper.do_call.call_count
+        thick_share = helper._get_share_by_name('share-fake-uuid-thickfs',
+                                                'NFSHARE')
+        share_again = helper._get_share_by_name('share-fake-uuid', 'NFSHARE')
+
+        self.assertEqual({'ID': '1', 'FSID': '4'}, share)
+        self.assertEqual({'ID': '2', 'FSID': '5'}, thick_share)
+        self.assertEqual(share, share_again)
+        self.assertEqual(calls, helper.do_call.call_count)
+
+    def test_get_share_by_name_index_timeout(self):
+        helper = self.driver.plugin.helper
+        helper.login()
+        helper._get_share_by_name('share-fake-uuid', 'NFSHARE')
+        helper._share_index['NFSHARE']['updated'] -= (
+            constants.SHARE_INDEX_TIMEOUT + 1)
+        self.mock_object(helper, 'do_call',
+                         mock.Mock(side_effect=helper.do_call))
+
+        share = helper._get_share_by_name('share-fake-uuid', 'NFSHARE')
+
+        self.assertEqual({'ID': '1', 'FSID': '4'}, share)
+        self.assertTrue(helper.do_call.called)
+
+    def test_delete_share_removes_from_index(self):
+        helper = self.driver.plugin.helper
+        helper.login()
+        helper._get_share_by_name('share-fake-uuid', 'NFSHARE')
+
+        self.driver.delete_share(self._context, self.share_nfs,
+                                 self.share_server)
+
+        self.assertNotIn('/share_fake_uuid/',
+                         helper._share_index['NFSHARE']['shares'])
+        self.assertIn('/share_fake_uuid_thickfs/',
+                      helper._share_index['NFSHARE']['shares'])
+
+    def test_get_access_from_share_index(self):
+        helper = self.driver.plugin.helper
+        helper.login()
+        self.mock_object(helper, 'do_call',
+                         mock.Mock(side_effect=helper.do_call))
+
+        access_id = helper._get_access_from_share('1', '100.112.0.2', 'NFS')
+        calls = helper.do_call.call_count
+        missing_id = helper._get_access_from_share('1', '1.2.3.4', 'NFS')
+
+        self.assertEqual('5', access_id)
+        self.assertIsNone(missing_id)
+        self.assertEqual(calls, helper.do_call.call_count)
+
+    def test_allow_and_deny_access_update_index(self):
+        helper = self.driver.plugin.helper
+        helper.login()
+        helper._get_access_from_share('1', '100.112.0.2', 'NFS')
+        original_do_call = helper.do_call
+
+        def fake_do_call(url, data=None, method=None, **kwargs):
+            if url.endswith('/NFS_SHARE_AUTH_CLIENT'):
+                return {"error": {"code": 0}, "data": {"ID": "7"}}
+            return original_do_call(url, data, method, **kwargs)
+
+        self.mock_object(helper, 'do_call',
+                         mock.Mock(side_effect=fake_do_call))
+
+        helper._allow_access_rest('1', '1.2.3.4', 'NFS',
+                                  constants.ACCESS_NFS_RW)
+        helper._remove_access_from_share('5', 'NFS')
+
+        self.assertEqual({'100.112.0.1_fail': '0', '1.2.3.4': '7'},
+                         helper._access_index[
+                             ('NFS_SHARE_AUTH_CLIENT', '1')]['access'])
+        self.assertEqual(2, helper.do_call.call_count)
+
+    def test_do_call_session(self):
+        rest_helper = helper.RestHelper(self.configuration)
+        response = mock.Mock(content=b'{"error":{"code":0}}')
+        self.mock_object(rest_helper.session, 'request',
+                         mock.Mock(return_value=response))
+
+        result = rest_helper.do_call('fake_url', '{"fake": "data"}')
+
+        self.assertEqual({"error": {"code": 0}}, result)
+        rest_helper.session.request.assert_called_once_with(
+            'POST', 'fake_url', data='{"fake": "data"}',
+            timeout=constants.SOCKET_TIMEOUT)
+        self.assertEqual('keep-alive',
+                         rest_helper.session.headers['Connection'])
+
+    def test_init_http_head_closes_session(self):
+        rest_helper = helper.RestHelper(self.configuration)
+        session = rest_helper.session
+        self.mock_object(session, 'close')
+
+        rest_helper.init_http_head()
+
+        session.close.assert_called_once_with()
+        self.assertIsNot(session, rest_helper.session)
+
+    def test_do_call_session_error(self):
+        rest_helper = helper.RestHelper(self.configuration)
+        response = mock.Mock()
+        response.raise_for_status.side_effect = Exception('fake')
+        self.mock_object(rest_helper.session, 'request',
+                         mock.Mock(return_value=response))
+
+        result = rest_helper.do_call('fake_url', method='GET')
+
+        self.assertEqual(constants.ERROR_CONNECT_TO_SERVER,
+                         result['error']['code'])
+        rest_helper.session.request.assert_called_once_with(
+            'GET', 'fake_url', data=None, timeout=constants.SOCKET_TIMEOUT)
+
     def test_create_nfs_snapshot_success(self):
         self.driver.plugin.helper.login()
         self.driver.plugin.helper.create_snapflag = False
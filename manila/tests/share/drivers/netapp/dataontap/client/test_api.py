@@ -18,9 +18,15 @@
 """
 Tests for NetApp API layer
 """
+import copy
+import threading
+
 import ddt
+from lxml import etree
 import mock
-from six.moves import urllib
+import requests
+import six
+from six.moves import BaseHTTPServer
 
 from manila import exception
 from manila.share.drivers.netapp.dataontap.client import api
@@ -160,6 +166,39 @@ class NetAppApiElementTransTests(test.TestCase):
                           None,
                           'value')
 
+    def test_get_child_by_name(self):
+        """Tests lookup of children by tag and local name."""
+        root = api.NaElement(etree.XML(
+            '<root xmlns:a="urn:fake"><e1>v1</e1><a:e2>v2</a:e2>'
+            '<e1>v3</e1></root>'))
+
+        self.assertEqual('v1', root.get_child_content('e1'))
+        self.assertEqual('v2', root.get_child_content('e2'))
+        self.assertEqual('v2', root.get_child_by_name(
+            '{urn:fake}e2').get_content())
+        self.assertIsNone(root.get_child_by_name('e3'))
+        self.assertIsNone(root.get_child_content('{urn:other}e2'))
+
+    def test_get_child_by_name_added_through_other_element(self):
+        """Tests children added after a lookup are found."""
+        root = api.NaElement('root')
+        self.assertIsNone(root.get_child_content('e1'))
+
+        api.NaElement(root._element).add_new_child('e1', 'v1')
+
+        self.assertEqual('v1', root.get_child_content('e1'))
+
+    def test_deepcopy(self):
+        root = api.NaElement('root')
+        root.add_new_child('e1', 'v1')
+        self.assertEqual('v1', root.get_child_content('e1'))
+
+        copied = copy.deepcopy(root)
+        copied.get_child_by_name('e1').set_content('v2')
+
+        self.assertEqual('v1', root.get_child_content('e1'))
+        self.assertEqual('v2', copied.get_child_content('e1'))
+
 
 @ddt.ddt
 class NetAppApiServerTests(test.TestCase):
@@ -175,31 +214,32 @@ class NetAppApiServerTests(test.TestCase):
         self.assertRaises(ValueError, self.root.invoke_elem, na_element)
 
     def test_invoke_elem_http_error(self):
-        """Tests handling of HTTPError"""
+        """Tests handling of HTTP errors"""
         na_element = fake.FAKE_NA_ELEMENT
         self.mock_object(self.root, '_create_request', mock.Mock(
             return_value=('abc', fake.FAKE_NA_ELEMENT)))
         self.mock_object(api, 'LOG')
-        self.root._opener = fake.FAKE_HTTP_OPENER
-        self.mock_object(self.root, '_build_opener')
-        self.mock_object(self.root._opener, 'open', mock.Mock(
-            side_effect=urllib.error.HTTPError(url='', hdrs='',
-                                               fp=None, code='401',
-                                               msg='httperror')))
-
-        self.assertRaises(api.NaApiError, self.root.invoke_elem,
-                          na_element)
-
-    def test_invoke_elem_urlerror(self):
-        """Tests handling of URLError"""
+        self.root._session = fake.FAKE_HTTP_SESSION
+        self.mock_object(self.root, '_build_session')
+        self.mock_object(self.root._session, 'post', mock.Mock(
+            return_value=mock.Mock(ok=False, status_code=401,
+                                   reason='httperror')))
+
+        result = self.assertRaises(api.NaApiError, self.root.invoke_elem,
+                                   na_element)
+        self.assertEqual('401', result.code)
+
+    @ddt.data(requests.ConnectionError, requests.Timeout)
+    def test_invoke_elem_connection_error(self, side_effect):
+        """Tests handling of connection errors and timeouts"""
         na_element = fake.FAKE_NA_ELEMENT
         self.mock_object(self.root, '_create_request', mock.Mock(
             return_value=('abc', fake.FAKE_NA_ELEMENT)))
         self.mock_object(api, 'LOG')
-        self.root._opener = fake.FAKE_HTTP_OPENER
-        self.mock_object(self.root, '_build_opener')
-        self.mock_object(self.root._opener, 'open', mock.Mock(
-            side_effect=urllib.error.URLError(reason='urlerror')))
+        self.root._session = fake.FAKE_HTTP_SESSION
+        self.mock_object(self.root, '_build_session')
+        self.mock_object(self.root._session, 'post', mock.Mock(
+            side_effect=side_effect))
 
         self.assertRaises(exception.StorageCommunicationException,
                           self.root.invoke_elem,
@@ -211,9 +251,9 @@ class NetAppApiServerTests(test.TestCase):
         self.mock_object(self.root, '_create_request', mock.Mock(
             return_value=('abc', fake.FAKE_NA_ELEMENT)))
         self.mock_object(api, 'LOG')
-        self.root._opener = fake.FAKE_HTTP_OPENER
-        self.mock_object(self.root, '_build_opener')
-        self.mock_object(self.root._opener, 'open', mock.Mock(
+        self.root._session = fake.FAKE_HTTP_SESSION
+        self.mock_object(self.root, '_build_session')
+        self.mock_object(self.root._session, 'post', mock.Mock(
             side_effect=Exception))
 
         exception = self.assertRaises(api.NaApiError, self.root.invoke_elem,
@@ -224,17 +264,265 @@ class NetAppApiServerTests(test.TestCase):
         """Tests the method invoke_elem with valid parameters"""
         na_element = fake.FAKE_NA_ELEMENT
         self.root._trace = True
+        self.root._refresh_conn = False
         self.mock_object(self.root, '_create_request', mock.Mock(
             return_value=('abc', fake.FAKE_NA_ELEMENT)))
         self.mock_object(api, 'LOG')
-        self.root._opener = fake.FAKE_HTTP_OPENER
-        self.mock_object(self.root, '_build_opener')
+        self.root._session = fake.FAKE_HTTP_SESSION
+        self.mock_object(self.root, '_build_session')
         self.mock_object(self.root, '_get_result', mock.Mock(
             return_value=fake.FAKE_NA_ELEMENT))
-        opener_mock = self.mock_object(
-            self.root._opener, 'open', mock.Mock())
-        opener_mock.read.side_effect = ['resp1', 'resp2']
+        post_mock = self.mock_object(
+            self.root._session, 'post', mock.Mock(
+                return_value=mock.Mock(ok=True, content='resp')))
 
         self.root.invoke_elem(na_element)
 
-        self.assertEqual(2, api.LOG.debug.call_count)
+        self.assertEqual(3, api.LOG.debug.call_count)
+        self.assertFalse(self.root._build_session.called)
+        post_mock.assert_called_once_with(
+            'http://127.0.0.1:80/' + api.NaServer.URL_FILER, data='abc',
+            headers=api.NaServer.REQUEST_HEADERS, timeout=None,
+            stream=False)
+        self.root._get_result.assert_called_once_with('resp')
+        stats = self.root.get_api_stats()[na_element.get_name()]
+        self.assertEqual(1, stats['calls'])
+
+    def test_build_session_closes_previous_session(self):
+        self.root._build_session()
+        session = self.root._session
+        self.mock_object(session, 'close')
+
+        self.root._build_session()
+
+        session.close.assert_called_once_with()
+        self.assertIsNot(session, self.root._session)
+        self.assertFalse(self.root._refresh_conn)
+
+    def test_deepcopy_shares_session(self):
+        self.root._build_session()
+        self.root.set_vserver('fake_vserver')
+
+        server = copy.deepcopy(self.root)
+        server.set_vserver('other_vserver')
+
+        self.assertIs(self.root._session, server._session)
+        self.assertIs(self.root._stats, server._stats)
+        self.assertEqual('fake_vserver', self.root.get_vserver())
+        self.assertEqual('other_vserver', server.get_vserver())
+
+
+class FakeZapiHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Answers ZAPI calls with a successful result, keeping alive."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        self.server.authorizations.add(self.headers.get('Authorization'))
+        body = self.server.response_body
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/xml')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeZapiServer(BaseHTTPServer.HTTPServer):
+
+    def __init__(self):
+        BaseHTTPServer.HTTPServer.__init__(self, ('127.0.0.1', 0),
+                                           FakeZapiHandler)
+        self.connections = 0
+        self.authorizations = set()
+        self.response_body = (
+            b'<netapp version="1.15" xmlns="%s"><results status="passed"/>'
+            b'</netapp>' % api.NaServer.NETAPP_NS.encode())
+
+    def get_request(self):
+        self.connections += 1
+        return BaseHTTPServer.HTTPServer.get_request(self)
+
+
+class NetAppApiServerKeepAliveTests(test.TestCase):
+    """Test case for NetApp API calls against a local fake ZAPI server"""
+
+    def setUp(self):
+        super(NetAppApiServerKeepAliveTests, self).setUp()
+        self.zapi_server = FakeZapiServer()
+        thread = threading.Thread(target=self.zapi_server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(self.zapi_server.server_close)
+        self.addCleanup(self.zapi_server.shutdown)
+        root = api.NaServer(
+            '127.0.0.1', port=self.zapi_server.server_address[1],
+            username='admin', password='pass')
+        self.addCleanup(lambda: root._session and root._session.close())
+        self.root = root
+
+    def test_invoke_successfully_reuses_connection(self):
+        for i in range(5):
+            result = self.root.invoke_successfully(
+                api.NaElement('system-get-version'))
+            self.assertEqual('passed', result.get_attr('status'))
+        copy.deepcopy(self.root).invoke_successfully(
+            api.NaElement('system-get-version'))
+
+        self.assertEqual(1, self.zapi_server.connections)
+        self.assertEqual(1, len(self.zapi_server.authorizations))
+        self.assertIsNotNone(self.zapi_server.authorizations.pop())
+        self.assertEqual(
+            6, self.root.get_api_stats()['system-get-version']['calls'])
+
+    def test_invoke_iter_elem_reuses_connection(self):
+        self.zapi_server.response_body = (
+            b'<netapp version="1.15" xmlns="%s"><results status="passed">'
+            b'<attributes-list><volume-attributes><name>vol1</name>'
+            b'</volume-attributes><volume-attributes><name>vol2</name>'
+            b'</volume-attributes></attributes-list>'
+            b'<num-records>2</num-records></results></netapp>' %
+            api.NaServer.NETAPP_NS.encode())
+
+        for i in range(3):
+            records = self.root.invoke_iter_elem(
+                api.NaElement('volume-get-iter'))
+            self.assertEqual([{'name': 'vol1'}, {'name': 'vol2'}],
+                             list(records))
+            self.assertEqual(2, records.num_records)
+            self.assertIsNone(records.next_tag)
+
+        self.assertEqual(1, self.zapi_server.connections)
+
+    def test_invoke_iter_elem_stopped_releases_connection(self):
+        self.root._pool_size = 1
+        self.root.set_timeout(5)
+        self.zapi_server.response_body = (
+            b'<netapp version="1.15" xmlns="%s"><results status="passed">'
+            b'<attributes-list><volume-attributes><name>vol1</name>'
+            b'</volume-attributes><volume-attributes><name>vol2</name>'
+            b'</volume-attributes></attributes-list></results></netapp>' %
+            api.NaServer.NETAPP_NS.encode())
+
+        records = iter(self.root.invoke_iter_elem(
+            api.NaElement('volume-get-iter')))
+        self.assertEqual({'name': 'vol1'}, next(records))
+        records.close()
+        result = self.root.invoke_successfully(
+            api.NaElement('system-get-version'))
+
+        self.assertEqual('passed', result.get_attr('status'))
+
+    def test_invoke_pool_timeout(self):
+        self.root._pool_size = 1
+        self.root.set_timeout(1)
+
+        records = self.root.invoke_iter_elem(
+            api.NaElement('volume-get-iter'))
+        self.addCleanup(records.close)
+
+        self.assertRaises(exception.StorageCommunicationException,
+                          self.root.invoke_successfully,
+                          api.NaElement('system-get-version'))
+
+
+@ddt.ddt
+class NetAppApiRecordStreamTests(test.TestCase):
+    """Test case for streaming of NetApp iterator API responses"""
+
+    def _get_stream(self, body):
+        return api.NaRecordStream(six.BytesIO(body.encode('utf-8')))
+
+    def test_iter(self):
+        stream = self._get_stream("""
+          <netapp xmlns="http://www.netapp.com/filer/admin" version="1.20">
+            <results status="passed">
+              <attributes-list>
+                <export-rule-info>
+                  <client-match>10.0.0.1</client-match>
+                  <rule-index>3</rule-index>
+                  <protocol>
+                    <access-protocol>nfs3</access-protocol>
+                    <access-protocol>nfs4</access-protocol>
+                  </protocol>
+                  <ro-rule><security-flavor>sys</security-flavor></ro-rule>
+                  <anon/>
+                </export-rule-info>
+                <export-rule-info>
+                  <rule-index>1</rule-index>
+                </export-rule-info>
+              </attributes-list>
+              <next-tag>&lt;export-rule-info&gt;1</next-tag>
+              <num-records>2</num-records>
+            </results>
+          </netapp>""")
+
+        records = list(stream)
+
+        expected = [
+            {
+                'client-match': '10.0.0.1',
+                'rule-index': '3',
+                'protocol': {'access-protocol': ['nfs3', 'nfs4']},
+                'ro-rule': {'security-flavor': 'sys'},
+                'anon': None,
+            },
+            {'rule-index': '1'},
+        ]
+        self.assertEqual(expected, records)
+        self.assertEqual('<export-rule-info>1', stream.next_tag)
+        self.assertEqual(2, stream.num_records)
+
+    @ddt.data(('<results status="failed" errno="13005" reason="fake"/>',
+               '13005', 'fake'),
+              ('<results status="failed"><errorno>15661</errorno>'
+               '<reason>fake</reason></results>', '15661', 'fake'))
+    @ddt.unpack
+    def test_iter_failed(self, body, code, message):
+        stream = self._get_stream(body)
+
+        error = self.assertRaises(api.NaApiError, list, stream)
+
+        self.assertEqual(code, error.code)
+        self.assertEqual(message, error.message)
+
+    def test_iter_closes_source_when_stopped(self):
+        source = mock.Mock(wraps=six.BytesIO(
+            b'<results status="passed"><attributes-list><a>1</a><a>2</a>'
+            b'</attributes-list></results>'))
+        stream = api.NaRecordStream(source)
+
+        records = iter(stream)
+        self.assertEqual('1', next(records))
+        records.close()
+
+        source.close.assert_called_once_with()
+
+    def test_iter_closes_response_when_stopped(self):
+        response = mock.Mock()
+        source = six.BytesIO(
+            b'<results status="passed"><attributes-list><a>1</a><a>2</a>'
+            b'</attributes-list></results>')
+        stream = api.NaRecordStream(source, response=response)
+
+        records = iter(stream)
+        self.assertEqual('1', next(records))
+        records.close()
+
+        response.close.assert_called_once_with()
+
+    def test_iter_releases_connection_when_completed(self):
+        response = mock.Mock()
+        source = mock.Mock(wraps=six.BytesIO(
+            b'<results status="passed"><attributes-list><a>1</a>'
+            b'</attributes-list></results>'))
+        source.release_conn = mock.Mock()
+        stream = api.NaRecordStream(source, response=response)
+
+        self.assertEqual(['1'], list(stream))
+
+        source.release_conn.assert_called_once_with()
+        self.assertFalse(response.close.called)
@@ -20,6 +20,7 @@ import time
 
 import ddt
 import mock
+from lxml import etree
 from oslo_log import log
 import six
 
@@ -65,6 +66,12 @@ class NetAppClientCmodeTestCase(test.TestCase):
         return mock.Mock(side_effect=netapp_api.NaApiError(code=code,
                                                            message=message))
 
+    def _mock_record_streams(self, *responses):
+        streams = [netapp_api.NaRecordStream(six.BytesIO(
+            etree.tostring(response))) for response in responses]
+        return self.mock_object(self.client.connection, 'invoke_iter_elem',
+                                mock.Mock(side_effect=streams))
+
     def test_init_features_ontapi_1_21(self):
 
         self.mock_object(client_base.NetAppBaseClient,
@@ -229,6 +236,45 @@ class NetAppClientCmodeTestCase(test.TestCase):
                           self.client.send_iter_request,
                           'storage-disk-get-iter')
 
+    def test_iter_records(self):
+
+        mock_invoke_iter_elem = self._mock_record_streams(
+            fake.STORAGE_DISK_GET_ITER_RESPONSE_PAGE_1,
+            fake.STORAGE_DISK_GET_ITER_RESPONSE_PAGE_2,
+            fake.STORAGE_DISK_GET_ITER_RESPONSE_PAGE_3)
+
+        storage_disk_get_iter_args = {
+            'desired-attributes': {
+                'storage-disk-info': {
+                    'disk-name': None,
+                }
+            }
+        }
+        result = list(self.client.iter_records(
+            'storage-disk-get-iter', api_args=storage_disk_get_iter_args,
+            max_page_length=10))
+
+        self.assertEqual(28, len(result))
+        self.assertEqual({'disk-name': 'cluster3-01:v4.16'}, result[0])
+        self.assertNotIn('max-records', storage_disk_get_iter_args)
+        requests = [call[0][0] for call in
+                    mock_invoke_iter_elem.call_args_list]
+        self.assertEqual(3, len(requests))
+        self.assertEqual('10', requests[0].get_child_content('max-records'))
+        self.assertIsNone(requests[0].get_child_content('tag'))
+        self.assertEqual('next_tag_1', requests[1].get_child_content('tag'))
+        self.assertEqual('next_tag_2', requests[2].get_child_content('tag'))
+
+    def test_iter_records_not_found(self):
+
+        mock_invoke_iter_elem = self._mock_record_streams(
+            fake.NO_RECORDS_RESPONSE)
+
+        result = list(self.client.iter_records('storage-disk-get-iter'))
+
+        self.assertEqual([], result)
+        self.assertEqual(1, mock_invoke_iter_elem.call_count)
+
     def test_set_vserver(self):
         self.client.set_vserver(fake.VSERVER_NAME)
         self.client.connection.set_vserver.assert_has_calls(
@@ -515,10 +561,7 @@ class NetAppClientCmodeTestCase(test.TestCase):
 
     def test_get_vserver_volume_count(self):
 
-        api_response = netapp_api.NaElement(fake.VOLUME_COUNT_RESPONSE)
-        self.mock_object(self.client,
-                         'send_iter_request',
-                         mock.Mock(return_value=api_response))
+        self._mock_record_streams(fake.VOLUME_COUNT_RESPONSE)
 
         result = self.client.get_vserver_volume_count()
 
@@ -3024,11 +3067,9 @@ class NetAppClientCmodeTestCase(test.TestCase):
 
     def test_get_clone_children_for_snapshot(self):
 
-        api_response = netapp_api.NaElement(
-            fake.VOLUME_GET_ITER_CLONE_CHILDREN_RESPONSE)
-        self.mock_object(self.client,
-                         'send_iter_request',
-                         mock.Mock(return_value=api_response))
+        self._mock_record_streams(fake.VOLUME_GET_ITER_CLONE_CHILDREN_RESPONSE)
+        self.mock_object(self.client, 'iter_records',
+                         mock.Mock(side_effect=self.client.iter_records))
 
         result = self.client.get_clone_children_for_snapshot(
             fake.SHARE_NAME, fake.SNAPSHOT_NAME)
@@ -3052,7 +3093,7 @@ class NetAppClientCmodeTestCase(test.TestCase):
                 },
             },
         }
-        self.client.send_iter_request.assert_has_calls([
+        self.client.iter_records.assert_has_calls([
             mock.call('volume-get-iter', volume_get_iter_args)])
 
         expected = [
@@ -3063,10 +3104,7 @@ class NetAppClientCmodeTestCase(test.TestCase):
 
     def test_get_clone_children_for_snapshot_not_found(self):
 
-        api_response = netapp_api.NaElement(fake.NO_RECORDS_RESPONSE)
-        self.mock_object(self.client,
-                         'send_iter_request',
-                         mock.Mock(return_value=api_response))
+        self._mock_record_streams(fake.NO_RECORDS_RESPONSE)
 
         result = self.client.get_clone_children_for_snapshot(
             fake.SHARE_NAME, fake.SNAPSHOT_NAME)
@@ -3472,11 +3510,9 @@ class NetAppClientCmodeTestCase(test.TestCase):
 
     def test_get_deleted_snapshots(self):
 
-        api_response = netapp_api.NaElement(
-            fake.SNAPSHOT_GET_ITER_DELETED_RESPONSE)
-        self.mock_object(self.client,
-                         'send_iter_request',
-                         mock.Mock(return_value=api_response))
+        self._mock_record_streams(fake.SNAPSHOT_GET_ITER_DELETED_RESPONSE)
+        self.mock_object(self.client, 'iter_records',
+                         mock.Mock(side_effect=self.client.iter_records))
 
         result = self.client._get_deleted_snapshots()
 
@@ -3495,7 +3531,7 @@ class NetAppClientCmodeTestCase(test.TestCase):
                 },
             },
         }
-        self.client.send_iter_request.assert_has_calls([
+        self.client.iter_records.assert_has_calls([
             mock.call('snapshot-get-iter', snapshot_get_iter_args)])
 
         expected = {
@@ -3821,10 +3857,9 @@ class NetAppClientCmodeTestCase(test.TestCase):
 
     def test_get_nfs_export_rule_indices(self):
 
-        api_response = netapp_api.NaElement(fake.EXPORT_RULE_GET_ITER_RESPONSE)
-        self.mock_object(self.client,
-                         'send_iter_request',
-                         mock.Mock(return_value=api_response))
+        self._mock_record_streams(fake.EXPORT_RULE_GET_ITER_RESPONSE)
+        self.mock_object(self.client, 'iter_records',
+                         mock.Mock(side_effect=self.client.iter_records))
 
         result = self.client._get_nfs_export_rule_indices(
             fake.EXPORT_POLICY_NAME, fake.IP_ADDRESS)
@@ -3846,7 +3881,7 @@ class NetAppClientCmodeTestCase(test.TestCase):
             },
         }
         self.assertListEqual(['1', '3'], result)
-        self.client.send_iter_request.assert_has_calls([
+        self.client.iter_records.assert_has_calls([
             mock.call('export-rule-get-iter', export_rule_get_iter_args)])
 
     def test_remove_nfs_export_rule(self):
@@ -4383,11 +4418,9 @@ class NetAppClientCmodeTestCase(test.TestCase):
     @ddt.unpack
     def test__get_aggregate_disk_types_ddt(self, shared, query_disk_raid_info):
 
-        api_response = netapp_api.NaElement(
-            fake.STORAGE_DISK_GET_ITER_RESPONSE)
-        self.mock_object(self.client,
-                         'send_iter_request',
-                         mock.Mock(return_value=api_response))
+        self._mock_record_streams(fake.STORAGE_DISK_GET_ITER_RESPONSE)
+        self.mock_object(self.client, 'iter_records',
+                         mock.Mock(side_effect=self.client.iter_records))
 
         result = self.client._get_aggregate_disk_types(
             fake.SHARE_AGGREGATE_NAME, shared=shared)
@@ -4406,7 +4439,7 @@ class NetAppClientCmodeTestCase(test.TestCase):
                 },
             },
         }
-        self.client.send_iter_request.assert_called_once_with(
+        self.client.iter_records.assert_called_once_with(
             'storage-disk-get-iter', storage_disk_get_iter_args)
 
         expected = set(fake.SHARE_AGGREGATE_DISK_TYPES)
@@ -4414,10 +4447,7 @@ class NetAppClientCmodeTestCase(test.TestCase):
 
     def test__get_aggregate_disk_types_not_found(self):
 
-        api_response = netapp_api.NaElement(fake.NO_RECORDS_RESPONSE)
-        self.mock_object(self.client,
-                         'send_iter_request',
-                         mock.Mock(return_value=api_response))
+        self._mock_record_streams(fake.NO_RECORDS_RESPONSE)
 
         result = self.client._get_aggregate_disk_types(
             fake.SHARE_AGGREGATE_NAME)
@@ -4426,8 +4456,8 @@ class NetAppClientCmodeTestCase(test.TestCase):
 
     def test__get_aggregate_disk_types_api_error(self):
 
-        self.mock_object(self.client,
-                         'send_iter_request',
+        self.mock_object(self.client.connection,
+                         'invoke_iter_elem',
                          mock.Mock(side_effect=self._mock_api_error()))
 
         result = self.client._get_aggregate_disk_types(
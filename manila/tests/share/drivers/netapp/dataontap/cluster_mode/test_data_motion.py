@@ -74,7 +74,8 @@ class NetAppCDOTDataMotionTestCase(test.TestCase):
         self.mock_cmode_client.assert_called_once_with(
             hostname='fake_hostname', password='fake_password',
             username='fake_user', transport_type='https', port=8866,
-            trace=mock.ANY, vserver=None)
+            trace=mock.ANY, vserver=None, connection_pool_size=10,
+            api_timeout=None)
 
     def test_get_client_for_backend_with_vserver(self):
         self.mock_object(data_motion, "get_backend_configuration",
@@ -88,7 +89,8 @@ class NetAppCDOTDataMotionTestCase(test.TestCase):
         self.mock_cmode_client.assert_called_once_with(
             hostname='fake_hostname', password='fake_password',
             username='fake_user', transport_type='https', port=8866,
-            trace=mock.ANY, vserver='fake_vserver')
+            trace=mock.ANY, vserver='fake_vserver', connection_pool_size=10,
+            api_timeout=None)
 
     def test_get_config_for_backend(self):
         self.mock_object(data_motion, "CONF")
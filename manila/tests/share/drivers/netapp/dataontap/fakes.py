@@ -73,7 +73,9 @@ CLIENT_KWARGS = {
     'vserver': None,
     'transport_type': 'https',
     'password': 'pass',
-    'port': '443'
+    'port': '443',
+    'connection_pool_size': 10,
+    'api_timeout': None,
 }
 
 SHARE = {
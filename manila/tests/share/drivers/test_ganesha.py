@@ -218,6 +218,25 @@ class GaneshaNASHelperTestCase(test.TestCase):
         ret = self._helper._fsal_hook('/fakepath', self.share, self.access)
         self.assertEqual({}, ret)
 
+    def test_make_export(self):
+        mock_ganesha_utils_patch = mock.Mock()
+
+        def fake_patch_run(tmpl1, tmpl2, tmpl3):
+            mock_ganesha_utils_patch(copy.deepcopy(tmpl1), tmpl2, tmpl3)
+            tmpl1.update(tmpl3)
+
+        self.mock_object(self._helper, '_fsal_hook',
+                         mock.Mock(return_value='fakefsal'))
+        self.mock_object(ganesha.ganesha_utils, 'patch',
+                         mock.Mock(side_effect=fake_patch_run))
+        ret = self._helper._make_export(fake_basepath, self.share,
+                                        self.access, 101)
+        self._helper._fsal_hook.assert_called_once_with(
+            fake_basepath, self.share, self.access)
+        mock_ganesha_utils_patch.assert_called_once_with(
+            {}, self._helper.export_template, fake_output_template)
+        self.assertEqual((fake_export_name, fake_output_template), ret)
+
     def test_allow_access(self):
         mock_ganesha_utils_patch = mock.Mock()
 
@@ -249,6 +268,7 @@ class GaneshaNASHelperTestCase(test.TestCase):
         self.assertRaises(exception.InvalidShareAccess,
                           self._helper._allow_access, '/fakepath',
                           self.share, access)
+        self.assertFalse(self._helper.ganesha.get_export_id.called)
 
     def test_deny_access(self):
         ret = self._helper._deny_access('/fakepath', self.share, self.access)
@@ -258,45 +278,75 @@ class GaneshaNASHelperTestCase(test.TestCase):
 
     @ddt.data({}, {'recovery': False})
     def test_update_access_for_allow(self, kwargs):
-        self.mock_object(self._helper, '_allow_access')
-        self.mock_object(self._helper, '_deny_access')
+        access1 = fake_share.fake_access(id='accid1', access_to='10.0.0.1')
+        access2 = fake_share.fake_access(id='accid2', access_to='10.0.0.2')
+        self._helper.ganesha.get_export_ids.return_value = [101, 102]
+        self.mock_object(self._helper, '_make_export',
+                         mock.Mock(side_effect=lambda b, s, a, x: (a['id'],
+                                                                   x)))
 
         self._helper.update_access(
-            '/some/path', 'aShare', add_rules=["example.com"], delete_rules=[],
-            **kwargs)
-
-        self._helper._allow_access.assert_called_once_with(
-            '/some/path', 'aShare', 'example.com')
-
-        self.assertFalse(self._helper._deny_access.called)
+            '/some/path', self.share, add_rules=[access1, access2],
+            delete_rules=[], **kwargs)
+
+        self._helper.ganesha.get_export_ids.assert_called_once_with(2)
+        self._helper._make_export.assert_has_calls([
+            mock.call('/some/path', self.share, access1, 101),
+            mock.call('/some/path', self.share, access2, 102)])
+        self._helper.ganesha.update_exports.assert_called_once_with(
+            add_exports=[('accid1', 101), ('accid2', 102)],
+            remove_exports=[])
+        self.assertFalse(self._helper.ganesha.get_export_id.called)
+        self.assertFalse(self._helper.ganesha.add_export.called)
         self.assertFalse(self._helper.ganesha.reset_exports.called)
         self.assertFalse(self._helper.ganesha.restart_service.called)
 
     def test_update_access_for_deny(self):
-        self.mock_object(self._helper, '_allow_access')
-        self.mock_object(self._helper, '_deny_access')
+        self._helper.ganesha.get_export_ids.return_value = []
+        access1 = fake_share.fake_access(id='accid1')
+        access2 = fake_share.fake_access(id='accid2')
 
         self._helper.update_access(
-            '/some/path', 'aShare', [], delete_rules=["example.com"])
-
-        self._helper._deny_access.assert_called_once_with(
-            '/some/path', 'aShare', 'example.com')
+            '/some/path', self.share, [], delete_rules=[access1, access2])
 
-        self.assertFalse(self._helper._allow_access.called)
+        self._helper.ganesha.update_exports.assert_called_once_with(
+            add_exports=[],
+            remove_exports=['fakename--accid1', 'fakename--accid2'])
+        self.assertFalse(self._helper.ganesha.remove_export.called)
         self.assertFalse(self._helper.ganesha.reset_exports.called)
         self.assertFalse(self._helper.ganesha.restart_service.called)
 
-    def test_update_access_recovery(self):
-        self.mock_object(self._helper, '_allow_access')
-        self.mock_object(self._helper, '_deny_access')
+    def test_update_access_no_rules(self):
+        self._helper.ganesha.get_export_ids.return_value = []
 
-        self._helper.update_access(
-            '/some/path', 'aShare', add_rules=["example.com"], delete_rules=[],
-            recovery=True)
+        self._helper.update_access('/some/path', self.share, [], [])
+
+        self.assertFalse(self._helper.ganesha.update_exports.called)
 
-        self._helper._allow_access.assert_called_once_with(
-            '/some/path', 'aShare', 'example.com')
+    def test_update_access_invalid_rule(self):
+        access = fake_share.fake_access(access_type='notip')
+
+        self.assertRaises(exception.InvalidShareAccess,
+                          self._helper.update_access, '/some/path',
+                          self.share, [self.access, access], [])
+
+        self.assertFalse(self._helper.ganesha.get_export_ids.called)
+        self.assertFalse(self._helper.ganesha.update_exports.called)
 
-        self.assertFalse(self._helper._deny_access.called)
+    def test_update_access_recovery(self):
+        self._helper.ganesha.get_export_ids.return_value = [101]
+        self.mock_object(self._helper, '_make_export',
+                         mock.Mock(return_value=(fake_export_name,
+                                                 fake_output_template)))
+
+        self._helper.update_access(
+            '/some/path', self.share, add_rules=[self.access],
+            delete_rules=[], recovery=True)
+
+        self._helper._make_export.assert_called_once_with(
+            '/some/path', self.share, self.access, 101)
+        self._helper.ganesha.update_exports.assert_called_once_with(
+            add_exports=[(fake_export_name, fake_output_template)],
+            remove_exports=[])
         self.assertTrue(self._helper.ganesha.reset_exports.called)
         self.assertTrue(self._helper.ganesha.restart_service.called)
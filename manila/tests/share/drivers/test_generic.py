@@ -880,29 +880,48 @@ class GenericShareDriverTestCase(test.TestCase):
                           self._context,
                           self.share)
 
+    def _mock_volume_watcher(self, volumes):
+
+        def fake_wait(volume_id, check, timeout):
+            for item in volumes:
+                if check(item):
+                    return True, item
+            return False, volumes[-1]
+
+        return self.mock_object(self._driver.volume_watcher, 'wait',
+                                mock.Mock(side_effect=fake_wait))
+
     def test_wait_for_available_volume(self):
         fake_volume = {'status': 'creating', 'id': 'fake'}
         fake_available_volume = {'status': 'available', 'id': 'fake'}
-        self.mock_object(self._driver.volume_api, 'get',
-                         mock.Mock(return_value=fake_available_volume))
+        mock_wait = self._mock_volume_watcher([fake_available_volume])
 
         actual_result = self._driver._wait_for_available_volume(
             fake_volume, 5, "error", "timeout")
 
         self.assertEqual(fake_available_volume, actual_result)
-        self._driver.volume_api.get.assert_called_once_with(
-            mock.ANY, fake_volume['id'])
+        mock_wait.assert_called_once_with(fake_volume['id'], mock.ANY, 5)
 
-    @mock.patch('time.sleep')
-    def test_wait_for_available_volume_error_extending(self, mock_sleep):
+    def test_wait_for_available_volume_already_available(self):
+        fake_volume = {'status': 'available', 'id': 'fake'}
+        mock_wait = self._mock_volume_watcher([])
+
+        actual_result = self._driver._wait_for_available_volume(
+            fake_volume, 5, "error", "timeout")
+
+        self.assertEqual(fake_volume, actual_result)
+        self.assertFalse(mock_wait.called)
+
+    def test_wait_for_available_volume_error_extending(self):
         fake_volume = {'status': 'error_extending', 'id': 'fake'}
+        mock_wait = self._mock_volume_watcher([])
+
         self.assertRaises(exception.ManilaException,
                           self._driver._wait_for_available_volume,
                           fake_volume, 5, 'error', 'timeout')
-        self.assertFalse(mock_sleep.called)
+        self.assertFalse(mock_wait.called)
 
-    @mock.patch('time.sleep')
-    def test_wait_for_extending_volume(self, mock_sleep):
+    def test_wait_for_extending_volume(self):
         initial_size = 1
         expected_size = 2
         mock_volume = fake_volume.FakeVolume(status='available',
@@ -911,30 +930,21 @@ class GenericShareDriverTestCase(test.TestCase):
                                                     size=initial_size)
         mock_extended_vol = fake_volume.FakeVolume(status='available',
                                                    size=expected_size)
-
-        self.mock_object(self._driver.volume_api, 'get',
-                         mock.Mock(side_effect=[mock_extending_vol,
-                                                mock_extended_vol]))
+        mock_wait = self._mock_volume_watcher([mock_extending_vol,
+                                               mock_extended_vol])
 
         result = self._driver._wait_for_available_volume(
             mock_volume, 5, "error", "timeout",
             expected_size=expected_size)
 
-        expected_get_count = 2
-
         self.assertEqual(mock_extended_vol, result)
-        self._driver.volume_api.get.assert_has_calls(
-            [mock.call(self._driver.admin_context, mock_volume['id'])] *
-            expected_get_count)
-        mock_sleep.assert_has_calls([mock.call(1)] * expected_get_count)
-
-    @ddt.data(mock.Mock(return_value={'status': 'creating', 'id': 'fake'}),
-              mock.Mock(return_value={'status': 'error', 'id': 'fake'}))
-    def test_wait_for_available_volume_invalid(self, volume_get_mock):
+        mock_wait.assert_called_once_with(mock_volume['id'], mock.ANY, 5)
+
+    @ddt.data({'status': 'creating', 'id': 'fake'},
+              {'status': 'error', 'id': 'fake'})
+    def test_wait_for_available_volume_invalid(self, volume):
         fake_volume = {'status': 'creating', 'id': 'fake'}
-        self.mock_object(self._driver.volume_api, 'get', volume_get_mock)
-        self.mock_object(time, 'time',
-                         mock.Mock(side_effect=[1.0, 1.33, 1.67, 2.0]))
+        self._mock_volume_watcher([volume])
 
         self.assertRaises(
             exception.ManilaException,
@@ -942,6 +952,21 @@ class GenericShareDriverTestCase(test.TestCase):
             fake_volume, 1, "error", "timeout"
         )
 
+    def test_volume_watcher(self):
+        self.mock_object(self._driver.volume_api, 'get',
+                         mock.Mock(return_value=mock.sentinel.volume))
+        self.mock_object(self._driver.volume_api, 'get_all',
+                         mock.Mock(return_value=[mock.sentinel.volume]))
+
+        self.assertEqual(mock.sentinel.volume,
+                         self._driver.volume_watcher.get_func('fake'))
+        self.assertEqual([mock.sentinel.volume],
+                         self._driver.volume_watcher.list_func())
+        self._driver.volume_api.get.assert_called_once_with(
+            self._driver.admin_context, 'fake')
+        self._driver.volume_api.get_all.assert_called_once_with(
+            self._driver.admin_context)
+
     def test_deallocate_container(self):
         fake_vol = fake_volume.FakeVolume()
         self.mock_object(self._driver, '_get_volume',
@@ -1284,86 +1309,17 @@ class GenericShareDriverTestCase(test.TestCase):
             assert_called_once_with(
                 self._driver.admin_context, server_details)
 
-    def test_ssh_exec_connection_not_exist(self):
-        ssh_conn_timeout = 30
-        CONF.set_default('ssh_conn_timeout', ssh_conn_timeout)
+    def test_ssh_exec(self):
         ssh_output = 'fake_ssh_output'
         cmd = ['fake', 'command']
-        ssh = mock.Mock()
-        ssh.get_transport = mock.Mock()
-        ssh.get_transport().is_active = mock.Mock(return_value=True)
-        ssh_pool = mock.Mock()
-        ssh_pool.create = mock.Mock(return_value=ssh)
-        self.mock_object(utils, 'SSHPool', mock.Mock(return_value=ssh_pool))
-        self.mock_object(processutils, 'ssh_execute',
+        self.mock_object(self._driver.ssh_sessions, 'execute',
                          mock.Mock(return_value=ssh_output))
-        self._driver.ssh_connections = {}
 
-        result = self._driver._ssh_exec(self.server, cmd)
+        result = self._driver._ssh_exec(self.server, cmd,
+                                        check_exit_code=False)
 
-        utils.SSHPool.assert_called_once_with(
-            self.server['ip'], 22, ssh_conn_timeout, self.server['username'],
-            self.server['password'], self.server['pk_path'], max_size=1)
-        ssh_pool.create.assert_called_once_with()
-        processutils.ssh_execute.assert_called_once_with(
-            ssh, 'fake command', check_exit_code=True)
-        ssh.get_transport().is_active.assert_called_once_with()
-        self.assertEqual(
-            self._driver.ssh_connections,
-            {self.server['instance_id']: (ssh_pool, ssh)}
-        )
-        self.assertEqual(ssh_output, result)
-
-    def test_ssh_exec_connection_exist(self):
-        ssh_output = 'fake_ssh_output'
-        cmd = ['fake', 'command']
-        ssh = mock.Mock()
-        ssh.get_transport = mock.Mock()
-        ssh.get_transport().is_active = mock.Mock(side_effect=lambda: True)
-        ssh_pool = mock.Mock()
-        self.mock_object(processutils, 'ssh_execute',
-                         mock.Mock(return_value=ssh_output))
-        self._driver.ssh_connections = {
-            self.server['instance_id']: (ssh_pool, ssh)
-        }
-
-        result = self._driver._ssh_exec(self.server, cmd)
-
-        processutils.ssh_execute.assert_called_once_with(
-            ssh, 'fake command', check_exit_code=True)
-        ssh.get_transport().is_active.assert_called_once_with()
-        self.assertEqual(
-            self._driver.ssh_connections,
-            {self.server['instance_id']: (ssh_pool, ssh)}
-        )
-        self.assertEqual(ssh_output, result)
-
-    def test_ssh_exec_connection_recreation(self):
-        ssh_output = 'fake_ssh_output'
-        cmd = ['fake', 'command']
-        ssh = mock.Mock()
-        ssh.get_transport = mock.Mock()
-        ssh.get_transport().is_active = mock.Mock(side_effect=lambda: False)
-        ssh_pool = mock.Mock()
-        ssh_pool.create = mock.Mock(side_effect=lambda: ssh)
-        ssh_pool.remove = mock.Mock()
-        self.mock_object(processutils, 'ssh_execute',
-                         mock.Mock(return_value=ssh_output))
-        self._driver.ssh_connections = {
-            self.server['instance_id']: (ssh_pool, ssh)
-        }
-
-        result = self._driver._ssh_exec(self.server, cmd)
-
-        processutils.ssh_execute.assert_called_once_with(
-            ssh, 'fake command', check_exit_code=True)
-        ssh.get_transport().is_active.assert_called_once_with()
-        ssh_pool.create.assert_called_once_with()
-        ssh_pool.remove.assert_called_once_with(ssh)
-        self.assertEqual(
-            self._driver.ssh_connections,
-            {self.server['instance_id']: (ssh_pool, ssh)}
-        )
+        self._driver.ssh_sessions.execute.assert_called_once_with(
+            self.server, cmd, check_exit_code=False)
         self.assertEqual(ssh_output, result)
 
     def test_get_share_stats_refresh_false(self):
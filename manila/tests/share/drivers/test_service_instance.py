@@ -978,8 +978,7 @@ class ServiceInstanceManagerTestCase(test.TestCase):
                                   fixed_ips=[{'ip_address': ip_address}]),
                 admin_port={'id': 'fake_admin_port',
                             'fixed_ips': [{'ip_address': ip_address}]}))
-        self.mock_object(service_instance.time, 'time',
-                         mock.Mock(return_value=5))
+        self._manager.instance_watcher.min_interval = 0
         self.mock_object(self._manager.network_helper, 'setup_network',
                          mock.Mock(return_value=network_data))
         self.mock_object(self._manager.network_helper, 'get_network_name',
@@ -1017,7 +1016,6 @@ class ServiceInstanceManagerTestCase(test.TestCase):
             self._manager.admin_context, instance_name, network_info)
 
         self.assertEqual(expected, result)
-        self.assertTrue(service_instance.time.time.called)
         self._manager.network_helper.setup_network.assert_called_once_with(
             network_info)
         self._manager._get_service_image.assert_called_once_with(
@@ -1078,8 +1076,7 @@ class ServiceInstanceManagerTestCase(test.TestCase):
             'id': 'fakeid', 'status': 'ACTIVE', 'networks':
             {net_name: [ip_address]}}
 
-        self.mock_object(service_instance.time, 'time',
-                         mock.Mock(return_value=5))
+        self._manager.instance_watcher.min_interval = 0
         self.mock_object(self._manager.network_helper, 'setup_network',
                          mock.Mock(return_value=network_data))
         self.mock_object(self._manager.network_helper, 'get_network_name',
@@ -1101,7 +1098,6 @@ class ServiceInstanceManagerTestCase(test.TestCase):
             exception.AdminIPNotFound, self._manager._create_service_instance,
             self._manager.admin_context, instance_name, network_info)
 
-        self.assertTrue(service_instance.time.time.called)
         self._manager.network_helper.setup_network.assert_called_once_with(
             network_info)
         self._manager._get_service_image.assert_called_once_with(
@@ -1241,29 +1237,17 @@ class ServiceInstanceManagerTestCase(test.TestCase):
         self._manager._get_key.assert_called_once_with(
             self._manager.admin_context)
 
-    @mock.patch('time.sleep')
-    @mock.patch('time.time')
-    def _test_wait_for_instance(self, mock_time, mock_sleep,
-                                server_get_side_eff=None,
-                                expected_try_count=1,
-                                expected_sleep_count=0,
-                                expected_ret_val=None,
+    def _test_wait_for_instance(self, servers, expected_ret_val=None,
                                 expected_exc=None):
-        mock_server_get = mock.Mock(side_effect=server_get_side_eff)
-        self.mock_object(self._manager.compute_api, 'server_get',
-                         mock_server_get)
 
-        self.fake_time = 0
+        def fake_wait(instance_id, check, timeout):
+            for server in servers:
+                if check(server):
+                    return True, server
+            return False, servers[-1] if servers else None
 
-        def fake_time():
-            return self.fake_time
-
-        def fake_sleep(sleep_time):
-            self.fake_time += sleep_time
-
-        # Note(lpetrut): LOG methods can call time.time
-        mock_time.side_effect = fake_time
-        mock_sleep.side_effect = fake_sleep
+        mock_wait = self.mock_object(self._manager.instance_watcher, 'wait',
+                                     mock.Mock(side_effect=fake_wait))
         timeout = 3
 
         if expected_exc:
@@ -1278,40 +1262,51 @@ class ServiceInstanceManagerTestCase(test.TestCase):
                 timeout=timeout)
             self.assertEqual(expected_ret_val, instance)
 
-        mock_server_get.assert_has_calls(
-            [mock.call(self._manager.admin_context,
-                       mock.sentinel.instance_id)] * expected_try_count)
-        mock_sleep.assert_has_calls([mock.call(1)] * expected_sleep_count)
+        mock_wait.assert_called_once_with(mock.sentinel.instance_id,
+                                          mock.ANY, timeout)
 
     def test_wait_for_instance_timeout(self):
-        server_get_side_eff = [
-            exception.InstanceNotFound(
-                instance_id=mock.sentinel.instance_id),
-            {'status': 'BUILDING'},
-            {'status': 'ACTIVE'}]
         # Note that in this case, although the status is active, the
         # 'networks' field is missing.
         self._test_wait_for_instance(
-            server_get_side_eff=server_get_side_eff,
-            expected_exc=exception.ServiceInstanceException,
-            expected_try_count=3,
-            expected_sleep_count=3)
+            [{'status': 'BUILDING'}, {'status': 'ACTIVE'}],
+            expected_exc=exception.ServiceInstanceException)
+
+    def test_wait_for_instance_never_found(self):
+        self._test_wait_for_instance(
+            [], expected_exc=exception.ServiceInstanceException)
 
     def test_wait_for_instance_error_state(self):
         mock_instance = {'status': 'ERROR'}
         self._test_wait_for_instance(
-            server_get_side_eff=[mock_instance],
-            expected_exc=exception.ServiceInstanceException,
-            expected_try_count=1)
+            [mock_instance, {'status': 'ACTIVE', 'networks': {}}],
+            expected_exc=exception.ServiceInstanceException)
 
     def test_wait_for_instance_available(self):
         mock_instance = {'status': 'ACTIVE',
                          'networks': mock.sentinel.networks}
         self._test_wait_for_instance(
-            server_get_side_eff=[mock_instance],
-            expected_try_count=1,
+            [{'status': 'BUILDING'}, mock_instance],
             expected_ret_val=mock_instance)
 
+    def test_instance_watcher(self):
+        self.mock_object(self._manager.compute_api, 'server_get',
+                         mock.Mock(return_value=mock.sentinel.server))
+        self.mock_object(self._manager.compute_api, 'server_list',
+                         mock.Mock(return_value=[mock.sentinel.server]))
+
+        self.assertEqual(
+            mock.sentinel.server,
+            self._manager.instance_watcher.get_func('fake_instance_id'))
+        self.assertEqual([mock.sentinel.server],
+                         self._manager.instance_watcher.list_func())
+        self._manager.compute_api.server_get.assert_called_once_with(
+            self._manager.admin_context, 'fake_instance_id')
+        self._manager.compute_api.server_list.assert_called_once_with(
+            self._manager.admin_context)
+        self.assertEqual((exception.InstanceNotFound, ),
+                         self._manager.instance_watcher.ignored_exceptions)
+
     def test_reboot_server(self):
         fake_server = {'instance_id': mock.sentinel.instance_id}
         soft_reboot = True
@@ -14,6 +14,7 @@
 #    under the License.
 
 import ddt
+import eventlet
 import mock
 
 from manila.common import constants
@@ -67,8 +68,6 @@ class ShareInstanceAccessTestCase(test.TestCase):
         self.mock_object(self.driver, "update_access", mock.Mock())
         self.mock_object(self.share_access_helper,
                          "_remove_access_rules", mock.Mock())
-        self.mock_object(self.share_access_helper, "_check_needs_refresh",
-                         mock.Mock(return_value=False))
 
         self.share_access_helper.update_access_rules(
             self.context, share_instance['id'],
@@ -80,8 +79,6 @@ class ShareInstanceAccessTestCase(test.TestCase):
             share_server=None)
         self.share_access_helper._remove_access_rules.assert_called_once_with(
             self.context, delete_rules, share_instance['id'])
-        self.share_access_helper._check_needs_refresh.assert_called_once_with(
-            self.context, rules, share_instance)
         db.share_instance_update_access_status.assert_called_with(
             self.context, share_instance['id'], constants.STATUS_ACTIVE)
 
@@ -143,35 +140,182 @@ class ShareInstanceAccessTestCase(test.TestCase):
                           delete_rules)
 
         self.driver.update_access.assert_called_with(
-            self.context, self.share_instance, [], add_rules=add_rules,
-            delete_rules=original_rules, share_server=None)
+            self.context, self.share_instance, add_rules,
+            add_rules=add_rules, delete_rules=original_rules,
+            share_server=None)
 
         db.share_instance_update_access_status.assert_called_with(
             self.context, self.share_instance['id'], constants.STATUS_ERROR)
 
-    def test_update_access_rules_recursive_call(self):
+    def test_update_access_rules_queued_changes(self):
         share_instance = db_utils.create_share_instance(
             access_rules_status=constants.STATUS_ACTIVE,
             share_id=self.share['id'])
-        add_rules = [db_utils.create_access(
-            share_id=self.share['id'])]
-        original_rules = []
+        rules = [db_utils.create_access(share_id=self.share['id'])
+                 for i in range(4)]
+        queued = []
+
+        def _update_access(*args, **kwargs):
+            if mock_update_access.call_count > 1:
+                return
+            # Changes requested while the driver applies the first one.
+            for rule in rules[1:]:
+                queued.append(eventlet.spawn(
+                    self.share_access_helper.update_access_rules,
+                    self.context, share_instance['id'], add_rules=[rule]))
+            queued.append(eventlet.spawn(
+                self.share_access_helper.update_access_rules,
+                self.context, share_instance['id'],
+                delete_rules=[rules[0], rules[3]]))
+            eventlet.sleep(0)
 
         self.mock_object(db, "share_instance_get", mock.Mock(
             return_value=share_instance))
         self.mock_object(db, "share_access_get_all_for_instance",
-                         mock.Mock(return_value=original_rules))
-        mock_update_access = self.mock_object(self.driver, "update_access")
-        self.mock_object(self.share_access_helper, '_check_needs_refresh',
-                         mock.Mock(side_effect=[True, False]))
+                         mock.Mock(return_value=rules))
+        self.mock_object(db, "share_instance_update_access_status")
+        self.mock_object(self.share_access_helper, "_remove_access_rules")
+        mock_update_access = self.mock_object(
+            self.driver, "update_access",
+            mock.Mock(side_effect=_update_access))
 
-        self.share_access_helper.update_access_rules(self.context,
-                                                     share_instance['id'],
-                                                     add_rules=add_rules)
+        self.share_access_helper.update_access_rules(
+            self.context, share_instance['id'], add_rules=rules[:1])
 
+        # The queued requests return once their changes are applied.
+        self.assertEqual([None] * 4, [thread.wait() for thread in queued])
         mock_update_access.assert_has_calls([
-            mock.call(self.context, share_instance, original_rules,
-                      add_rules=add_rules, delete_rules=[], share_server=None),
-            mock.call(self.context, share_instance, original_rules,
-                      add_rules=[], delete_rules=[], share_server=None)
+            mock.call(self.context, share_instance, rules,
+                      add_rules=rules[:1], delete_rules=[],
+                      share_server=None),
+            mock.call(self.context, share_instance, rules[1:3],
+                      add_rules=rules[1:3], delete_rules=[rules[0]],
+                      share_server=None),
         ])
+        self.assertEqual(2, mock_update_access.call_count)
+        self.share_access_helper._remove_access_rules.assert_has_calls([
+            mock.call(self.context, [], share_instance['id']),
+            mock.call(self.context, [rules[0], rules[3]],
+                      share_instance['id']),
+        ])
+        db.share_instance_update_access_status.assert_has_calls([
+            mock.call(self.context, share_instance['id'],
+                      constants.STATUS_UPDATING),
+            mock.call(self.context, share_instance['id'],
+                      constants.STATUS_UPDATING),
+            mock.call(self.context, share_instance['id'],
+                      constants.STATUS_ACTIVE),
+        ])
+        self.assertEqual({}, self.share_access_helper._pending_updates)
+
+    def test_update_access_rules_queued_add_after_delete_all(self):
+        share_instance = db_utils.create_share_instance(
+            access_rules_status=constants.STATUS_ACTIVE,
+            share_id=self.share['id'])
+        rules = [db_utils.create_access(share_id=self.share['id'])
+                 for i in range(2)]
+        queued = []
+
+        def _update_access(*args, **kwargs):
+            if mock_update_access.call_count > 1:
+                return
+            queued.append(eventlet.spawn(
+                self.share_access_helper.update_access_rules,
+                self.context, share_instance['id'], delete_rules='all'))
+            queued.append(eventlet.spawn(
+                self.share_access_helper.update_access_rules,
+                self.context, share_instance['id'], add_rules=rules[1:]))
+            eventlet.sleep(0)
+
+        self.mock_object(db, "share_instance_get", mock.Mock(
+            return_value=share_instance))
+        self.mock_object(db, "share_access_get_all_for_instance",
+                         mock.Mock(return_value=rules))
+        self.mock_object(db, "share_instance_update_access_status")
+        self.mock_object(self.share_access_helper, "_remove_access_rules")
+        mock_update_access = self.mock_object(
+            self.driver, "update_access",
+            mock.Mock(side_effect=_update_access))
+
+        self.share_access_helper.update_access_rules(
+            self.context, share_instance['id'], add_rules=rules[:1])
+
+        self.assertEqual([None] * 2, [thread.wait() for thread in queued])
+        mock_update_access.assert_called_with(
+            self.context, share_instance, rules[1:], add_rules=rules[1:],
+            delete_rules=rules[:1], share_server=None)
+        self.assertEqual(2, mock_update_access.call_count)
+        self.share_access_helper._remove_access_rules.assert_called_with(
+            self.context, rules[:1], share_instance['id'])
+
+    def test_update_access_rules_exception_applies_queued_changes(self):
+        share_instance = db_utils.create_share_instance(
+            access_rules_status=constants.STATUS_ACTIVE,
+            share_id=self.share['id'])
+        rules = [db_utils.create_access(share_id=self.share['id'])
+                 for i in range(2)]
+        queued = []
+
+        def _update_access(*args, **kwargs):
+            if mock_update_access.call_count > 1:
+                return
+            queued.append(eventlet.spawn(
+                self.share_access_helper.update_access_rules,
+                self.context, share_instance['id'], add_rules=rules[1:]))
+            eventlet.sleep(0)
+            raise exception.ManilaException()
+
+        self.mock_object(db, "share_instance_get", mock.Mock(
+            return_value=share_instance))
+        self.mock_object(db, "share_access_get_all_for_instance",
+                         mock.Mock(return_value=rules))
+        self.mock_object(db, "share_instance_update_access_status")
+        self.mock_object(self.share_access_helper, "_remove_access_rules")
+        mock_update_access = self.mock_object(
+            self.driver, "update_access",
+            mock.Mock(side_effect=_update_access))
+
+        self.assertRaises(exception.ManilaException,
+                          self.share_access_helper.update_access_rules,
+                          self.context, share_instance['id'],
+                          add_rules=rules[:1])
+
+        self.assertIsNone(queued[0].wait())
+        mock_update_access.assert_called_with(
+            self.context, share_instance, rules, add_rules=rules[1:],
+            delete_rules=[], share_server=None)
+        self.assertEqual(2, mock_update_access.call_count)
+        self.assertEqual({}, self.share_access_helper._pending_updates)
+
+    def test_update_access_rules_queued_changes_exception(self):
+        share_instance = db_utils.create_share_instance(
+            access_rules_status=constants.STATUS_ACTIVE,
+            share_id=self.share['id'])
+        rules = [db_utils.create_access(share_id=self.share['id'])]
+        queued = []
+
+        def _update_access(*args, **kwargs):
+            if mock_update_access.call_count > 1:
+                raise exception.ManilaException()
+            queued.append(eventlet.spawn(
+                self.share_access_helper.update_access_rules,
+                self.context, share_instance['id'], delete_rules='all'))
+            eventlet.sleep(0)
+
+        self.mock_object(db, "share_instance_get", mock.Mock(
+            return_value=share_instance))
+        self.mock_object(db, "share_access_get_all_for_instance",
+                         mock.Mock(return_value=rules))
+        self.mock_object(db, "share_instance_update_access_status")
+        self.mock_object(self.share_access_helper, "_remove_access_rules")
+        mock_update_access = self.mock_object(
+            self.driver, "update_access",
+            mock.Mock(side_effect=_update_access))
+
+        self.share_access_helper.update_access_rules(
+            self.context, share_instance['id'], add_rules=rules)
+
+        # The caller that requested the failed changes gets the exception.
+        self.assertRaises(exception.ManilaException, queued[0].wait)
+        self.assertEqual(2, mock_update_access.call_count)
+        self.assertEqual({}, self.share_access_helper._pending_updates)
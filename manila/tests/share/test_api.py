@@ -303,7 +303,8 @@ class ShareAPITestCase(test.TestCase):
             ctx, 'share', 'get_all')
         db_api.share_get_all_by_project.assert_called_once_with(
             ctx, sort_dir='desc', sort_key='created_at',
-            project_id='fake_pid_1', filters={}, is_public=False
+            project_id='fake_pid_1', filters={}, is_public=False,
+            limit=None, offset=None, marker=None
         )
         self.assertEqual(_FAKE_LIST_OF_ALL_SHARES[0], shares)
 
@@ -315,7 +316,8 @@ class ShareAPITestCase(test.TestCase):
         share_api.policy.check_policy.assert_called_once_with(
             ctx, 'share', 'get_all')
         db_api.share_get_all.assert_called_once_with(
-            ctx, sort_dir='desc', sort_key='created_at', filters={})
+            ctx, sort_dir='desc', sort_key='created_at', filters={},
+            limit=None, offset=None, marker=None)
         self.assertEqual(_FAKE_LIST_OF_ALL_SHARES, shares)
 
     def test_get_all_non_admin_filter_by_share_server(self):
@@ -354,7 +356,7 @@ class ShareAPITestCase(test.TestCase):
         ])
         db_api.share_get_all_by_share_server.assert_called_once_with(
             ctx, 'fake_server_3', sort_dir='desc', sort_key='created_at',
-            filters={},
+            filters={}, limit=None, offset=None, marker=None,
         )
         db_api.share_get_all_by_project.assert_has_calls([])
         db_api.share_get_all.assert_has_calls([])
@@ -370,7 +372,8 @@ class ShareAPITestCase(test.TestCase):
         ])
         db_api.share_get_all_by_project.assert_called_once_with(
             ctx, sort_dir='desc', sort_key='created_at',
-            project_id='fake_pid_2', filters={}, is_public=False
+            project_id='fake_pid_2', filters={}, is_public=False,
+            limit=None, offset=None, marker=None
         )
         self.assertEqual(_FAKE_LIST_OF_ALL_SHARES[1::2], shares)
 
@@ -383,34 +386,41 @@ class ShareAPITestCase(test.TestCase):
             mock.call(ctx, 'share', 'get_all'),
         ])
         db_api.share_get_all.assert_called_once_with(
-            ctx, sort_dir='desc', sort_key='created_at', filters={})
+            ctx, sort_dir='desc', sort_key='created_at', filters={},
+            limit=None, offset=None, marker=None)
         self.assertEqual(_FAKE_LIST_OF_ALL_SHARES[::2], shares)
 
     def test_get_all_admin_filter_by_status(self):
         ctx = context.RequestContext('fake_uid', 'fake_pid_2', is_admin=True)
-        self.mock_object(db_api, 'share_get_all_by_project',
-                         mock.Mock(return_value=_FAKE_LIST_OF_ALL_SHARES[1:]))
+        self.mock_object(
+            db_api, 'share_get_all_by_project',
+            mock.Mock(return_value=_FAKE_LIST_OF_ALL_SHARES[2::4]))
         shares = self.api.get_all(ctx, {'status': constants.STATUS_AVAILABLE})
         share_api.policy.check_policy.assert_has_calls([
             mock.call(ctx, 'share', 'get_all'),
         ])
         db_api.share_get_all_by_project.assert_called_once_with(
             ctx, sort_dir='desc', sort_key='created_at',
-            project_id='fake_pid_2', filters={}, is_public=False
+            project_id='fake_pid_2',
+            filters={'status': constants.STATUS_AVAILABLE}, is_public=False,
+            limit=None, offset=None, marker=None
         )
         self.assertEqual(_FAKE_LIST_OF_ALL_SHARES[2::4], shares)
 
     def test_get_all_admin_filter_by_status_and_all_tenants(self):
         ctx = context.RequestContext('fake_uid', 'fake_pid_2', is_admin=True)
-        self.mock_object(db_api, 'share_get_all',
-                         mock.Mock(return_value=_FAKE_LIST_OF_ALL_SHARES))
+        self.mock_object(
+            db_api, 'share_get_all',
+            mock.Mock(return_value=_FAKE_LIST_OF_ALL_SHARES[1::2]))
         shares = self.api.get_all(
             ctx, {'status': constants.STATUS_ERROR, 'all_tenants': 1})
         share_api.policy.check_policy.assert_has_calls([
             mock.call(ctx, 'share', 'get_all'),
         ])
         db_api.share_get_all.assert_called_once_with(
-            ctx, sort_dir='desc', sort_key='created_at', filters={})
+            ctx, sort_dir='desc', sort_key='created_at',
+            filters={'status': constants.STATUS_ERROR},
+            limit=None, offset=None, marker=None)
         self.assertEqual(_FAKE_LIST_OF_ALL_SHARES[1::2], shares)
 
     def test_get_all_non_admin_filter_by_all_tenants(self):
@@ -424,7 +434,8 @@ class ShareAPITestCase(test.TestCase):
         ])
         db_api.share_get_all_by_project.assert_called_once_with(
             ctx, sort_dir='desc', sort_key='created_at',
-            project_id='fake_pid_2', filters={}, is_public=False
+            project_id='fake_pid_2', filters={}, is_public=False,
+            limit=None, offset=None, marker=None
         )
         self.assertEqual(_FAKE_LIST_OF_ALL_SHARES[1:], shares)
 
@@ -439,7 +450,9 @@ class ShareAPITestCase(test.TestCase):
         ])
         db_api.share_get_all_by_project.assert_called_once_with(
             ctx, sort_dir='desc', sort_key='created_at',
-            project_id='fake_pid_2', filters={}, is_public=False
+            project_id='fake_pid_2',
+            filters={'status': constants.STATUS_ERROR}, is_public=False,
+            limit=None, offset=None, marker=None
         )
 
         # two items expected, one filtered
@@ -455,11 +468,55 @@ class ShareAPITestCase(test.TestCase):
         ])
         db_api.share_get_all_by_project.assert_has_calls([
             mock.call(ctx, sort_dir='desc', sort_key='created_at',
-                      project_id='fake_pid_2', filters={}, is_public=False),
+                      project_id='fake_pid_2',
+                      filters={'status': constants.STATUS_ERROR},
+                      is_public=False, limit=None, offset=None, marker=None),
             mock.call(ctx, sort_dir='desc', sort_key='created_at',
-                      project_id='fake_pid_2', filters={}, is_public=False),
+                      project_id='fake_pid_2',
+                      filters={'status': constants.STATUS_AVAILABLE},
+                      is_public=False, limit=None, offset=None, marker=None),
         ])
 
+    def test_get_all_paginated_in_db(self):
+        ctx = context.RequestContext('fake_uid', 'fake_pid_2', is_admin=False)
+        self.mock_object(db_api, 'share_get_all_by_project',
+                         mock.Mock(return_value=_FAKE_LIST_OF_ALL_SHARES[2:]))
+
+        shares = self.api.get_all(
+            ctx, {'status': constants.STATUS_AVAILABLE}, limit=2, offset=1,
+            marker='fake_marker')
+
+        self.assertEqual(_FAKE_LIST_OF_ALL_SHARES[2:], shares)
+        db_api.share_get_all_by_project.assert_called_once_with(
+            ctx, sort_dir='desc', sort_key='created_at',
+            project_id='fake_pid_2',
+            filters={'status': constants.STATUS_AVAILABLE}, is_public=False,
+            limit=2, offset=1, marker='fake_marker')
+
+    def test_get_all_paginated_in_memory(self):
+        ctx = context.RequestContext('fake_uid', 'fake_pid_2', is_admin=False)
+        shares = [dict(share, id='id%d' % i, name='foo')
+                  for i, share in enumerate(_FAKE_LIST_OF_ALL_SHARES)]
+        self.mock_object(db_api, 'share_get_all_by_project',
+                         mock.Mock(return_value=shares))
+
+        result = self.api.get_all(ctx, {'name': 'foo'}, limit=1, offset=1,
+                                  marker='id0')
+
+        self.assertEqual([shares[2]], result)
+        db_api.share_get_all_by_project.assert_called_once_with(
+            ctx, sort_dir='desc', sort_key='created_at',
+            project_id='fake_pid_2', filters={}, is_public=False,
+            limit=None, offset=None, marker=None)
+
+    def test_get_all_paginated_in_memory_marker_not_found(self):
+        ctx = context.RequestContext('fake_uid', 'fake_pid_2', is_admin=False)
+        self.mock_object(db_api, 'share_get_all_by_project',
+                         mock.Mock(return_value=[{'id': 'id1', 'name': 'a'}]))
+
+        self.assertRaises(exception.InvalidInput, self.api.get_all,
+                          ctx, {'name': 'a'}, marker='fake_marker')
+
     @ddt.data('True', 'true', '1', 'yes', 'y', 'on', 't', True)
     def test_get_all_non_admin_public(self, is_public):
         ctx = context.RequestContext('fake_uid', 'fake_pid_2',
@@ -472,7 +529,8 @@ class ShareAPITestCase(test.TestCase):
         ])
         db_api.share_get_all_by_project.assert_called_once_with(
             ctx, sort_dir='desc', sort_key='created_at',
-            project_id='fake_pid_2', filters={}, is_public=True
+            project_id='fake_pid_2', filters={}, is_public=True,
+            limit=None, offset=None, marker=None
         )
         self.assertEqual(_FAKE_LIST_OF_ALL_SHARES[1:], shares)
 
@@ -488,7 +546,8 @@ class ShareAPITestCase(test.TestCase):
         ])
         db_api.share_get_all_by_project.assert_called_once_with(
             ctx, sort_dir='desc', sort_key='created_at',
-            project_id='fake_pid_2', filters={}, is_public=False
+            project_id='fake_pid_2', filters={}, is_public=False,
+            limit=None, offset=None, marker=None
         )
         self.assertEqual(_FAKE_LIST_OF_ALL_SHARES[1:], shares)
 
@@ -511,7 +570,8 @@ class ShareAPITestCase(test.TestCase):
             ctx, 'share', 'get_all')
         db_api.share_get_all_by_project.assert_called_once_with(
             ctx, sort_dir='asc', sort_key='status',
-            project_id='fake_pid_1', filters={}, is_public=False
+            project_id='fake_pid_1', filters={}, is_public=False,
+            limit=None, offset=None, marker=None
         )
         self.assertEqual(_FAKE_LIST_OF_ALL_SHARES[0], shares)
 
@@ -551,7 +611,8 @@ class ShareAPITestCase(test.TestCase):
             ctx, 'share', 'get_all')
         db_api.share_get_all_by_project.assert_called_once_with(
             ctx, sort_dir='desc', sort_key='created_at',
-            project_id='fake_pid_1', filters=search_opts, is_public=False)
+            project_id='fake_pid_1', filters=search_opts, is_public=False,
+            limit=None, offset=None, marker=None)
         self.assertEqual(_FAKE_LIST_OF_ALL_SHARES[0], shares)
 
     def test_get_all_filter_by_metadata(self):
@@ -1543,7 +1604,8 @@ class ShareAPITestCase(test.TestCase):
         share_api.policy.check_policy.assert_called_once_with(
             ctx, 'share_snapshot', 'get_all_snapshots')
         db_api.share_snapshot_get_all_by_project.assert_called_once_with(
-            ctx, 'fakepid', sort_dir='desc', sort_key='share_id', filters={})
+            ctx, 'fakepid', sort_dir='desc', sort_key='share_id', filters={},
+            limit=None, offset=None, marker=None)
 
     @mock.patch.object(db_api, 'share_snapshot_get_all', mock.Mock())
     def test_get_all_snapshots_admin_all_tenants(self):
@@ -1552,7 +1614,8 @@ class ShareAPITestCase(test.TestCase):
         share_api.policy.check_policy.assert_called_once_with(
             self.context, 'share_snapshot', 'get_all_snapshots')
         db_api.share_snapshot_get_all.assert_called_once_with(
-            self.context, sort_dir='desc', sort_key='share_id', filters={})
+            self.context, sort_dir='desc', sort_key='share_id', filters={},
+            limit=None, offset=None, marker=None)
 
     @mock.patch.object(db_api, 'share_snapshot_get_all_by_project',
                        mock.Mock())
@@ -1562,23 +1625,41 @@ class ShareAPITestCase(test.TestCase):
         share_api.policy.check_policy.assert_called_once_with(
             ctx, 'share_snapshot', 'get_all_snapshots')
         db_api.share_snapshot_get_all_by_project.assert_called_once_with(
-            ctx, 'fakepid', sort_dir='desc', sort_key='share_id', filters={})
+            ctx, 'fakepid', sort_dir='desc', sort_key='share_id', filters={},
+            limit=None, offset=None, marker=None)
 
     def test_get_all_snapshots_not_admin_search_opts(self):
-        search_opts = {'size': 'fakesize'}
-        fake_objs = [{'name': 'fakename1'}, search_opts]
+        search_opts = {'size': 'fakesize', 'fake_key': 'fake_value'}
+        fake_objs = [{'name': 'fakename1', 'size': 'fakesize'},
+                     {'size': 'fakesize', 'fake_key': 'fake_value'}]
         ctx = context.RequestContext('fakeuid', 'fakepid', is_admin=False)
         self.mock_object(db_api, 'share_snapshot_get_all_by_project',
                          mock.Mock(return_value=fake_objs))
 
         result = self.api.get_all_snapshots(ctx, search_opts)
 
-        self.assertEqual([search_opts], result)
+        self.assertEqual([fake_objs[1]], result)
         share_api.policy.check_policy.assert_called_once_with(
             ctx, 'share_snapshot', 'get_all_snapshots')
         db_api.share_snapshot_get_all_by_project.assert_called_once_with(
             ctx, 'fakepid', sort_dir='desc', sort_key='share_id',
-            filters=search_opts)
+            filters={'size': 'fakesize'}, limit=None, offset=None,
+            marker=None)
+
+    def test_get_all_snapshots_paginated_in_db(self):
+        ctx = context.RequestContext('fakeuid', 'fakepid', is_admin=False)
+        self.mock_object(db_api, 'share_snapshot_get_all_by_project',
+                         mock.Mock(return_value=['fake_snapshot']))
+
+        result = self.api.get_all_snapshots(
+            ctx, {'status': constants.STATUS_AVAILABLE}, limit=1, offset=2,
+            marker='fake_marker')
+
+        self.assertEqual(['fake_snapshot'], result)
+        db_api.share_snapshot_get_all_by_project.assert_called_once_with(
+            ctx, 'fakepid', sort_dir='desc', sort_key='share_id',
+            filters={'status': constants.STATUS_AVAILABLE}, limit=1,
+            offset=2, marker='fake_marker')
 
     def test_get_all_snapshots_with_sorting_valid(self):
         self.mock_object(
@@ -1590,7 +1671,8 @@ class ShareAPITestCase(test.TestCase):
         share_api.policy.check_policy.assert_called_once_with(
             ctx, 'share_snapshot', 'get_all_snapshots')
         db_api.share_snapshot_get_all_by_project.assert_called_once_with(
-            ctx, 'fake_pid_1', sort_dir='asc', sort_key='status', filters={})
+            ctx, 'fake_pid_1', sort_dir='asc', sort_key='status', filters={},
+            limit=None, offset=None, marker=None)
         self.assertEqual(_FAKE_LIST_OF_ALL_SNAPSHOTS[0], snapshots)
 
     def test_get_all_snapshots_sort_key_invalid(self):
@@ -559,6 +559,12 @@ class ShareDriverTestCase(test.TestCase):
                           share_driver.update_replica_state,
                           'fake_context', ['r1', 'r2'], 'fake_replica', [], [])
 
+    def test_update_replica_states(self):
+        share_driver = self._instantiate_share_driver(None, True)
+        self.assertRaises(NotImplementedError,
+                          share_driver.update_replica_states,
+                          'fake_context', ['r1', 'r2'])
+
     def test_create_replicated_snapshot(self):
         share_driver = self._instantiate_share_driver(None, False)
         self.assertRaises(NotImplementedError,
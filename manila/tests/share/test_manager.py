@@ -173,7 +173,8 @@ class ShareManagerTestCase(test.TestCase):
         self.assertTrue(self.share_manager.driver.initialized)
         self.share_manager.db.share_instances_get_all_by_host.\
             assert_called_once_with(utils.IsAMatcher(context.RequestContext),
-                                    self.share_manager.host)
+                                    self.share_manager.host,
+                                    with_share_data=True)
         self.share_manager.driver.do_setup.assert_called_once_with(
             utils.IsAMatcher(context.RequestContext))
         self.share_manager.driver.check_for_setup_error.\
@@ -241,25 +242,31 @@ class ShareManagerTestCase(test.TestCase):
         self.assertFalse(self.share_manager.driver.initialized)
 
     def _setup_init_mocks(self, setup_access_rules=True):
-        instances = [
+        shares = [
             db_utils.create_share(id='fake_id_1',
                                   status=constants.STATUS_AVAILABLE,
-                                  display_name='fake_name_1').instance,
+                                  display_name='fake_name_1'),
             db_utils.create_share(id='fake_id_2',
                                   status=constants.STATUS_ERROR,
-                                  display_name='fake_name_2').instance,
+                                  display_name='fake_name_2'),
             db_utils.create_share(id='fake_id_3',
                                   status=constants.STATUS_AVAILABLE,
-                                  display_name='fake_name_3').instance,
+                                  display_name='fake_name_3'),
             db_utils.create_share(
                 id='fake_id_4',
                 status=constants.STATUS_AVAILABLE,
                 task_state=constants.TASK_STATE_MIGRATION_IN_PROGRESS,
-                display_name='fake_name_4').instance,
+                display_name='fake_name_4'),
             db_utils.create_share(id='fake_id_5',
                                   status=constants.STATUS_AVAILABLE,
-                                  display_name='fake_name_5').instance,
+                                  display_name='fake_name_5'),
         ]
+        instances = []
+        for share in shares:
+            instance = share.instance
+            instance.set_share_data(share)
+            instance['share_server_id'] = 'fake_server_id'
+            instances.append(instance)
 
         instances[4]['access_rules_status'] = constants.STATUS_OUT_OF_SYNC
 
@@ -282,20 +289,19 @@ class ShareManagerTestCase(test.TestCase):
 
         instances, rules = self._setup_init_mocks()
         fake_export_locations = ['fake/path/1', 'fake/path']
-        share_server = 'fake_share_server_type_does_not_matter'
+        share_server = {'id': 'fake_server_id'}
         self.mock_object(self.share_manager.db,
                          'share_instances_get_all_by_host',
                          mock.Mock(return_value=instances))
-        self.mock_object(self.share_manager.db, 'share_instance_get',
-                         mock.Mock(side_effect=[instances[0], instances[2],
-                                                instances[4]]))
         self.mock_object(self.share_manager.db,
-                         'share_export_locations_update')
+                         'share_server_get_all_by_host',
+                         mock.Mock(return_value=[share_server]))
+        self.mock_object(self.share_manager.db,
+                         'share_export_locations_update_many')
         self.mock_object(self.share_manager.driver, 'ensure_share',
                          mock.Mock(return_value=fake_export_locations))
         self.mock_object(self.share_manager, '_ensure_share_instance_has_pool')
-        self.mock_object(self.share_manager, '_get_share_server',
-                         mock.Mock(return_value=share_server))
+        self.mock_object(self.share_manager, '_get_share_server')
         self.mock_object(self.share_manager, 'publish_service_capabilities',
                          mock.Mock())
         self.mock_object(self.share_manager.db,
@@ -312,13 +318,19 @@ class ShareManagerTestCase(test.TestCase):
 
         # verification of call
         self.share_manager.db.share_instances_get_all_by_host.\
+            assert_called_once_with(utils.IsAMatcher(context.RequestContext),
+                                    self.share_manager.host,
+                                    with_share_data=True)
+        self.share_manager.db.share_server_get_all_by_host.\
             assert_called_once_with(utils.IsAMatcher(context.RequestContext),
                                     self.share_manager.host)
-        exports_update = self.share_manager.db.share_export_locations_update
-        exports_update.assert_has_calls([
-            mock.call(mock.ANY, instances[0]['id'], fake_export_locations),
-            mock.call(mock.ANY, instances[2]['id'], fake_export_locations)
-        ])
+        exports_update = (
+            self.share_manager.db.share_export_locations_update_many)
+        exports_update.assert_called_once_with(
+            utils.IsAMatcher(context.RequestContext),
+            {instances[0]['id']: fake_export_locations,
+             instances[2]['id']: fake_export_locations,
+             instances[4]['id']: fake_export_locations})
         self.share_manager.driver.do_setup.assert_called_once_with(
             utils.IsAMatcher(context.RequestContext))
         self.share_manager.driver.check_for_setup_error.\
@@ -327,10 +339,7 @@ class ShareManagerTestCase(test.TestCase):
             mock.call(utils.IsAMatcher(context.RequestContext), instances[0]),
             mock.call(utils.IsAMatcher(context.RequestContext), instances[2]),
         ])
-        self.share_manager._get_share_server.assert_has_calls([
-            mock.call(utils.IsAMatcher(context.RequestContext), instances[0]),
-            mock.call(utils.IsAMatcher(context.RequestContext), instances[2]),
-        ])
+        self.assertFalse(self.share_manager._get_share_server.called)
         self.share_manager.driver.ensure_share.assert_has_calls([
             mock.call(utils.IsAMatcher(context.RequestContext), instances[0],
                       share_server=share_server),
@@ -349,18 +358,16 @@ class ShareManagerTestCase(test.TestCase):
             raise exception.ManilaException(message="Fake raise")
 
         instances = self._setup_init_mocks(setup_access_rules=False)
-        share_server = 'fake_share_server_type_does_not_matter'
+        share_server = {'id': 'fake_server_id'}
         self.mock_object(self.share_manager.db,
                          'share_instances_get_all_by_host',
                          mock.Mock(return_value=instances))
-        self.mock_object(self.share_manager.db, 'share_instance_get',
-                         mock.Mock(side_effect=[instances[0], instances[2],
-                                                instances[3]]))
+        self.mock_object(self.share_manager.db,
+                         'share_server_get_all_by_host',
+                         mock.Mock(return_value=[share_server]))
         self.mock_object(self.share_manager.driver, 'ensure_share',
                          mock.Mock(side_effect=raise_exception))
         self.mock_object(self.share_manager, '_ensure_share_instance_has_pool')
-        self.mock_object(self.share_manager, '_get_share_server',
-                         mock.Mock(return_value=share_server))
         self.mock_object(self.share_manager, 'publish_service_capabilities')
         self.mock_object(manager.LOG, 'error')
         self.mock_object(manager.LOG, 'info')
@@ -371,7 +378,8 @@ class ShareManagerTestCase(test.TestCase):
         # verification of call
         self.share_manager.db.share_instances_get_all_by_host.\
             assert_called_once_with(utils.IsAMatcher(context.RequestContext),
-                                    self.share_manager.host)
+                                    self.share_manager.host,
+                                    with_share_data=True)
         self.share_manager.driver.do_setup.assert_called_once_with(
             utils.IsAMatcher(context.RequestContext))
         self.share_manager.driver.check_for_setup_error.assert_called_with()
@@ -379,10 +387,6 @@ class ShareManagerTestCase(test.TestCase):
             mock.call(utils.IsAMatcher(context.RequestContext), instances[0]),
             mock.call(utils.IsAMatcher(context.RequestContext), instances[2]),
         ])
-        self.share_manager._get_share_server.assert_has_calls([
-            mock.call(utils.IsAMatcher(context.RequestContext), instances[0]),
-            mock.call(utils.IsAMatcher(context.RequestContext), instances[2]),
-        ])
         self.share_manager.driver.ensure_share.assert_has_calls([
             mock.call(utils.IsAMatcher(context.RequestContext), instances[0],
                       share_server=share_server),
@@ -407,18 +411,15 @@ class ShareManagerTestCase(test.TestCase):
             raise exception.ManilaException(message="Fake raise")
 
         instances, rules = self._setup_init_mocks()
-        share_server = 'fake_share_server_type_does_not_matter'
+        share_server = {'id': 'fake_server_id'}
         smanager = self.share_manager
         self.mock_object(smanager.db, 'share_instances_get_all_by_host',
                          mock.Mock(return_value=instances))
-        self.mock_object(self.share_manager.db, 'share_instance_get',
-                         mock.Mock(side_effect=[instances[0], instances[2],
-                                                instances[4]]))
+        self.mock_object(smanager.db, 'share_server_get_all_by_host',
+                         mock.Mock(return_value=[share_server]))
         self.mock_object(self.share_manager.driver, 'ensure_share',
                          mock.Mock(return_value=None))
         self.mock_object(smanager, '_ensure_share_instance_has_pool')
-        self.mock_object(smanager, '_get_share_server',
-                         mock.Mock(return_value=share_server))
         self.mock_object(smanager, 'publish_service_capabilities')
         self.mock_object(manager.LOG, 'error')
         self.mock_object(manager.LOG, 'info')
@@ -433,7 +434,7 @@ class ShareManagerTestCase(test.TestCase):
         # verification of call
         smanager.db.share_instances_get_all_by_host.\
             assert_called_once_with(utils.IsAMatcher(context.RequestContext),
-                                    smanager.host)
+                                    smanager.host, with_share_data=True)
         smanager.driver.do_setup.assert_called_once_with(
             utils.IsAMatcher(context.RequestContext))
         smanager.driver.check_for_setup_error.assert_called_with()
@@ -441,10 +442,6 @@ class ShareManagerTestCase(test.TestCase):
             mock.call(utils.IsAMatcher(context.RequestContext), instances[0]),
             mock.call(utils.IsAMatcher(context.RequestContext), instances[2]),
         ])
-        smanager._get_share_server.assert_has_calls([
-            mock.call(utils.IsAMatcher(context.RequestContext), instances[0]),
-            mock.call(utils.IsAMatcher(context.RequestContext), instances[2]),
-        ])
         smanager.driver.ensure_share.assert_has_calls([
             mock.call(utils.IsAMatcher(context.RequestContext), instances[0],
                       share_server=share_server),
@@ -471,6 +468,91 @@ class ShareManagerTestCase(test.TestCase):
             mock.call(mock.ANY, mock.ANY),
         ])
 
+    def test_init_host_with_driver_ensure_shares(self):
+        instances, rules = self._setup_init_mocks()
+        share_server = {'id': 'fake_server_id'}
+        fake_export_locations = ['fake/path/1', 'fake/path']
+        smanager = self.share_manager
+        self.mock_object(smanager.db, 'share_instances_get_all_by_host',
+                         mock.Mock(return_value=instances))
+        self.mock_object(smanager.db, 'share_server_get_all_by_host',
+                         mock.Mock(return_value=[share_server]))
+        self.mock_object(smanager.db, 'share_export_locations_update_many')
+        self.mock_object(smanager.driver, 'ensure_share')
+        self.mock_object(
+            smanager.driver, 'ensure_shares',
+            mock.Mock(return_value={instances[0]['id']: fake_export_locations,
+                                    instances[2]['id']: None}))
+        self.mock_object(smanager, '_ensure_share_instance_has_pool')
+        self.mock_object(smanager, 'publish_service_capabilities')
+        self.mock_object(smanager.access_helper, 'update_access_rules')
+
+        smanager.init_host()
+
+        smanager.driver.ensure_shares.assert_called_once_with(
+            utils.IsAMatcher(context.RequestContext),
+            [instances[0], instances[2], instances[4]],
+            share_servers={share_server['id']: share_server})
+        self.assertFalse(smanager.driver.ensure_share.called)
+        smanager.db.share_export_locations_update_many.\
+            assert_called_once_with(
+                utils.IsAMatcher(context.RequestContext),
+                {instances[0]['id']: fake_export_locations})
+        smanager.access_helper.update_access_rules.assert_called_once_with(
+            utils.IsAMatcher(context.RequestContext), instances[4]['id'],
+            share_server=share_server)
+        smanager.publish_service_capabilities.assert_called_once_with(
+            utils.IsAMatcher(context.RequestContext))
+
+    def test_init_host_with_exception_on_driver_ensure_shares(self):
+        instances = self._setup_init_mocks(setup_access_rules=False)
+        smanager = self.share_manager
+        self.mock_object(smanager.db, 'share_instances_get_all_by_host',
+                         mock.Mock(return_value=instances))
+        self.mock_object(smanager.db, 'share_server_get_all_by_host',
+                         mock.Mock(return_value=[{'id': 'fake_server_id'}]))
+        self.mock_object(smanager.db, 'share_export_locations_update_many')
+        self.mock_object(smanager.driver, 'ensure_share')
+        self.mock_object(smanager.driver, 'ensure_shares',
+                         mock.Mock(side_effect=exception.ManilaException))
+        self.mock_object(smanager, '_ensure_share_instance_has_pool')
+        self.mock_object(smanager, 'publish_service_capabilities')
+        self.mock_object(smanager.access_helper, 'update_access_rules')
+        self.mock_object(manager.LOG, 'error')
+
+        smanager.init_host()
+
+        self.assertFalse(smanager.driver.ensure_share.called)
+        self.assertFalse(
+            smanager.db.share_export_locations_update_many.called)
+        self.assertFalse(smanager.access_helper.update_access_rules.called)
+        self.assertEqual(1, manager.LOG.error.call_count)
+        smanager.publish_service_capabilities.assert_called_once_with(
+            utils.IsAMatcher(context.RequestContext))
+
+    def test_init_host_with_share_server_on_other_host(self):
+        instances = self._setup_init_mocks(setup_access_rules=False)
+        share_server = {'id': 'fake_server_id'}
+        smanager = self.share_manager
+        self.mock_object(smanager.db, 'share_instances_get_all_by_host',
+                         mock.Mock(return_value=instances[:1]))
+        self.mock_object(smanager.db, 'share_server_get_all_by_host',
+                         mock.Mock(return_value=[]))
+        self.mock_object(smanager, '_get_share_server',
+                         mock.Mock(return_value=share_server))
+        self.mock_object(smanager.driver, 'ensure_share',
+                         mock.Mock(return_value=None))
+        self.mock_object(smanager, '_ensure_share_instance_has_pool')
+        self.mock_object(smanager, 'publish_service_capabilities')
+
+        smanager.init_host()
+
+        smanager._get_share_server.assert_called_once_with(
+            utils.IsAMatcher(context.RequestContext), instances[0])
+        smanager.driver.ensure_share.assert_called_once_with(
+            utils.IsAMatcher(context.RequestContext), instances[0],
+            share_server=share_server)
+
     def test_create_share_instance_from_snapshot_with_server(self):
         """Test share can be created from snapshot if server exists."""
         network = db_utils.create_share_network()
@@ -1174,28 +1256,105 @@ class ShareManagerTestCase(test.TestCase):
         self.assertTrue(mock_info_log.called)
         self.assertFalse(mock_snap_instance_update.called)
 
-    @ddt.data('openstack1@watson#_pool0', 'openstack1@newton#_pool0')
-    def test_periodic_share_replica_update(self, host):
+    def test_periodic_share_replica_update(self):
         mock_debug_log = self.mock_object(manager.LOG, 'debug')
         replicas = [
-            fake_replica(host='openstack1@watson#pool4'),
-            fake_replica(host='openstack1@watson#pool5'),
-            fake_replica(host='openstack1@newton#pool5'),
-            fake_replica(host='openstack1@newton#pool5'),
-
+            fake_replica(host='openstack1@watson#pool4',
+                         share_server='fake_share_server'),
+            fake_replica(host='openstack1@watson#pool5',
+                         share_server='fake_share_server'),
         ]
-        self.mock_object(self.share_manager.db, 'share_replicas_get_all',
-                         mock.Mock(return_value=replicas))
+        mock_get_replicas = self.mock_object(
+            self.share_manager.db, 'share_replicas_get_all_by_host',
+            mock.Mock(return_value=replicas))
+        self.mock_object(self.share_manager.driver, 'update_replica_states',
+                         mock.Mock(side_effect=NotImplementedError))
         mock_update_method = self.mock_object(
             self.share_manager, '_share_replica_update')
-
-        self.share_manager.host = host
+        self.share_manager.host = 'openstack1@watson'
 
         self.share_manager.periodic_share_replica_update(self.context)
 
+        mock_get_replicas.assert_called_once_with(
+            self.context, 'openstack1@watson',
+            replica_states=(constants.REPLICA_STATE_IN_SYNC,
+                            constants.REPLICA_STATE_OUT_OF_SYNC,
+                            constants.STATUS_ERROR),
+            exclude_statuses=constants.TRANSITIONAL_STATUSES,
+            with_share_data=True, with_share_server=True)
+        self.share_manager.driver.update_replica_states.\
+            assert_called_once_with(
+                self.context, mock.ANY,
+                share_servers={replicas[0]['share_server_id']:
+                               'fake_share_server'})
+        mock_update_method.assert_has_calls([
+            mock.call(self.context, replicas[0],
+                      share_id=replicas[0]['share_id']),
+            mock.call(self.context, replicas[1],
+                      share_id=replicas[1]['share_id']),
+        ], any_order=True)
         self.assertEqual(2, mock_update_method.call_count)
         self.assertEqual(1, mock_debug_log.call_count)
 
+    def test_periodic_share_replica_update_driver_replica_states(self):
+        replicas = [fake_replica(share_server='fake_share_server')
+                    for i in range(3)]
+        self.mock_object(self.share_manager.db,
+                         'share_replicas_get_all_by_host',
+                         mock.Mock(return_value=replicas))
+        self.mock_object(
+            self.share_manager.driver, 'update_replica_states',
+            mock.Mock(return_value={
+                replicas[0]['id']: constants.REPLICA_STATE_IN_SYNC,
+                replicas[1]['id']: None,
+            }))
+        mock_update_method = self.mock_object(
+            self.share_manager, '_share_replica_update')
+
+        self.share_manager.periodic_share_replica_update(self.context)
+
+        mock_update_method.assert_has_calls([
+            mock.call(self.context, replicas[0],
+                      share_id=replicas[0]['share_id'],
+                      replica_state=constants.REPLICA_STATE_IN_SYNC),
+            mock.call(self.context, replicas[2],
+                      share_id=replicas[2]['share_id']),
+        ], any_order=True)
+        self.assertEqual(2, mock_update_method.call_count)
+
+    def test_periodic_share_replica_update_nothing_to_update(self):
+        self.mock_object(self.share_manager.db,
+                         'share_replicas_get_all_by_host',
+                         mock.Mock(return_value=[]))
+        mock_driver_call = self.mock_object(self.share_manager.driver,
+                                            'update_replica_states')
+        mock_update_method = self.mock_object(
+            self.share_manager, '_share_replica_update')
+
+        self.share_manager.periodic_share_replica_update(self.context)
+
+        self.assertFalse(mock_driver_call.called)
+        self.assertFalse(mock_update_method.called)
+
+    def test__share_replica_update_with_replica_state(self):
+        replica = fake_replica(
+            replica_state=constants.REPLICA_STATE_OUT_OF_SYNC)
+        self.mock_object(self.share_manager.db, 'share_replica_get',
+                         mock.Mock(return_value=replica))
+        mock_driver_call = self.mock_object(
+            self.share_manager.driver, 'update_replica_state')
+        mock_db_update_call = self.mock_object(
+            self.share_manager.db, 'share_replica_update')
+
+        self.share_manager._share_replica_update(
+            self.context, replica, share_id=replica['share_id'],
+            replica_state=constants.REPLICA_STATE_IN_SYNC)
+
+        self.assertFalse(mock_driver_call.called)
+        mock_db_update_call.assert_called_once_with(
+            self.context, replica['id'],
+            {'replica_state': constants.REPLICA_STATE_IN_SYNC})
+
     @ddt.data(constants.REPLICA_STATE_IN_SYNC,
               constants.REPLICA_STATE_OUT_OF_SYNC)
     def test__share_replica_update_driver_exception(self, replica_state):
@@ -2423,10 +2582,6 @@ class ShareManagerTestCase(test.TestCase):
                 self.share_manager.driver, 'delete_share',
                 mock.Mock(side_effect=exception.ShareResourceNotFound(
                     share_id=share['id'])))
-            self.mock_object(
-                self.share_manager.access_helper, '_check_needs_refresh',
-                mock.Mock(return_value=False)
-            )
 
         self.mock_object(manager.LOG, 'warning')
 
@@ -3360,9 +3515,9 @@ class ShareManagerTestCase(test.TestCase):
         self.mock_object(self.share_manager.db, 'cgsnapshot_get',
                          mock.Mock(return_value=fake_snap))
         self.mock_object(self.share_manager.db, 'consistency_group_update')
-        self.mock_object(self.share_manager.db, 'share_instance_update')
+        self.mock_object(self.share_manager.db, 'share_instances_update_many')
         self.mock_object(self.share_manager.db,
-                         'share_export_locations_update')
+                         'share_export_locations_update_many')
         fake_share_update_list = [{'id': fake_share['id'],
                                    'foo': 'bar',
                                    'export_locations': fake_export_locations}]
@@ -3373,10 +3528,11 @@ class ShareManagerTestCase(test.TestCase):
 
         self.share_manager.create_consistency_group(self.context, "fake_id")
 
-        self.share_manager.db.share_instance_update.\
-            assert_any_call(mock.ANY, 'fake_share_id', {'foo': 'bar'})
-        self.share_manager.db.share_export_locations_update.\
-            assert_any_call(mock.ANY, 'fake_share_id', fake_export_locations)
+        self.share_manager.db.share_instances_update_many.\
+            assert_any_call(mock.ANY, [{'id': 'fake_share_id', 'foo': 'bar'}])
+        self.share_manager.db.share_export_locations_update_many.\
+            assert_called_once_with(
+                mock.ANY, {'fake_share_id': fake_export_locations})
         self.share_manager.db.consistency_group_update.\
             assert_any_call(mock.ANY, 'fake_id',
                             {'status': constants.STATUS_AVAILABLE,
@@ -3420,7 +3576,7 @@ class ShareManagerTestCase(test.TestCase):
                          'share_instances_get_all_by_consistency_group_id',
                          mock.Mock(return_value=[fake_share]))
         self.mock_object(self.share_manager.db, 'consistency_group_update')
-        self.mock_object(self.share_manager.db, 'share_instance_update')
+        self.mock_object(self.share_manager.db, 'share_instances_update_many')
         self.mock_object(self.share_manager.driver,
                          'create_consistency_group_from_cgsnapshot',
                          mock.Mock(side_effect=exception.Error))
@@ -3429,9 +3585,10 @@ class ShareManagerTestCase(test.TestCase):
                           self.share_manager.create_consistency_group,
                           self.context, "fake_id")
 
-        self.share_manager.db.share_instance_update.\
-            assert_any_call(mock.ANY, 'fake_share_id',
-                            {'status': constants.STATUS_ERROR})
+        self.share_manager.db.share_instances_update_many.\
+            assert_called_once_with(
+                mock.ANY, [{'id': 'fake_share_id',
+                            'status': constants.STATUS_ERROR}])
         self.share_manager.db.consistency_group_update.\
             assert_called_once_with(mock.ANY, 'fake_id',
                                     {'status': constants.STATUS_ERROR})
@@ -3871,6 +4028,58 @@ class ShareManagerTestCase(test.TestCase):
             migration_api.ShareMigrationHelper.\
                 cleanup_new_instance.assert_called_once_with(new_instance)
 
+    def test__migration_start_generic_resumes_copy(self):
+        db_utils.create_share(id='fake_id')
+        instance = db_utils.create_share_instance(
+            share_id='fake_id',
+            status=constants.STATUS_MIGRATING,
+            share_server_id='fake_server_id')
+        kept_instance = db_utils.create_share_instance(
+            share_id='fake_id',
+            status=constants.STATUS_MIGRATING_TO,
+            host='fake_host@backend#pool')
+        other_instance = db_utils.create_share_instance(
+            share_id='fake_id',
+            status=constants.STATUS_MIGRATING_TO,
+            host='other_host@backend#pool')
+        share = db.share_get(self.context, 'fake_id')
+        host = {'host': 'fake_host@backend#pool'}
+        server = 'share_server'
+
+        # mocks
+        self.mock_object(self.share_manager.db, 'share_server_get',
+                         mock.Mock(return_value=server))
+        self.mock_object(self.share_manager.db, 'share_instance_get',
+                         mock.Mock(return_value=kept_instance))
+        self.mock_object(self.share_manager.db, 'share_instance_update')
+        self.mock_object(migration_api.ShareMigrationHelper,
+                         'change_to_read_only')
+        self.mock_object(migration_api.ShareMigrationHelper,
+                         'create_instance_and_wait')
+        self.mock_object(migration_api.ShareMigrationHelper,
+                         'cleanup_new_instance')
+        self.mock_object(self.share_manager.driver, 'migration_get_info',
+                         mock.Mock(return_value='src_fake_info'))
+        self.mock_object(rpcapi.ShareAPI, 'migration_get_info',
+                         mock.Mock(return_value='dest_fake_info'))
+        self.mock_object(data_rpc.DataAPI, 'migration_start')
+
+        # run
+        self.share_manager._migration_start_generic(
+            self.context, share, instance, host, False)
+
+        # asserts
+        self.share_manager.db.share_instance_get.assert_called_once_with(
+            self.context, kept_instance['id'], with_share_data=True)
+        self.assertFalse(migration_api.ShareMigrationHelper.
+                         create_instance_and_wait.called)
+        self.assertFalse(self.share_manager.db.share_instance_update.called)
+        migration_api.ShareMigrationHelper.cleanup_new_instance.\
+            assert_called_once_with(other_instance)
+        data_rpc.DataAPI.migration_start.assert_called_once_with(
+            self.context, share['id'], ['lost+found'], instance['id'],
+            kept_instance['id'], 'src_fake_info', 'dest_fake_info', False)
+
     @ddt.data('fake_model_update', Exception('fake'))
     def test_migration_complete_driver(self, exc):
         server = 'fake_server'
@@ -4025,9 +4234,13 @@ class ShareManagerTestCase(test.TestCase):
         self.share_manager.db.share_server_get.assert_called_once_with(
             utils.IsAMatcher(context.RequestContext), 'fake_server_id')
 
-        if status != 'other':
+        if status == constants.TASK_STATE_DATA_COPYING_ERROR:
+            self.assertFalse(
+                migration_api.ShareMigrationHelper.cleanup_new_instance.called)
+        elif status != 'other':
             migration_api.ShareMigrationHelper.cleanup_new_instance.\
                 assert_called_once_with(new_instance)
+        if status != 'other':
             migration_api.ShareMigrationHelper.cleanup_access_rules.\
                 assert_called_once_with(instance, server,
                                         self.share_manager.driver)
@@ -4644,48 +4857,69 @@ class ShareManagerTestCase(test.TestCase):
 
     def test_periodic_share_replica_snapshot_update(self):
         mock_debug_log = self.mock_object(manager.LOG, 'debug')
-        replicas = 3 * [
+        replicas = [
             fake_replica(host='malfoy@manor#_pool0',
                          replica_state=constants.REPLICA_STATE_IN_SYNC)
+            for i in range(2)
         ]
-        replicas.append(fake_replica(replica_state=constants.STATUS_ACTIVE))
         snapshot = fakes.fake_snapshot(create_instance=True,
                                        status=constants.STATUS_DELETING)
-        snapshot_instances = 3 * [
-            fakes.fake_snapshot_instance(base_snapshot=snapshot)
+        replica_snapshots = [
+            fakes.fake_snapshot_instance(
+                base_snapshot=snapshot, share_instance_id=replica['id'],
+                status=constants.STATUS_DELETING)
+            for replica in replicas
         ]
-        self.mock_object(
-            db, 'share_replicas_get_all', mock.Mock(return_value=replicas))
-        self.mock_object(db, 'share_snapshot_instance_get_all_with_filters',
-                         mock.Mock(return_value=snapshot_instances))
+        snapshot_instances = replica_snapshots + [snapshot['instance']]
+        mock_get_replicas = self.mock_object(
+            db, 'share_replicas_get_all_by_host',
+            mock.Mock(return_value=replicas))
+        mock_get_snapshot_instances = self.mock_object(
+            db, 'share_snapshot_instance_get_all_with_filters',
+            mock.Mock(side_effect=[replica_snapshots, snapshot_instances]))
         mock_snapshot_update_call = self.mock_object(
             self.share_manager, '_update_replica_snapshot')
+        self.share_manager.host = 'malfoy@manor'
 
         retval = self.share_manager.periodic_share_replica_snapshot_update(
             self.context)
 
         self.assertIsNone(retval)
         self.assertEqual(1, mock_debug_log.call_count)
-        self.assertEqual(0, mock_snapshot_update_call.call_count)
+        mock_get_replicas.assert_called_once_with(
+            self.context, 'malfoy@manor',
+            replica_states=(constants.REPLICA_STATE_IN_SYNC,
+                            constants.REPLICA_STATE_OUT_OF_SYNC,
+                            constants.STATUS_ERROR),
+            with_share_server=False)
+        mock_get_snapshot_instances.assert_has_calls([
+            mock.call(self.context,
+                      {'share_instance_ids': mock.ANY,
+                       'statuses': (constants.STATUS_CREATING,
+                                    constants.STATUS_DELETING)}),
+            mock.call(self.context, {'snapshot_ids': [snapshot['id']]}),
+        ])
+        mock_snapshot_update_call.assert_has_calls([
+            mock.call(self.context, replica_snapshot,
+                      replica_snapshots=snapshot_instances,
+                      share_id=replicas[0]['share_id'])
+            for replica_snapshot in replica_snapshots
+        ], any_order=True)
 
     @ddt.data(True, False)
     def test_periodic_share_replica_snapshot_update_nothing_to_update(
-            self, has_instances):
+            self, has_replicas):
         mock_debug_log = self.mock_object(manager.LOG, 'debug')
         replicas = 3 * [
             fake_replica(host='malfoy@manor#_pool0',
                          replica_state=constants.REPLICA_STATE_IN_SYNC)
         ]
-        replicas.append(fake_replica(replica_state=constants.STATUS_ACTIVE))
-        snapshot = fakes.fake_snapshot(create_instance=True,
-                                       status=constants.STATUS_DELETING)
-        snapshot_instances = 3 * [
-            fakes.fake_snapshot_instance(base_snapshot=snapshot)
-        ]
-        self.mock_object(db, 'share_replicas_get_all',
-                         mock.Mock(side_effect=[[], replicas]))
-        self.mock_object(db, 'share_snapshot_instance_get_all_with_filters',
-                         mock.Mock(side_effect=[snapshot_instances, []]))
+        self.mock_object(db, 'share_replicas_get_all_by_host',
+                         mock.Mock(return_value=replicas if has_replicas
+                                   else []))
+        mock_get_snapshot_instances = self.mock_object(
+            db, 'share_snapshot_instance_get_all_with_filters',
+            mock.Mock(return_value=[]))
         mock_snapshot_update_call = self.mock_object(
             self.share_manager, '_update_replica_snapshot')
 
@@ -4694,6 +4928,8 @@ class ShareManagerTestCase(test.TestCase):
 
         self.assertIsNone(retval)
         self.assertEqual(1, mock_debug_log.call_count)
+        self.assertEqual(has_replicas,
+                         mock_get_snapshot_instances.called)
         self.assertEqual(0, mock_snapshot_update_call.call_count)
 
     def test__update_replica_snapshot_replica_deleted_from_database(self):
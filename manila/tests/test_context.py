@@ -31,6 +31,30 @@ class ContextTestCase(test.TestCase):
         self.assertFalse('admin' in user_context.roles)
         self.assertTrue('admin' in admin_context.roles)
 
+    def test_to_policy_values(self):
+        ctxt = context.RequestContext('111', '222', roles=['weasel'],
+                                      is_admin=False)
+
+        values = ctxt.to_policy_values()
+
+        self.assertEqual(ctxt.to_dict(), values)
+        self.assertIs(values, ctxt.to_policy_values())
+
+    def test_to_policy_values_identity_changed(self):
+        ctxt = context.RequestContext('111', '222', roles=['weasel'],
+                                      is_admin=False)
+        values = ctxt.to_policy_values()
+
+        admin_values = ctxt.elevated().to_policy_values()
+        ctxt.roles.append('fake_role')
+        role_values = ctxt.to_policy_values()
+
+        self.assertFalse(values['is_admin'])
+        self.assertTrue(admin_values['is_admin'])
+        self.assertIn('admin', admin_values['roles'])
+        self.assertIsNot(values, role_values)
+        self.assertEqual(['weasel', 'fake_role'], role_values['roles'])
+
     def test_request_context_sets_is_admin(self):
         ctxt = context.RequestContext('111',
                                       '222',
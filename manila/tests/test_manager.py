@@ -112,9 +112,143 @@ class SchedulerDependentManagerTestCase(test.TestCase):
 
         self.sched_manager.scheduler_rpcapi.update_service_capabilities.\
             assert_called_once_with(
-                self.context, self.service_name, self.host, last_capabilities)
+                self.context, self.service_name, self.host, last_capabilities,
+                seqno=None)
         manager.LOG.debug.assert_called_once_with(mock.ANY)
 
+    def _publish_capabilities(self, capabilities, full=False):
+        self.sched_manager.last_capabilities = capabilities
+        self.sched_manager._publish_service_capabilities(self.context,
+                                                         full=full)
+
+    def test__publish_service_capabilities_delta(self):
+        self.flags(capabilities_full_update_interval=10)
+        rpcapi = self.sched_manager.scheduler_rpcapi
+        self.mock_object(rpcapi, 'update_service_capabilities')
+        self.mock_object(rpcapi, 'update_service_capabilities_delta')
+        capabilities = {
+            'foo': 'bar',
+            'pools': [{'pool_name': 'p1', 'free_capacity_gb': 10},
+                      {'pool_name': 'p2', 'free_capacity_gb': 20}],
+        }
+
+        self._publish_capabilities(capabilities)
+        self._publish_capabilities({
+            'foo': 'bar',
+            'pools': [{'pool_name': 'p1', 'free_capacity_gb': 5},
+                      {'pool_name': 'p2', 'free_capacity_gb': 20}],
+        })
+
+        rpcapi.update_service_capabilities.assert_called_once_with(
+            self.context, self.service_name, self.host, capabilities,
+            seqno=1)
+        rpcapi.update_service_capabilities_delta.assert_called_once_with(
+            self.context, self.service_name, self.host,
+            {'updated': {}, 'removed': [],
+             'pools': {'p1': {'updated': {'free_capacity_gb': 5},
+                              'removed': []}},
+             'removed_pools': []},
+            2)
+
+    def test__publish_service_capabilities_full_interval(self):
+        self.flags(capabilities_full_update_interval=3)
+        rpcapi = self.sched_manager.scheduler_rpcapi
+        self.mock_object(rpcapi, 'update_service_capabilities')
+        self.mock_object(rpcapi, 'update_service_capabilities_delta')
+
+        for i in range(7):
+            self._publish_capabilities({'foo': i})
+
+        self.assertEqual(
+            [1, 4, 7],
+            [c[1]['seqno'] for c in
+             rpcapi.update_service_capabilities.call_args_list])
+        self.assertEqual(
+            [2, 3, 5, 6],
+            [c[0][4] for c in
+             rpcapi.update_service_capabilities_delta.call_args_list])
+
+    def test__publish_service_capabilities_full(self):
+        self.flags(capabilities_full_update_interval=10)
+        rpcapi = self.sched_manager.scheduler_rpcapi
+        self.mock_object(rpcapi, 'update_service_capabilities')
+        self.mock_object(rpcapi, 'update_service_capabilities_delta')
+
+        self._publish_capabilities({'foo': 'bar'})
+        self._publish_capabilities({'foo': 'baz'}, full=True)
+
+        rpcapi.update_service_capabilities.assert_has_calls([
+            mock.call(self.context, self.service_name, self.host,
+                      {'foo': 'bar'}, seqno=1),
+            mock.call(self.context, self.service_name, self.host,
+                      {'foo': 'baz'}, seqno=2),
+        ])
+        self.assertFalse(rpcapi.update_service_capabilities_delta.called)
+
+    def test__publish_service_capabilities_deltas_disabled(self):
+        rpcapi = self.sched_manager.scheduler_rpcapi
+        self.mock_object(rpcapi, 'update_service_capabilities')
+        self.mock_object(rpcapi, 'update_service_capabilities_delta')
+
+        self._publish_capabilities({'foo': 'bar'})
+        self._publish_capabilities({'foo': 'baz'})
+
+        rpcapi.update_service_capabilities.assert_has_calls([
+            mock.call(self.context, self.service_name, self.host,
+                      {'foo': 'bar'}, seqno=None),
+            mock.call(self.context, self.service_name, self.host,
+                      {'foo': 'baz'}, seqno=None),
+        ])
+        self.assertFalse(rpcapi.update_service_capabilities_delta.called)
+
+    def test__publish_service_capabilities_pools_not_comparable(self):
+        self.flags(capabilities_full_update_interval=10)
+        rpcapi = self.sched_manager.scheduler_rpcapi
+        self.mock_object(rpcapi, 'update_service_capabilities')
+        self.mock_object(rpcapi, 'update_service_capabilities_delta')
+
+        self._publish_capabilities({'pools': [{'free_capacity_gb': 1}]})
+        self._publish_capabilities({'pools': [{'free_capacity_gb': 2}]})
+
+        self.assertEqual(2, rpcapi.update_service_capabilities.call_count)
+        self.assertFalse(rpcapi.update_service_capabilities_delta.called)
+
+    def test__get_capabilities_delta(self):
+        old = {
+            'foo': 'bar',
+            'old_key': 'value',
+            'pools': [{'pool_name': 'p1', 'free_capacity_gb': 10, 'x': 1},
+                      {'pool_name': 'p2', 'free_capacity_gb': 20},
+                      {'pool_name': 'p3', 'free_capacity_gb': 30}],
+        }
+        new = {
+            'foo': 'baz',
+            'new_key': 'value',
+            'pools': [{'pool_name': 'p1', 'free_capacity_gb': 5},
+                      {'pool_name': 'p2', 'free_capacity_gb': 20},
+                      {'pool_name': 'p4', 'free_capacity_gb': 40}],
+        }
+
+        delta = manager._get_capabilities_delta(old, new)
+
+        self.assertEqual({'foo': 'baz', 'new_key': 'value'}, delta['updated'])
+        self.assertEqual(['old_key'], delta['removed'])
+        self.assertEqual(
+            {'p1': {'updated': {'free_capacity_gb': 5}, 'removed': ['x']},
+             'p4': {'updated': {'pool_name': 'p4', 'free_capacity_gb': 40},
+                    'removed': []}},
+            delta['pools'])
+        self.assertEqual(['p3'], delta['removed_pools'])
+
+    @ddt.data(({}, {'pools': []}),
+              ({'pools': None}, {'pools': None}),
+              ({'pools': [{'pool_name': 'p'}, {'pool_name': 'p'}]},
+               {'pools': []}),
+              ('fake', {}))
+    @ddt.unpack
+    def test__get_capabilities_delta_not_comparable(self, old, new):
+        self.assertIsNone(manager._get_capabilities_delta(old, new))
+
     @ddt.data(None, '', [], {}, {'foo': 'bar'})
     def test_update_service_capabilities(self, capabilities):
         self.sched_manager.update_service_capabilities(capabilities)
@@ -17,6 +17,7 @@
 
 import os.path
 
+import mock
 from oslo_config import cfg
 from oslo_policy import policy as common_policy
 
@@ -134,6 +135,155 @@ class PolicyTestCase(test.TestCase):
         policy.enforce(admin_context, uppercase_action, self.target)
 
 
+class PolicyDecisionCacheTestCase(test.TestCase):
+
+    def setUp(self):
+        super(PolicyDecisionCacheTestCase, self).setUp()
+        policy.reset()
+        policy.init()
+        self.rules = {
+            "example:allowed": [],
+            "example:denied": [["false:false"]],
+            "example:my_file": [["role:compute_admin"],
+                                ["project_id:%(project_id)s"]],
+            "example:get_http": [["http:http://www.example.com"]],
+        }
+        self._set_rules(['example:allowed', 'example:denied',
+                         'example:my_file'])
+        self.context = context.RequestContext('fake', 'fake', roles=['member'])
+        self.mock_enforce = self.mock_object(
+            policy._ENFORCER, 'enforce',
+            mock.Mock(side_effect=policy._ENFORCER.enforce))
+
+    def tearDown(self):
+        policy.reset()
+        super(PolicyDecisionCacheTestCase, self).tearDown()
+
+    def _set_rules(self, actions):
+        these_rules = common_policy.Rules.from_dict(
+            {action: self.rules[action] for action in actions})
+        policy._ENFORCER.set_rules(these_rules)
+
+    def test_enforce_cached(self):
+        target = {'project_id': 'fake', 'user_id': 'fake'}
+
+        self.assertTrue(policy.enforce(self.context, 'example:my_file',
+                                       target))
+        self.assertTrue(policy.enforce(self.context, 'example:my_file',
+                                       dict(target)))
+
+        self.assertEqual(1, self.mock_enforce.call_count)
+
+    def test_enforce_denied_cached(self):
+        for __ in range(2):
+            self.assertRaises(exception.PolicyNotAuthorized, policy.enforce,
+                              self.context, 'example:denied', {})
+            self.assertFalse(policy.enforce(self.context, 'example:denied',
+                                            {}, do_raise=False))
+
+        self.assertEqual(1, self.mock_enforce.call_count)
+
+    def test_enforce_cached_per_target_owner(self):
+        policy.enforce(self.context, 'example:my_file',
+                       {'project_id': 'fake', 'user_id': 'fake'})
+
+        self.assertRaises(exception.PolicyNotAuthorized, policy.enforce,
+                          self.context, 'example:my_file',
+                          {'project_id': 'another', 'user_id': 'fake'})
+        self.assertEqual(2, self.mock_enforce.call_count)
+
+    def test_enforce_cached_per_credentials(self):
+        target = {'project_id': 'another'}
+        self.assertRaises(exception.PolicyNotAuthorized, policy.enforce,
+                          self.context, 'example:my_file', target)
+
+        self.context.roles.append('compute_admin')
+
+        policy.enforce(self.context, 'example:my_file', target)
+        self.assertEqual(2, self.mock_enforce.call_count)
+
+    def test_enforce_rules_changed(self):
+        policy.enforce(self.context, 'example:allowed', {})
+
+        self.rules['example:allowed'] = [['false:false']]
+        self._set_rules(['example:allowed'])
+
+        self.assertRaises(exception.PolicyNotAuthorized, policy.enforce,
+                          self.context, 'example:allowed', {})
+        self.assertEqual(2, self.mock_enforce.call_count)
+
+    def test_enforce_not_cached_with_http_check(self):
+        self._set_rules(['example:allowed', 'example:get_http'])
+
+        policy.enforce(self.context, 'example:allowed', {})
+        policy.enforce(self.context, 'example:allowed', {})
+
+        self.assertEqual(2, self.mock_enforce.call_count)
+
+    def test_enforce_not_cached_with_dict_context(self):
+        credentials = self.context.to_dict()
+
+        policy.enforce(credentials, 'example:allowed', {})
+        policy.enforce(credentials, 'example:allowed', {})
+
+        self.assertEqual(2, self.mock_enforce.call_count)
+
+
+class EnforcerTestCase(test.TestCase):
+
+    def setUp(self):
+        super(EnforcerTestCase, self).setUp()
+        self.enforcer = policy.Enforcer(CONF)
+        self.mock_load_rules = self.mock_object(
+            common_policy.Enforcer, 'load_rules')
+        self.mock_time = self.mock_object(policy.time, 'time',
+                                          mock.Mock(return_value=100))
+
+    def test_load_rules_throttled(self):
+        self.flags(policy_reload_interval=60)
+
+        self.enforcer.load_rules()
+        self.mock_time.return_value = 159
+        self.enforcer.load_rules()
+
+        self.mock_load_rules.assert_called_once_with(False)
+
+    def test_load_rules_interval_expired(self):
+        self.flags(policy_reload_interval=60)
+
+        self.enforcer.load_rules()
+        self.mock_time.return_value = 160
+        self.enforcer.load_rules()
+
+        self.assertEqual(2, self.mock_load_rules.call_count)
+
+    def test_load_rules_forced(self):
+        self.flags(policy_reload_interval=60)
+
+        self.enforcer.load_rules()
+        self.enforcer.load_rules(True)
+
+        self.mock_load_rules.assert_has_calls([mock.call(False),
+                                               mock.call(True)])
+
+    def test_load_rules_after_clear(self):
+        self.flags(policy_reload_interval=60)
+
+        self.enforcer.load_rules()
+        self.enforcer.clear()
+        self.enforcer.load_rules()
+
+        self.assertEqual(2, self.mock_load_rules.call_count)
+
+    def test_load_rules_interval_zero(self):
+        self.flags(policy_reload_interval=0)
+
+        self.enforcer.load_rules()
+        self.enforcer.load_rules()
+
+        self.assertEqual(2, self.mock_load_rules.call_count)
+
+
 class DefaultPolicyTestCase(test.TestCase):
 
     def setUp(self):
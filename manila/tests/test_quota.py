@@ -19,6 +19,7 @@ import datetime
 import mock
 from oslo_config import cfg
 from oslo_utils import timeutils
+from oslo_utils import uuidutils
 import testtools
 
 from manila.common import constants
@@ -1119,6 +1120,12 @@ class FakeSession(object):
     def add(self, instance):
         pass
 
+    def add_all(self, instances):
+        pass
+
+    def flush(self):
+        pass
+
     def __enter__(self):
         return self
 
@@ -1164,14 +1171,20 @@ class QuotaReserveSqlAlchemyTestCase(test.TestCase):
         self.usages = {}
         self.usages_created = {}
         self.reservations_created = {}
+        self.usages_locked = []
+        self.session = FakeSession()
 
         def fake_get_session():
-            return FakeSession()
+            return self.session
 
-        def fake_get_project_quota_usages(context, session, project_id):
+        def fake_get_project_quota_usages(context, session, project_id,
+                                          resources=None):
+            self.usages_locked.append(('project', resources))
             return self.usages.copy()
 
-        def fake_get_user_quota_usages(context, session, project_id, user_id):
+        def fake_get_user_quota_usages(context, session, project_id, user_id,
+                                       resources=None):
+            self.usages_locked.append(('user', resources))
             return self.usages.copy()
 
         def fake_quota_usage_create(context, project_id, user_id, resource,
@@ -1185,16 +1198,19 @@ class QuotaReserveSqlAlchemyTestCase(test.TestCase):
 
             return quota_usage_ref
 
-        def fake_reservation_create(context, uuid, usage_id, project_id,
-                                    user_id, resource, delta, expire,
-                                    session=None):
-            reservation_ref = self._make_reservation(
-                uuid, usage_id, project_id, user_id, resource, delta, expire,
-                timeutils.utcnow(), timeutils.utcnow())
+        def fake_reservations_create(context, session, usages, project_id,
+                                     user_id, deltas, expire):
+            reservations = []
+            for resource, delta in deltas.items():
+                reservation_ref = self._make_reservation(
+                    uuidutils.generate_uuid(), usages[resource], project_id,
+                    user_id, resource, delta, expire, timeutils.utcnow(),
+                    timeutils.utcnow())
 
-            self.reservations_created[resource] = reservation_ref
+                self.reservations_created[resource] = reservation_ref
+                reservations.append(reservation_ref.uuid)
 
-            return reservation_ref
+            return reservations
 
         self.mock_object(sqa_api, 'get_session', fake_get_session)
         self.mock_object(sqa_api, '_get_project_quota_usages',
@@ -1203,8 +1219,8 @@ class QuotaReserveSqlAlchemyTestCase(test.TestCase):
                          fake_get_user_quota_usages)
         self.mock_object(sqa_api, '_quota_usage_create',
                          fake_quota_usage_create)
-        self.mock_object(sqa_api, '_reservation_create',
-                         fake_reservation_create)
+        self.mock_object(sqa_api, '_reservations_create',
+                         fake_reservations_create)
 
         self.patcher = mock.patch.object(timeutils, 'utcnow')
         self.mock_utcnow = self.patcher.start()
@@ -1318,6 +1334,74 @@ class QuotaReserveSqlAlchemyTestCase(test.TestCase):
                   usage_id=self.usages_created['gigabytes'],
                   delta=2 * 1024), ])
 
+    def test_quota_reserve_locks_reserved_resources_only(self):
+        self.init_usage('test_project', 'test_user', 'shares', 3, 0)
+        context = FakeContext('test_project', 'test_class')
+        quotas = dict(shares=5, gigabytes=10 * 1024, )
+        deltas = dict(shares=1, )
+
+        sqa_api.quota_reserve(context, self.resources, quotas, quotas,
+                              deltas, self.expire, 0, 0)
+
+        self.assertEqual([('user', ['shares']), ('project', ['shares'])],
+                         self.usages_locked)
+
+    def test_quota_reserve_flushes_new_usages_once(self):
+        self.mock_object(self.session, 'add_all')
+        self.mock_object(self.session, 'flush')
+        context = FakeContext('test_project', 'test_class')
+        quotas = dict(shares=5, gigabytes=10 * 1024, )
+        deltas = dict(shares=2, gigabytes=2 * 1024, )
+
+        sqa_api.quota_reserve(context, self.resources, quotas, quotas,
+                              deltas, self.expire, 0, 0)
+
+        self.session.add_all.assert_called_once_with(mock.ANY)
+        self.assertEqual(
+            sorted(self.usages_created.values(), key=id),
+            sorted(self.session.add_all.call_args[0][0], key=id))
+        self.session.flush.assert_called_once_with()
+
+    def test_quota_reserve_overs_flushes_new_usages(self):
+        self.mock_object(self.session, 'add_all')
+        self.mock_object(self.session, 'flush')
+        context = FakeContext('test_project', 'test_class')
+        quotas = dict(shares=1, gigabytes=10 * 1024, )
+        deltas = dict(shares=2, gigabytes=2 * 1024, )
+
+        self.assertRaises(exception.OverQuota,
+                          sqa_api.quota_reserve,
+                          context, self.resources, quotas, quotas,
+                          deltas, self.expire, 0, 0)
+
+        self.assertEqual(
+            sorted(self.usages_created.values(), key=id),
+            sorted(self.session.add_all.call_args[0][0], key=id))
+        self.session.flush.assert_called_once_with()
+        self.assertEqual({}, self.reservations_created)
+
+    def test_quota_reserve_ignores_sync_of_other_resources(self):
+        self.init_usage('test_project', 'test_user', 'shares', -1, 0)
+        self.init_usage('test_project', 'test_user', 'gigabytes', 5, 0)
+        sync = mock.Mock(return_value={'shares': 2, 'gigabytes': 7})
+        context = FakeContext('test_project', 'test_class')
+        quotas = dict(shares=5, gigabytes=10 * 1024, )
+        deltas = dict(shares=1, )
+
+        with mock.patch.dict(sqa_api.QUOTA_SYNC_FUNCTIONS,
+                             {'_sync_shares': sync}):
+            sqa_api.quota_reserve(context, self.resources, quotas, quotas,
+                                  deltas, self.expire, 0, 0)
+
+        self.assertEqual(1, sync.call_count)
+
+        self.compare_usage(self.usages, [dict(resource='shares',
+                                              in_use=2,
+                                              reserved=1),
+                                         dict(resource='gigabytes',
+                                              in_use=5,
+                                              reserved=0), ])
+
     def test_quota_reserve_negative_in_use(self):
         self.init_usage('test_project', 'test_user', 'shares', -1, 0,
                         until_refresh=1)
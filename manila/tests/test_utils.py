@@ -24,6 +24,7 @@ import time
 import uuid
 
 import ddt
+import eventlet
 import mock
 from oslo_config import cfg
 from oslo_utils import timeutils
@@ -574,6 +575,304 @@ class SSHPoolTestCase(test.TestCase):
             paramiko.SSHClient.assert_called_once_with()
 
 
+class SSHSessionManagerTestCase(test.TestCase):
+    """Unit test for the shared SSH session manager."""
+
+    def setUp(self):
+        super(SSHSessionManagerTestCase, self).setUp()
+        self.server = {'ip': '127.0.0.1', 'username': 'test',
+                       'password': 'test'}
+        self.mock_object(paramiko, 'SSHClient',
+                         mock.Mock(side_effect=FakeSSHClient))
+        self.mock_object(utils.processutils, 'ssh_execute',
+                         mock.Mock(return_value=('out', '')))
+        self.manager = utils.SSHSessionManager(10, max_channels=2,
+                                               idle_timeout=60)
+
+    def test_execute_reuses_session(self):
+        for i in range(3):
+            result = self.manager.execute(self.server, ['fake', 'command'],
+                                          check_exit_code=False)
+
+        self.assertEqual(('out', ''), result)
+        paramiko.SSHClient.assert_called_once_with()
+        ssh = utils.processutils.ssh_execute.call_args[0][0]
+        utils.processutils.ssh_execute.assert_has_calls(
+            [mock.call(ssh, 'fake command', check_exit_code=False)] * 3)
+        stats = self.manager.get_stats()
+        self.assertEqual(1, stats['sessions'])
+        self.assertEqual(1, stats['sessions_created'])
+        self.assertEqual(3, stats['commands'])
+
+    def test_execute_replaces_dead_session(self):
+        self.manager.execute(self.server, ['fake'])
+        ssh = utils.processutils.ssh_execute.call_args[0][0]
+        ssh.get_transport().active = False
+
+        self.manager.execute(self.server, ['fake'])
+
+        self.assertEqual(2, paramiko.SSHClient.call_count)
+        self.assertIsNot(ssh, utils.processutils.ssh_execute.call_args[0][0])
+        self.assertEqual(1, self.manager.get_stats()['sessions_replaced'])
+
+    def test_execute_evicts_idle_sessions(self):
+        other_server = dict(self.server, ip='127.0.0.2')
+        self.manager.execute(other_server, ['fake'])
+        ssh = utils.processutils.ssh_execute.call_args[0][0]
+        self.mock_object(ssh, 'close')
+        session = self.manager._sessions[
+            self.manager._get_key(other_server)]
+        session.last_used -= 120
+
+        self.manager.execute(self.server, ['fake'])
+
+        ssh.close.assert_called_once_with()
+        stats = self.manager.get_stats()
+        self.assertEqual(1, stats['sessions'])
+        self.assertEqual(1, stats['sessions_evicted'])
+
+    def test_execute_limits_concurrent_commands(self):
+        running = []
+        max_running = []
+        event = eventlet.event.Event()
+
+        def _ssh_execute(*args, **kwargs):
+            running.append(1)
+            max_running.append(len(running))
+            event.wait()
+            running.pop()
+            return 'out', ''
+
+        utils.processutils.ssh_execute.side_effect = _ssh_execute
+        pool = eventlet.GreenPool()
+        for i in range(4):
+            pool.spawn_n(self.manager.execute, self.server, ['fake'])
+        eventlet.sleep(0)
+        event.send()
+        pool.waitall()
+
+        self.assertEqual(2, max(max_running))
+        self.assertEqual(4, self.manager.get_stats()['commands'])
+
+    def test_execute_failure(self):
+        utils.processutils.ssh_execute.side_effect = (
+            utils.processutils.ProcessExecutionError)
+
+        self.assertRaises(utils.processutils.ProcessExecutionError,
+                          self.manager.execute, self.server, ['fake'])
+
+        stats = self.manager.get_stats()
+        self.assertEqual(1, stats['commands'])
+        self.assertEqual(1, stats['commands_failed'])
+        self.assertEqual(0, self.manager._sessions[
+            self.manager._get_key(self.server)].users)
+
+    def test_close_all(self):
+        self.manager.execute(self.server, ['fake'])
+
+        self.manager.close_all()
+
+        self.assertEqual(0, self.manager.get_stats()['sessions'])
+
+
+class StatusWatcherTestCase(test.TestCase):
+    """Unit test for the shared resource status watcher."""
+
+    def setUp(self):
+        super(StatusWatcherTestCase, self).setUp()
+        self.statuses = {}
+        self.get_func = mock.Mock(side_effect=self._get)
+        self.list_func = mock.Mock(side_effect=lambda: [
+            self._get(resource_id) for resource_id in self.statuses])
+        self.watcher = utils.StatusWatcher(
+            self.get_func, self.list_func, min_interval=0.01,
+            max_interval=0.04,
+            ignored_exceptions=(exception.InstanceNotFound, ))
+
+    def _get(self, resource_id):
+        if resource_id not in self.statuses:
+            raise exception.InstanceNotFound(instance_id=resource_id)
+        return {'id': resource_id, 'status': self.statuses[resource_id]}
+
+    @staticmethod
+    def _is_ready(resource):
+        if resource['status'] == 'error':
+            raise exception.ManilaException('failed')
+        return resource['status'] == 'ready'
+
+    def _set_status_later(self, resource_id, status, delay=0.05):
+        def _set():
+            self.statuses[resource_id] = status
+        eventlet.spawn_after(delay, _set)
+
+    def test_wait_single_resource_uses_get(self):
+        self.statuses['fake1'] = 'creating'
+        self._set_status_later('fake1', 'ready')
+
+        ready, resource = self.watcher.wait('fake1', self._is_ready, 5)
+
+        self.assertTrue(ready)
+        self.assertEqual({'id': 'fake1', 'status': 'ready'}, resource)
+        self.get_func.assert_called_with('fake1')
+        self.assertFalse(self.list_func.called)
+        self.assertEqual({}, self.watcher._waiters)
+
+    def test_wait_many_resources_batched(self):
+        resource_ids = ['fake%s' % i for i in range(20)]
+        for resource_id in resource_ids:
+            self.statuses[resource_id] = 'creating'
+            self._set_status_later(resource_id, 'ready')
+        pool = eventlet.GreenPool()
+
+        results = list(pool.imap(
+            lambda resource_id: self.watcher.wait(
+                resource_id, self._is_ready, 5), resource_ids))
+
+        self.assertEqual([True] * 20, [ready for ready, __ in results])
+        self.assertFalse(self.get_func.called)
+        self.assertTrue(self.list_func.called)
+        self.assertLess(self.list_func.call_count, 20)
+
+    def test_wait_not_listed_resource_is_got(self):
+        self.list_func.side_effect = lambda: [self._get('fake1')]
+        self.statuses.update({'fake1': 'ready', 'fake2': 'ready'})
+        pool = eventlet.GreenPool()
+
+        results = list(pool.imap(
+            lambda resource_id: self.watcher.wait(
+                resource_id, self._is_ready, 5), ['fake1', 'fake2']))
+
+        self.assertEqual([True, True], [ready for ready, __ in results])
+        self.get_func.assert_called_once_with('fake2')
+
+    def test_wait_timeout(self):
+        self.statuses['fake1'] = 'creating'
+
+        ready, resource = self.watcher.wait('fake1', self._is_ready, 0.1)
+
+        self.assertFalse(ready)
+        self.assertEqual({'id': 'fake1', 'status': 'creating'}, resource)
+        self.assertEqual({}, self.watcher._waiters)
+
+    def test_wait_wall_clock_pinned(self):
+        self.statuses['fake1'] = 'ready'
+        self.mock_object(utils.time, 'time', mock.Mock(return_value=5))
+
+        ready, resource = self.watcher.wait('fake1', self._is_ready, 5)
+
+        self.assertTrue(ready)
+
+    def test_wait_ignored_exception(self):
+        self._set_status_later('fake1', 'ready')
+
+        ready, resource = self.watcher.wait('fake1', self._is_ready, 5)
+
+        self.assertTrue(ready)
+
+    def test_wait_check_raises(self):
+        self.statuses['fake1'] = 'creating'
+        self._set_status_later('fake1', 'error')
+
+        self.assertRaises(exception.ManilaException, self.watcher.wait,
+                          'fake1', self._is_ready, 5)
+        self.assertEqual({}, self.watcher._waiters)
+
+    def test_wait_get_raises(self):
+        self.get_func.side_effect = exception.VolumeNotFound(volume_id='x')
+
+        self.assertRaises(exception.VolumeNotFound, self.watcher.wait,
+                          'fake1', self._is_ready, 5)
+
+    def test_poll_backoff(self):
+        self.statuses['fake1'] = 'creating'
+        self.watcher._waiters['fake1'] = [utils._StatusWaiter(self._is_ready)]
+        self.now = 0
+        intervals = []
+
+        def fake_sleep(seconds):
+            self.now += seconds
+
+        def fake_poll():
+            intervals.append(self.watcher._interval)
+            if len(intervals) == 5:
+                self.watcher._waiters.clear()
+            return False
+
+        self.mock_object(self.watcher, '_poll',
+                         mock.Mock(side_effect=fake_poll))
+        self.mock_object(utils.eventlet, 'sleep',
+                         mock.Mock(side_effect=fake_sleep))
+        self.mock_object(self.watcher, '_now',
+                         mock.Mock(side_effect=lambda: self.now))
+
+        self.watcher._poll_loop()
+
+        self.assertEqual([0.01, 0.02, 0.04, 0.04, 0.04], intervals)
+        self.assertIsNone(self.watcher._poller)
+
+
+class VersionedTTLCacheTestCase(test.TestCase):
+
+    def setUp(self):
+        super(VersionedTTLCacheTestCase, self).setUp()
+        self.ttl = 10
+        self.cache = utils.VersionedTTLCache(lambda: self.ttl)
+        self.mock_time = self.mock_object(utils.time, 'time',
+                                          mock.Mock(return_value=100))
+
+    def test_get_cached(self):
+        load = mock.Mock(return_value={'key': 'value'})
+
+        first = self.cache.get('fake', load)
+        second = self.cache.get('fake', load)
+
+        load.assert_called_once_with()
+        self.assertEqual({'key': 'value'}, first)
+        self.assertEqual(first, second)
+
+    def test_get_returns_copies(self):
+        load = mock.Mock(return_value={'key': ['value']})
+
+        self.cache.get('fake', load)['key'].append('changed')
+        self.cache.get('fake', load)['key'].append('changed')
+
+        self.assertEqual({'key': ['value']}, self.cache.get('fake', load))
+        load.assert_called_once_with()
+
+    def test_get_expired(self):
+        load = mock.Mock(side_effect=['value1', 'value2'])
+
+        self.cache.get('fake', load)
+        self.mock_time.return_value = 110
+
+        self.assertEqual('value2', self.cache.get('fake', load))
+        self.assertEqual(2, load.call_count)
+
+    def test_get_disabled(self):
+        self.ttl = 0
+        load = mock.Mock(side_effect=['value1', 'value2'])
+
+        self.assertEqual('value1', self.cache.get('fake', load))
+        self.assertEqual('value2', self.cache.get('fake', load))
+
+    def test_invalidate(self):
+        load = mock.Mock(side_effect=['value1', 'value2'])
+        self.cache.get('fake', load)
+
+        self.cache.invalidate()
+
+        self.assertEqual(1, self.cache.version)
+        self.assertEqual('value2', self.cache.get('fake', load))
+
+    def test_invalidate_during_load(self):
+        def load():
+            self.cache.invalidate()
+            return 'stale'
+
+        self.assertEqual('stale', self.cache.get('fake', load))
+        self.assertEqual('fresh', self.cache.get('fake', lambda: 'fresh'))
+
+
 class CidrToNetmaskTestCase(test.TestCase):
     """Unit test for cidr to netmask."""
 
@@ -19,8 +19,10 @@ import os
 
 from oslo_config import cfg
 import six
+from sqlalchemy import event
 
 from manila import context
+from manila.db.sqlalchemy import api as db_api
 from manila import utils
 
 CONF = cfg.CONF
@@ -96,3 +98,43 @@ class create_temp_config_with_opts(object):
 
     def __exit__(self, exc_type, exc_value, exc_traceback):
         return False  # do not suppress errors
+
+
+class count_db_queries(object):
+    """Counts SQL statements executed through the database engine.
+
+    usage:
+        with count_db_queries() as counter:
+            db.share_get_all(ctxt)
+        self.assertLessEqual(counter.count, 3)
+
+    Statements issued by nested calls are counted too, so this can be used
+    to assert an upper bound on the queries made by an API call and guard
+    against N+1 loading regressions. The 'SELECT 1' pings oslo.db issues
+    when a connection is checked out of the pool are not counted.
+    """
+
+    _PING_STATEMENTS = ('SELECT 1',)
+
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters,
+                               context, executemany):
+        if statement.strip().upper() not in self._PING_STATEMENTS:
+            self.statements.append(statement)
+
+    def __enter__(self):
+        self.engine = db_api.get_engine()
+        event.listen(self.engine, 'before_cursor_execute',
+                     self._before_cursor_execute)
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        event.remove(self.engine, 'before_cursor_execute',
+                     self._before_cursor_execute)
+        return False  # do not suppress errors
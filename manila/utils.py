@@ -18,6 +18,7 @@
 """Utilities and helper functions."""
 
 import contextlib
+import copy
 import errno
 import functools
 import inspect
@@ -29,8 +30,12 @@ import shutil
 import socket
 import sys
 import tempfile
+import threading
 import time
 
+import eventlet
+from eventlet import event
+from eventlet import hubs
 from eventlet import pools
 import netaddr
 from oslo_concurrency import lockutils
@@ -48,6 +53,7 @@ from manila.common import constants
 from manila.db import api as db_api
 from manila import exception
 from manila.i18n import _
+from manila.i18n import _LW
 
 CONF = cfg.CONF
 LOG = log.getLogger(__name__)
@@ -153,6 +159,277 @@ class SSHPool(pools.Pool):
             self.current_size -= 1
 
 
+class _SSHSession(object):
+
+    def __init__(self, max_channels):
+        self.client = None
+        self.last_used = time.time()
+        self.users = 0
+        self.lock = threading.Lock()
+        self.channels = threading.BoundedSemaphore(max_channels)
+
+
+class SSHSessionManager(object):
+    """Keeps persistent ssh sessions to remote servers.
+
+    A single session is kept per server and shared by all callers, every
+    command running on its own channel of the session transport. The number
+    of commands running at once on a server is limited, sessions idle for
+    longer than idle_timeout seconds are closed and dead sessions are
+    replaced transparently.
+    """
+
+    def __init__(self, conn_timeout, max_channels=8, idle_timeout=600):
+        self.conn_timeout = conn_timeout
+        self.max_channels = max_channels
+        self.idle_timeout = idle_timeout
+        self._sessions = {}
+        self._stats = {
+            'sessions_created': 0,
+            'sessions_replaced': 0,
+            'sessions_evicted': 0,
+            'commands': 0,
+            'commands_failed': 0,
+            'commands_time': 0.0,
+        }
+
+    @staticmethod
+    def _get_key(server):
+        return server['ip'], server.get('port', 22), server['username']
+
+    def get_stats(self):
+        """Returns counters about sessions and the commands run on them."""
+        stats = dict(self._stats)
+        stats['sessions'] = len(self._sessions)
+        return stats
+
+    def execute(self, server, command, check_exit_code=True):
+        """Runs a command on a server through its shared ssh session.
+
+        :param server: dict with 'ip', 'username' and optionally 'port',
+            'password' and 'pk_path' keys.
+        :param command: list with the command and its arguments.
+        """
+        self._evict_idle_sessions()
+        key = self._get_key(server)
+        session = self._sessions.get(key)
+        if session is None:
+            session = self._sessions[key] = _SSHSession(self.max_channels)
+        session.users += 1
+        try:
+            with session.channels:
+                ssh = self._get_client(session, server)
+                start = time.time()
+                try:
+                    return processutils.ssh_execute(
+                        ssh, ' '.join(command),
+                        check_exit_code=check_exit_code)
+                except Exception:
+                    self._stats['commands_failed'] += 1
+                    raise
+                finally:
+                    session.last_used = time.time()
+                    self._stats['commands'] += 1
+                    self._stats['commands_time'] += (
+                        session.last_used - start)
+        finally:
+            session.users -= 1
+
+    def _get_client(self, session, server):
+        with session.lock:
+            if session.client is not None:
+                transport = session.client.get_transport()
+                if transport is not None and transport.is_active():
+                    return session.client
+                LOG.debug("SSH session to %s is not active anymore, "
+                          "reconnecting.", server['ip'])
+                session.client.close()
+                session.client = None
+                self._stats['sessions_replaced'] += 1
+
+            session.client = SSHPool(
+                server['ip'], server.get('port', 22), self.conn_timeout,
+                server['username'], server.get('password'),
+                server.get('pk_path'), max_size=1).create()
+            self._stats['sessions_created'] += 1
+            return session.client
+
+    def _evict_idle_sessions(self):
+        if not self.idle_timeout:
+            return
+        deadline = time.time() - self.idle_timeout
+        for key, session in list(self._sessions.items()):
+            if session.users or session.last_used >= deadline:
+                continue
+            self._sessions.pop(key, None)
+            if session.client is not None:
+                session.client.close()
+            self._stats['sessions_evicted'] += 1
+
+    def close(self, server):
+        """Closes the session to a server, if any."""
+        session = self._sessions.pop(self._get_key(server), None)
+        if session is not None and session.client is not None:
+            session.client.close()
+
+    def close_all(self):
+        for session in list(self._sessions.values()):
+            if session.client is not None:
+                session.client.close()
+        self._sessions.clear()
+
+
+class _StatusWaiter(object):
+
+    def __init__(self, check):
+        self.check = check
+        self.event = event.Event()
+        self.resource = None
+
+
+class StatusWatcher(object):
+    """Waits for remote resources to reach a status with shared polls.
+
+    The status of all the resources waited for is fetched by a single
+    greenthread, with one list call per poll, or one get call when a single
+    resource is watched, instead of each waiter polling its own resource.
+    Waiters are woken up through events as soon as their resource is ready
+    or failed. The interval between polls doubles while none of the waiters
+    is woken up, up to max_interval, and goes back to min_interval whenever
+    a waiter is added or woken up.
+    """
+
+    def __init__(self, get_func, list_func, min_interval=1, max_interval=8,
+                 backoff_rate=2, ignored_exceptions=()):
+        """Initializes the watcher.
+
+        :param get_func: callable receiving a resource id and returning the
+            resource as a dict with 'id' and 'status' keys.
+        :param list_func: callable returning a list of such resources.
+            Resources not returned by it are fetched with get_func.
+        :param ignored_exceptions: exceptions raised by get_func that do not
+            abort the wait, such as the resource not being visible yet.
+        """
+        self.get_func = get_func
+        self.list_func = list_func
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff_rate = backoff_rate
+        self.ignored_exceptions = ignored_exceptions
+        self._waiters = {}
+        self._interval = min_interval
+        self._next_poll = 0
+        self._poller = None
+
+    @staticmethod
+    def _now():
+        # NOTE: Polls are scheduled with the clock of the eventlet hub, which
+        # is monotonic and is the one timeouts and sleeps are based on.
+        return hubs.get_hub().clock()
+
+    def wait(self, resource_id, check, timeout):
+        """Waits until a resource satisfies a check or timeout expires.
+
+        :param check: callable receiving the resource and returning True
+            once the wait is over. Exceptions raised by it abort the wait
+            and are raised to the caller.
+        :returns: tuple with a boolean telling whether the check succeeded
+            before timeout and the last state of the resource, or None if
+            it was never retrieved.
+        """
+        waiter = _StatusWaiter(check)
+        self._waiters.setdefault(resource_id, []).append(waiter)
+        self._interval = self.min_interval
+        if self._poller is None:
+            self._next_poll = self._now() + self.min_interval
+            self._poller = eventlet.spawn(self._poll_loop)
+        else:
+            self._next_poll = min(self._next_poll,
+                                  self._now() + self.min_interval)
+        try:
+            with eventlet.Timeout(timeout, False):
+                return True, waiter.event.wait()
+            return False, waiter.resource
+        finally:
+            self._remove_waiter(resource_id, waiter)
+
+    def _remove_waiter(self, resource_id, waiter):
+        waiters = self._waiters.get(resource_id, [])
+        if waiter in waiters:
+            waiters.remove(waiter)
+        if not waiters:
+            self._waiters.pop(resource_id, None)
+
+    def _poll_loop(self):
+        try:
+            while self._waiters:
+                delay = self._next_poll - self._now()
+                if delay > 0:
+                    # NOTE: Sleep in steps of min_interval at most, so that
+                    # new waiters get their first poll in time.
+                    eventlet.sleep(min(delay, self.min_interval))
+                    continue
+                if self._poll():
+                    self._interval = self.min_interval
+                else:
+                    self._interval = min(self._interval * self.backoff_rate,
+                                         self.max_interval)
+                self._next_poll = self._now() + self._interval
+        finally:
+            self._poller = None
+
+    def _poll(self):
+        """Fetches the watched resources and wakes up their waiters.
+
+        :returns: True if any waiter was woken up.
+        """
+        resource_ids = list(self._waiters)
+        resources = {}
+        if len(resource_ids) > 1:
+            try:
+                resources = dict((resource['id'], resource)
+                                 for resource in self.list_func())
+            except Exception as e:
+                LOG.warning(_LW("Failed to list resources to check their "
+                                "status, getting them one by one: %s"), e)
+
+        woken = False
+        for resource_id in resource_ids:
+            resource = resources.get(resource_id)
+            if resource is None:
+                try:
+                    resource = self.get_func(resource_id)
+                except self.ignored_exceptions as e:
+                    LOG.debug("Resource %(id)s is not available yet: %(e)s",
+                              {'id': resource_id, 'e': e})
+                    continue
+                except Exception as e:
+                    woken |= self._wake_up(resource_id, exc=e)
+                    continue
+            woken |= self._wake_up(resource_id, resource=resource)
+        return woken
+
+    def _wake_up(self, resource_id, resource=None, exc=None):
+        woken = False
+        for waiter in list(self._waiters.get(resource_id, [])):
+            if waiter.event.ready():
+                continue
+            if exc is None:
+                waiter.resource = resource
+                try:
+                    if not waiter.check(resource):
+                        continue
+                except Exception as e:
+                    waiter.event.send_exception(e)
+                else:
+                    waiter.event.send(resource)
+            else:
+                waiter.event.send_exception(exc)
+            self._remove_waiter(resource_id, waiter)
+            woken = True
+        return woken
+
+
 def check_ssh_injection(cmd_list):
     ssh_injection_pattern = ['`', '$', '|', '||', ';', '&', '&&', '>', '>>',
                              '<']
@@ -392,6 +669,52 @@ def read_cached_file(filename, cache_info, reload_func=None):
     return cache_info['data']
 
 
+class VersionedTTLCache(object):
+    """In-memory cache of values that expire after a time to live.
+
+    Every invalidation bumps the version of the cache, and a value is only
+    stored if no invalidation happened while it was being loaded, so that
+    a load racing with an update never caches the data the update replaced.
+    Cached values are copied in and out, callers are free to modify them.
+
+    :param ttl: callable returning the time to live in seconds, a value of
+                0 disables caching.
+    """
+
+    def __init__(self, ttl):
+        self._ttl = ttl
+        self._entries = {}
+        self._version = 0
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        return self._version
+
+    def get(self, key, load):
+        """Return the value of key, calling load() if it is not cached."""
+        ttl = self._ttl()
+        if ttl <= 0:
+            return load()
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > now:
+            return copy.deepcopy(entry[1])
+
+        version = self._version
+        value = load()
+        with self._lock:
+            if version == self._version:
+                self._entries[key] = (now + ttl, copy.deepcopy(value))
+        return value
+
+    def invalidate(self):
+        """Drop all cached values."""
+        with self._lock:
+            self._version += 1
+            self._entries = {}
+
+
 def file_open(*args, **kwargs):
     """Open file
 
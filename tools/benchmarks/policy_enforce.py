@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark the policy overhead of API requests.
+
+Simulates share listing requests of a non admin user: a request context is
+created, the listing is authorized, and every listed share is checked with
+the share policy and an extension authorizer, the way per item checks of
+list endpoints do. Prints the policy time per request and per check, and
+the number of rule evaluations and policy file loads per request.
+
+Usage: python tools/benchmarks/policy_enforce.py [requests] [items]
+           [reload_interval] [policy_file]
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import time
+
+from oslo_config import cfg
+from oslo_policy import policy as oslo_policy
+
+from manila.api import extensions
+from manila import context
+from manila import policy
+
+CONF = cfg.CONF
+
+
+def _percentile(samples, percent):
+    samples = sorted(samples)
+    index = min(len(samples) - 1, int(len(samples) * percent / 100.0))
+    return samples[index]
+
+
+def _counting(counter, func):
+    def _count(*args, **kwargs):
+        counter[0] += 1
+        return func(*args, **kwargs)
+    return _count
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    items = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    interval = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    policy_file = (sys.argv[4] if len(sys.argv) > 4 else
+                   os.path.join(os.path.dirname(__file__), os.pardir,
+                                os.pardir, 'etc', 'manila', 'policy.json'))
+
+    CONF([], project='manila', default_config_files=[])
+    if interval is not None:
+        CONF.set_override('policy_reload_interval', interval)
+    policy.init(os.path.abspath(policy_file))
+
+    evaluations = [0]
+    loads = [0]
+    oslo_policy.Enforcer.enforce = _counting(
+        evaluations, oslo_policy.Enforcer.enforce)
+    oslo_policy.Enforcer.load_rules = _counting(
+        loads, oslo_policy.Enforcer.load_rules)
+
+    authorize = extensions.soft_extension_authorizer('share', 'benchmark')
+    shares = [{'id': 'share-%d' % i, 'project_id': 'project',
+               'user_id': 'user-%d' % (i % 3), 'size': 1,
+               'share_proto': 'NFS', 'is_public': False}
+              for i in range(items)]
+
+    timings = []
+    for request in range(requests):
+        start = time.time()
+        ctxt = context.RequestContext('user-0', 'project', roles=['member'])
+        policy.check_policy(ctxt, 'share', 'get_all')
+        for share in shares:
+            policy.check_policy(ctxt, 'share', 'get', share)
+            authorize(ctxt)
+        timings.append(time.time() - start)
+
+    checks = 2 * items + 2
+    print('%d requests, %d items, reload interval %ss' % (
+        requests, items, CONF.policy_reload_interval))
+    print('  request: p50 %.2fms, p99 %.2fms' %
+          (_percentile(timings, 50) * 1000, _percentile(timings, 99) * 1000))
+    print('  per check: %.1fus' %
+          (_percentile(timings, 50) * 1000000 / checks))
+    print('  rule evaluations per request: %.1f' %
+          (evaluations[0] / float(requests)))
+    print('  policy file loads per request: %.1f' %
+          (loads[0] / float(requests)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark concurrent quota reservations.
+
+Runs a number of workers that reserve and commit share quota for a small
+set of projects, the way bursts of share creations do, and prints the
+throughput, per-reservation latency percentiles and the number of SQL
+statements issued per reservation.
+
+By default the database is a temporary SQLite file, in which case the
+workers are serialized by the database lock. Pass a MySQL connection
+string to measure row-level locking.
+
+Usage: python tools/benchmarks/quota_reserve.py [workers] [reservations]
+           [projects] [connection]
+"""
+
+from __future__ import print_function
+
+import datetime
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from oslo_config import cfg
+from oslo_db import exception as db_exception
+from oslo_utils import timeutils
+from sqlalchemy import event
+
+from manila import context
+from manila.db.sqlalchemy import api as sqa_api
+from manila.db.sqlalchemy import models
+from manila import exception
+from manila import quota
+
+CONF = cfg.CONF
+
+QUOTAS = {'shares': 1000000, 'gigabytes': 1000000}
+
+
+def _percentile(samples, percent):
+    samples = sorted(samples)
+    index = min(len(samples) - 1, int(len(samples) * percent / 100.0))
+    return samples[index]
+
+
+def _setup_database(connection):
+    CONF([], project='manila', default_config_files=[])
+    CONF.set_override('connection', connection, group='database')
+    engine = sqa_api.get_engine()
+    models.BASE.metadata.create_all(engine)
+
+    statements = [0]
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _count(*args, **kwargs):
+        statements[0] += 1
+
+    return statements
+
+
+def _worker(resources, project_ids, count, timings, errors):
+    for i in range(count):
+        project_id = project_ids[i % len(project_ids)]
+        ctxt = context.RequestContext('benchmark-user', project_id,
+                                      is_admin=True)
+        expire = timeutils.utcnow() + datetime.timedelta(seconds=60)
+        start = time.time()
+        try:
+            reservations = sqa_api.quota_reserve(
+                ctxt, resources, QUOTAS, QUOTAS,
+                {'shares': 1, 'gigabytes': 1 + i % 10}, expire, 0, 0)
+            sqa_api.reservation_commit(ctxt, reservations,
+                                       project_id=project_id,
+                                       user_id='benchmark-user')
+        except (exception.ManilaException, db_exception.DBError) as e:
+            errors.append(e)
+            continue
+        timings.append(time.time() - start)
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    reservations = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    projects = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    if len(sys.argv) > 4:
+        connection = sys.argv[4]
+        db_file = None
+    else:
+        db_file = tempfile.NamedTemporaryFile(suffix='.sqlite',
+                                              delete=False).name
+        connection = 'sqlite:///%s' % db_file
+
+    try:
+        statements = _setup_database(connection)
+        resources = {res.name: res for res in quota.resources
+                     if res.name in QUOTAS}
+        project_ids = ['benchmark-project-%d' % i for i in range(projects)]
+
+        timings = []
+        errors = []
+        per_worker = reservations // workers
+        threads = [threading.Thread(target=_worker,
+                                    args=(resources, project_ids, per_worker,
+                                          timings, errors))
+                   for _ in range(workers)]
+        start = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.time() - start
+    finally:
+        if db_file:
+            os.unlink(db_file)
+
+    done = len(timings)
+    print('%d workers, %d projects, %s' % (
+        workers, projects, connection.split(':')[0]))
+    print('  reservations: %d committed, %d failed in %.2fs' %
+          (done, len(errors), elapsed))
+    if done:
+        print('  throughput: %.1f reservations/s' % (done / elapsed))
+        print('  latency: p50 %.2fms, p99 %.2fms' %
+              (_percentile(timings, 50) * 1000,
+               _percentile(timings, 99) * 1000))
+        print('  SQL statements per reservation: %.1f' %
+              (statements[0] / float(done)))
+
+
+if __name__ == '__main__':
+    main()
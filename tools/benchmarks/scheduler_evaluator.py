@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark goodness/filter function evaluation over many pools.
+
+Simulates scheduling requests against a few hundred pools, each reporting
+the same goodness function, and prints per-request latency percentiles
+with and without the compiled expression cache.
+
+Usage: python tools/benchmarks/scheduler_evaluator.py [pools] [requests]
+"""
+
+from __future__ import print_function
+
+import sys
+import time
+
+from manila.scheduler.evaluator import evaluator
+
+GOODNESS_FUNCTION = ("(capabilities.total_capacity_gb - "
+                     "capabilities.free_capacity_gb) < 100 ? "
+                     "100 - stats.allocated_capacity_gb / 10 : "
+                     "max(0, 50 - share.size)")
+
+
+def _percentile(samples, percent):
+    samples = sorted(samples)
+    index = min(len(samples) - 1, int(len(samples) * percent / 100.0))
+    return samples[index]
+
+
+def _run(pools, requests, compile_once):
+    timings = []
+    for request in range(requests):
+        start = time.time()
+        for pool in range(pools):
+            if not compile_once:
+                evaluator._cache.clear()
+            evaluator.evaluate(
+                GOODNESS_FUNCTION,
+                capabilities={'total_capacity_gb': 1000,
+                              'free_capacity_gb': 950 - pool % 100},
+                stats={'allocated_capacity_gb': pool},
+                share={'size': request % 50},
+                extra={})
+        timings.append(time.time() - start)
+    return timings
+
+
+def main():
+    pools = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    for label, compile_once in (('parse per host', False),
+                                ('compiled + cached', True)):
+        timings = _run(pools, requests, compile_once)
+        print("%-18s pools=%d p50=%.2fms p99=%.2fms" % (
+            label, pools,
+            _percentile(timings, 50) * 1000,
+            _percentile(timings, 99) * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark rendering of share detail listings.
+
+Builds share models in memory, each with a few replicas and export
+locations, renders them with the share view builder at a given API
+microversion, and prints the rendering time per listing and per share and
+the number of times the effective instance of each share was selected.
+
+Usage: python tools/benchmarks/share_view_render.py [shares] [replicas]
+           [listings] [microversion]
+"""
+
+from __future__ import print_function
+
+import sys
+import time
+
+from oslo_config import cfg
+
+from manila.api.openstack import api_version_request as api_version
+from manila.api.openstack import wsgi
+from manila.api.views import shares as shares_views
+from manila.common import constants
+from manila import context
+from manila.db.sqlalchemy import models
+
+CONF = cfg.CONF
+
+REPLICA_STATES = (constants.REPLICA_STATE_ACTIVE,
+                  constants.REPLICA_STATE_IN_SYNC,
+                  constants.REPLICA_STATE_OUT_OF_SYNC)
+
+
+def _percentile(samples, percent):
+    samples = sorted(samples)
+    index = min(len(samples) - 1, int(len(samples) * percent / 100.0))
+    return samples[index]
+
+
+def _make_share(index, replicas):
+    share_id = 'share-%d' % index
+    instances = []
+    for replica in range(replicas):
+        instance = models.ShareInstance(
+            id='%s-instance-%d' % (share_id, replica),
+            share_id=share_id,
+            host='host%d@backend#pool' % replica,
+            status=constants.STATUS_AVAILABLE,
+            access_rules_status=constants.STATUS_ACTIVE,
+            replica_state=(REPLICA_STATES[min(replica, 2)]
+                           if replicas > 1 else None))
+        instance.export_locations = [
+            models.ShareInstanceExportLocations(
+                path='10.0.%d.%d:/%s' % (replica, path, share_id),
+                is_admin_only=False)
+            for path in range(2)]
+        instances.append(instance)
+
+    share = models.Share(id=share_id, display_name='share %d' % index,
+                         size=1, project_id='project', user_id='user',
+                         share_proto='NFS', is_public=False,
+                         snapshot_support=True, replication_type='dr')
+    share.instances = instances
+    share.share_metadata = []
+    return share
+
+
+def main():
+    shares = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    replicas = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    listings = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+    version = (sys.argv[4] if len(sys.argv) > 4
+               else api_version._MAX_API_VERSION)
+
+    CONF([], project='manila', default_config_files=[])
+    request = wsgi.Request.blank('/project/shares/detail',
+                                 base_url='http://localhost/v2')
+    request.api_version_request = api_version.APIVersionRequest(version)
+    request.environ['manila.context'] = context.RequestContext(
+        'user', 'project', is_admin=True)
+    builder = shares_views.ViewBuilder()
+
+    selections = [0]
+    get_instance = models.Share._get_instance
+
+    def _counting_get_instance(self):
+        selections[0] += 1
+        return get_instance(self)
+
+    models.Share._get_instance = _counting_get_instance
+
+    timings = []
+    for listing in range(listings):
+        # Shares are loaded again from the database for each request.
+        share_models = [_make_share(i, replicas) for i in range(shares)]
+        start = time.time()
+        builder.detail_list(request, share_models)
+        timings.append(time.time() - start)
+
+    print('%d shares with %d replicas, microversion %s' % (
+        shares, replicas, version))
+    print('  listing: p50 %.2fms, p99 %.2fms' %
+          (_percentile(timings, 50) * 1000, _percentile(timings, 99) * 1000))
+    print('  per share: %.1fus' %
+          (_percentile(timings, 50) * 1000000 / shares))
+    print('  instance selections per share: %.1f' %
+          (selections[0] / float(shares * listings)))
+
+
+if __name__ == '__main__':
+    main()
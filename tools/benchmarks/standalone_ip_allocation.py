@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark IP allocation of the standalone network plugin.
+
+Fills a /16 network up to the given percentage with allocations, in the
+lowest addresses, and prints the latency of finding free addresses along
+with the number of allocation lookups the previous per-address search
+would have sent to the database.
+
+Usage: python tools/benchmarks/standalone_ip_allocation.py [full%] [amount]
+"""
+
+from __future__ import print_function
+
+import sys
+import time
+
+import mock
+import netaddr
+from oslo_config import cfg
+
+from manila.network import standalone_network_plugin
+
+CIDR = '10.0.0.0/16'
+CONF = cfg.CONF
+GROUP = 'benchmark'
+
+
+def main():
+    full = int(sys.argv[1]) if len(sys.argv) > 1 else 90
+    amount = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+
+    network = netaddr.IPNetwork(CIDR)
+    used = [str(ip) for ip in
+            list(network.iter_hosts())[:network.size * full // 100]]
+
+    CONF([], project='manila', default_config_files=[])
+    CONF.register_opts(
+        standalone_network_plugin.standalone_network_plugin_opts, group=GROUP)
+    CONF.set_override('standalone_network_plugin_gateway', '10.0.0.1', GROUP)
+    CONF.set_override('standalone_network_plugin_mask', '16', GROUP)
+    plugin = standalone_network_plugin.StandaloneNetworkPlugin(
+        config_group_name=GROUP)
+    plugin.db = mock.Mock()
+    plugin.db.network_allocations_get_ip_addresses.return_value = used
+
+    start = time.time()
+    ips = plugin._get_available_ips(None, amount)
+    elapsed = time.time() - start
+
+    first_free = network.first + len(used) + 1
+    per_ip_lookups = first_free + amount - network.first
+    print("used=%d allocated=%s" % (len(used), ', '.join(ips)))
+    print("bulk query: 1 query, %.2fms" % (elapsed * 1000))
+    print("per-address lookups previously needed: %d queries" %
+          per_ip_lookups)
+
+
+if __name__ == '__main__':
+    main()